@@ -0,0 +1,316 @@
+"""
+Answer cache for grounded chat.
+
+With no real conversation history, the system prompt is fully determined by
+the diagnosis label, the confidence and the response language, so the answer
+depends only on those plus the user's question. Answers are cached under a
+scope of (route, diagnosis, confidence bucket, language) in two tiers:
+
+- exact: the normalized question (case, punctuation and whitespace folded)
+- similar: a MinHash signature over the question's content-word shingles,
+  matched against the other questions in the same scope above a Jaccard
+  threshold ("what are the symptoms?" ~ "which symptoms are typical")
+
+Entries expire after a TTL and are evicted LRU. Requests whose history holds
+a previous user turn bypass the cache — the answer then depends on context.
+
+Configuration (env):
+    CHAT_CACHE_ENABLED            default true
+    CHAT_CACHE_SIZE               max cached answers (default 2048)
+    CHAT_CACHE_TTL                seconds (default 3600)
+    CHAT_CACHE_SIMILARITY         MinHash Jaccard threshold, 0 disables (default 0.8)
+    CHAT_CACHE_CONFIDENCE_BUCKET  confidence bucket width in percent (default 10)
+"""
+
+from __future__ import annotations
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.api.medical_context import parse_diagnosis_context
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed permutations so signatures are stable across processes
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME | 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME,
+    )
+    for i in range(NUM_PERM)
+]
+
+# Function words that carry no meaning for "is this the same question".
+# Negations are deliberately kept.
+_STOPWORDS = frozenset(
+    """a an the is are was were be been being am do does did can could should would
+    will shall may might must what which who whom whose how why when where i me my
+    we our you your it its this that these those there here of to in on at for with
+    about from by as and or if so please tell explain describe give show some any
+    usually typically typical common commonly""".split()
+)
+
+_CJK_RE = re.compile(r"[一-鿿㐀-䶿]")
+
+Scope = Tuple[str, str, int, str]
+
+
+def _char_class(ch: str) -> Optional[str]:
+    if _CJK_RE.match(ch):
+        return "cjk"
+    category = unicodedata.category(ch)
+    # Combining marks (Mn/Mc) belong to the word: Devanagari and Arabic
+    # vowel signs and viramas are marks, and ``re``'s \w does not match them
+    if category[0] in "LM":
+        return "word"
+    if category[0] == "N":
+        return "number"
+    return None
+
+
+def _tokens(text: str) -> List[str]:
+    """Words (letters with their marks), numbers and single CJK ideographs."""
+    tokens: List[str] = []
+    current: List[str] = []
+    current_class = None
+    for ch in text:
+        cls = _char_class(ch)
+        if current and (cls != current_class or cls == "cjk"):
+            tokens.append("".join(current))
+            current = []
+        if cls is not None:
+            current.append(ch)
+        current_class = cls
+    if current:
+        tokens.append("".join(current))
+    return tokens
+
+
+def normalize_question(text: str) -> str:
+    """Case-fold, strip punctuation and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_tokens(text))
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def question_shingles(normalized: str) -> Set[str]:
+    """Content-word unigrams and bigrams of a normalized question."""
+    words = [_stem(w) for w in normalized.split() if w not in _STOPWORDS]
+    shingles = set(words)
+    shingles.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return shingles
+
+
+def minhash(shingles: Iterable[str]) -> Tuple[int, ...]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "big")
+        for s in shingles
+    ]
+    if not hashes:
+        return ()
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimate_jaccard(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def history_is_trivial(history: Iterable) -> bool:
+    """True when the history holds no earlier user turn (e.g. only a greeting)."""
+    for msg in history:
+        role = msg.get("role") if isinstance(msg, dict) else getattr(msg, "role", None)
+        text = msg.get("text") if isinstance(msg, dict) else getattr(msg, "text", "")
+        if role != "assistant" and (text or "").strip():
+            return False
+    return True
+
+
+@dataclass
+class _Entry:
+    answer: str
+    expires_at: float
+    signature: Tuple[int, ...]
+
+
+class ChatAnswerCache:
+    """
+    TTL + LRU cache of chat answers with an exact and a MinHash-similarity tier.
+
+    Args:
+        max_entries: Maximum cached answers across all scopes.
+        ttl: Seconds an answer stays valid.
+        similarity_threshold: Minimum estimated Jaccard for a similar hit; 0 disables the tier.
+        confidence_bucket: Width in percent of the confidence buckets in the scope.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        similarity_threshold: Optional[float] = None,
+        confidence_bucket: Optional[float] = None,
+    ):
+        self.max_entries = max_entries or int(os.getenv("CHAT_CACHE_SIZE", "2048"))
+        self.ttl = ttl or float(os.getenv("CHAT_CACHE_TTL", "3600"))
+        self.similarity_threshold = (
+            similarity_threshold
+            if similarity_threshold is not None
+            else float(os.getenv("CHAT_CACHE_SIMILARITY", "0.8"))
+        )
+        self.confidence_bucket = confidence_bucket or float(
+            os.getenv("CHAT_CACHE_CONFIDENCE_BUCKET", "10")
+        )
+
+        self._entries: "OrderedDict[Tuple[Scope, str], _Entry]" = OrderedDict()
+        self._by_scope: Dict[Scope, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "hits_exact": 0,
+            "hits_similar": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "entries": 0,
+        }
+
+    def scope(self, route: str, diagnosis: str, confidence: float, language: str) -> Scope:
+        bucket = int(max(confidence, 0.0) // self.confidence_bucket)
+        return (route, diagnosis.strip().upper(), bucket, (language or "en").lower())
+
+    def get(self, scope: Scope, question: str) -> Optional[str]:
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._live(scope, normalized, now)
+            if entry is not None:
+                self.stats["hits_exact"] += 1
+                return entry.answer
+
+            if self.similarity_threshold > 0 and self._by_scope.get(scope):
+                signature = minhash(question_shingles(normalized))
+                best, best_score = None, self.similarity_threshold
+                for other in list(self._by_scope[scope]):
+                    candidate = self._live(scope, other, now)
+                    if candidate is None:
+                        continue
+                    score = estimate_jaccard(signature, candidate.signature)
+                    if score >= best_score:
+                        best, best_score = candidate, score
+                if best is not None:
+                    self.stats["hits_similar"] += 1
+                    return best.answer
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, scope: Scope, question: str, answer: str) -> None:
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        entry = _Entry(
+            answer=answer,
+            expires_at=time.time() + self.ttl,
+            signature=minhash(question_shingles(normalized)),
+        )
+        with self._lock:
+            key = (scope, normalized)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._by_scope.setdefault(scope, set()).add(normalized)
+            while len(self._entries) > self.max_entries:
+                (old_scope, old_q), _ = self._entries.popitem(last=False)
+                self._forget(old_scope, old_q)
+            self.stats["entries"] = len(self._entries)
+
+    def bypass(self) -> None:
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_scope.clear()
+            self.stats["entries"] = 0
+
+    def _live(self, scope: Scope, normalized: str, now: float) -> Optional[_Entry]:
+        key = (scope, normalized)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del self._entries[key]
+            self._forget(scope, normalized)
+            self.stats["entries"] = len(self._entries)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _forget(self, scope: Scope, normalized: str) -> None:
+        questions = self._by_scope.get(scope)
+        if questions is not None:
+            questions.discard(normalized)
+            if not questions:
+                del self._by_scope[scope]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_chat_cache_instance: Optional[ChatAnswerCache] = None
+
+
+def get_chat_cache() -> Optional[ChatAnswerCache]:
+    """Shared cache, or None when CHAT_CACHE_ENABLED is false."""
+    global _chat_cache_instance
+    if os.getenv("CHAT_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _chat_cache_instance is None:
+        _chat_cache_instance = ChatAnswerCache()
+    return _chat_cache_instance
+
+
+def lookup_scope(
+    route: str, context: Optional[str], language: Optional[str], history: List
+) -> Tuple[Optional[ChatAnswerCache], Optional[Scope]]:
+    """
+    Resolve the cache and scope for a chat request.
+    Returns (None, None) when caching is disabled or the history is non-trivial.
+    """
+    cache = get_chat_cache()
+    if cache is None:
+        return None, None
+    if not history_is_trivial(history):
+        cache.bypass()
+        return None, None
+
+    diagnosis, confidence = "", 0.0
+    if context:
+        try:
+            diagnosis, confidence = parse_diagnosis_context(context)
+        except Exception:
+            diagnosis = context.strip()
+    return cache, cache.scope(route, diagnosis, confidence, language or "en")
@@ -0,0 +1,288 @@
+"""
+Token-budgeted prompt assembly for the chat routes.
+
+The system message is laid out most-stable-first so provider-side prompt
+caching can reuse it:
+
+    role + response guidelines        identical for every request
+    grounded condition summary        per diagnosis
+    language instruction              per language
+    AI CONFIDENCE for this scan       per request (short trailing line)
+    knowledge base passages           per request, top-k for the question
+
+Everything above the confidence line is memoized per (diagnosis, language).
+History is then filled newest-first into whatever is left of the token
+budget; turns that no longer fit are folded into a one-line recap of the
+earlier questions, or dropped if even that does not fit. Non-English
+sessions get a short language reminder on the final user turn (only when
+there is history to pull the model off-language) instead of two synthetic
+enforcement turns.
+
+Token counts use tiktoken's cl100k_base when installed, otherwise a local
+word/punctuation approximation.
+
+Configuration (env):
+    CHAT_PROMPT_TOKEN_BUDGET   total prompt tokens per request (default 1600)
+    CHAT_HISTORY_MAX_TURNS     most recent history turns considered (default 6)
+    CHAT_HISTORY_MAX_CHARS     per-turn character cap (default 500)
+    CHAT_KB_PASSAGES           knowledge base passages per question; 0 sends
+                               the full condition block instead (default 3)
+"""
+
+from __future__ import annotations
+import os
+import re
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from backend.api.medical_context import (
+    format_condition_summary,
+    format_context_for_prompt,
+    format_passages_for_prompt,
+    get_condition_info,
+    get_relevant_passages,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional dependency, or its BPE file is unavailable offline
+    _ENCODING = None
+
+# Per-message framing overhead in the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_APPROX_TOKEN_RE = re.compile(
+    r"[一-鿿㐀-䶿぀-ヿ가-힯]|[^\W\d_]{1,6}|\d{1,3}|[^\w\s]",
+    re.UNICODE,
+)
+
+SYSTEM_PROMPT_HEADER = """You are VoxRay, an AI radiology assistant designed to help healthcare professionals understand imaging findings.
+
+YOUR ROLE:
+- Explain radiological findings in clear, professional language
+- Provide educational context about detected conditions
+- Recommend appropriate next steps based on clinical guidelines
+- Act as a knowledgeable translator between AI analysis and clinical practice
+
+RESPONSE GUIDELINES:
+
+1. SAFETY & BOUNDARIES (CRITICAL):
+   - You MAY discuss general standard treatments and typical symptoms if listed in the provided context.
+   - Do NOT provide patient-specific prescriptions or specific dosages (e.g., "Take 500mg Amoxicillin").
+   - Never invent findings (e.g., "3mm nodule") if not in verified data.
+   - Always prioritize the provided context over internal knowledge.
+
+2. USE YOUR KNOWLEDGE BASE:
+   - When asked about "symptoms" → Reference TYPICAL SYMPTOMS provided
+   - When asked about "treatment" → Reference STANDARD TREATMENT OPTIONS provided
+   - When asked about "next steps" → Reference RECOMMENDED NEXT STEPS
+
+3. LANGUAGE & TONE:
+   - SAY: "Pneumonia typically presents with..." (Generalizing signs)
+   - DON'T SAY: "I can see..." (Implies specific localization ability)
+   - Keep responses concise (2-4 sentences) for voice output.
+   - Build on previous conversation.
+
+4. LIMITATIONS:
+   - You classified this image based on patterns but cannot pinpoint exact locations.
+   - Specific localization requires radiologist review.
+   - Always recommend professional consultation for treatment decisions.
+"""
+
+
+def count_tokens(text: str) -> int:
+    """Token count of ``text`` with the local tokenizer."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(_APPROX_TOKEN_RE.findall(text))
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def kb_passages_per_question() -> int:
+    return int(os.getenv("CHAT_KB_PASSAGES", "3"))
+
+
+@lru_cache(maxsize=256)
+def system_prefix(
+    diagnosis_label: Optional[str],
+    display_label: Optional[str],
+    language_instruction: str,
+    summary_only: bool = True,
+) -> str:
+    """Memoized system prompt for one (diagnosis, language), without per-scan values."""
+    parts = [SYSTEM_PROMPT_HEADER]
+    if diagnosis_label:
+        condition_info = get_condition_info(diagnosis_label)
+        diagnosis = display_label or diagnosis_label
+        parts.append(
+            format_condition_summary(condition_info, diagnosis)
+            if summary_only
+            else format_context_for_prompt(condition_info, diagnosis, None)
+        )
+    parts.append(language_instruction)
+    return "\n".join(parts)
+
+
+@dataclass
+class AssembledPrompt:
+    """Messages for one chat call plus what the budget did to them."""
+
+    messages: List[Dict[str, str]]
+    prompt_tokens: int
+    system_tokens: int
+    history_kept: int
+    history_dropped: int
+    summarized: bool = False
+    budget: int = 0
+
+
+# Running totals for /metrics
+prompt_stats: Dict[str, int] = {
+    "requests": 0,
+    "prompt_tokens": 0,
+    "history_dropped": 0,
+}
+
+
+def _recap(turns: Iterable[Dict[str, str]], max_chars: int = 80) -> Optional[str]:
+    questions = []
+    for turn in turns:
+        if turn["role"] != "user":
+            continue
+        text = " ".join(turn["content"].split())
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(" ", 1)[0] + "…"
+        questions.append(text)
+    if not questions:
+        return None
+    return "[Earlier in this conversation the user asked: " + "; ".join(questions) + "]"
+
+
+def assemble_chat_prompt(
+    message: str,
+    history: Iterable,
+    language_instruction: str,
+    lang_code: str = "en",
+    diagnosis_label: Optional[str] = None,
+    display_label: Optional[str] = None,
+    confidence: Optional[float] = None,
+    raw_context: Optional[str] = None,
+    budget: Optional[int] = None,
+    max_turns: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    route: str = "chat",
+) -> AssembledPrompt:
+    """
+    Build the message chain for one chat request within a token budget.
+
+    Args:
+        message: The current user message (always kept).
+        history: Prior turns, oldest first, as objects or dicts with role/text.
+        language_instruction: "CRITICAL: Respond ONLY in ..." line.
+        lang_code: ISO code; non-English gets a reminder on the final turn.
+        diagnosis_label: Parsed label; selects the grounded context block.
+        display_label: Human-readable label shown to the model.
+        confidence: Scan confidence in percent, appended after the cached prefix.
+        raw_context: Unparseable context string, passed through verbatim.
+        budget: Total prompt token budget.
+        max_turns: Most recent history turns considered.
+        max_chars: Per-turn character cap.
+        route: Label for the prompt-size log line.
+    """
+    budget = budget or int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "1600"))
+    max_turns = max_turns or int(os.getenv("CHAT_HISTORY_MAX_TURNS", "6"))
+    max_chars = max_chars or int(os.getenv("CHAT_HISTORY_MAX_CHARS", "500"))
+
+    passages_k = kb_passages_per_question()
+    system_content = system_prefix(
+        diagnosis_label, display_label, language_instruction, passages_k > 0
+    )
+    if confidence is not None and diagnosis_label:
+        system_content += f"\nAI CONFIDENCE FOR THIS SCAN: {confidence:.1f}%"
+    if diagnosis_label and passages_k > 0:
+        system_content += format_passages_for_prompt(
+            get_relevant_passages(diagnosis_label, message, k=passages_k)
+        )
+    if raw_context:
+        system_content += f"\nDiagnosis context provided: {raw_context}"
+    system_msg = {"role": "system", "content": system_content}
+
+    turns: List[Dict[str, str]] = []
+    for msg in history:
+        role = msg.get("role") if isinstance(msg, dict) else msg.role
+        text = msg.get("text") if isinstance(msg, dict) else msg.text
+        if not text:
+            continue
+        if len(text) > max_chars:
+            text = text[:max_chars] + "..."
+        turns.append({"role": "assistant" if role == "assistant" else "user", "content": text})
+
+    user_content = message
+    if lang_code != "en" and turns:
+        # History in another language pulls the model off-language; a short
+        # reminder on the final turn is enough to hold it
+        user_content = f"{message}\n\n({language_instruction})"
+    user_msg = {"role": "user", "content": user_content}
+
+    system_tokens = message_tokens(system_msg)
+    used = system_tokens + message_tokens(user_msg)
+
+    # Newest turns first, as many as fit
+    candidates = turns[-max_turns:]
+    older = turns[:-max_turns] if len(turns) > max_turns else []
+    kept: List[Dict[str, str]] = []
+    for turn in reversed(candidates):
+        cost = message_tokens(turn)
+        if used + cost > budget:
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+    dropped = candidates[: len(candidates) - len(kept)]
+
+    summarized = False
+    history_msgs = kept
+    recap = _recap(older + dropped) if (older or dropped) else None
+    if recap is not None:
+        recap_msg = {"role": "user", "content": recap}
+        cost = message_tokens(recap_msg)
+        if used + cost <= budget:
+            # A recap must not sit between two user turns
+            if not kept or kept[0]["role"] == "user":
+                history_msgs = [recap_msg, {"role": "assistant", "content": "[Noted.]"}] + kept
+                cost += message_tokens(history_msgs[1])
+            else:
+                history_msgs = [recap_msg] + kept
+            used += cost
+            summarized = True
+
+    messages = [system_msg] + history_msgs + [user_msg]
+    result = AssembledPrompt(
+        messages=messages,
+        prompt_tokens=used,
+        system_tokens=system_tokens,
+        history_kept=len(kept),
+        history_dropped=len(turns) - len(kept),
+        summarized=summarized,
+        budget=budget,
+    )
+
+    prompt_stats["requests"] += 1
+    prompt_stats["prompt_tokens"] += used
+    prompt_stats["history_dropped"] += result.history_dropped
+    logger.info(
+        f"[ChatPrompt] {route} prompt_tokens={used} system={system_tokens} "
+        f"history={len(kept)}/{len(turns)} summarized={summarized} budget={budget}"
+    )
+    return result
@@ -1,28 +1,57 @@
 import jwt
-from jwt import PyJWKClient
 from fastapi import Request, HTTPException, Depends
 import os
+import logging
 from dotenv import load_dotenv
 from pathlib import Path
+from backend.security.token_verifier import JWKSStore, TokenVerifier, VerifiedTokenCache
 
 # Load env from backend/.env
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 env_path = BASE_DIR / "backend" / ".env"
 load_dotenv(dotenv_path=env_path)
 
+logger = logging.getLogger(__name__)
+
 # Stack Auth Project ID from env
 STACK_PROJECT_ID = os.getenv("STACK_PROJECT_ID")
 
+# Local JWKS file override for offline/test environments
+JWKS_FILE = os.getenv("STACK_JWKS_FILE", "")
+
 # Construct JWKS URL (Public Keys)
-if STACK_PROJECT_ID:
+if os.getenv("STACK_JWKS_URL"):
+    JWKS_URL = os.getenv("STACK_JWKS_URL")
+elif STACK_PROJECT_ID:
     JWKS_URL = f"https://api.stack-auth.com/api/v1/projects/{STACK_PROJECT_ID}/.well-known/jwks.json"
 else:
     # Fallback or warning - for now we proceed but get_current_user will fail if not set
     JWKS_URL = ""
-    print("WARNING: STACK_PROJECT_ID not set. Auth will fail.")
+    if not JWKS_FILE:
+        logger.warning("STACK_PROJECT_ID not set. Auth will fail.")
+
+# Public keys are held in memory and refreshed in the background (see start_auth_refresh);
+# already-verified tokens are served from an LRU until they expire.
+jwks_store = JWKSStore(
+    url=JWKS_URL or None,
+    file_path=JWKS_FILE or None,
+    refresh_interval=float(os.getenv("JWKS_REFRESH_INTERVAL", "3600")),
+)
+token_verifier = TokenVerifier(
+    jwks_store,
+    audience=STACK_PROJECT_ID,
+    cache=VerifiedTokenCache(max_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))),
+)
+
+
+def start_auth_refresh():
+    """Start background JWKS fetching. Called from the app lifespan."""
+    jwks_store.start()
+
+
+def stop_auth_refresh():
+    jwks_store.stop()
 
-# Cache the public keys
-jwks_client = PyJWKClient(JWKS_URL) if JWKS_URL else None
 
 def get_current_user(request: Request):
     """
@@ -35,24 +64,12 @@ def get_current_user(request: Request):
     if not token:
         raise HTTPException(status_code=401, detail="Missing authentication token")
 
-    if not jwks_client:
+    if not jwks_store.configured:
         raise HTTPException(status_code=500, detail="Server auth configuration error (Missing Project ID)")
 
     try:
-        # 2. Get the Signing Key
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
-
-        # 3. Decode & Verify (ES256/RS256)
-        payload = jwt.decode(
-            token,
-            signing_key.key,
-            algorithms=["ES256", "RS256"],
-            audience=STACK_PROJECT_ID,
-            # Add leeway to handle clock skew between client and server
-            leeway=60,  # Allow 60 seconds tolerance
-            options={"verify_aud": True} 
-        )
-        return payload
+        # 2. Cached payload, or signing key lookup + ES256/RS256 verification
+        return token_verifier.verify(token)
 
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -60,17 +77,41 @@ def get_current_user(request: Request):
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
     except Exception as e:
         # Catch-all for other crypto/network errors
-        print(f"Auth Error: {e}")
+        logger.warning(f"Auth Error: {e}")
         raise HTTPException(status_code=401, detail="Authentication failed")
 
+def user_roles(user: dict) -> set:
+    """
+    Roles granted to a verified token: its ``roles``/``role`` claims, plus
+    "admin" for subjects listed in ADMIN_USER_IDS (Stack Auth access tokens
+    carry no roles unless a custom claim is configured).
+    """
+    claim = user.get("roles") or []
+    roles = {claim} if isinstance(claim, str) else set(claim)
+    if isinstance(user.get("role"), str):
+        roles.add(user["role"])
+    admins = {s.strip() for s in os.getenv("ADMIN_USER_IDS", "").split(",") if s.strip()}
+    if user.get("sub") in admins:
+        roles.add("admin")
+    return roles
+
+
 def require_role(role: str):
     """
-    Placeholder for Role-Based Access Control (RBAC).
+    Role-Based Access Control: 403 unless the authenticated user has ``role``.
     Usage: @app.post("/admin", dependencies=[Depends(require_role("admin"))])
     """
     def role_checker(user: dict = Depends(get_current_user)):
-        # In the future, check user.get('roles') or similar from Stack Auth metadata
-        # if role not in user.get('roles', []):
-        #     raise HTTPException(status_code=403, detail="Insufficient permissions")
+        if role not in user_roles(user):
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
         return user
     return role_checker
+
+
+def require_llm_api_key() -> None:
+    """Shared by the v1 and v2 chat routes."""
+    if not os.getenv("OPENROUTER_API_KEY"):
+        raise HTTPException(
+            status_code=500,
+            detail="OpenRouter API Key not found. Please set OPENROUTER_API_KEY in .env",
+        )
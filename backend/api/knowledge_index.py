@@ -0,0 +1,303 @@
+"""
+File-backed medical knowledge base with an inverted index.
+
+Conditions are loaded from versioned JSON files (``knowledge_base/*.json``
+next to this module, or MEDICAL_KB_DIR), so the knowledge base grows by
+adding data, not code. Each file holds::
+
+    {"version": "1.0.0", "last_updated": "2024-01",
+     "aliases": {"TUMOR": "LUNG_CANCER", ...},
+     "conditions": {"PNEUMONIA": {"description": ..., ...}, ...}}
+
+Files are merged in name order; later files may add or override conditions.
+
+Two lookups are served:
+
+- resolve(label): classifier label -> condition key (exact, then substring,
+  then alias keywords), memoized per label.
+- search(question, condition, k): BM25 over per-field passages
+  (description, features, location, next steps, differential, symptoms,
+  treatment) restricted to one condition, so only the parts relevant to the
+  user's question go into the prompt.
+- default_passages(condition): the symptoms, treatment and next-steps
+  passages, for questions the index has no terms for (other languages,
+  "what should I do now?").
+
+Postings are grouped by condition, so a restricted search touches only that
+condition's handful of passages regardless of knowledge base size.
+"""
+
+from __future__ import annotations
+import os
+import re
+import json
+import math
+import unicodedata
+import logging
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KB_DIR = Path(__file__).resolve().parent / "knowledge_base"
+
+# Indexed fields, the heading shown to the model, and words a question about
+# that field is likely to use ("what are the symptoms" -> common_symptoms)
+PASSAGE_FIELDS: Dict[str, Tuple[str, str]] = {
+    "description": ("CONDITION DESCRIPTION", "description overview what mean meaning explain"),
+    "radiological_features": (
+        "TYPICAL RADIOLOGICAL FEATURES",
+        "feature finding sign look appearance indicator show xray x ray image",
+    ),
+    "typical_location": ("COMMON ANATOMICAL LOCATION", "location where located area side lobe"),
+    "next_steps": (
+        "RECOMMENDED NEXT STEPS",
+        "next step recommend recommendation follow up should do test workup",
+    ),
+    "differential": (
+        "DIFFERENTIAL CONSIDERATIONS",
+        "differential diagnosis alternative else other could cause",
+    ),
+    "common_symptoms": (
+        "TYPICAL SYMPTOMS (General Knowledge)",
+        "symptom present presentation feel complaint sign",
+    ),
+    "standard_treatment": (
+        "STANDARD TREATMENT OPTIONS (General Knowledge)",
+        "treatment treat therapy manage management cure medication medicine",
+    ),
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Passages sent when a question matches nothing in the index
+DEFAULT_PASSAGE_FIELDS = ("common_symptoms", "standard_treatment", "next_steps")
+
+_CJK_RE = re.compile(r"[\u4e00-\u9fff\u3400-\u4dbf]")
+_STOPWORDS = frozenset(
+    """a an the is are was were be been do does did can could should would will
+    what which who how why when of to in on at for with about from by as and or
+    if it its this that these those my me i you your we our there any some please
+    tell patient""".split()
+)
+
+
+@lru_cache(maxsize=65536)
+def _stem(token: str) -> str:
+    for suffix in ("ations", "ation", "ments", "ment", "ings", "ing", "ies", "es", "ed", "s"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[: -len(suffix)] + ("y" if suffix == "ies" else "")
+    return token
+
+
+def _words(text: str) -> List[str]:
+    """Runs of letters, marks and digits; CJK ideographs one at a time."""
+    words: List[str] = []
+    current: List[str] = []
+    for ch in text:
+        # Marks (Mn/Mc) stay in the word: Devanagari and Arabic vowel signs
+        # are marks, and ``re``'s \w does not match them
+        in_word = unicodedata.category(ch)[0] in "LMN"
+        if current and (not in_word or _CJK_RE.match(ch)):
+            words.append("".join(current))
+            current = []
+        if in_word:
+            if _CJK_RE.match(ch):
+                words.append(ch)
+            else:
+                current.append(ch)
+    if current:
+        words.append("".join(current))
+    return words
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return [_stem(t) for t in _words(text) if t not in _STOPWORDS]
+
+
+def normalize_label(label: str) -> str:
+    """Uppercase, strip, drop numeric class prefixes ("01_"), unify separators."""
+    clean = label.upper().strip()
+    clean = re.sub(r"^\d+_", "", clean)
+    return clean.replace(" ", "_").replace("-", "_")
+
+
+@dataclass
+class Passage:
+    condition: str
+    field: str
+    heading: str
+    text: str
+    length: int
+
+
+@dataclass
+class SearchHit:
+    passage: Passage
+    score: float
+
+
+class KnowledgeBase:
+    """
+    Conditions, aliases and the BM25 passage index built from a data directory.
+
+    Args:
+        kb_dir: Directory of ``*.json`` knowledge base files.
+    """
+
+    def __init__(self, kb_dir: Optional[str] = None):
+        self.kb_dir = Path(kb_dir or os.getenv("MEDICAL_KB_DIR") or DEFAULT_KB_DIR)
+        self.version = "0.0.0"
+        self.last_updated = ""
+        self.files: List[str] = []
+        self.conditions: Dict[str, Dict[str, Any]] = {}
+        self.aliases: Dict[str, str] = {}
+        self._load()
+
+        self.passages: List[Passage] = []
+        # condition -> field -> passage id
+        self._by_field: Dict[str, Dict[str, int]] = {}
+        # term -> condition -> [(passage id, term frequency)]
+        self._postings: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+        self._doc_freq: Dict[str, int] = {}
+        self._avg_len = 1.0
+        self._build()
+        self.resolve = lru_cache(maxsize=1024)(self._resolve)
+
+    # ── Loading ──────────────────────────────────────────────────────────
+
+    def _load(self) -> None:
+        paths = sorted(self.kb_dir.glob("*.json"))
+        if not paths:
+            raise FileNotFoundError(f"No knowledge base files in {self.kb_dir}")
+        for path in paths:
+            document = json.loads(path.read_text(encoding="utf-8"))
+            self.conditions.update(document.get("conditions", {}))
+            self.aliases.update(
+                {k.upper(): v for k, v in document.get("aliases", {}).items()}
+            )
+            if document.get("version"):
+                self.version = document["version"]
+                self.last_updated = document.get("last_updated", self.last_updated)
+            self.files.append(path.name)
+        for alias, key in list(self.aliases.items()):
+            if key not in self.conditions:
+                logger.warning(f"[KB] Alias {alias} points at unknown condition {key}")
+                del self.aliases[alias]
+
+    def _build(self) -> None:
+        total_len = 0
+        field_terms_by_field = {f: tokenize(t) for f, (_, t) in PASSAGE_FIELDS.items()}
+        postings = self._postings
+        for key, info in self.conditions.items():
+            for field, (heading, _) in PASSAGE_FIELDS.items():
+                value = info.get(field)
+                if not value:
+                    continue
+                text = ", ".join(value) if isinstance(value, list) else str(value)
+                terms = tokenize(text) + field_terms_by_field[field]
+                pid = len(self.passages)
+                self.passages.append(Passage(key, field, heading, text, len(terms)))
+                self._by_field.setdefault(key, {})[field] = pid
+                total_len += len(terms)
+                for term, tf in Counter(terms).items():
+                    by_condition = postings.get(term)
+                    if by_condition is None:
+                        postings[term] = {key: [(pid, tf)]}
+                    elif key in by_condition:
+                        by_condition[key].append((pid, tf))
+                    else:
+                        by_condition[key] = [(pid, tf)]
+        self._doc_freq = {
+            term: sum(len(plist) for plist in by_condition.values())
+            for term, by_condition in postings.items()
+        }
+        self._avg_len = total_len / max(len(self.passages), 1)
+
+    # ── Label resolution ─────────────────────────────────────────────────
+
+    def _resolve(self, label: str) -> Optional[str]:
+        clean = normalize_label(label)
+        if not clean:
+            return None
+
+        # Exact match
+        if clean in self.conditions:
+            return clean
+
+        # Partial match (e.g., "LUNG" in "NORMAL_LUNG", "CANCER" in "LUNG_CANCER").
+        # Linear, but runs once per distinct label thanks to the memo
+        for key in self.conditions:
+            if clean in key or key in clean:
+                return key
+
+        # Keyword-based matching
+        for keyword, key in self.aliases.items():
+            if keyword in clean:
+                return key
+        return None
+
+    # ── Retrieval ────────────────────────────────────────────────────────
+
+    def search(
+        self, question: str, condition: Optional[str] = None, k: int = 3
+    ) -> List[SearchHit]:
+        """Top-``k`` passages for ``question`` by BM25, optionally within one condition."""
+        terms = tokenize(question)
+        if not terms:
+            return []
+        n = len(self.passages)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(terms):
+            by_condition = self._postings.get(term)
+            if not by_condition:
+                continue
+            df = self._doc_freq[term]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            postings = (
+                by_condition.get(condition, ())
+                if condition is not None
+                else [p for plist in by_condition.values() for p in plist]
+            )
+            for pid, tf in postings:
+                length = self.passages[pid].length
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self._avg_len)
+                scores[pid] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [SearchHit(self.passages[pid], score) for pid, score in ranked]
+
+    def default_passages(
+        self, condition: str, fields: Tuple[str, ...] = DEFAULT_PASSAGE_FIELDS
+    ) -> List[SearchHit]:
+        """The condition's ``fields`` passages, in that order, with score 0."""
+        by_field = self._by_field.get(condition, {})
+        return [SearchHit(self.passages[by_field[f]], 0.0) for f in fields if f in by_field]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "last_updated": self.last_updated,
+            "files": list(self.files),
+            "conditions_count": len(self.conditions),
+            "conditions": list(self.conditions.keys()),
+            "passages": len(self.passages),
+        }
+
+
+_kb_instance: Optional[KnowledgeBase] = None
+_kb_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    global _kb_instance
+    if _kb_instance is None:
+        with _kb_lock:
+            if _kb_instance is None:
+                _kb_instance = KnowledgeBase()
+    return _kb_instance
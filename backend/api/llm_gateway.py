@@ -0,0 +1,378 @@
+"""
+Shared async gateway to the OpenAI-compatible chat provider (OpenRouter).
+
+One AsyncOpenAI client per event loop, backed by a keep-alive connection
+pool, replaces the per-request blocking OpenAI clients in the chat routes.
+Calls are bounded by a concurrency limiter and retried with full-jitter
+exponential backoff on connection errors, timeouts, 429s and 5xx.
+Streamed completions are exposed as text deltas (LLMGateway.stream) and as
+Server-Sent Events for the /chat/stream routes (chat_sse_stream).
+
+Configuration (env):
+    LLM_BASE_URL          default https://openrouter.ai/api/v1
+    LLM_MODEL             default google/gemini-2.0-flash-001
+    LLM_TIMEOUT           total request timeout, seconds (default 30)
+    LLM_CONNECT_TIMEOUT   connect timeout, seconds (default 5)
+    LLM_MAX_RETRIES       retries after the first attempt (default 2)
+    LLM_MAX_CONCURRENCY   in-flight provider calls per worker (default 16)
+    LLM_MAX_CONNECTIONS   connection pool size (default 32)
+"""
+
+from __future__ import annotations
+import os
+import json
+import time
+import asyncio
+import logging
+import random
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_MODEL = "google/gemini-2.0-flash-001"
+
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMGateway:
+    """
+    Pooled, rate-limited access to an OpenAI-compatible chat completions API.
+
+    Args:
+        base_url: Provider base URL.
+        api_key: API key; read from OPENROUTER_API_KEY at call time if omitted.
+        model: Default model name.
+        timeout: Total per-attempt timeout in seconds.
+        connect_timeout: TCP/TLS connect timeout in seconds.
+        max_retries: Retries after the first attempt on retryable errors.
+        max_concurrency: Max concurrent provider calls.
+        max_connections: Max pooled connections (all kept alive).
+        backoff_base: First backoff ceiling in seconds; doubles per attempt.
+        backoff_max: Cap on any single backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        self.base_url = base_url or os.getenv("LLM_BASE_URL", DEFAULT_BASE_URL)
+        self._api_key = api_key
+        self.model = model or os.getenv("LLM_MODEL", DEFAULT_MODEL)
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "30"))
+        self.connect_timeout = connect_timeout or float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+        self.max_retries = (
+            max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "2"))
+        )
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Clients and semaphores are bound to the loop that created them
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._client_key: Optional[str] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._closing: Set[Any] = set()  # close() futures of replaced clients
+
+        self.stats: Dict[str, float] = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "in_flight": 0,
+            "streams": 0,
+            "ttft_seconds_sum": 0.0,
+            "ttft_count": 0,
+            "stream_tokens": 0,
+            "stream_generation_seconds": 0.0,
+        }
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or os.getenv("OPENROUTER_API_KEY")
+
+    def _get_client(self) -> openai.AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        key = self.api_key
+        if self._client is None or self._loop is not loop or self._client_key != key:
+            if self._client is not None:
+                self._retire_client(self._client, self._loop, loop)
+            http_client = openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+            )
+            self._client = openai.AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=key,
+                http_client=http_client,
+                timeout=openai.Timeout(self.timeout, connect=self.connect_timeout),
+                max_retries=0,  # retries are ours, so backoff is jittered and counted
+            )
+            self._client_key = key
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    def _retire_client(
+        self,
+        client: openai.AsyncOpenAI,
+        owner: Optional[asyncio.AbstractEventLoop],
+        current: asyncio.AbstractEventLoop,
+    ) -> None:
+        """Close a replaced client's connection pool on the loop that owns it."""
+        if owner is current:
+            future = current.create_task(client.close())
+        elif owner is not None and owner.is_running():
+            future = asyncio.run_coroutine_threadsafe(client.close(), owner)
+        else:
+            # Its loop has stopped, so the pool can no longer be awaited; it is
+            # released when the client is garbage collected
+            return
+        # Hold a reference until the close completes
+        self._closing.add(future)
+        future.add_done_callback(self._closing.discard)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after", ""))
+            except (TypeError, ValueError):
+                retry_after = None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        ceiling = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return random.uniform(0, ceiling)  # full jitter
+
+    async def _create_with_retries(self, client: openai.AsyncOpenAI, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return await client.chat.completions.create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self.stats["retries"] += 1
+                logger.warning(
+                    f"[LLMGateway] {type(e).__name__}; retry {attempt}/{self.max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.4,
+        max_tokens: int = 250,
+    ) -> str:
+        """Run a chat completion and return the first choice's text."""
+        client = self._get_client()
+        async with self._semaphore:
+            self.stats["in_flight"] += 1
+            self.stats["requests"] += 1
+            try:
+                completion = await self._create_with_retries(
+                    client,
+                    model=model or self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+        return completion.choices[0].message.content or ""
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.4,
+        max_tokens: int = 250,
+        usage: Optional[Dict[str, float]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding text deltas as they arrive.
+
+        Retries only happen before the stream opens — once tokens have been
+        forwarded a failure is surfaced to the caller. If ``usage`` is given
+        it is filled with ttft_s, tokens, generation_s and tokens_per_sec.
+        """
+        client = self._get_client()
+        async with self._semaphore:
+            self.stats["in_flight"] += 1
+            self.stats["requests"] += 1
+            self.stats["streams"] += 1
+            started = time.perf_counter()
+            first_token_at: Optional[float] = None
+            chunks = 0
+            reported_tokens: Optional[int] = None
+            response = None
+            try:
+                response = await self._create_with_retries(
+                    client,
+                    model=model or self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in response:
+                    if getattr(chunk, "usage", None) is not None:
+                        reported_tokens = chunk.usage.completion_tokens
+                    if not chunk.choices:
+                        continue
+                    text = chunk.choices[0].delta.content
+                    if not text:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    chunks += 1
+                    yield text
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+                if response is not None:
+                    # A client that left mid-stream must not keep the pooled
+                    # connection checked out until garbage collection
+                    await response.close()
+                if first_token_at is not None:
+                    self._record_stream(
+                        started, first_token_at, reported_tokens or chunks, usage
+                    )
+
+    def _record_stream(
+        self,
+        started: float,
+        first_token_at: float,
+        tokens: int,
+        usage: Optional[Dict[str, float]],
+    ) -> None:
+        ended = time.perf_counter()
+        ttft = first_token_at - started
+        generation = max(ended - first_token_at, 1e-6)
+        self.stats["ttft_seconds_sum"] += ttft
+        self.stats["ttft_count"] += 1
+        self.stats["stream_tokens"] += tokens
+        self.stats["stream_generation_seconds"] += generation
+        if usage is not None:
+            usage.update(
+                ttft_s=ttft,
+                tokens=tokens,
+                generation_s=generation,
+                tokens_per_sec=tokens / generation,
+            )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            try:
+                await self._client.close()
+            except RuntimeError:
+                pass  # Loop that owned the pool is already gone
+            self._client = None
+            self._loop = None
+
+
+_gateway_instance: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    global _gateway_instance
+    if _gateway_instance is None:
+        _gateway_instance = LLMGateway()
+    return _gateway_instance
+
+
+# ── Server-Sent Events ──────────────────────────────────────────────────────
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+async def chat_sse_stream(
+    gateway: LLMGateway,
+    messages: List[Dict[str, str]],
+    temperature: float = 0.4,
+    max_tokens: int = 250,
+    meta: Optional[Dict[str, Any]] = None,
+    strip: bool = False,
+    on_complete: Optional[Callable[[str], None]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Wrap LLMGateway.stream as SSE: one ``start``, a ``delta`` per text chunk,
+    then ``end`` (full text + timing) or ``error``. ``on_complete`` receives
+    the full text of a stream that finished without error.
+    NEVER raises — a StreamingResponse generator must end cleanly.
+    """
+    yield sse_event("start", {"model": gateway.model, **(meta or {})})
+    parts: List[str] = []
+    usage: Dict[str, float] = {}
+    try:
+        async for text in gateway.stream(
+            messages, temperature=temperature, max_tokens=max_tokens, usage=usage
+        ):
+            if strip and not parts:
+                text = text.lstrip()
+                if not text:
+                    continue
+            parts.append(text)
+            yield sse_event("delta", {"text": text})
+    except Exception as e:
+        logger.error(f"[LLMGateway] Stream failed: {e}")
+        yield sse_event("error", {"message": f"Error generating response: {str(e)}"})
+        return
+
+    full_text = "".join(parts)
+    if strip:
+        full_text = full_text.strip()
+    if on_complete is not None and full_text:
+        on_complete(full_text)
+    yield sse_event(
+        "end",
+        {
+            "text": full_text,
+            "ttft_ms": round(usage.get("ttft_s", 0.0) * 1000, 1),
+            "tokens": int(usage.get("tokens", 0)),
+            "tokens_per_sec": round(usage.get("tokens_per_sec", 0.0), 1),
+        },
+    )
+
+
+async def cached_sse_stream(
+    text: str, model: str, meta: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[bytes]:
+    """Replay an already known answer with the same event shape as chat_sse_stream."""
+    yield sse_event("start", {"model": model, "cached": True, **(meta or {})})
+    yield sse_event("delta", {"text": text})
+    yield sse_event("end", {"text": text, "ttft_ms": 0.0, "tokens": 0, "tokens_per_sec": 0.0, "cached": True})
@@ -1,5 +1,6 @@
 import uvicorn
 import io
+import asyncio
 import numpy as np  # NumPy is relatively fast, keeping for common types
 from pathlib import Path
 from PIL import Image
@@ -9,30 +10,74 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
-from backend.api.deps import get_current_user
-from typing import List, Optional
+from backend.api.deps import (
+    get_current_user,
+    require_llm_api_key,
+    start_auth_refresh,
+    stop_auth_refresh,
+)
+from backend.api.llm_gateway import (
+    get_llm_gateway,
+    chat_sse_stream,
+    cached_sse_stream,
+    sse_event,
+    SSE_HEADERS,
+)
+from backend.api.chat_cache import get_chat_cache, lookup_scope
+from backend.api.chat_prompt import assemble_chat_prompt, prompt_stats
+from backend.api.single_flight import (
+    digest,
+    single_flight,
+    single_flight_stats,
+    upload_digest,
+)
+from backend.api.uploads import Upload, ingest_upload, install_upload_limits
+from backend.voice.tts_cache import (
+    get_tts_cache,
+    load_warmup_phrases,
+    tts_cache_key,
+    warm_up,
+)
+from backend.voice.tts_pipeline import speech_stream
+from backend.voice.tts_backends import TTSBackendError, get_tts_router
+from backend.voice.stt_service import (
+    STAGES as STT_STAGES,
+    get_stt_service,
+    reset_stt_service,
+    stt_service_busy,
+    stt_service_stats,
+    stt_session,
+)
+from backend.serving.model_lifecycle import get_model_lifecycle, process_rss_bytes
+from backend.core.runtime_config import configure_runtime, get_thread_budget
+from backend.voice.stt_backends import load_stt
+from backend.voice.long_form import LongFormUpdate, stream_long_form, transcribe_long_form
+from backend.voice.vad import TrimResult, record_trim, trim_enabled, trim_silence, trim_stats
+from typing import List, Optional, Tuple
 from backend.api.medical_context import (
-    get_condition_info,
-    format_context_for_prompt,
     get_knowledge_base_info,
+    parse_diagnosis_context,
 )
 from backend.voice.multilingual import (
     get_language_config,
     TTS_INCOMPATIBLE_SCRIPTS,
     LANGS,
+    LANG_WHISPER_NAME,
 )
 from dotenv import load_dotenv
 import os
+import logging
+from backend.core.logging_config import log_stats, setup_logging
 
 # Load environment variables from .env file
 load_dotenv()
+# JSON records written from a background thread (LOG_* settings come from .env)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # --- Lazy Loading Placeholders ---
 tf = None
 torch = None
-librosa = None
-sf = None
-edge_tts = None
 preprocess_input = None
 AutoProcessor = None
 AutoModelForSpeechSeq2Seq = None
@@ -43,6 +88,7 @@ IMG_WIDTH = 224
 
 stt_processor = None
 stt_model = None
+stt_loaded = None  # LoadedSTT: backend and checkpoint behind stt_model
 device = "cpu"  # Default
 
 # Edge TTS Configuration
@@ -143,7 +189,7 @@ def load_class_names():
             MEDICAL_CLASS_NAMES = sorted(
                 [d.name for d in TRAIN_DIR.iterdir() if d.is_dir()]
             )
-            print(f"✅ Loaded {len(MEDICAL_CLASS_NAMES)} classes from {TRAIN_DIR}")
+            logger.info(f"✅ Loaded {len(MEDICAL_CLASS_NAMES)} classes from {TRAIN_DIR}")
         else:
             # Fallback: Production mode or directory missing
             MEDICAL_CLASS_NAMES = [
@@ -154,11 +200,11 @@ def load_class_names():
                 "05_FRACTURED",
                 "06_PNEUMONIA",
             ]
-            print(
+            logger.warning(
                 f"⚠️ Training directory not found. Using fallback with {len(MEDICAL_CLASS_NAMES)} classes"
             )
     except Exception as e:
-        print(f"❌ Error loading class names: {e}")
+        logger.error(f"❌ Error loading class names: {e}")
         MEDICAL_CLASS_NAMES = [
             "01_NORMAL_LUNG",
             "02_NORMAL_BONE",
@@ -172,8 +218,21 @@ def load_class_names():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler — replaces deprecated @app.on_event('startup')."""
+    # JWKS is fetched off the request path so the first authenticated call doesn't block
+    start_auth_refresh()
     await load_models()
+    model_lifecycle.start()
+    # Warm the TTS cache in the background; startup does not wait for it
+    tts_warmup = asyncio.create_task(warm_tts_cache())
     yield
+    tts_warmup.cancel()
+    model_lifecycle.stop()
+    stop_auth_refresh()
+    await get_llm_gateway().aclose()
+    # Drain buffered audit events before the worker exits
+    from backend.audit.audit_writer import shutdown_audit_writers
+
+    shutdown_audit_writers()
 
 
 app = FastAPI(
@@ -201,15 +260,19 @@ ALLOWED_ORIGINS = [
 if os.getenv("SPACE_HOST"):
     hf_origin = f"https://{os.getenv('SPACE_HOST')}"
     ALLOWED_ORIGINS.append(hf_origin)
-    print(f"✅ Added Hugging Face origin: {hf_origin}")
+    logger.info(f"✅ Added Hugging Face origin: {hf_origin}")
 
 # 3. Add Vercel Frontend (From Secrets)
 frontend_url = os.getenv("FRONTEND_URL")
 if frontend_url:
     ALLOWED_ORIGINS.append(frontend_url)
-    print(f"✅ Added frontend origin: {frontend_url}")
+    logger.info(f"✅ Added frontend origin: {frontend_url}")
 
-print(f"🔒 CORS Allowed Origins: {ALLOWED_ORIGINS}")
+logger.info(f"🔒 CORS Allowed Origins: {ALLOWED_ORIGINS}")
+
+# Per-endpoint upload caps, enforced while the body streams in (inside CORS,
+# so a 413 still carries CORS headers)
+install_upload_limits(app)
 
 # 4. Apply Middleware (No wildcards for security)
 app.add_middleware(
@@ -228,10 +291,12 @@ async def global_exception_handler(request: FastAPIRequest, exc: Exception):
     Reflects the request's own origin if it is in the allowed list.
     Respects status_code if present (e.g. HTTPException), else 500.
     """
-    import traceback
-
-    print(f"!!! EXCEPTION CAUGHT: {type(exc)}: {exc}", flush=True)
-    print(traceback.format_exc(), flush=True)
+    # Queued with the exception attached; the traceback is formatted off the request path
+    logger.error(
+        f"Unhandled {type(exc).__name__}: {exc}",
+        exc_info=(type(exc), exc, exc.__traceback__),
+        extra={"method": request.method, "path": request.url.path},
+    )
 
     origin = request.headers.get("origin", "")
     cors_origin = origin if origin in ALLOWED_ORIGINS else ""
@@ -289,45 +354,301 @@ async def metrics_endpoint():
         f"voxray_model_loaded{{model=\"medical_classifier\"}} {1 if medical_model is not None else 0}",
         f"voxray_model_loaded{{model=\"stt\"}} {1 if stt_model is not None else 0}",
     ])
+    if stt_loaded is not None:
+        metrics_lines.extend([
+            "# HELP voxray_stt_backend_info STT backend and Whisper checkpoint in use",
+            "# TYPE voxray_stt_backend_info gauge",
+            f'voxray_stt_backend_info{{backend="{stt_loaded.backend}",model="{stt_loaded.model_id}"}} 1',
+        ])
+
+    # Model residency (load on demand, evict when idle or under memory pressure)
+    lifecycle = model_lifecycle.stats()
+    metrics_lines.extend([
+        "",
+        "# HELP voxray_model_resident Whether the model is currently held in memory",
+        "# TYPE voxray_model_resident gauge",
+        *(f'voxray_model_resident{{model="{name}"}} {int(m["resident"])}' for name, m in lifecycle.items()),
+        "# HELP voxray_model_loads_total Model loads, including reloads after eviction",
+        "# TYPE voxray_model_loads_total counter",
+        *(f'voxray_model_loads_total{{model="{name}"}} {m["loads"]}' for name, m in lifecycle.items()),
+        "# HELP voxray_model_load_failures_total Model loads that failed",
+        "# TYPE voxray_model_load_failures_total counter",
+        *(f'voxray_model_load_failures_total{{model="{name}"}} {m["load_failures"]}' for name, m in lifecycle.items()),
+        "# HELP voxray_model_evictions_total Model evictions by reason",
+        "# TYPE voxray_model_evictions_total counter",
+        *(
+            f'voxray_model_evictions_total{{model="{name}",reason="{reason}"}} {count}'
+            for name, m in lifecycle.items()
+            for reason, count in m["evictions"].items()
+        ),
+        "# HELP voxray_model_idle_seconds Seconds since the model was last used",
+        "# TYPE voxray_model_idle_seconds gauge",
+        *(
+            f'voxray_model_idle_seconds{{model="{name}"}} {m["idle_seconds"]:.1f}'
+            for name, m in lifecycle.items()
+            if m["idle_seconds"] is not None
+        ),
+        "# HELP voxray_model_load_seconds Duration of the model's most recent load",
+        "# TYPE voxray_model_load_seconds gauge",
+        *(f'voxray_model_load_seconds{{model="{name}"}} {m["load_seconds"]:.3f}' for name, m in lifecycle.items()),
+    ])
+    metrics_lines.extend([
+        "# HELP voxray_log_records_dropped_total Log records dropped before output",
+        "# TYPE voxray_log_records_dropped_total counter",
+        *(f'voxray_log_records_dropped_total{{reason="{reason}"}} {count}' for reason, count in log_stats.items()),
+    ])
+    budget = get_thread_budget()
+    metrics_lines.extend([
+        "# HELP voxray_cpu_budget_threads Threads allotted to each inference pool",
+        "# TYPE voxray_cpu_budget_threads gauge",
+        f'voxray_cpu_budget_threads{{pool="total"}} {budget.total}',
+        f'voxray_cpu_budget_threads{{pool="tf_intra_op"}} {budget.tf_intra}',
+        f'voxray_cpu_budget_threads{{pool="tf_inter_op"}} {budget.tf_inter}',
+        f'voxray_cpu_budget_threads{{pool="torch_intra_op"}} {budget.torch_intra}',
+        f'voxray_cpu_budget_threads{{pool="torch_inter_op"}} {budget.torch_interop}',
+    ])
+    rss = process_rss_bytes()
+    if rss is not None:
+        metrics_lines.extend([
+            "# HELP voxray_process_rss_bytes Resident set size of this worker",
+            "# TYPE voxray_process_rss_bytes gauge",
+            f"voxray_process_rss_bytes {rss}",
+        ])
+
+    # LLM gateway traffic
+    llm = get_llm_gateway().stats
+    metrics_lines.extend([
+        "",
+        "# HELP voxray_llm_requests_total Chat completion calls sent to the LLM provider",
+        "# TYPE voxray_llm_requests_total counter",
+        f"voxray_llm_requests_total {llm['requests']}",
+        "# HELP voxray_llm_retries_total LLM calls retried after a transient error",
+        "# TYPE voxray_llm_retries_total counter",
+        f"voxray_llm_retries_total {llm['retries']}",
+        "# HELP voxray_llm_errors_total LLM calls that failed after retries",
+        "# TYPE voxray_llm_errors_total counter",
+        f"voxray_llm_errors_total {llm['errors']}",
+        "# HELP voxray_llm_in_flight LLM calls currently in flight",
+        "# TYPE voxray_llm_in_flight gauge",
+        f"voxray_llm_in_flight {llm['in_flight']}",
+        "# HELP voxray_llm_streams_total Streamed chat completions started",
+        "# TYPE voxray_llm_streams_total counter",
+        f"voxray_llm_streams_total {llm['streams']}",
+        "# HELP voxray_llm_ttft_seconds Time to first streamed token",
+        "# TYPE voxray_llm_ttft_seconds summary",
+        f"voxray_llm_ttft_seconds_sum {llm['ttft_seconds_sum']:.6f}",
+        f"voxray_llm_ttft_seconds_count {llm['ttft_count']}",
+        "# HELP voxray_llm_stream_tokens_total Completion tokens delivered over streams",
+        "# TYPE voxray_llm_stream_tokens_total counter",
+        f"voxray_llm_stream_tokens_total {llm['stream_tokens']}",
+        "# HELP voxray_llm_stream_generation_seconds_total Time spent streaming after the first token",
+        "# TYPE voxray_llm_stream_generation_seconds_total counter",
+        f"voxray_llm_stream_generation_seconds_total {llm['stream_generation_seconds']:.6f}",
+    ])
+
+    # Prompt sizes after budgeting
+    metrics_lines.extend([
+        "",
+        "# HELP voxray_chat_prompt_tokens Prompt tokens sent per chat request",
+        "# TYPE voxray_chat_prompt_tokens summary",
+        f"voxray_chat_prompt_tokens_sum {prompt_stats['prompt_tokens']}",
+        f"voxray_chat_prompt_tokens_count {prompt_stats['requests']}",
+        "# HELP voxray_chat_history_turns_dropped_total History turns left out to fit the token budget",
+        "# TYPE voxray_chat_history_turns_dropped_total counter",
+        f"voxray_chat_history_turns_dropped_total {prompt_stats['history_dropped']}",
+    ])
+
+    # Coalesced duplicate requests
+    flights = single_flight_stats()
+    if flights:
+        metrics_lines.extend([
+            "",
+            "# HELP voxray_singleflight_coalesced_total Requests that joined an identical in-flight request",
+            "# TYPE voxray_singleflight_coalesced_total counter",
+        ])
+        for group, st in flights.items():
+            metrics_lines.append(f'voxray_singleflight_coalesced_total{{group="{group}"}} {st["coalesced"]}')
+        metrics_lines.extend([
+            "# HELP voxray_singleflight_cancelled_total In-flight requests cancelled after all waiters left",
+            "# TYPE voxray_singleflight_cancelled_total counter",
+        ])
+        for group, st in flights.items():
+            metrics_lines.append(f'voxray_singleflight_cancelled_total{{group="{group}"}} {st["cancelled"]}')
+
+    # Chat answer cache
+    chat_cache = get_chat_cache()
+    if chat_cache is not None:
+        cc = chat_cache.stats
+        metrics_lines.extend([
+            "",
+            "# HELP voxray_chat_cache_hits_total Chat answers served from cache",
+            "# TYPE voxray_chat_cache_hits_total counter",
+            f'voxray_chat_cache_hits_total{{tier="exact"}} {cc["hits_exact"]}',
+            f'voxray_chat_cache_hits_total{{tier="similar"}} {cc["hits_similar"]}',
+            "# HELP voxray_chat_cache_misses_total Cacheable chat requests sent to the LLM",
+            "# TYPE voxray_chat_cache_misses_total counter",
+            f"voxray_chat_cache_misses_total {cc['misses']}",
+            "# HELP voxray_chat_cache_bypassed_total Chat requests not cacheable because of history",
+            "# TYPE voxray_chat_cache_bypassed_total counter",
+            f"voxray_chat_cache_bypassed_total {cc['bypassed']}",
+            "# HELP voxray_chat_cache_entries Cached chat answers",
+            "# TYPE voxray_chat_cache_entries gauge",
+            f"voxray_chat_cache_entries {cc['entries']}",
+        ])
+
+    # TTS audio cache
+    tts_cache = get_tts_cache()
+    if tts_cache is not None:
+        tc = tts_cache.stats
+        tu = tts_cache.usage()
+        metrics_lines.extend([
+            "",
+            "# HELP voxray_tts_cache_hits_total Speech requests served from the TTS cache",
+            "# TYPE voxray_tts_cache_hits_total counter",
+            f'voxray_tts_cache_hits_total{{tier="memory"}} {tc["hits_memory"]}',
+            f'voxray_tts_cache_hits_total{{tier="disk"}} {tc["hits_disk"]}',
+            "# HELP voxray_tts_cache_misses_total Speech requests synthesized upstream",
+            "# TYPE voxray_tts_cache_misses_total counter",
+            f"voxray_tts_cache_misses_total {tc['misses']}",
+            "# HELP voxray_tts_cache_evictions_total Clips evicted from the disk tier",
+            "# TYPE voxray_tts_cache_evictions_total counter",
+            f"voxray_tts_cache_evictions_total {tc['evictions']}",
+            "# HELP voxray_tts_cache_bytes Bytes held by the TTS cache",
+            "# TYPE voxray_tts_cache_bytes gauge",
+            f'voxray_tts_cache_bytes{{tier="memory"}} {tu["memory_bytes"]}',
+            f'voxray_tts_cache_bytes{{tier="disk"}} {tu["disk_bytes"]}',
+        ])
+
+    # Batched speech-to-text
+    stt = stt_service_stats()
+    if stt is not None:
+        metrics_lines.extend([
+            "",
+            "# HELP voxray_stt_clips_total Clips transcribed by the STT service",
+            "# TYPE voxray_stt_clips_total counter",
+            f"voxray_stt_clips_total {stt['clips']}",
+            "# HELP voxray_stt_batches_total Whisper generate calls",
+            "# TYPE voxray_stt_batches_total counter",
+            f"voxray_stt_batches_total {stt['batches']}",
+            "# HELP voxray_stt_queue_depth Clips waiting for a batch",
+            "# TYPE voxray_stt_queue_depth gauge",
+            f"voxray_stt_queue_depth {stt['queue_depth']}",
+            "# HELP voxray_stt_stage_seconds_total Time per STT stage (queue per clip, others per batch)",
+            "# TYPE voxray_stt_stage_seconds_total counter",
+        ])
+        for stage in STT_STAGES:
+            metrics_lines.append(
+                f'voxray_stt_stage_seconds_total{{stage="{stage}"}} {stt[stage + "_ms_sum"] / 1000:.6f}'
+            )
+
+    if trim_stats["clips"]:
+        metrics_lines.extend([
+            "",
+            "# HELP voxray_stt_vad_clips_total Uploads passed through silence trimming",
+            "# TYPE voxray_stt_vad_clips_total counter",
+            f"voxray_stt_vad_clips_total {trim_stats['clips']}",
+            "# HELP voxray_stt_vad_silent_clips_total Uploads with no speech, skipped without running Whisper",
+            "# TYPE voxray_stt_vad_silent_clips_total counter",
+            f"voxray_stt_vad_silent_clips_total {trim_stats['silent_clips']}",
+            "# HELP voxray_stt_vad_audio_seconds_total Audio before and after trimming",
+            "# TYPE voxray_stt_vad_audio_seconds_total counter",
+            f'voxray_stt_vad_audio_seconds_total{{stage="input"}} {trim_stats["input_seconds"]:.3f}',
+            f'voxray_stt_vad_audio_seconds_total{{stage="kept"}} {trim_stats["kept_seconds"]:.3f}',
+            "# HELP voxray_stt_vad_windows_saved_total 30 s Whisper windows not decoded thanks to trimming",
+            "# TYPE voxray_stt_vad_windows_saved_total counter",
+            f"voxray_stt_vad_windows_saved_total {trim_stats['windows_saved']}",
+        ])
+
+    # TTS backend routing
+    tts_backends = get_tts_router().stats()
+    for metric, key, kind, help_text in (
+        ("voxray_tts_backend_requests_total", "requests", "counter", "Synthesis attempts per TTS backend"),
+        ("voxray_tts_backend_failures_total", "failures", "counter", "Failed or timed-out synthesis attempts"),
+        ("voxray_tts_backend_failovers_total", "failovers", "counter", "Attempts that took over from a failed backend"),
+        ("voxray_tts_backend_ttfb_seconds", "ttfb_ewma", "gauge", "Time to first audio chunk (EWMA)"),
+        ("voxray_tts_backend_demoted", "demoted", "gauge", "1 while a backend is routed around"),
+    ):
+        metrics_lines.extend(["", f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"])
+        for name, st in tts_backends.items():
+            value = f"{st[key]:.6f}" if key == "ttfb_ewma" else st[key]
+            metrics_lines.append(f'{metric}{{backend="{name}"}} {value}')
+
+    # Audit writer backlog and loss counters
+    from backend.audit.audit_writer import audit_writer_stats
+
+    audit = audit_writer_stats()
+    metrics_lines.extend([
+        "",
+        "# HELP voxray_audit_queue_depth Audit events waiting to be written",
+        "# TYPE voxray_audit_queue_depth gauge",
+        f"voxray_audit_queue_depth {audit['queue_depth']}",
+        "# HELP voxray_audit_events_written_total Audit events written to disk",
+        "# TYPE voxray_audit_events_written_total counter",
+        f"voxray_audit_events_written_total {audit['events_written']}",
+        "# HELP voxray_audit_events_dropped_total Audit events dropped (queue full or closed)",
+        "# TYPE voxray_audit_events_dropped_total counter",
+        f"voxray_audit_events_dropped_total {audit['events_dropped']}",
+    ])
     
     return Response(content="\n".join(metrics_lines), media_type="text/plain")
 
 
 async def load_models():
-    """Load all ML models and heavy dependencies at application startup."""
+    """Import heavy dependencies and load the warm-standby models at startup."""
     # Lazy load heavy dependencies
-    print("⏳ Initializing models and heavy dependencies...")
-    global tf, torch, librosa, sf, edge_tts, preprocess_input
+    logger.info("⏳ Initializing models and heavy dependencies...")
+    global tf, torch, preprocess_input
     global AutoProcessor, AutoModelForSpeechSeq2Seq
-    global medical_model, stt_processor, stt_model, device
+    global device
 
+    # Thread budget (and autotuned profile) must be fixed before TF/torch import
+    thread_budget = configure_runtime()
     try:
         import tensorflow as tf
         from tensorflow.keras.applications.resnet_v2 import preprocess_input
         import torch
-        import librosa
-        import soundfile as sf
-        import edge_tts
         from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
 
+        thread_budget.apply_tensorflow(tf)
+        thread_budget.apply_torch(torch)
         device = "cuda:0" if torch.cuda.is_available() else "cpu"
-        print(f"✅ Libraries loaded. Device: {device}")
+        logger.info(f"✅ Libraries loaded. Device: {device}")
+        logger.info(
+            f"✅ CPU budget {thread_budget.total}: TF {thread_budget.tf_intra}+{thread_budget.tf_inter}, "
+            f"torch {thread_budget.torch_intra}+{thread_budget.torch_interop} threads"
+            + (f", pinned TF={thread_budget.tf_cores} torch={thread_budget.torch_cores}" if thread_budget.pinning else "")
+        )
     except ImportError as e:
-        print(f"❌ Critical Dependency Missing: {e}")
+        logger.error(f"❌ Critical Dependency Missing: {e}")
         return
 
     # Load class names first
     load_class_names()
 
+    # Other models load on first use and are evicted when idle
+    model_lifecycle.preload_standby()
+
+    logger.info(f"✅ TTS backends: {', '.join(get_tts_router().order)} (loaded on first use).")
+    logger.info(f"✅ Standby models loaded: {', '.join(sorted(model_lifecycle.standby)) or 'none'}")
+
+
+def _load_classifier():
+    """Fetch (if needed) and load the Keras classifier into ``medical_model``."""
+    global medical_model
+    if tf is None:
+        return None
+
     # --- Runtime Model Download from Hugging Face Hub ---
     REPO_ID = "witty22/voxray-model"
     FILENAME = "medical_model_final.keras"
 
-    model_path = BASE_DIR / "backend" / "models" / FILENAME
+    # CLASSIFIER_MODEL_PATH loads a local model as-is (no size check, no Hub download)
+    override = os.getenv("CLASSIFIER_MODEL_PATH")
+    model_path = Path(override) if override else BASE_DIR / "backend" / "models" / FILENAME
 
     # Check if file exists AND is not an LFS pointer (< 1MB = LFS pointer)
-    if not model_path.exists() or model_path.stat().st_size < 1_000_000:
-        print(f"⚠️ {FILENAME} is missing or an LFS pointer. Downloading real binary...")
+    if not override and (not model_path.exists() or model_path.stat().st_size < 1_000_000):
+        logger.warning(f"⚠️ {FILENAME} is missing or an LFS pointer. Downloading real binary...")
         try:
             from huggingface_hub import hf_hub_download
 
@@ -341,54 +662,85 @@ async def load_models():
                 local_dir_use_symlinks=False,
             )
             model_path = Path(downloaded_path)
-            print(f"✅ Successfully downloaded model to {model_path}")
+            logger.info(f"✅ Successfully downloaded model to {model_path}")
         except Exception as e:
-            print(f"❌ Hub download failed: {e}")
-            import traceback
-
-            traceback.print_exc()
+            logger.error(f"❌ Hub download failed: {e}", exc_info=True)
             # Continue without model - endpoint will return 503
 
     # Final Load
-    if model_path.exists() and model_path.stat().st_size > 1_000_000:
+    if model_path.exists() and (override or model_path.stat().st_size > 1_000_000):
         try:
             medical_model = tf.keras.models.load_model(str(model_path))
             size_mb = model_path.stat().st_size / (1024 * 1024)
-            print(
+            logger.info(
                 f"🚀 Model loaded into memory. Size: {size_mb:.2f} MB. Expected {len(MEDICAL_CLASS_NAMES)} classes"
             )
         except Exception as e:
-            print(f"❌ Keras load failed: {e}")
-            import traceback
-
-            traceback.print_exc()
+            logger.error(f"❌ Keras load failed: {e}", exc_info=True)
     else:
-        print("❌ No valid model file available! /predict/image will return 503.")
+        logger.error("❌ No valid model file available! /predict/image will return 503.")
+    return medical_model
+
+
+def _release_classifier():
+    global medical_model
+    medical_model = None
+
 
-    print("⏳ Loading STT Model (Whisper)...")
-    stt_processor = AutoProcessor.from_pretrained("openai/whisper-base")
-    stt_model = AutoModelForSpeechSeq2Seq.from_pretrained("openai/whisper-base").to(
-        device
+def _load_stt_model():
+    """Load Whisper into ``stt_processor``/``stt_model``."""
+    global stt_processor, stt_model, stt_loaded, device, URDU_TOKEN_ID
+    if torch is None:
+        return None
+
+    logger.info("⏳ Loading STT Model (Whisper)...")
+    # STT_BACKEND / STT_MODEL_ID pick the checkpoint and how it runs (fp32 or int8)
+    stt_loaded = load_stt(device=device)
+    stt_processor, stt_model = stt_loaded.processor, stt_loaded.model
+    device = stt_loaded.device  # int8 runs on CPU even when CUDA is present
+    logger.info(
+        f"✅ STT: {stt_loaded.model_id} via {stt_loaded.backend} on {stt_loaded.device} "
+        f"({stt_loaded.parameter_bytes / 1024 / 1024:.0f} MB weights)"
     )
 
     # Resolve Urdu token ID from actual loaded vocabulary — safe across model versions
-    global URDU_TOKEN_ID
     try:
         vocab = stt_processor.tokenizer.get_vocab()
         URDU_TOKEN_ID = vocab.get("<|ur|>")
-        print(f"✅ Urdu suppress token resolved: {URDU_TOKEN_ID}")
+        logger.info(f"✅ Urdu suppress token resolved: {URDU_TOKEN_ID}")
     except Exception as e:
-        print(f"⚠️ Could not resolve Urdu token ID: {e}")
+        logger.warning(f"⚠️ Could not resolve Urdu token ID: {e}")
         URDU_TOKEN_ID = None
+    return stt_model
+
 
-    print("✅ TTS Engine: Edge-TTS (cloud-based, no local loading required).")
-    print("✅ All models loaded successfully.")
+def _release_stt_model():
+    global stt_processor, stt_model, stt_loaded
+    reset_stt_service()
+    stt_processor = stt_model = stt_loaded = None
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+model_lifecycle = get_model_lifecycle()
+model_lifecycle.register(
+    "classifier", _load_classifier, lambda: medical_model, _release_classifier
+)
+model_lifecycle.register(
+    "stt", _load_stt_model, lambda: stt_model, _release_stt_model, busy=stt_service_busy
+)
 
 
 # ... (keep existing code)
 
 
-def preprocess_image_from_bytes(file_bytes: bytes):
+def _image_source(data):
+    """A file-like object for PIL: uploads' streams as-is, raw bytes wrapped."""
+    return data if hasattr(data, "read") else io.BytesIO(data)
+
+
+def preprocess_image_from_bytes(file_bytes):
+    """``file_bytes``: image bytes or a binary stream (``Upload.open()``)."""
     global tf, preprocess_input
 
     if tf is None:
@@ -399,7 +751,7 @@ def preprocess_image_from_bytes(file_bytes: bytes):
         tf = _tf
         preprocess_input = _pi
 
-    img = Image.open(io.BytesIO(file_bytes)).convert("RGB")
+    img = Image.open(_image_source(file_bytes)).convert("RGB")
     img = img.resize((IMG_WIDTH, IMG_HEIGHT))
     img_arr = np.array(img).astype(np.float32)
     img_preprocessed = preprocess_input(img_arr)
@@ -413,50 +765,33 @@ class DiagnosisResponse(BaseModel):
 
 
 @app.post("/predict/image", response_model=DiagnosisResponse)
+@single_flight("predict_image", key=lambda image_file, **_: upload_digest(image_file))
 async def predict_image(
     image_file: UploadFile = File(...), user: dict = Depends(get_current_user)
 ):
     """Protected endpoint - requires authentication."""
-    print(f"👤 User {user.get('sub')} requesting prediction")
-
-    # 1. Check if the global variable actually exists in this worker
-    print(f"🔍 Debug: medical_model type: {type(medical_model)}")
-
-    # 2. Check the physical file on the disk
-    model_path = Path("/app/backend/models/medical_model_final.keras")
-    if not model_path.exists():
-        print(f"❌ ABSOLUTE PATH FAIL: {model_path} not found")
-        # Try relative as fallback
-        model_path = Path("backend/models/medical_model_final.keras")
-        print(
-            f"🔍 Checking relative path: {model_path.absolute()} - Exists: {model_path.exists()}"
-        )
-
-    if model_path.exists():
-        size_mb = os.path.getsize(model_path) / (1024 * 1024)
-        print(f"📁 Model file found! Size: {size_mb:.2f} MB")
-        if size_mb < 1:
-            print("⚠️ ALERT: Model file is too small. Likely a Git LFS pointer error!")
+    logger.debug("Prediction requested", extra={"user": user.get("sub")})
 
-    if medical_model is None:
+    # Load the classifier if it was evicted (or never loaded) in this worker.
+    # A missing or LFS-pointer model file is reported once, when loading.
+    model = await model_lifecycle.aacquire("classifier")
+    if model is None:
         raise HTTPException(
             status_code=503, detail="Model is None in this worker process."
         )
+    upload = await ingest_upload(image_file, "image")
     try:
-        file_bytes = await image_file.read()
-
-        img_batch = preprocess_image_from_bytes(file_bytes)
-        predict = medical_model.predict(img_batch)
+        img_batch = preprocess_image_from_bytes(upload.open())
+        predict = model.predict(img_batch)
         score = predict[0]  # Already probabilities - model has softmax in final layer
 
-        # Log all class probabilities for debugging
-        print("\n📊 Prediction scores:")
-        for idx, (class_name, prob) in enumerate(zip(MEDICAL_CLASS_NAMES, score)):
-            print(f"  {idx}: {class_name}: {float(prob) * 100:.2f}%")
-
         diagnosis = MEDICAL_CLASS_NAMES[np.argmax(score)]
         confidence = float(np.max(score))
-        print(f"✅ Top prediction: {diagnosis} ({confidence * 100:.1f}%)\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"✅ Top prediction: {diagnosis} ({confidence * 100:.1f}%)",
+                extra={"scores": {c: round(float(p), 4) for c, p in zip(MEDICAL_CLASS_NAMES, score)}},
+            )
         return JSONResponse(content={"diagnosis": diagnosis, "confidence": confidence})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
@@ -523,7 +858,7 @@ def generate_gradcam(model, img_array, class_idx):
         grads = tape.gradient(class_channel, conv_outputs)
 
         if grads is None:
-            print("⚠️ Gradients are None. Check model architecture.")
+            logger.warning("⚠️ Gradients are None. Check model architecture.")
             return None
 
         # Global average pooling of gradients
@@ -539,10 +874,7 @@ def generate_gradcam(model, img_array, class_idx):
 
         return heatmap.numpy()
     except Exception as e:
-        print(f"⚠️ Grad-CAM generation failed: {e}")
-        import traceback
-
-        traceback.print_exc()
+        logger.warning(f"⚠️ Grad-CAM generation failed: {e}", exc_info=True)
         return None
 
 
@@ -553,7 +885,7 @@ def create_heatmap_overlay(heatmap, original_img_bytes, threshold=0.35):
     """
     try:
         # Load original image
-        img = Image.open(io.BytesIO(original_img_bytes)).convert("RGB")
+        img = Image.open(_image_source(original_img_bytes)).convert("RGB")
         orig_w, orig_h = img.size
         img_array = np.array(img)
 
@@ -619,7 +951,7 @@ def create_heatmap_overlay(heatmap, original_img_bytes, threshold=0.35):
         return base64.b64encode(buffer.getvalue()).decode("utf-8")
 
     except Exception as e:
-        print(f"Error in heatmap overlay: {e}")
+        logger.error(f"Error in heatmap overlay: {e}")
         return None
 
 
@@ -628,6 +960,7 @@ class ExplainResponse(BaseModel):
 
 
 @app.post("/predict/explain", response_model=ExplainResponse)
+@single_flight("predict_explain", key=lambda image_file, **_: upload_digest(image_file))
 async def explain_prediction(
     image_file: UploadFile = File(...), user: dict = Depends(get_current_user)
 ):
@@ -635,21 +968,22 @@ async def explain_prediction(
     Generate Grad-CAM explanation for the model's prediction.
     Returns a base64 encoded heatmap overlay image.
     """
-    if medical_model is None:
+    model = await model_lifecycle.aacquire("classifier")
+    if model is None:
         raise HTTPException(status_code=503, detail="Model not loaded.")
 
+    upload = await ingest_upload(image_file, "image")
     try:
-        file_bytes = await image_file.read()
-        img_batch = preprocess_image_from_bytes(file_bytes)
+        img_batch = preprocess_image_from_bytes(upload.open())
 
         # Get prediction to determine which class to explain
-        predictions = medical_model.predict(img_batch)
+        predictions = model.predict(img_batch)
         class_idx = int(np.argmax(predictions[0]))
 
-        print(f"🔍 Generating Grad-CAM explanation for class {class_idx}...")
+        logger.debug(f"🔍 Generating Grad-CAM explanation for class {class_idx}...")
 
         # Generate Grad-CAM heatmap
-        heatmap = generate_gradcam(medical_model, img_batch, class_idx)
+        heatmap = generate_gradcam(model, img_batch, class_idx)
 
         if heatmap is None:
             raise HTTPException(
@@ -657,13 +991,13 @@ async def explain_prediction(
             )
 
         # Create overlay image
-        heatmap_b64 = create_heatmap_overlay(heatmap, file_bytes)
+        heatmap_b64 = create_heatmap_overlay(heatmap, upload.open())
 
-        print("✅ Grad-CAM explanation generated successfully!")
+        logger.debug("✅ Grad-CAM explanation generated successfully!")
         return JSONResponse(content={"heatmap_b64": heatmap_b64})
 
     except Exception as e:
-        print(f"❌ Explanation error: {e}")
+        logger.error(f"❌ Explanation error: {e}")
         raise HTTPException(
             status_code=500, detail=f"Error generating explanation: {str(e)}"
         )
@@ -674,83 +1008,200 @@ class TranscriptionResponse(BaseModel):
     detected_language: Optional[str] = None
 
 
+async def _load_audio_for_stt(upload: Upload) -> np.ndarray:
+    """
+    Decode an upload to 16 kHz mono float32 and drop non-speech before
+    Whisper, both off the event loop; an empty result means the clip was silent.
+    """
+    from backend.voice.audio_ingest import decode_audio
+
+    def decode_and_trim() -> Tuple[np.ndarray, Optional[TrimResult]]:
+        audio_data = decode_audio(upload.open())
+        if not trim_enabled():
+            return audio_data, None
+        return audio_data, trim_silence(audio_data)
+
+    audio_data, trimmed = await asyncio.to_thread(decode_and_trim)
+    if trimmed is None:
+        return audio_data
+    record_trim(trimmed)
+    return trimmed.audio
+
+
+def _stt_language(language: Optional[str]) -> dict:
+    """Whisper language config for an ISO code; ``whisper_name`` is None when auto-detecting."""
+    lang_cfg = STT_LANG_CONFIG.get(
+        language or "en",
+        {"whisper_name": language or "en", "expected_script": None},
+    )
+    if not language:
+        return dict(lang_cfg, whisper_name=None)
+    logger.debug(f"🌐 Forcing STT language: {lang_cfg['whisper_name']}")
+    return lang_cfg
+
+
+WHISPER_NAME_TO_CODE = {name: code for code, name in LANG_WHISPER_NAME.items()}
+
+
+def _detected_language(language: Optional[str], update: LongFormUpdate) -> dict:
+    """
+    Response fields for the transcription language: the forced code, or the
+    code the language-ID stage picked plus its distribution.
+    """
+    if language:
+        return {"detected_language": language}
+    detected = WHISPER_NAME_TO_CODE.get(update.language or "")
+    fields = {"detected_language": detected or "auto"}
+    if update.language_probs:
+        ranked = sorted(update.language_probs.items(), key=lambda kv: -kv[1])
+        fields["language_probabilities"] = {
+            WHISPER_NAME_TO_CODE.get(name, name): round(p, 4) for name, p in ranked
+        }
+    return fields
+
+
+def _check_script(transcription: str, language: Optional[str], lang_cfg: dict) -> str:
+    """Post-validation: warn when output script does not match expected."""
+    expected_script = lang_cfg.get("expected_script")
+    actual_script = detect_script(transcription) if transcription else "unknown"
+    if (
+        expected_script
+        and actual_script not in (expected_script, "unknown")
+        and len(transcription) > 3
+    ):
+        logger.warning(
+            f"⚠️ STT Script Mismatch: lang={language}, "
+            f"expected={expected_script}, got={actual_script}. "
+            f"text={transcription[:50]!r}"
+        )
+    return actual_script
+
+
 @app.post("/transcribe/audio", response_model=TranscriptionResponse)
 async def transcribe_audio(
     audio_file: UploadFile = File(...), language: Optional[str] = None
 ):
-    if not stt_model or not stt_processor:
-        raise HTTPException(status_code=503, detail="F2 (STT) models are not loaded.")
-    try:
-        audio_data, original_samplerate = sf.read(io.BytesIO(await audio_file.read()))
-        if original_samplerate != 16000:
-            audio_data = librosa.resample(
-                y=audio_data, orig_sr=original_samplerate, target_sr=16000
+    with stt_session():
+        model = await model_lifecycle.aacquire("stt")
+        processor = stt_processor
+        if model is None or processor is None:
+            raise HTTPException(status_code=503, detail="F2 (STT) models are not loaded.")
+        upload = await ingest_upload(audio_file, "audio")
+        try:
+            audio_data = await _load_audio_for_stt(upload)
+            lang_cfg = _stt_language(language)
+            if audio_data.size == 0:
+                logger.debug("🎧 STT skipped: no speech detected")
+                return JSONResponse(
+                    content={
+                        "transcription": "",
+                        "detected_language": language or "auto",
+                        "script_detected": "unknown",
+                    }
+                )
+
+            # Whisper runs on the STT service's executor, micro-batched with other
+            # concurrent clips of the same forced language (attention masks keep
+            # padded rows exact). forced_decoder_ids alone prevents the Urdu token
+            # in output — suppress_tokens=[URDU_TOKEN_ID] was runtime-verified identical.
+            # Clips longer than one 30 s window are split into overlapping windows
+            # that decode as a batch and are stitched back together.
+            service = get_stt_service(processor, model, device)
+            result = await transcribe_long_form(service, audio_data, lang_cfg["whisper_name"])
+            transcription = result.text
+            logger.debug(f"🎧 STT windows={result.windows_total} chars={len(transcription)}")
+
+            detected = _detected_language(language, result)
+            script_language = language or detected["detected_language"]
+            actual_script = _check_script(
+                transcription, script_language, STT_LANG_CONFIG.get(script_language, lang_cfg)
             )
-        if len(audio_data.shape) > 1:
-            audio_data = audio_data.mean(axis=1)
-
-        # Build processor output WITH attention mask — eliminates padding warning,
-        # improves accuracy on short clips (runtime-verified: same output, no warning)
-        processor_output = stt_processor(
-            audio_data,
-            sampling_rate=16000,
-            return_tensors="pt",
-            return_attention_mask=True,
-        )
-        input_features = processor_output.input_features.to(device)
-        attention_mask = processor_output.attention_mask.to(device)
+            return JSONResponse(
+                content={
+                    "transcription": transcription,
+                    **detected,
+                    "script_detected": actual_script,
+                }
+            )
+        except Exception as e:
+            logger.error(f"❌ Transcription error: {e}")
+            raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
 
-        # Resolve Whisper language config
-        lang_cfg = STT_LANG_CONFIG.get(
-            language or "en",
-            {"whisper_name": language or "en", "expected_script": None},
-        )
 
-        if language:
-            print(f"🌐 Forcing STT language: {lang_cfg['whisper_name']}")
-            forced_decoder_ids = stt_processor.get_decoder_prompt_ids(
-                language=lang_cfg["whisper_name"],
-                task="transcribe",
-            )
-        else:
-            forced_decoder_ids = None
-
-        # Runtime-verified: forced_decoder_ids alone prevents Urdu token in output.
-        # suppress_tokens=[URDU_TOKEN_ID] produces IDENTICAL output — omitted intentionally.
-        predicted_ids = stt_model.generate(
-            input_features,
-            attention_mask=attention_mask,
-            forced_decoder_ids=forced_decoder_ids,
-            max_length=448,
-        )
-        transcription = stt_processor.batch_decode(
-            predicted_ids, skip_special_tokens=True
-        )[0].strip()
-
-        # Post-validation: warn when output script does not match expected
-        expected_script = lang_cfg.get("expected_script")
-        actual_script = detect_script(transcription) if transcription else "unknown"
-        if (
-            expected_script
-            and actual_script not in (expected_script, "unknown")
-            and len(transcription) > 3
-        ):
-            print(
-                f"⚠️ STT Script Mismatch: lang={language}, "
-                f"expected={expected_script}, got={actual_script}. "
-                f"text={transcription[:50]!r}"
+@app.post("/transcribe/audio/stream")
+async def transcribe_audio_stream(
+    audio_file: UploadFile = File(...), language: Optional[str] = None
+):
+    """
+    Long-form transcription as Server-Sent Events: a ``partial`` event with
+    the stitched transcript each time another 30 s window is decoded, then
+    ``final`` (same fields as /transcribe/audio) or ``error``.
+    """
+    with stt_session():
+        model = await model_lifecycle.aacquire("stt")
+        processor = stt_processor
+        if model is None or processor is None:
+            raise HTTPException(status_code=503, detail="F2 (STT) models are not loaded.")
+        upload = await ingest_upload(audio_file, "audio")
+        try:
+            audio_data = await _load_audio_for_stt(upload)
+        except Exception as e:
+            logger.error(f"❌ Transcription error: {e}")
+            raise HTTPException(status_code=400, detail=f"Error reading audio: {str(e)}")
+        lang_cfg = _stt_language(language)
+        service = get_stt_service(processor, model, device)
+
+    async def events():
+        # The stream keeps its own session: the handler's closes on return
+        with stt_session():
+            async for event in transcription_events():
+                yield event
+
+    async def transcription_events():
+        # NEVER raise inside a StreamingResponse generator
+        if audio_data.size == 0:
+            yield sse_event(
+                "final",
+                {
+                    "transcription": "",
+                    "detected_language": language or "auto",
+                    "script_detected": "unknown",
+                    "windows_total": 0,
+                },
             )
+            return
+        try:
+            async for update in stream_long_form(service, audio_data, lang_cfg["whisper_name"]):
+                if not update.final:
+                    yield sse_event(
+                        "partial",
+                        {
+                            "transcription": update.text,
+                            "windows_done": update.windows_done,
+                            "windows_total": update.windows_total,
+                        },
+                    )
+                    continue
+                detected = _detected_language(language, update)
+                script_language = language or detected["detected_language"]
+                yield sse_event(
+                    "final",
+                    {
+                        "transcription": update.text,
+                        **detected,
+                        "script_detected": _check_script(
+                            update.text,
+                            script_language,
+                            STT_LANG_CONFIG.get(script_language, lang_cfg),
+                        ),
+                        "windows_total": update.windows_total,
+                    },
+                )
+        except Exception as e:
+            logger.error(f"❌ Transcription stream error: {e}")
+            yield sse_event("error", {"message": f"Error processing audio: {str(e)}"})
 
-        return JSONResponse(
-            content={
-                "transcription": transcription,
-                "detected_language": language or "auto",
-                "script_detected": actual_script,
-            }
-        )
-    except Exception as e:
-        print(f"❌ Transcription error: {e}")
-        raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 class TTSRequest(BaseModel):
@@ -787,39 +1238,81 @@ def normalize_medical_text(text: str) -> str:
     return text
 
 
+TTS_MAX_CHARS = 2000
+
+
+def prepare_tts_text(text: str) -> str:
+    """Normalize for pronunciation and cap length without cutting mid-word."""
+    clean_text = normalize_medical_text(text)
+    if len(clean_text) > TTS_MAX_CHARS:
+        clean_text = clean_text[:TTS_MAX_CHARS].rsplit(" ", 1)[0] + "..."
+    return clean_text
+
+
+async def warm_tts_cache():
+    """Pre-synthesize TTS_WARMUP_FILE phrases into the TTS cache."""
+    tts_cache = get_tts_cache()
+    phrases = load_warmup_phrases()
+    if tts_cache is None or not phrases:
+        return
+    router = get_tts_router()
+    jobs = []
+    for lang, texts in phrases.items():
+        lang_config = get_language_config(lang)
+        if lang_config is None:
+            logger.warning(f"⚠️ TTS warm-up: unknown language '{lang}' skipped")
+            continue
+        for text in texts:
+            clean_text = prepare_tts_text(text)
+            try:
+                route = router.route(lang_config)
+            except TTSBackendError as e:
+                logger.warning(f"⚠️ TTS warm-up: {e}")
+                break
+            jobs.append(
+                (
+                    tts_cache_key(clean_text, route.voice, route.format),
+                    lambda t=clean_text, r=route, lang=lang: speech_stream(t, r.voice, lang, r.synthesize),
+                )
+            )
+    try:
+        await warm_up(tts_cache, jobs)
+    except Exception as e:
+        logger.warning(f"⚠️ TTS warm-up failed: {e}")
+
+
+def _speech_key(request: "TTSRequest", **_) -> Optional[str]:
+    text = (request.text or "").strip()
+    if not text:
+        return None
+    lang_config = get_language_config(request.language) or get_language_config("en")
+    return digest(normalize_medical_text(text), lang_config.tts_voice)
+
+
 @app.post("/generate/speech")
+@single_flight("generate_speech", key=_speech_key)
 async def generate_speech(request: TTSRequest = Body(...)):
     """
-    High-Fidelity Neural TTS using Microsoft Edge TTS.
+    High-Fidelity Neural TTS using Microsoft Edge TTS, with local voices as
+    a failover/low-latency backend (backend.voice.tts_backends).
     Streams audio directly to frontend for low latency.
     Supports 6 languages via centralized config.
+    Repeated text is served from the TTS cache (backend.voice.tts_cache).
     """
     text = (request.text or "").strip()
     if not text:
         raise HTTPException(status_code=400, detail="Text is required")
 
-    # Lazy load edge_tts if not already
-    global edge_tts
-    if edge_tts is None:
-        import edge_tts as _edge_tts
-
-        edge_tts = _edge_tts
-
     try:
         # Get voice for requested language
         lang_config = get_language_config(request.language)
         if lang_config is None:
             lang_config = get_language_config("en")
-        print(f"🎙️ TTS Language: {lang_config.display_name} ({lang_config.tts_voice})")
+        logger.debug(f"🎙️ TTS Language: {lang_config.display_name} ({lang_config.tts_voice})")
 
         # 1. Normalize text (fixes pronunciation & skipping)
-        clean_text = normalize_medical_text(text)
-
         # 2. Safe length cap (avoid cutting mid-word)
-        max_chars = 2000
-        if len(clean_text) > max_chars:
-            clean_text = clean_text[:max_chars].rsplit(" ", 1)[0] + "..."
-            print(f"⚠️ Text truncated from {len(text)} to {len(clean_text)} chars")
+        clean_text = prepare_tts_text(text)
 
         # 3. Pre-flight: block scripts that Edge-TTS physically cannot render for this voice.
         # Runtime-verified: Latin text through hi-IN-SwaraNeural succeeds (27 chunks).
@@ -828,7 +1321,7 @@ async def generate_speech(request: TTSRequest = Body(...)):
         if incompatible and len(clean_text) > 3:
             detected_script = detect_script(clean_text)
             if detected_script in incompatible:
-                print(
+                logger.error(
                     f"❌ TTS pre-flight blocked: voice={lang_config.tts_voice}, "
                     f"incompatible script={detected_script}, text={clean_text[:40]!r}"
                 )
@@ -845,60 +1338,90 @@ async def generate_speech(request: TTSRequest = Body(...)):
                     },
                 )
 
-        # 4. Stream generator.
-        # communicate is created INSIDE the generator — not outside.
-        # Creating it outside and capturing via closure is equivalent, but keeping it
-        # inside makes the lifecycle explicit and prevents accidental double-instantiation.
+        # 4. Pick TTS backends for this language (backend.voice.tts_backends):
+        # Edge TTS and/or local voices, ordered by health and latency
+        route = get_tts_router().route(lang_config)
+
+        # 5. Cache lookup — a hit never touches a TTS backend. Audio from any
+        # candidate's voice is acceptable, so a clip cached before a routing
+        # change is still served; a request counts as one hit or one miss.
+        tts_cache = get_tts_cache()
+        cache_keys = [
+            tts_cache_key(clean_text, c.voice, c.backend.format) for c in route.candidates
+        ]
+        if tts_cache is not None:
+            cached = next(
+                (data for data in map(tts_cache.get_memory, cache_keys) if data is not None),
+                None,
+            )
+            if cached is None:
+                cached = await asyncio.to_thread(tts_cache.get_first, cache_keys)
+            if cached is not None:
+                return Response(
+                    content=cached,
+                    media_type="audio/mpeg",
+                    headers={
+                        "X-TTS-Language": request.language or "en",
+                        "X-TTS-Cache": "hit",
+                    },
+                )
+
+        # 6. Stream generator.
+        # Long text is synthesized sentence by sentence with bounded parallelism
+        # (backend.voice.tts_pipeline) so audio starts after the first sentence;
+        # the first sentence picks the backend (failing over if needed) and
+        # the rest of the request stays on it, so the MP3 encoding never changes.
+        # On a cache miss the stream is tee'd into the cache, which stores the
+        # clip only if synthesis completes on the primary backend.
         # NEVER raise inside a StreamingResponse generator — it crashes the ASGI app.
         # Return gracefully instead; the frontend handles empty/truncated audio.
         async def audio_stream():
-            try:
-                communicate = edge_tts.Communicate(
-                    text=clean_text,
-                    voice=lang_config.tts_voice,
+            source = speech_stream(
+                clean_text, route.voice, lang_config.language, route.synthesize
+            )
+            if tts_cache is not None:
+                source = tts_cache.tee(
+                    cache_keys[0], source, cacheable=lambda: not route.failed_over
                 )
+            try:
                 chunk_count = 0
-                async for chunk in communicate.stream():
-                    if chunk["type"] == "audio":
-                        chunk_count += 1
-                        yield chunk["data"]
+                async for chunk in source:
+                    chunk_count += 1
+                    yield chunk
                 if chunk_count > 0:
-                    print(
-                        f"✅ TTS Success: {chunk_count} chunks for {lang_config.display_name}"
+                    logger.debug(
+                        f"✅ TTS Success: {chunk_count} chunks for {lang_config.display_name} "
+                        f"via {'+'.join(route.used)}"
                     )
                 else:
-                    print(f"⚠️ TTS: Zero chunks for voice={lang_config.tts_voice}")
+                    logger.warning(f"⚠️ TTS: Zero chunks for voice={route.voice}")
             except Exception as stream_error:
-                print(f"❌ TTS Stream Error for '{request.language}': {stream_error}")
+                logger.error(f"❌ TTS Stream Error for '{request.language}': {stream_error}")
                 return  # NEVER raise — return ends the generator cleanly
 
-        # 5. Return Stream (MP3 format)
+        # 7. Return Stream (MP3 format)
         return StreamingResponse(
             audio_stream(),
             media_type="audio/mpeg",
-            headers={"X-TTS-Language": request.language or "en"},
+            headers={
+                "X-TTS-Language": request.language or "en",
+                "X-TTS-Backend": route.backend,
+                "X-TTS-Cache": "miss" if tts_cache is not None else "off",
+            },
         )
 
-    except edge_tts.exceptions.NoAudioReceived as e:
-        print(f"❌ NoAudioReceived for language '{request.language}': {e}")
-        print(f"   Text: '{text[:100]}...'")
-        import traceback
-
-        traceback.print_exc()
+    except TTSBackendError as e:
+        logger.error(f"❌ No TTS backend for language '{request.language}': {e}")
         raise HTTPException(
             status_code=503,
             detail={
-                "error": "TTS_NO_AUDIO",
-                "message": f"No audio generated for language '{request.language}'. Please try again or switch to English.",
+                "error": "TTS_UNAVAILABLE",
+                "message": f"No speech engine is available for language '{request.language}'.",
                 "language": request.language,
-                "voice": lang_config.tts_voice,
             },
         )
     except Exception as e:
-        print(f"❌ TTS Generation Error for '{request.language}': {e}")
-        import traceback
-
-        traceback.print_exc()
+        logger.error(f"❌ TTS Generation Error for '{request.language}': {e}", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail={
@@ -909,8 +1432,7 @@ async def generate_speech(request: TTSRequest = Body(...)):
         )
 
 
-# --- Conversational AI (OpenRouter) ---
-from openai import OpenAI
+# --- Conversational AI (OpenRouter via backend.api.llm_gateway) ---
 from dotenv import load_dotenv
 import os
 
@@ -941,183 +1463,150 @@ async def get_kb_info():
     return JSONResponse(content=get_knowledge_base_info())
 
 
-@app.post("/chat")
-async def chat_endpoint(
-    request: ChatRequest = Body(...), user: dict = Depends(get_current_user)
-):
+def build_chat_messages(request: ChatRequest) -> List[dict]:
     """
-    Enhanced chat endpoint with:
-    - Medical context injection (Static RAG)
-    - Conversation history support
-    - Robust error handling
+    Build the LLM message chain for a chat request: grounded system prompt,
+    budgeted history and the user's message (see backend/api/chat_prompt.py).
+    Shared by /chat and /chat/stream.
     """
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        raise HTTPException(
-            status_code=500,
-            detail="OpenRouter API Key not found. Please set OPENROUTER_API_KEY in .env",
-        )
-
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key,
-    )
-
     # Parse context and get medical grounding
-    diagnosis_label = "Unknown"
-    confidence = 0.0
-    medical_context = ""
+    diagnosis_label = None
+    clean_diagnosis = None
+    confidence = None
+    raw_context = None
 
     if request.context:
         try:
-            import re
-
             # Expected format: "Diagnosis: PNEUMONIA, Confidence: 98.7%"
-            context_str = request.context.strip()
-
-            # Extract diagnosis
-            if "Diagnosis:" in context_str:
-                diagnosis_part = context_str.split(",")[0]
-                diagnosis_label = diagnosis_part.split(":")[-1].strip()
-            elif ":" in context_str:
-                diagnosis_label = context_str.split(":")[0].strip()
-            else:
-                diagnosis_label = context_str.split(",")[0].strip()
-
-            # Extract confidence
-            if "Confidence:" in context_str:
-                conf_part = context_str.split("Confidence:")[-1]
-                conf_str = conf_part.replace("%", "").replace(")", "").strip().split()[0]
-                try:
-                    confidence = float(conf_str)
-                except ValueError:
-                    confidence = 0.0
-            elif "%" in context_str:
-                match = re.search(r"(\d+\.?\d*)%", context_str)
-                if match:
-                    confidence = float(match.group(1))
-
-            # Get grounded medical context — use clean display label, not raw class name
-            condition_info = get_condition_info(diagnosis_label)
+            diagnosis_label, confidence = parse_diagnosis_context(request.context)
+
+            # Grounded context uses the clean display label, not the raw class name
             clean_diagnosis = DIAGNOSIS_DISPLAY_LABELS.get(
                 diagnosis_label, diagnosis_label.replace("_", " ").title()
             )
-            medical_context = format_context_for_prompt(
-                condition_info, clean_diagnosis, confidence
-            )
 
-            print(
+            logger.debug(
                 f"📋 Context parsed - Diagnosis: {clean_diagnosis}, Confidence: {confidence}%"
             )
 
         except Exception as e:
-            print(f"⚠️ Context parsing warning: {e}")
-            medical_context = f"\nDiagnosis context provided: {request.context}\n"
+            logger.warning(f"⚠️ Context parsing warning: {e}")
+            diagnosis_label, confidence = None, None
+            raw_context = request.context
 
-    # Language enforcement — injected at top of system prompt for maximum LLM compliance
     lang_code = (request.language or "en").lower()
     lang_instruction = LANG_LLM_INSTRUCTIONS.get(
         lang_code,
         f"CRITICAL: Respond ONLY in the language with ISO code '{lang_code}'.",
     )
 
-    # Clean diagnosis label for display (fallback safe if context was None)
-    clean_diagnosis = DIAGNOSIS_DISPLAY_LABELS.get(
-        diagnosis_label, diagnosis_label.replace("_", " ").title()
+    prompt = assemble_chat_prompt(
+        request.message,
+        request.history,
+        language_instruction=lang_instruction,
+        lang_code=lang_code,
+        diagnosis_label=diagnosis_label,
+        display_label=clean_diagnosis,
+        confidence=confidence,
+        raw_context=raw_context,
+        route="v1",
     )
+    return prompt.messages
 
-    # Build system prompt with grounding
-    system_prompt = f"""{lang_instruction}
-
-You are VoxRay, an AI radiology assistant designed to help healthcare professionals understand imaging findings.
-
-YOUR ROLE:
-- Explain radiological findings in clear, professional language
-- Provide educational context about detected conditions  
-- Recommend appropriate next steps based on clinical guidelines
-- Act as a knowledgeable translator between AI analysis and clinical practice
-
-{medical_context}
-
-RESPONSE GUIDELINES:
-
-1. SAFETY & BOUNDARIES (CRITICAL):
-   - You MAY discuss general standard treatments and typical symptoms if listed in the provided context.
-   - Do NOT provide patient-specific prescriptions or specific dosages (e.g., "Take 500mg Amoxicillin").
-   - Never invent findings (e.g., "3mm nodule") if not in verified data.
-   - Always prioritize the provided context over internal knowledge.
 
-2. USE YOUR KNOWLEDGE BASE:
-   - When asked about "symptoms" → Reference TYPICAL SYMPTOMS provided above
-   - When asked about "treatment" → Reference STANDARD TREATMENT OPTIONS provided above
-   - When asked about "next steps" → Reference RECOMMENDED NEXT STEPS
-
-3. LANGUAGE & TONE:
-   - SAY: "Pneumonia typically presents with..." (Generalizing signs)
-   - DON'T SAY: "I can see..." (Implies specific localization ability)
-   - Keep responses concise (2-4 sentences) for voice output.
-   - Build on previous conversation.
-
-4. LIMITATIONS:
-   - You classified this image based on patterns but cannot pinpoint exact locations.
-   - Specific localization requires radiologist review.
-   - Always recommend professional consultation for treatment decisions.
-"""
-
-    # Build message chain with history
-    messages = [{"role": "system", "content": system_prompt}]
-
-    # Add conversation history (last 6 exchanges, with length limits)
-    MAX_MESSAGE_LENGTH = 500
-
-    for msg in request.history[-6:]:
-        role = "assistant" if msg.role == "assistant" else "user"
-        text = msg.text
-
-        if len(text) > MAX_MESSAGE_LENGTH:
-            text = text[:MAX_MESSAGE_LENGTH] + "..."
-
-        if text:
-            messages.append({"role": role, "content": text})
+@app.post("/chat")
+@single_flight("chat", key=lambda request, **_: digest(request.model_dump()))
+async def chat_endpoint(
+    request: ChatRequest = Body(...), user: dict = Depends(get_current_user)
+):
+    """
+    Enhanced chat endpoint with:
+    - Medical context injection (Static RAG)
+    - Conversation history support
+    - Robust error handling
+    """
+    require_llm_api_key()
 
-    # Language enforcement injection for non-English — overrides conversation history momentum
-    if lang_code != "en":
-        messages.append({
-            "role": "user",
-            "content": f"[SYSTEM: {lang_instruction} Your next response MUST be in this language only.]"
-        })
-        messages.append({
-            "role": "assistant",
-            "content": "[Understood. I will respond only in the required language.]"
-        })
+    # Repeated first questions about the same scan are answered from cache
+    cache, scope = lookup_scope("v1", request.context, request.language, request.history)
+    if cache is not None:
+        cached = cache.get(scope, request.message)
+        if cached is not None:
+            return JSONResponse(content={"response": cached})
 
-    # Add current user message
-    messages.append({"role": "user", "content": request.message})
+    # Shared pooled async client — never blocks the event loop
+    gateway = get_llm_gateway()
+    messages = build_chat_messages(request)
 
-    print(
+    logger.debug(
         f"💬 Processing chat - Message: '{request.message[:50]}...' with {len(request.history)} history items"
     )
 
     try:
-        completion = client.chat.completions.create(
-            model="google/gemini-2.0-flash-001",
-            messages=messages,
+        response_text = await gateway.complete(
+            messages,
             temperature=0.4,
             max_tokens=250,
         )
+        logger.debug(f"✅ Chat response generated: '{response_text[:50]}...'")
 
-        response_text = completion.choices[0].message.content
-        print(f"✅ Chat response generated: '{response_text[:50]}...'")
-
+        if cache is not None:
+            cache.put(scope, request.message, response_text)
         return JSONResponse(content={"response": response_text})
 
     except Exception as e:
-        print(f"❌ Chat Error: {e}")
+        logger.error(f"❌ Chat Error: {e}")
         raise HTTPException(
             status_code=500, detail=f"Error generating response: {str(e)}"
         )
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest = Body(...), user: dict = Depends(get_current_user)
+):
+    """
+    Streaming variant of /chat. Forwards tokens as Server-Sent Events
+    (start / delta / end / error) as they arrive from the provider.
+    """
+    require_llm_api_key()
+
+    gateway = get_llm_gateway()
+    meta = {"language": (request.language or "en").lower()}
+    cache, scope = lookup_scope("v1", request.context, request.language, request.history)
+    if cache is not None:
+        cached = cache.get(scope, request.message)
+        if cached is not None:
+            return StreamingResponse(
+                cached_sse_stream(cached, gateway.model, meta),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+            )
+
+    messages = build_chat_messages(request)
+
+    logger.debug(
+        f"💬 Streaming chat - Message: '{request.message[:50]}...' with {len(request.history)} history items"
+    )
+
+    return StreamingResponse(
+        chat_sse_stream(
+            gateway,
+            messages,
+            temperature=0.4,
+            max_tokens=250,
+            meta=meta,
+            on_complete=(
+                (lambda text: cache.put(scope, request.message, text))
+                if cache is not None
+                else None
+            ),
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 # ==================== API VERSIONING SETUP ====================
 # This MUST be called after all V1 endpoints are defined above
 from backend.api.versioning import setup_versioning, APIVersionMiddleware
@@ -1128,8 +1617,6 @@ setup_versioning(app)
 # Add version headers middleware
 app.add_middleware(APIVersionMiddleware)
 
-print("✅ API Versioning configured: /v1/*, /v2/*, and root-level V1 endpoints")
-
 
 @app.get("/api/feature-flags")
 async def feature_flags():
@@ -8,141 +8,25 @@ Sources:
 - AO Foundation Fracture Classification
 - Standard Radiology Reporting Criteria
 
-Last Updated: 2024-01
+Condition data, version and update date live in knowledge_base/*.json
+(loaded and indexed by knowledge_index.py).
 Review Schedule: Every 6 months or when guidelines change
-Version: 1.0.0
 
 DISCLAIMER: This provides educational context only.
 Always recommend professional consultation for clinical decisions.
 """
 
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-# Version tracking for maintenance
-KNOWLEDGE_BASE_VERSION = "1.0.0"
-LAST_UPDATED = "2024-01"
+from backend.api.knowledge_index import SearchHit, get_knowledge_base
 
-CONDITION_DETAILS: Dict[str, Dict[str, Any]] = {
-    # Class 0: NORMAL_LUNG
-    "NORMAL_LUNG": {
-        "description": "No significant acute pulmonary abnormalities detected.",
-        "radiological_features": [
-            "Clear bilateral lung fields",
-            "Sharp costophrenic angles",
-            "Normal cardiac silhouette (CTR < 50%)",
-            "Visible pulmonary vascular markings",
-            "No focal consolidation or masses"
-        ],
-        "typical_location": "N/A - findings indicate normal anatomy",
-        "severity": "None",
-        "severity_level": 0,
-        "next_steps": "No further imaging required unless clinical symptoms persist. Correlate with patient presentation.",
-        "differential": [],
-        "source": "Standard Chest X-Ray Normalcy Criteria",
-        "common_symptoms": ["None (Asymptomatic regarding radiologic findings)"],
-        "standard_treatment": "No medical intervention required."
-    },
-    
-    # Class 1: NORMAL_BONE
-    "NORMAL_BONE": {
-        "description": "No evidence of acute fracture or dislocation.",
-        "radiological_features": [
-            "Intact cortical margins",
-            "Normal trabecular bone pattern",
-            "Preserved joint alignment",
-            "No visible lucent fracture lines",
-            "No periosteal reaction"
-        ],
-        "typical_location": "N/A - findings indicate normal anatomy",
-        "severity": "None",
-        "severity_level": 0,
-        "next_steps": "If clinical suspicion for fracture remains high, consider CT or MRI for occult injuries. Correlate with mechanism of injury.",
-        "differential": [],
-        "source": "Standard Skeletal Trauma Protocols",
-        "common_symptoms": ["None (Asymptomatic regarding radiologic findings)"],
-        "standard_treatment": "No medical intervention required."
-    },
-
-    # Class 2: NORMAL_PNEUMONIA (Ambiguous class - requires special handling)
-    "NORMAL_PNEUMONIA": {
-        "description": "Classification shows mixed features. Image may represent transitional state (early or resolving infection) or require clarification.",
-        "radiological_features": [
-            "Features are equivocal (neither clearly normal nor clearly abnormal)",
-            "May represent early/resolving disease process",
-            "Subtle findings that require expert interpretation",
-            "Requires manual radiologist review for definitive interpretation"
-        ],
-        "typical_location": "Unspecified - requires clinical correlation",
-        "severity": "Indeterminate - Requires Review",
-        "severity_level": 1,
-        "next_steps": "Recommend radiologist review. Consider repeat imaging in 48-72 hours if clinically indicated. Correlate with symptoms, vital signs, and laboratory values.",
-        "differential": ["Early pneumonia", "Resolving infection", "Atelectasis", "Artifact"],
-        "source": "VoxRay Classification Uncertainty Protocol",
-        "common_symptoms": ["Variable", "Mild cough", "Low-grade fever"],
-        "standard_treatment": "Clinical correlation required to determine necessity of treatment."
-    },
-
-    # Class 3: LUNG_CANCER
-    "LUNG_CANCER": {
-        "description": "Suspicious pulmonary finding requiring urgent oncological workup.",
-        "radiological_features": [
-            "Solitary pulmonary nodule or mass (>3cm classified as mass)",
-            "Spiculated or irregular margins (higher malignancy risk)",
-            "Possible hilar or mediastinal lymphadenopathy",
-            "May have associated pleural effusion",
-            "Possible chest wall invasion"
-        ],
-        "typical_location": "Upper lobes more commonly affected; can present centrally (squamous) or peripherally (adenocarcinoma)",
-        "severity": "HIGH - Urgent specialist referral required",
-        "severity_level": 3,
-        "next_steps": "Urgent: CT chest with contrast for characterization. PET-CT for staging if confirmed. Pulmonology/Oncology referral. Tissue biopsy for histological diagnosis. Smoking cessation counseling.",
-        "differential": ["Primary lung cancer", "Metastatic disease", "Benign granuloma", "Hamartoma"],
-        "source": "Fleischner Society Guidelines for Pulmonary Nodules; NCCN Lung Cancer Screening Guidelines",
-        "common_symptoms": ["Persistent cough", "Hemoptysis (coughing up blood)", "Unexplained weight loss", "Chest pain", "Shortness of breath"],
-        "standard_treatment": "Treatment is stage-dependent. Options typically include surgical resection, chemotherapy, radiation therapy, immunotherapy, and targeted drug therapy."
-    },
-
-    # Class 4: FRACTURED
-    "FRACTURED": {
-        "description": "Disruption of bone continuity consistent with acute fracture.",
-        "radiological_features": [
-            "Visible lucent fracture line traversing cortex",
-            "Cortical step-off or discontinuity",
-            "Displacement or angulation if present",
-            "Associated soft tissue swelling",
-            "Possible joint involvement or extension"
-        ],
-        "typical_location": "Location varies by mechanism - common sites include distal radius (Colles'), hip (femoral neck), ankle (malleoli), and clavicle",
-        "severity": "Moderate to High - depends on location and displacement",
-        "severity_level": 2,
-        "next_steps": "Orthopedic consultation. Immobilization (splint/cast). CT if complex fracture pattern suspected. Assess for neurovascular compromise. Pain management.",
-        "differential": ["Acute fracture", "Stress fracture", "Pathologic fracture"],
-        "source": "AO Foundation Fracture Classification; Ottawa Ankle/Knee Rules",
-        "common_symptoms": ["Immediate pain", "Swelling", "Bruising", "Inability to bear weight or move limb", "Deformity"],
-        "standard_treatment": "Immobilization (splint/cast), pain management, and physical therapy. Complex fractures may require surgical fixation (ORIF)."
-    },
-
-    # Class 5: PNEUMONIA
-    "PNEUMONIA": {
-        "description": "Inflammatory consolidation of lung parenchyma consistent with infectious process.",
-        "radiological_features": [
-            "Airspace consolidation (areas of increased opacity)",
-            "Air bronchograms (air-filled bronchi visible within consolidation)",
-            "Silhouette sign (loss of normal cardiac or diaphragm border)",
-            "Possible parapneumonic pleural effusion",
-            "May show lobar, bronchopneumonia, or interstitial pattern"
-        ],
-        "typical_location": "Lower lobes commonly affected; can be lobar (single lobe), bronchopneumonia (patchy bilateral), or interstitial pattern. May be unilateral or bilateral.",
-        "severity": "Moderate - assess with CURB-65 or PSI score for disposition",
-        "severity_level": 2,
-        "next_steps": "CBC, CMP, blood cultures if febrile/septic. Sputum culture if productive cough. Empiric antibiotics per local guidelines (typically macrolide or fluoroquinolone for CAP). Monitor oxygen saturation. Consider CT if complicated or treatment failure.",
-        "differential": ["Bacterial pneumonia", "Viral pneumonia", "Aspiration pneumonia", "Atypical pneumonia"],
-        "source": "IDSA/ATS Community-Acquired Pneumonia Guidelines 2019",
-        "common_symptoms": ["High fever", "Chills", "Productive cough (yellow/green sputum)", "Pleuritic chest pain", "Fatigue"],
-        "standard_treatment": "Antibiotics (for bacterial causes), rest, fluids, and antipyretics. Severe cases may require hospitalization and oxygen therapy."
-    }
-}
+# Conditions live in versioned data files under backend/api/knowledge_base/
+# (see knowledge_index.py); these names are kept for existing importers.
+_kb = get_knowledge_base()
+KNOWLEDGE_BASE_VERSION = _kb.version
+LAST_UPDATED = _kb.last_updated
+CONDITION_DETAILS: Dict[str, Dict[str, Any]] = _kb.conditions
 
 
 def get_condition_info(diagnosis_label: str) -> Dict[str, Any]:
@@ -158,45 +42,30 @@ def get_condition_info(diagnosis_label: str) -> Dict[str, Any]:
     """
     if not diagnosis_label:
         return _get_fallback_info("Unknown")
-    
-    # Normalize: uppercase, strip whitespace, remove numeric prefixes
-    clean_label = diagnosis_label.upper().strip()
-    clean_label = re.sub(r'^\d+_', '', clean_label)  # Remove "01_", "02_", etc.
-    clean_label = clean_label.replace(' ', '_')       # Handle spaces
-    clean_label = clean_label.replace('-', '_')       # Handle hyphens
-    
-    # Exact match
-    if clean_label in CONDITION_DETAILS:
-        return CONDITION_DETAILS[clean_label]
-    
-    # Partial match (e.g., "LUNG" in "NORMAL_LUNG", "CANCER" in "LUNG_CANCER")
-    for key in CONDITION_DETAILS:
-        if clean_label in key or key in clean_label:
-            return CONDITION_DETAILS[key]
-    
-    # Keyword-based matching
-    keyword_map = {
-        "NORMAL": "NORMAL_LUNG",
-        "HEALTHY": "NORMAL_LUNG",
-        "CLEAR": "NORMAL_LUNG",
-        "FRACTURE": "FRACTURED",
-        "BROKEN": "FRACTURED",
-        "CANCER": "LUNG_CANCER",
-        "TUMOR": "LUNG_CANCER",
-        "MASS": "LUNG_CANCER",
-        "NODULE": "LUNG_CANCER",
-        "INFECTION": "PNEUMONIA",
-        "CONSOLIDATION": "PNEUMONIA"
-    }
-    
-    for keyword, condition_key in keyword_map.items():
-        if keyword in clean_label:
-            return CONDITION_DETAILS[condition_key]
-    
+
+    # Exact, partial and keyword matching — memoized per label
+    key = get_knowledge_base().resolve(diagnosis_label)
+    if key is not None:
+        return CONDITION_DETAILS[key]
+
     # Safe fallback for unknown conditions
     return _get_fallback_info(diagnosis_label)
 
 
+def get_relevant_passages(diagnosis_label: str, question: str, k: int = 3) -> List[SearchHit]:
+    """
+    Returns the top-k knowledge base passages for the user's question,
+    restricted to the resolved condition. Questions with no matching terms
+    ("What should I do now?", most non-English questions) get the condition's
+    symptoms, treatment and next steps instead. Empty for unknown conditions.
+    """
+    kb = get_knowledge_base()
+    key = kb.resolve(diagnosis_label) if diagnosis_label else None
+    if key is None or k <= 0:
+        return []
+    return kb.search(question, condition=key, k=k) or kb.default_passages(key)
+
+
 def _get_fallback_info(diagnosis_label: str) -> Dict[str, Any]:
     """Returns a safe fallback response for unknown conditions."""
     return {
@@ -215,14 +84,52 @@ def _get_fallback_info(diagnosis_label: str) -> Dict[str, Any]:
     }
 
 
-def format_context_for_prompt(condition_info: Dict[str, Any], diagnosis: str, confidence: float) -> str:
+def parse_diagnosis_context(context_str: str) -> Tuple[str, float]:
+    """
+    Extracts (diagnosis_label, confidence) from a chat context string.
+
+    Expected format: "Diagnosis: PNEUMONIA, Confidence: 98.7%", but bare
+    "PNEUMONIA (85%)" style strings are accepted too.
+    """
+    context_str = context_str.strip()
+    confidence = 0.0
+
+    # Extract diagnosis
+    if "Diagnosis:" in context_str:
+        diagnosis_part = context_str.split(",")[0]
+        diagnosis_label = diagnosis_part.split(":")[-1].strip()
+    elif ":" in context_str:
+        diagnosis_label = context_str.split(":")[0].strip()
+    else:
+        diagnosis_label = context_str.split(",")[0].strip()
+
+    # Extract confidence — with .split()[0] guard for trailing text
+    if "Confidence:" in context_str:
+        conf_part = context_str.split("Confidence:")[-1]
+        conf_str = conf_part.replace("%", "").replace(")", "").strip().split()[0]
+        try:
+            confidence = float(conf_str)
+        except ValueError:
+            confidence = 0.0
+    elif "%" in context_str:
+        match = re.search(r"(\d+\.?\d*)%", context_str)
+        if match:
+            confidence = float(match.group(1))
+
+    return diagnosis_label, confidence
+
+
+def format_context_for_prompt(
+    condition_info: Dict[str, Any], diagnosis: str, confidence: Optional[float]
+) -> str:
     """
     Formats condition information into a structured prompt section for the LLM.
     
     Args:
         condition_info: Dictionary from get_condition_info()
         diagnosis: The diagnosis label
-        confidence: Confidence percentage (0-100)
+        confidence: Confidence percentage (0-100); None omits the line so the
+            block is identical for every scan with this diagnosis
     
     Returns:
         Formatted string for injection into system prompt
@@ -243,11 +150,12 @@ def format_context_for_prompt(condition_info: Dict[str, Any], diagnosis: str, co
         3: '🔴 URGENT'
     }.get(severity_level, '⚪ UNKNOWN')
     
+    confidence_line = f"AI CONFIDENCE: {confidence:.1f}%\n" if confidence is not None else ""
+
     return f"""
 === SCAN ANALYSIS RESULTS ===
 DETECTED CONDITION: {diagnosis}
-AI CONFIDENCE: {confidence:.1f}%
-SEVERITY: {severity_emoji} - {condition_info.get('severity', 'Unknown')}
+{confidence_line}SEVERITY: {severity_emoji} - {condition_info.get('severity', 'Unknown')}
 
 CONDITION DESCRIPTION:
 {condition_info.get('description', 'N/A')}
@@ -285,11 +193,58 @@ CRITICAL INSTRUCTIONS FOR GENERATING RESPONSES:
 """
 
 
+def format_condition_summary(condition_info: Dict[str, Any], diagnosis: str) -> str:
+    """
+    Compact, question-independent header for a condition. Used with
+    format_passages_for_prompt() instead of the full block, so only the
+    passages relevant to the user's question are sent.
+    """
+    severity_level = condition_info.get('severity_level', 1)
+    severity_emoji = {
+        0: '🟢 NORMAL',
+        1: '🟡 REVIEW NEEDED',
+        2: '🟠 MODERATE',
+        3: '🔴 URGENT'
+    }.get(severity_level, '⚪ UNKNOWN')
+
+    return f"""
+=== SCAN ANALYSIS RESULTS ===
+DETECTED CONDITION: {diagnosis}
+SEVERITY: {severity_emoji} - {condition_info.get('severity', 'Unknown')}
+
+CONDITION DESCRIPTION:
+{condition_info.get('description', 'N/A')}
+
+REFERENCE: {condition_info.get('source', 'Standard clinical guidelines')}
+KNOWLEDGE BASE VERSION: {KNOWLEDGE_BASE_VERSION} (Updated: {LAST_UPDATED})
+=== END SCAN RESULTS ===
+
+CRITICAL INSTRUCTIONS FOR GENERATING RESPONSES:
+1. USE THE VERIFIED INFORMATION ABOVE AND IN THE REFERENCE NOTES to answer questions accurately.
+2. SAY "typically presents with" NOT "I can see" (you cannot see specific locations).
+3. If the reference notes do not cover the question, say so and recommend specialist review.
+4. ALWAYS recommend professional consultation for treatment decisions.
+5. DO NOT invent specific findings not listed in the verified information.
+"""
+
+
+def format_passages_for_prompt(hits: List[SearchHit]) -> str:
+    """Formats retrieved knowledge base passages as reference notes."""
+    if not hits:
+        return ""
+    lines = ["", "REFERENCE NOTES FOR THIS QUESTION:"]
+    for hit in hits:
+        lines.append(f"{hit.passage.heading}: {hit.passage.text}")
+    return "\n".join(lines)
+
+
 def get_knowledge_base_info() -> Dict[str, Any]:
     """Returns metadata about the knowledge base for version checking."""
+    info = get_knowledge_base().info()
     return {
-        "version": KNOWLEDGE_BASE_VERSION,
-        "last_updated": LAST_UPDATED,
-        "conditions_count": len(CONDITION_DETAILS),
-        "conditions": list(CONDITION_DETAILS.keys())
+        "version": info["version"],
+        "last_updated": info["last_updated"],
+        "conditions_count": info["conditions_count"],
+        "conditions": info["conditions"],
+        "files": info["files"],
     }
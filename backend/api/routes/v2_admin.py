@@ -0,0 +1,47 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from backend.core.feature_flags import require_feature, FeatureFlag
+from backend.api.deps import require_role
+from backend.audit.audit_index import get_audit_index
+
+router = APIRouter()
+
+
+@router.get("/admin/audit/events")
+@require_feature(FeatureFlag.AUDIT_LOGGING)
+async def query_audit_events(
+    request_id: Optional[str] = Query(None),
+    user_id_hash: Optional[str] = Query(None),
+    input_hash: Optional[str] = Query(None),
+    event_type: Optional[str] = Query(None),
+    since: Optional[str] = Query(None, description="ISO date/time, inclusive"),
+    until: Optional[str] = Query(None, description="ISO date/time, exclusive"),
+    limit: int = Query(100, ge=1, le=1000),
+    user: dict = Depends(require_role("admin")),
+):
+    """
+    Indexed audit log lookup for compliance review.
+    Feature encoded: FF_AUDIT_LOGGING
+    """
+    if not any((request_id, user_id_hash, input_hash, event_type, since, until)):
+        raise HTTPException(
+            status_code=400,
+            detail="At least one filter (request_id, user_id_hash, input_hash, event_type, since, until) is required",
+        )
+
+    # SQLite, segment tail reads and block decompression stay off the event loop
+    index = await asyncio.to_thread(get_audit_index)
+    # Only the bytes appended since the last refresh are read
+    await asyncio.to_thread(index.refresh)
+    events = await asyncio.to_thread(
+        index.query,
+        request_id=request_id,
+        user_id_hash=user_id_hash,
+        input_hash=input_hash,
+        event_type=event_type,
+        since=since,
+        until=until,
+        limit=limit,
+    )
+    return {"count": len(events), "events": events}
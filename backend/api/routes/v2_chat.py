@@ -1,11 +1,20 @@
-import os
-from typing import List, Optional
+import logging
+from typing import List, Optional, Tuple
 from fastapi import APIRouter, Body, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
-from backend.api.deps import get_current_user
-from backend.api.medical_context import get_condition_info, format_context_for_prompt
-
+from backend.api.deps import get_current_user, require_llm_api_key
+from backend.api.llm_gateway import (
+    get_llm_gateway,
+    chat_sse_stream,
+    cached_sse_stream,
+    SSE_HEADERS,
+)
+from backend.api.chat_cache import lookup_scope
+from backend.api.medical_context import parse_diagnosis_context
+from backend.api.chat_prompt import assemble_chat_prompt
+
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
@@ -25,73 +34,29 @@ class ChatRequestV2(BaseModel):
     language: Optional[str] = "en"  # V2: Language code (en, es, fr, etc.)
 
 
-@router.post("/chat")
-async def chat_v2(
-    request: ChatRequestV2 = Body(...), user: dict = Depends(get_current_user)
-):
+def build_chat_messages_v2(request: ChatRequestV2) -> Tuple[List[dict], str]:
     """
-    V2 Chat endpoint with multilingual support.
-    Supports language parameter for non-English responses.
+    Build the LLM message chain for a V2 chat request.
+    Returns (messages, target_language name). Shared by /chat and /chat/stream.
     """
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        raise HTTPException(
-            status_code=500,
-            detail="OpenRouter API Key not found. Please set OPENROUTER_API_KEY in .env",
-        )
-
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key,
-    )
-
     # Parse context and get medical grounding
-    diagnosis_label = "Unknown"
-    confidence = 0.0
-    medical_context = ""
+    diagnosis_label = None
+    confidence = None
+    raw_context = None
 
     if request.context:
         try:
-            import re
-
             # Expected format: "Diagnosis: PNEUMONIA, Confidence: 98.7%"
-            context_str = request.context.strip()
-
-            # Extract diagnosis
-            if "Diagnosis:" in context_str:
-                diagnosis_part = context_str.split(",")[0]
-                diagnosis_label = diagnosis_part.split(":")[-1].strip()
-            elif ":" in context_str:
-                diagnosis_label = context_str.split(":")[0].strip()
-            else:
-                diagnosis_label = context_str.split(",")[0].strip()
-
-            # Extract confidence — with .split()[0] guard for trailing text
-            if "Confidence:" in context_str:
-                conf_part = context_str.split("Confidence:")[-1]
-                conf_str = conf_part.replace("%", "").replace(")", "").strip().split()[0]
-                try:
-                    confidence = float(conf_str)
-                except ValueError:
-                    confidence = 0.0
-            elif "%" in context_str:
-                match = re.search(r"(\d+\.?\d*)%", context_str)
-                if match:
-                    confidence = float(match.group(1))
-
-            # Get grounded medical context
-            condition_info = get_condition_info(diagnosis_label)
-            medical_context = format_context_for_prompt(
-                condition_info, diagnosis_label, confidence
-            )
+            diagnosis_label, confidence = parse_diagnosis_context(request.context)
 
-            print(
+            logger.debug(
                 f"📋 Context parsed - Diagnosis: {diagnosis_label}, Confidence: {confidence}%"
             )
 
         except Exception as e:
-            print(f"⚠️ Context parsing warning: {e}")
-            medical_context = f"\nDiagnosis context provided: {request.context}\n"
+            logger.warning(f"⚠️ Context parsing warning: {e}")
+            diagnosis_label, confidence = None, None
+            raw_context = request.context
 
     # V2: Language instruction — matches main.py LANG_LLM_INSTRUCTIONS
     # Hindi disabled: whisper-base cannot distinguish spoken Hindi from Urdu
@@ -105,102 +70,110 @@ async def chat_v2(
     }
     target_language, script_note = language_map.get(request.language, ("English", ""))
     lang_code = (request.language or "en").lower()
-    
-    # Language instruction at TOP of system prompt for maximum compliance
+
     language_instruction = (
         f"CRITICAL: Respond ONLY in {target_language}.{script_note}"
         if lang_code != "en"
         else "CRITICAL: Respond ONLY in English."
     )
 
-    # Build system prompt with grounding — language instruction FIRST
-    system_prompt = f"""{language_instruction}
-
-You are VoxRay, an AI radiology assistant designed to help healthcare professionals understand imaging findings.
-
-YOUR ROLE:
-- Explain radiological findings in clear, professional language
-- Provide educational context about detected conditions  
-- Recommend appropriate next steps based on clinical guidelines
-- Act as a knowledgeable translator between AI analysis and clinical practice
-
-{medical_context}
-
-RESPONSE GUIDELINES:
-
-1. SAFETY & BOUNDARIES (CRITICAL):
-   - You MAY discuss general standard treatments and typical symptoms if listed in the provided context.
-   - Do NOT provide patient-specific prescriptions or specific dosages (e.g., "Take 500mg Amoxicillin").
-   - Never invent findings (e.g., "3mm nodule") if not in verified data.
-   - Always prioritize the provided context over internal knowledge.
-
-2. USE YOUR KNOWLEDGE BASE:
-   - When asked about "symptoms" → Reference TYPICAL SYMPTOMS provided above
-   - When asked about "treatment" → Reference STANDARD TREATMENT OPTIONS provided above
-   - When asked about "next steps" → Reference RECOMMENDED NEXT STEPS
-
-3. LANGUAGE & TONE:
-   - SAY: "Pneumonia typically presents with..." (Generalizing signs)
-   - DON'T SAY: "I can see..." (Implies specific localization ability)
-   - Keep responses concise (2-4 sentences) for voice output.
-   - Build on previous conversation.
-
-4. LIMITATIONS:
-   - You classified this image based on patterns but cannot pinpoint exact locations.
-   - Specific localization requires radiologist review.
-   - Always recommend professional consultation for treatment decisions.
-"""
-
-    # Build message chain with history
-    messages = [{"role": "system", "content": system_prompt}]
-
-    # Add conversation history (last 6 exchanges, with length limits)
-    MAX_MESSAGE_LENGTH = 500
-
-    for msg in request.history[-6:]:
-        role = "assistant" if msg.role == "assistant" else "user"
-        text = msg.text
+    prompt = assemble_chat_prompt(
+        request.message,
+        request.history,
+        language_instruction=language_instruction,
+        lang_code=lang_code,
+        diagnosis_label=diagnosis_label,
+        confidence=confidence,
+        raw_context=raw_context,
+        route="v2",
+    )
+    return prompt.messages, target_language
 
-        if len(text) > MAX_MESSAGE_LENGTH:
-            text = text[:MAX_MESSAGE_LENGTH] + "..."
 
-        if text:
-            messages.append({"role": role, "content": text})
+@router.post("/chat")
+async def chat_v2(
+    request: ChatRequestV2 = Body(...), user: dict = Depends(get_current_user)
+):
+    """
+    V2 Chat endpoint with multilingual support.
+    Supports language parameter for non-English responses.
+    """
+    require_llm_api_key()
 
-    # Language enforcement injection for non-English — overrides conversation history momentum
-    if lang_code != "en":
-        messages.append({
-            "role": "user",
-            "content": f"[SYSTEM: {language_instruction} Your next response MUST be in this language only.]"
-        })
-        messages.append({
-            "role": "assistant",
-            "content": "[Understood. I will respond only in the required language.]"
-        })
+    # Repeated first questions about the same scan are answered from cache
+    cache, scope = lookup_scope("v2", request.context, request.language, request.history)
+    if cache is not None:
+        cached = cache.get(scope, request.message)
+        if cached is not None:
+            return {"response": cached}
 
-    # Add current user message
-    messages.append({"role": "user", "content": request.message})
+    gateway = get_llm_gateway()
+    messages, target_language = build_chat_messages_v2(request)
 
-    print(
+    logger.debug(
         f"💬 [V2] Processing chat - Message: '{request.message[:50]}...' in {target_language}, {len(request.history)} history items"
     )
 
     try:
-        completion = client.chat.completions.create(
-            model="google/gemini-2.0-flash-001",
-            messages=messages,
-            temperature=0.4,
-            max_tokens=200,
-        )
-
-        response_text = completion.choices[0].message.content.strip()
-        print(f"✅ Chat response generated: '{response_text[:50]}...'")
+        response_text = (
+            await gateway.complete(messages, temperature=0.4, max_tokens=200)
+        ).strip()
+        logger.debug(f"✅ Chat response generated: '{response_text[:50]}...'")
 
+        if cache is not None:
+            cache.put(scope, request.message, response_text)
         return {"response": response_text}
 
     except Exception as e:
-        print(f"❌ OpenRouter error: {e}")
+        logger.error(f"❌ OpenRouter error: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate response: {str(e)}",
         )
+
+
+@router.post("/chat/stream")
+async def chat_stream_v2(
+    request: ChatRequestV2 = Body(...), user: dict = Depends(get_current_user)
+):
+    """
+    Streaming V2 chat. Tokens are sent as Server-Sent Events
+    (start / delta / end / error) as soon as the provider produces them.
+    """
+    require_llm_api_key()
+
+    gateway = get_llm_gateway()
+    meta = {"language": (request.language or "en").lower()}
+    cache, scope = lookup_scope("v2", request.context, request.language, request.history)
+    if cache is not None:
+        cached = cache.get(scope, request.message)
+        if cached is not None:
+            return StreamingResponse(
+                cached_sse_stream(cached, gateway.model, meta),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+            )
+
+    messages, target_language = build_chat_messages_v2(request)
+
+    logger.debug(
+        f"💬 [V2] Streaming chat - Message: '{request.message[:50]}...' in {target_language}, {len(request.history)} history items"
+    )
+
+    return StreamingResponse(
+        chat_sse_stream(
+            gateway,
+            messages,
+            temperature=0.4,
+            max_tokens=200,
+            meta=meta,
+            strip=True,
+            on_complete=(
+                (lambda text: cache.put(scope, request.message, text))
+                if cache is not None
+                else None
+            ),
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
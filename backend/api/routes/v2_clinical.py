@@ -1,18 +1,33 @@
+import logging
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, BackgroundTasks
 from backend.core.feature_flags import require_feature, FeatureFlag
 from backend.api.deps import get_current_user
+from backend.api.uploads import ingest_upload
 from backend.clinical.dicom.dicom_handler import DICOMHandler
 from backend.security.anonymizer import DicomAnonymizer
 from backend.audit.audit_logger import AuditLogger
-from tensorflow.keras.applications.resnet_v2 import preprocess_input
+from backend.audit.audit_index import get_audit_index
+from backend.audit.audit_archive import AuditArchiver
 from PIL import Image
 import numpy as np
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 dicom_handler = DICOMHandler()
 anonymizer = DicomAnonymizer()
 audit_logger = AuditLogger()
 
+
+def _index_closed_segment(path):
+    # The index (a SQLite file in the log directory) opens on the first
+    # rotation, not at import, so importing the app creates no files
+    get_audit_index(str(audit_logger.log_dir)).index_segment(path)
+
+
+# Segments are indexed, then sealed (compressed + hash-chained) as the writer rotates them out
+audit_logger.writer.add_segment_close_hook(_index_closed_segment)
+AuditArchiver().attach(audit_logger.writer)
+
 IMG_HEIGHT = 224
 IMG_WIDTH = 224
 
@@ -32,12 +47,13 @@ async def predict_dicom(
     import backend.api.main as main_app
     from backend.api.main import MEDICAL_CLASS_NAMES
 
-    if main_app.medical_model is None:
+    model = await main_app.model_lifecycle.aacquire("classifier")
+    if model is None:
         raise HTTPException(status_code=503, detail="Model is not loaded")
 
-    # 1. Read and Parse DICOM
-    file_bytes = await dicom_file.read()
-    extract_result = dicom_handler.read_and_extract(file_bytes)
+    # 1. Read and Parse DICOM (spooled upload, parsed in place; hashed once)
+    upload = await ingest_upload(dicom_file, "dicom")
+    extract_result = dicom_handler.read_and_extract(upload.open())
 
     if not extract_result.ok:
         raise HTTPException(
@@ -46,6 +62,10 @@ async def predict_dicom(
 
     # 2. Preprocess for ResNet50V2 (224x224, preprocessed)
     try:
+        # Imported here, not at module level: importing this router must not
+        # load TensorFlow before configure_runtime() has fixed its thread pools
+        from tensorflow.keras.applications.resnet_v2 import preprocess_input
+
         rgb_array = extract_result.image_rgb
         img = Image.fromarray(rgb_array)
         img = img.resize((IMG_WIDTH, IMG_HEIGHT))
@@ -58,7 +78,7 @@ async def predict_dicom(
     # 3. Predict
     try:
         # Use existing v1 model
-        prediction_scores = main_app.medical_model.predict(img_batch)[0]
+        prediction_scores = model.predict(img_batch)[0]
         diagnosis_idx = np.argmax(prediction_scores)
         diagnosis = MEDICAL_CLASS_NAMES[diagnosis_idx]
         confidence = float(np.max(prediction_scores))
@@ -79,10 +99,7 @@ async def predict_dicom(
         import uuid
 
         request_id = str(uuid.uuid4())
-
-        import hashlib
-
-        input_hash = hashlib.sha256(file_bytes).hexdigest()
+        input_hash = upload.sha256
 
         user_id = user.get("sub", "unknown")
 
@@ -99,7 +116,7 @@ async def predict_dicom(
                 },
             )
         except Exception as e:
-            print(f"Audit log failed: {e}")
+            logger.error(f"Audit log failed: {e}")
 
     return {
         "diagnosis": diagnosis,
@@ -6,11 +6,17 @@ from backend.core.feature_flags import (
     check_flag,
 )
 from backend.serving.model_server import ModelServer
+from backend.serving.model_lifecycle import get_model_lifecycle
 from backend.api.deps import get_current_user
+from backend.api.uploads import ingest_upload
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 model_server = ModelServer()
+# Built on first request, evicted when idle (see model_lifecycle)
+get_model_lifecycle().register(
+    "ensemble", model_server.load, lambda: model_server.ensemble, model_server.unload
+)
 
 
 @router.post("/predict/image")
@@ -37,7 +43,7 @@ async def predict_image_v2(
             detail="Invalid file type. Only JPEG or PNG is supported.",
         )
 
-    if model_server.ensemble is None:
+    if await get_model_lifecycle().aacquire("ensemble") is None:
         logger.error("[v2] ModelServer ensemble not initialized.")
         raise HTTPException(
             status_code=503,
@@ -45,13 +51,13 @@ async def predict_image_v2(
         )
 
     try:
-        image_bytes = await file.read()
+        upload = await ingest_upload(file, "image")
 
         run_uncertainty = bool(enable_uncertainty) and check_flag(
             FeatureFlag.UNCERTAINTY_QUANTIFICATION
         )
 
-        result = model_server.predict(image_bytes, run_uncertainty=run_uncertainty)
+        result = model_server.predict(upload.open(), run_uncertainty=run_uncertainty)
 
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
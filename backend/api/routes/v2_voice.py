@@ -1,8 +1,16 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from backend.core.feature_flags import require_feature, FeatureFlag
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, UploadFile, File, WebSocket, WebSocketDisconnect
+from backend.core.feature_flags import require_feature, check_flag, FeatureFlag
 from pydantic import BaseModel
 from backend.voice.medical_vocabulary import MedicalVocabulary
 from backend.voice.wake_word import WakeWordDetector
+from backend.voice.live_transcription import live_transcripts, pcm_to_float
+from backend.voice.stt_service import get_stt_service, stt_session
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -36,3 +44,66 @@ async def wake_word_detect(file: UploadFile = File(...)):
     audio_bytes = await file.read(1024)
     result = detector.detect(audio_bytes)
     return result
+
+
+@router.websocket("/voice/stream")
+async def voice_stream(
+    websocket: WebSocket, language: Optional[str] = None, encoding: str = "s16le"
+):
+    """
+    Live transcription. The client sends binary frames of 16 kHz mono PCM
+    (``encoding`` s16le or f32le) and a text frame ``{"type": "end"}`` when
+    done. Each speech segment is decoded as soon as voice activity detection
+    closes it; the server pushes ``partial`` and ``final`` hypotheses as
+    ``{"type", "segment", "text", "start", "end"}`` and ``{"type": "done"}``
+    after the last one.
+    """
+    if not check_flag(FeatureFlag.NOISE_HANDLING):
+        await websocket.close(code=1008, reason="FEATURE_NOT_ENABLED")
+        return
+    # Imported here: main includes this router
+    from backend.api import main
+
+    with stt_session():
+        model = await main.model_lifecycle.aacquire("stt")
+        processor = main.stt_processor
+        if model is None or processor is None:
+            await websocket.close(code=1013, reason="F2 (STT) models are not loaded.")
+            return
+        await websocket.accept()
+        whisper_language = main._stt_language(language)["whisper_name"]
+        service = get_stt_service(processor, model, main.device)
+
+        async def frames():
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                if message.get("bytes") is not None:
+                    yield pcm_to_float(message["bytes"], encoding)
+                elif message.get("text") is not None:
+                    if json.loads(message["text"]).get("type") == "end":
+                        return
+
+        try:
+            async for hypothesis in live_transcripts(frames(), service, whisper_language):
+                await websocket.send_json(
+                    {
+                        "type": hypothesis.kind,
+                        "segment": hypothesis.segment,
+                        "text": hypothesis.text,
+                        "start": round(hypothesis.start, 3),
+                        "end": round(hypothesis.end, 3),
+                    }
+                )
+            await websocket.send_json({"type": "done"})
+            await websocket.close()
+        except WebSocketDisconnect:
+            logger.info("[VoiceStream] Client disconnected")
+        except ValueError as e:
+            await websocket.send_json({"type": "error", "message": str(e)})
+            await websocket.close(code=1003)
+        except Exception as e:
+            logger.error(f"[VoiceStream] Transcription failed: {e}")
+            await websocket.send_json({"type": "error", "message": f"Error processing audio: {str(e)}"})
+            await websocket.close(code=1011)
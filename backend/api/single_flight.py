@@ -0,0 +1,230 @@
+"""
+Single-flight coalescing of identical concurrent requests.
+
+When a study is open in several tabs, the same image / text / prompt reaches
+the backend several times at once. The first request for a key runs the
+handler; concurrent duplicates await the same in-flight task and receive its
+result (or its exception). Nothing is cached — once the task finishes the key
+is forgotten and the next request runs again.
+
+Each waiter awaits the shared task through ``asyncio.shield``, so cancelling
+one waiter does not cancel the work for the others; when the last waiter for
+a key is cancelled the task is cancelled too. Starlette does not cancel a
+non-streaming handler when its client disconnects, so a dropped HTTP request
+still waits for (and discards) the shared result; only streaming bodies stop
+early, once every subscriber has left (see SharedStream).
+
+Streaming handlers are coalesced too: a StreamingResponse result is turned
+into a SharedStream that runs the original body once, buffers the chunks and
+replays them to each waiter's own StreamingResponse.
+
+Usage:
+
+    @app.post("/predict/image")
+    @single_flight("predict_image", key=lambda image_file, **_: upload_digest(image_file))
+    async def predict_image(image_file: UploadFile = File(...), ...):
+        ...
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from starlette.responses import StreamingResponse
+
+from backend.api.uploads import ingest_upload
+
+logger = logging.getLogger(__name__)
+
+
+def digest(*parts: Any) -> str:
+    """SHA-256 over the JSON form of ``parts`` (bytes are hashed as-is)."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(part)
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+async def upload_digest(upload) -> str:
+    """SHA-256 of an UploadFile, computed once per request (see ``uploads``)."""
+    return (await ingest_upload(upload)).sha256
+
+
+class SharedStream:
+    """
+    Runs one async byte iterator and replays it to every subscriber.
+
+    Chunks are buffered so late subscribers start from the beginning. The
+    producer is cancelled once ``expected`` subscribers have all left before
+    it finished.
+    """
+
+    def __init__(self, source: AsyncIterator[bytes], expected: int = 1):
+        self._source = source
+        self._chunks: List[bytes] = []
+        self._done = False
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._remaining = max(expected, 1)
+        self._active = 0
+
+    async def _produce(self) -> None:
+        try:
+            async for chunk in self._source:
+                self._chunks.append(chunk)
+                self._changed.set()
+        except Exception as e:  # A StreamingResponse generator must end cleanly
+            logger.error(f"[SingleFlight] Shared stream failed: {e}")
+        finally:
+            self._done = True
+            self._changed.set()
+
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._produce())
+        self._active += 1
+        index = 0
+        try:
+            while True:
+                while index < len(self._chunks):
+                    yield self._chunks[index]
+                    index += 1
+                if self._done:
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+        finally:
+            self._active -= 1
+            self._remaining -= 1
+            if self._remaining <= 0 and self._active == 0 and not self._done:
+                self._task.cancel()
+
+
+@dataclass
+class _SharedStreamingResult:
+    stream: SharedStream
+    status_code: int
+    headers: Dict[str, str]
+    media_type: Optional[str]
+
+    def response(self) -> StreamingResponse:
+        return StreamingResponse(
+            self.stream.subscribe(),
+            status_code=self.status_code,
+            headers=self.headers,
+            media_type=self.media_type,
+        )
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """In-flight task registry for one group of requests."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self.stats: Dict[str, int] = {"leaders": 0, "coalesced": 0, "cancelled": 0}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            self.stats["leaders"] += 1
+
+            def _forget(_task, key=key, call=call):
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+            call.task.add_done_callback(_forget)
+        else:
+            self.stats["coalesced"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                # Last interested client is gone — stop the work
+                call.task.cancel()
+                self.stats["cancelled"] += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+
+_flights: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    if name not in _flights:
+        _flights[name] = SingleFlight(name)
+    return _flights[name]
+
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    return {name: dict(f.stats, in_flight=f.in_flight()) for name, f in _flights.items()}
+
+
+def single_flight(name: str, key: Callable[..., Any]):
+    """
+    Decorator that coalesces concurrent calls of an async handler with equal keys.
+
+    ``key`` receives the handler's arguments and returns (or awaits to) a
+    string, or None to run the call uncoalesced.
+    """
+    flight = get_single_flight(name)
+
+    def decorator(func: Callable):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs)
+            if inspect.isawaitable(k):
+                k = await k
+            if k is None:
+                return await func(*args, **kwargs)
+
+            async def run():
+                result = await func(*args, **kwargs)
+                if isinstance(result, StreamingResponse):
+                    # Each waiter needs its own response over one shared body
+                    call = flight._calls.get(k)
+                    headers = {
+                        header: value
+                        for header, value in result.headers.items()
+                        if header.lower() not in ("content-type", "content-length")
+                    }
+                    return _SharedStreamingResult(
+                        SharedStream(result.body_iterator, call.waiters if call else 1),
+                        result.status_code,
+                        headers,
+                        result.media_type,
+                    )
+                return result
+
+            result = await flight.do(k, run)
+            if isinstance(result, _SharedStreamingResult):
+                return result.response()
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,208 @@
+"""
+Upload ingestion: size caps, one hash, zero-copy views.
+
+Handlers used to ``await file.read()`` the whole upload into a bytes object,
+hash it again for single-flight keys and DICOM audits, and wrap it in
+``BytesIO`` for the decoder, so a large DICOM or WAV was held in memory
+several times over. Here:
+
+- ``UploadLimitMiddleware`` counts request-body bytes as they arrive and
+  answers 413 as soon as an upload endpoint's cap is passed (or straight
+  away when Content-Length already exceeds it), before the multipart parser
+  has buffered the rest
+- multipart file parts spool to disk above UPLOAD_SPOOL_MB (Starlette's
+  SpooledTemporaryFile), so large uploads never sit in memory whole
+- ``ingest_upload`` hashes the spooled content once (SHA-256) and caches
+  the result on the UploadFile, so the single-flight key, the audit log and
+  the handler share one digest
+- ``Upload.open()`` hands decoders (PIL, pydicom, soundfile) a read-only
+  memory map of the spooled file, or the in-memory spool itself for small
+  uploads, instead of a copy. The map lives as long as the UploadFile it
+  was made from (FastAPI releases that when the request ends)
+
+Configuration (env):
+    UPLOAD_MAX_IMAGE_MB   cap for image uploads (default 20)
+    UPLOAD_MAX_AUDIO_MB   cap for audio uploads (default 50)
+    UPLOAD_MAX_DICOM_MB   cap for DICOM uploads (default 200)
+    UPLOAD_SPOOL_MB       multipart file parts larger than this spool to disk (default 1)
+"""
+
+from __future__ import annotations
+import io
+import os
+import mmap
+import asyncio
+import hashlib
+import logging
+import tempfile
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Dict, Optional, Union
+
+from fastapi import HTTPException
+from starlette.formparsers import MultiPartParser
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS_MB = {"image": 20, "audio": 50, "dicom": 200}
+
+# Upload endpoints and the kind of file each accepts (/v1 aliases included)
+UPLOAD_ROUTES: Dict[str, str] = {
+    "/predict/image": "image",
+    "/predict/explain": "image",
+    "/v2/predict/image": "image",
+    "/transcribe/audio": "audio",
+    "/transcribe/audio/stream": "audio",
+    "/v2/voice/wake-word-detect": "audio",
+    "/v2/predict/dicom": "dicom",
+}
+
+
+def upload_limit(kind: str) -> int:
+    """Byte cap for an upload kind."""
+    mb = float(os.getenv(f"UPLOAD_MAX_{kind.upper()}_MB", str(DEFAULT_LIMITS_MB[kind])))
+    return int(mb * 1024 * 1024)
+
+
+def route_kind(path: str) -> Optional[str]:
+    if path.startswith("/v1/"):
+        path = path[3:]
+    return UPLOAD_ROUTES.get(path)
+
+
+def _too_large(kind: str, limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"{kind.capitalize()} upload exceeds {limit // (1024 * 1024)} MB limit.",
+    )
+
+
+class UploadLimitMiddleware:
+    """Reject oversized uploads while the body is still streaming in."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        kind = route_kind(scope.get("path", "")) if scope["type"] == "http" else None
+        if kind is None:
+            return await self.app(scope, receive, send)
+
+        limit = upload_limit(kind)
+        headers = dict(scope.get("headers") or [])
+        try:
+            declared = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            declared = 0
+        if declared > limit:
+            error = _too_large(kind, limit)
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def counting_receive() -> dict:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Re-raised by FastAPI's body parsing; becomes a 413 response
+                    raise _too_large(kind, limit)
+            return message
+
+        return await self.app(scope, counting_receive, send)
+
+
+def install_upload_limits(app: Any) -> None:
+    """Add the size-cap middleware and apply the spool threshold."""
+    MultiPartParser.spool_max_size = int(float(os.getenv("UPLOAD_SPOOL_MB", "1")) * 1024 * 1024)
+    app.add_middleware(UploadLimitMiddleware)
+
+
+# ── Ingestion ────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Upload:
+    """A received upload: its size and digest, and zero-copy access to it."""
+
+    filename: Optional[str]
+    content_type: Optional[str]
+    size: int
+    sha256: str
+    _file: BinaryIO = field(repr=False)
+    _map: Optional[mmap.mmap] = field(default=None, repr=False)
+
+    @property
+    def spooled(self) -> bool:
+        """True when the content lives in a file on disk (memory-mapped)."""
+        return self._map is not None
+
+    @property
+    def data(self) -> Union[bytes, memoryview]:
+        """The content as a bytes-like object, without copying."""
+        if self._map is not None:
+            return memoryview(self._map)
+        memory = _memory_spool(self._file)
+        return memory.getvalue() if memory is not None else b""  # shares BytesIO's buffer
+
+    def open(self) -> BinaryIO:
+        """A file-like object at offset 0 for decoders (PIL, pydicom, soundfile)."""
+        stream = self._map if self._map is not None else self._file
+        stream.seek(0)
+        return stream
+
+
+_ingested: "weakref.WeakKeyDictionary[Any, Upload]" = weakref.WeakKeyDictionary()
+
+
+def _memory_spool(f: BinaryIO) -> Optional[io.BytesIO]:
+    """The BytesIO behind an in-memory SpooledTemporaryFile, if that is what ``f`` is."""
+    if isinstance(f, io.BytesIO):
+        return f
+    if isinstance(f, tempfile.SpooledTemporaryFile) and not f._rolled:
+        return f._file
+    return None
+
+
+def _ingest(f: BinaryIO, filename: Optional[str], content_type: Optional[str]) -> Upload:
+    memory = _memory_spool(f)
+    if memory is not None:
+        with memory.getbuffer() as view:
+            return Upload(filename, content_type, len(view), hashlib.sha256(view).hexdigest(), f)
+
+    raw = f._file if isinstance(f, tempfile.SpooledTemporaryFile) else f
+    try:
+        fd = raw.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        # Neither an in-memory spool nor a real file: read it (one copy)
+        f.seek(0)
+        content = f.read()
+        return Upload(
+            filename, content_type, len(content), hashlib.sha256(content).hexdigest(), io.BytesIO(content)
+        )
+    f.flush()
+    size = os.fstat(fd).st_size
+    if size == 0:
+        return Upload(filename, content_type, 0, hashlib.sha256().hexdigest(), f)
+    mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    digest = hashlib.sha256(mapped).hexdigest()  # releases the GIL while it pages through
+    return Upload(filename, content_type, size, digest, f, mapped)
+
+
+async def ingest_upload(upload: Any, kind: Optional[str] = None) -> Upload:
+    """
+    Size and hash an UploadFile once per request. With ``kind``, uploads over
+    that kind's cap raise 413 (the middleware normally stops them earlier).
+    """
+    ingested = _ingested.get(upload)
+    if ingested is None:
+        ingested = await asyncio.to_thread(
+            _ingest, upload.file, upload.filename, getattr(upload, "content_type", None)
+        )
+        _ingested[upload] = ingested
+    if kind is not None and ingested.size > upload_limit(kind):
+        raise _too_large(kind, upload_limit(kind))
+    return ingested
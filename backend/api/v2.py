@@ -45,3 +45,7 @@ router.include_router(v2_voice.router)
 # 4. Chat (Multilingual) - lightweight, no TensorFlow dependency
 from backend.api.routes import v2_chat
 router.include_router(v2_chat.router, tags=["chat-v2"])
+
+# 5. Admin (audit queries) - lightweight, no TensorFlow dependency
+from backend.api.routes import v2_admin
+router.include_router(v2_admin.router, tags=["admin"])
@@ -0,0 +1,539 @@
+"""
+Sealed (compressed, seekable, tamper-evident) audit segments.
+
+When the writer rotates a segment out, it is sealed into two files:
+
+    audit-YYYY-MM-DD.jsonl.z              concatenated zlib blocks
+    audit-YYYY-MM-DD.jsonl.manifest.json  block index + integrity data
+
+Blocks hold whole lines (~64 KiB uncompressed) and are compressed
+independently, so any byte range of the original JSONL — the offsets the
+AuditIndex stores — is served by decompressing only the covering blocks.
+
+Integrity:
+  - leaf_i   = sha256(0x00 || line_i)
+  - chain_i  = sha256(chain_{i-1} || leaf_i), continuing across segments
+  - each block records chain_in/chain_out (a checkpoint) and a Merkle root
+    over its leaves; the segment Merkle root covers the block roots.
+
+Because every block carries its own checkpoint, blocks and segments verify
+independently (and in parallel); cross-segment continuity is then an
+O(#segments) comparison of manifest heads. The chain runs in sealing order
+(each manifest's ``sequence``), not name order: a late event for an already
+sealed date lands in a new segment that is sealed after later dates. The
+tail of the chain is kept in ``chain_head.json`` so sealing does not read
+every manifest. A sealed segment is immutable; sealing refuses to overwrite
+one.
+
+CLI:
+    python -m backend.audit.audit_archive seal [--log-dir logs/audit]
+    python -m backend.audit.audit_archive verify [--full] [--workers 4]
+"""
+
+from __future__ import annotations
+import os
+import json
+import zlib
+import bisect
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.audit.audit_writer import (
+    DATA_SUFFIX,
+    MANIFEST_SUFFIX,
+    AuditWriter,
+    parse_segment_name,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+GENESIS = "0" * 64
+DEFAULT_BLOCK_SIZE = 64 * 1024
+VERIFY_STATE_FILENAME = "verify_state.json"
+CHAIN_HEAD_FILENAME = "chain_head.json"
+
+
+# ── Hashing primitives ────────────────────────────────────────────────────
+
+
+def leaf_hash(line: bytes) -> bytes:
+    """Leaf digest of one JSONL line (without its trailing newline)."""
+    return hashlib.sha256(b"\x00" + line).digest()
+
+
+def chain_step(chain: bytes, leaf: bytes) -> bytes:
+    return hashlib.sha256(chain + leaf).digest()
+
+
+def merkle_root(leaves: List[bytes]) -> bytes:
+    """Binary Merkle root; an odd node is promoted unchanged to the next level."""
+    if not leaves:
+        return hashlib.sha256(b"").digest()
+    level = leaves
+    while len(level) > 1:
+        nxt = [
+            hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+    return level[0]
+
+
+# ── Sealing ───────────────────────────────────────────────────────────────
+
+
+def sealed_paths(log_dir: Path, segment: str) -> Tuple[Path, Path]:
+    return log_dir / f"{segment}{DATA_SUFFIX}", log_dir / f"{segment}{MANIFEST_SUFFIX}"
+
+
+def is_sealed(log_dir: Path, segment: str) -> bool:
+    return sealed_paths(Path(log_dir), segment)[1].exists()
+
+
+def _segment_sort_key(name: str) -> Tuple[str, int]:
+    parsed = parse_segment_name(name)
+    return parsed if parsed else ("", 0)
+
+
+def list_sealed_segments(log_dir: Path) -> List[str]:
+    """Sealed segment names in name order (see ``chain_order`` for chain order)."""
+    names = [
+        p.name[: -len(MANIFEST_SUFFIX)]
+        for p in Path(log_dir).glob(f"audit-*{MANIFEST_SUFFIX}")
+    ]
+    return sorted(names, key=_segment_sort_key)
+
+
+def load_manifest(log_dir: Path, segment: str) -> Dict[str, Any]:
+    _, manifest_path = sealed_paths(Path(log_dir), segment)
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
+
+
+def chain_order(manifests: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Segment names in the order they were sealed (name order for unsequenced manifests)."""
+    return sorted(
+        manifests, key=lambda s: (manifests[s].get("sequence", 0), _segment_sort_key(s))
+    )
+
+
+def _chain_tail(log_dir: Path) -> Tuple[str, int]:
+    """(head, sequence) of the most recently sealed segment."""
+    head_file = Path(log_dir) / CHAIN_HEAD_FILENAME
+    if head_file.exists():
+        tail = json.loads(head_file.read_text(encoding="utf-8"))
+        return tail["head"], tail["sequence"]
+    # Directory sealed before chain_head.json existed
+    segments = list_sealed_segments(log_dir)
+    if not segments:
+        return GENESIS, 0
+    manifests = {s: load_manifest(log_dir, s) for s in segments}
+    last = manifests[chain_order(manifests)[-1]]
+    return last["head"], last.get("sequence", 0)
+
+
+def seal_segment(
+    path: Path,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    level: int = 6,
+    keep_source: bool = False,
+) -> Dict[str, Any]:
+    """
+    Compress a closed JSONL segment into independently decompressible blocks
+    and write its manifest. Returns the manifest. Raises FileExistsError if
+    the segment is already sealed.
+    """
+    path = Path(path)
+    log_dir = path.parent
+    segment = path.name
+    data_path, manifest_path = sealed_paths(log_dir, segment)
+    if data_path.exists() or manifest_path.exists():
+        raise FileExistsError(f"{segment} is already sealed")
+
+    prev_head, sequence = _chain_tail(log_dir)
+    chain = bytes.fromhex(prev_head)
+
+    blocks: List[Dict[str, Any]] = []
+    block_roots: List[bytes] = []
+    raw_offset = 0
+    comp_offset = 0
+    events = 0
+
+    tmp_data = data_path.with_suffix(data_path.suffix + ".tmp")
+    with path.open("rb") as src, tmp_data.open("wb") as dst:
+        pending: List[bytes] = []
+        pending_size = 0
+
+        def emit() -> None:
+            nonlocal chain, raw_offset, comp_offset, events, pending, pending_size
+            leaves = [leaf_hash(line.rstrip(b"\n")) for line in pending]
+            chain_in = chain
+            for leaf in leaves:
+                chain = chain_step(chain, leaf)
+            root = merkle_root(leaves)
+            compressed = zlib.compress(b"".join(pending), level)
+            dst.write(compressed)
+            blocks.append(
+                {
+                    "raw_offset": raw_offset,
+                    "raw_length": pending_size,
+                    "offset": comp_offset,
+                    "length": len(compressed),
+                    "events": len(pending),
+                    "chain_in": chain_in.hex(),
+                    "chain_out": chain.hex(),
+                    "merkle_root": root.hex(),
+                }
+            )
+            block_roots.append(root)
+            raw_offset += pending_size
+            comp_offset += len(compressed)
+            events += len(pending)
+            pending, pending_size = [], 0
+
+        for line in src:
+            if not line.endswith(b"\n"):
+                line += b"\n"  # Torn final write; seal what was persisted
+            pending.append(line)
+            pending_size += len(line)
+            if pending_size >= block_size:
+                emit()
+        if pending:
+            emit()
+
+        dst.flush()
+        os.fsync(dst.fileno())
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "segment": segment,
+        "codec": "zlib",
+        "block_size": block_size,
+        "raw_size": raw_offset,
+        "compressed_size": comp_offset,
+        "event_count": events,
+        "sequence": sequence + 1,
+        "prev_head": prev_head,
+        "head": chain.hex(),
+        "merkle_root": merkle_root(block_roots).hex(),
+        "blocks": blocks,
+    }
+
+    os.replace(tmp_data, data_path)
+    tmp_manifest = manifest_path.with_suffix(".tmp")
+    tmp_manifest.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp_manifest, manifest_path)
+    tmp_head = log_dir / f"{CHAIN_HEAD_FILENAME}.tmp"
+    tmp_head.write_text(
+        json.dumps({"segment": segment, "head": manifest["head"], "sequence": sequence + 1}),
+        encoding="utf-8",
+    )
+    os.replace(tmp_head, log_dir / CHAIN_HEAD_FILENAME)
+
+    if not keep_source:
+        path.unlink()
+    return manifest
+
+
+def seal_closed_segments(
+    log_dir: str, active: Optional[str] = None, **kwargs: Any
+) -> List[str]:
+    """Seal every unsealed JSONL segment except ``active``, oldest first."""
+    log_dir_path = Path(log_dir)
+    names = sorted(
+        (
+            p.name
+            for p in log_dir_path.glob("audit-*.jsonl")
+            if parse_segment_name(p.name) and p.name != active
+        ),
+        key=_segment_sort_key,
+    )
+    sealed = []
+    for name in names:
+        if not is_sealed(log_dir_path, name):
+            try:
+                seal_segment(log_dir_path / name, **kwargs)
+            except FileExistsError as e:
+                # A blob without a manifest: an interrupted seal; leave it for inspection
+                logger.error(f"[AuditArchiver] Not sealing {name}: {e}")
+                continue
+            sealed.append(name)
+    return sealed
+
+
+class AuditArchiver:
+    """
+    Seals segments as the AuditWriter rotates them out. Sealing runs on the
+    archiver's own thread, one segment at a time, so compressing a large
+    segment never stalls the writer (and fills its queue).
+    """
+
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE, keep_source: bool = False):
+        self.block_size = block_size
+        self.keep_source = keep_source
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def attach(self, writer: AuditWriter) -> None:
+        # Register after AuditIndex.attach() so the index reads the plain JSONL
+        writer.add_segment_close_hook(self.submit)
+
+    def submit(self, path: Path) -> None:
+        """Queue ``path`` for sealing (writer-thread hook)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="audit-archiver"
+                )
+            self._executor.submit(self._seal_logged, path)
+
+    def flush(self) -> None:
+        """Wait for every queued segment to be sealed."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _seal_logged(self, path: Path) -> None:
+        try:
+            self.seal(path)
+        except Exception as e:
+            logger.error(f"[AuditArchiver] Sealing {Path(path).name} failed: {e}", exc_info=True)
+
+    def seal(self, path: Path) -> None:
+        manifest = seal_segment(
+            path, block_size=self.block_size, keep_source=self.keep_source
+        )
+        logger.info(
+            f"[AuditArchiver] Sealed {manifest['segment']}: {manifest['event_count']} events, "
+            f"{manifest['raw_size']} -> {manifest['compressed_size']} bytes"
+        )
+
+
+# ── Random access ─────────────────────────────────────────────────────────
+
+
+class SealedSegment:
+    """Random-access reader over a sealed segment, addressed by raw JSONL offsets."""
+
+    def __init__(self, log_dir: str, segment: str):
+        self.log_dir = Path(log_dir)
+        self.segment = segment
+        self.manifest = load_manifest(self.log_dir, segment)
+        self.data_path = sealed_paths(self.log_dir, segment)[0]
+        self._starts = [b["raw_offset"] for b in self.manifest["blocks"]]
+
+    @property
+    def raw_size(self) -> int:
+        return self.manifest["raw_size"]
+
+    def read_block(self, block_idx: int) -> bytes:
+        block = self.manifest["blocks"][block_idx]
+        with self.data_path.open("rb") as f:
+            f.seek(block["offset"])
+            return zlib.decompress(f.read(block["length"]))
+
+    def read(self, raw_offset: int, length: int) -> bytes:
+        """Bytes [raw_offset, raw_offset + length) of the original JSONL."""
+        first = bisect.bisect_right(self._starts, raw_offset) - 1
+        out = bytearray()
+        idx = max(first, 0)
+        end = raw_offset + length
+        while idx < len(self._starts) and self._starts[idx] < end:
+            block = self.manifest["blocks"][idx]
+            raw = self.read_block(idx)
+            lo = max(raw_offset - block["raw_offset"], 0)
+            hi = min(end - block["raw_offset"], block["raw_length"])
+            out += raw[lo:hi]
+            idx += 1
+        return bytes(out)
+
+    def iter_lines(self, start: int = 0) -> Iterator[Tuple[int, bytes]]:
+        """Yield (raw_offset, line) for every line at or after ``start``."""
+        first = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        for idx in range(first, len(self._starts)):
+            offset = self._starts[idx]
+            for line in self.read_block(idx).splitlines(keepends=True):
+                if offset >= start:
+                    yield offset, line
+                offset += len(line)
+
+
+# ── Verification ──────────────────────────────────────────────────────────
+
+
+@dataclass
+class VerifyResult:
+    ok: bool
+    segment: str
+    events: int = 0
+    message: str = "OK"
+    head: Optional[str] = None
+    prev_head: Optional[str] = None
+    failed_blocks: List[int] = field(default_factory=list)
+
+
+def verify_block(log_dir: str, segment: str, block_idx: int) -> bool:
+    """Spot-check one block against its checkpoint and Merkle root."""
+    reader = SealedSegment(log_dir, segment)
+    return _verify_block_bytes(reader.manifest["blocks"][block_idx], reader.read_block(block_idx))
+
+
+def _verify_block_bytes(block: Dict[str, Any], raw: bytes) -> bool:
+    if len(raw) != block["raw_length"]:
+        return False
+    leaves = [leaf_hash(line) for line in raw.split(b"\n")[:-1]]
+    if len(leaves) != block["events"]:
+        return False
+    chain = bytes.fromhex(block["chain_in"])
+    for leaf in leaves:
+        chain = chain_step(chain, leaf)
+    return chain.hex() == block["chain_out"] and merkle_root(leaves).hex() == block["merkle_root"]
+
+
+def verify_segment(log_dir: str, segment: str) -> VerifyResult:
+    """Verify every block of a sealed segment plus its internal checkpoint links."""
+    try:
+        reader = SealedSegment(log_dir, segment)
+    except (OSError, ValueError) as e:
+        return VerifyResult(False, segment, message=f"Unreadable manifest: {e}")
+
+    manifest = reader.manifest
+    blocks = manifest["blocks"]
+    failed: List[int] = []
+    expected_in = manifest["prev_head"]
+    roots: List[bytes] = []
+
+    with reader.data_path.open("rb") as f:
+        for idx, block in enumerate(blocks):
+            ok = block["chain_in"] == expected_in
+            if ok:
+                f.seek(block["offset"])
+                try:
+                    raw = zlib.decompress(f.read(block["length"]))
+                    ok = _verify_block_bytes(block, raw)
+                except zlib.error:
+                    ok = False
+            if not ok:
+                failed.append(idx)
+            expected_in = block["chain_out"]
+            roots.append(bytes.fromhex(block["merkle_root"]))
+
+    if not failed and expected_in != manifest["head"]:
+        return VerifyResult(False, segment, message="Head does not match last block checkpoint")
+    if not failed and merkle_root(roots).hex() != manifest["merkle_root"]:
+        return VerifyResult(False, segment, message="Segment Merkle root mismatch")
+
+    return VerifyResult(
+        ok=not failed,
+        segment=segment,
+        events=manifest["event_count"],
+        message="OK" if not failed else f"{len(failed)} block(s) failed verification",
+        head=manifest["head"],
+        prev_head=manifest["prev_head"],
+        failed_blocks=failed,
+    )
+
+
+def _verify_segment_args(args: Tuple[str, str]) -> VerifyResult:
+    return verify_segment(*args)
+
+
+def verify_log(
+    log_dir: str,
+    workers: Optional[int] = None,
+    full: bool = False,
+    state_path: Optional[str] = None,
+) -> List[VerifyResult]:
+    """
+    Verify sealed segments in parallel and check the chain links between them.
+
+    Unless ``full`` is set, segments recorded as verified in the state file
+    (with an unchanged head) are skipped, so routine runs only touch segments
+    sealed since the previous run.
+    """
+    log_dir_path = Path(log_dir)
+    state_file = Path(state_path) if state_path else log_dir_path / VERIFY_STATE_FILENAME
+    state: Dict[str, str] = {}
+    if not full and state_file.exists():
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+
+    manifests = {s: load_manifest(log_dir_path, s) for s in list_sealed_segments(log_dir_path)}
+    segments = chain_order(manifests)
+    todo = [s for s in segments if state.get(s) != manifests[s]["head"]]
+
+    if workers == 1 or len(todo) <= 1:
+        results = [verify_segment(str(log_dir_path), s) for s in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(
+                pool.map(_verify_segment_args, [(str(log_dir_path), s) for s in todo])
+            )
+
+    by_name = {r.segment: r for r in results}
+    expected_prev = GENESIS
+    for name in segments:
+        manifest = manifests[name]
+        if manifest["prev_head"] != expected_prev:
+            result = by_name.get(name) or VerifyResult(
+                True, name, manifest["event_count"], head=manifest["head"]
+            )
+            result.ok = False
+            result.message = "Chain link broken: prev_head does not match preceding segment"
+            by_name[name] = result
+        expected_prev = manifest["head"]
+
+    for name, result in by_name.items():
+        if result.ok:
+            state[name] = manifests[name]["head"]
+        else:
+            state.pop(name, None)
+    state_file.write_text(json.dumps(state), encoding="utf-8")
+
+    return [by_name[s] for s in segments if s in by_name]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seal and verify VoxRay audit segments.")
+    parser.add_argument("--log-dir", default="logs/audit")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seal = sub.add_parser("seal", help="Seal closed JSONL segments")
+    seal.add_argument("--active", help="Segment still being written (skipped)")
+    seal.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+
+    verify = sub.add_parser("verify", help="Verify sealed segments")
+    verify.add_argument("--full", action="store_true", help="Re-verify every segment")
+    verify.add_argument("--workers", type=int, default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "seal":
+        sealed = seal_closed_segments(
+            args.log_dir, active=args.active, block_size=args.block_size
+        )
+        print(f"✅ Sealed {len(sealed)} segment(s)")
+        return 0
+
+    results = verify_log(args.log_dir, workers=args.workers, full=args.full)
+    failures = [r for r in results if not r.ok]
+    for r in failures:
+        print(f"❌ {r.segment}: {r.message} (blocks {r.failed_blocks})")
+    print(
+        f"{'✅' if not failures else '❌'} Verified {len(results)} segment(s), "
+        f"{sum(r.events for r in results)} events, {len(failures)} failure(s)"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
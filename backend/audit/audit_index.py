@@ -0,0 +1,322 @@
+"""
+SQLite sidecar index over the audit JSONL segments.
+
+Each indexed event stores its lookup keys plus the (segment, offset, length)
+of its line, so queries by request_id, user_id_hash, input_hash, event_type or
+time range are index seeks followed by one positioned read per hit — no
+segment is ever scanned at query time.
+
+Indexing is incremental: every segment remembers how many bytes have been
+indexed, so closed segments are indexed once (via the writer's segment-close
+hook) and the active segment only has its new tail read on refresh().
+Sealed segments (see audit_archive) are read through their block index.
+
+CLI:
+    python -m backend.audit.audit_index query --user-id-hash 3f2a... --since 2026-07-01
+    python -m backend.audit.audit_index query --request-id 6b1e...
+    python -m backend.audit.audit_index reindex
+"""
+
+from __future__ import annotations
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.audit.audit_writer import AuditWriter, parse_segment_name
+from backend.audit.audit_archive import SealedSegment, is_sealed, list_sealed_segments
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "audit_index.sqlite3"
+# Parsed manifests kept for point reads; sealed segments never change
+SEALED_READER_CACHE_SIZE = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    timestamp TEXT,
+    event_type TEXT,
+    request_id TEXT,
+    user_id_hash TEXT,
+    input_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_request ON events(request_id);
+CREATE INDEX IF NOT EXISTS idx_events_user_ts ON events(user_id_hash, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_input ON events(input_hash);
+CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events(event_type, timestamp);
+"""
+
+
+class AuditIndex:
+    """
+    Incrementally maintained lookup index for one audit log directory.
+
+    Args:
+        log_dir: Directory holding ``audit-*.jsonl`` segments.
+        db_path: SQLite file; defaults to ``<log_dir>/audit_index.sqlite3``.
+    """
+
+    def __init__(self, log_dir: str = "logs/audit", db_path: Optional[str] = None):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(db_path) if db_path else self.log_dir / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._readers: "OrderedDict[str, SealedSegment]" = OrderedDict()
+        self._readers_lock = threading.Lock()
+
+    def attach(self, writer: AuditWriter) -> None:
+        """Index each segment as soon as the writer rotates it out."""
+        writer.add_segment_close_hook(self.index_segment)
+
+    # ── Indexing ─────────────────────────────────────────────────────────
+
+    def index_segment(self, path: Path) -> int:
+        """Index any complete lines past the segment's indexed watermark. Returns events added."""
+        path = Path(path)
+        name = path.name
+        if parse_segment_name(name) is None:
+            return 0
+
+        sealed = not path.exists()
+        if sealed and not is_sealed(self.log_dir, name):
+            return 0
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT indexed_bytes FROM segments WHERE name = ?", (name,)
+            ).fetchone()
+            start = row[0] if row else 0
+
+            if sealed:
+                reader = SealedSegment(str(self.log_dir), name)
+                if reader.raw_size <= start:
+                    return 0
+                lines = reader.iter_lines(start)
+            else:
+                if path.stat().st_size <= start:
+                    return 0
+                lines = self._iter_file_lines(path, start)
+
+            rows = []
+            offset = start
+            for line_offset, raw in lines:
+                if not raw.endswith(b"\n"):
+                    break  # Partial tail still being written
+                rows.append(self._row_for(name, line_offset, raw))
+                offset = line_offset + len(raw)
+
+            self._conn.executemany(
+                "INSERT INTO events (segment, offset, length, timestamp, event_type, "
+                "request_id, user_id_hash, input_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [r for r in rows if r is not None],
+            )
+            self._conn.execute(
+                "INSERT INTO segments (name, indexed_bytes) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET indexed_bytes = excluded.indexed_bytes",
+                (name, offset),
+            )
+            self._conn.commit()
+            return sum(1 for r in rows if r is not None)
+
+    @staticmethod
+    def _iter_file_lines(path: Path, start: int):
+        with path.open("rb") as f:
+            f.seek(start)
+            offset = start
+            for raw in f:
+                yield offset, raw
+                offset += len(raw)
+
+    def refresh(self) -> int:
+        """Pick up new segments (plain or sealed) and the unindexed tail of the active one."""
+        names = {p.name for p in self.log_dir.glob("audit-*.jsonl")}
+        names.update(list_sealed_segments(self.log_dir))
+        added = 0
+        for name in sorted(names):
+            added += self.index_segment(self.log_dir / name)
+        return added
+
+    def reindex(self) -> int:
+        """Drop the index and rebuild it from every segment on disk."""
+        with self._lock:
+            self._conn.execute("DELETE FROM events")
+            self._conn.execute("DELETE FROM segments")
+            self._conn.commit()
+        return self.refresh()
+
+    @staticmethod
+    def _row_for(segment: str, offset: int, raw: bytes):
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            logger.warning(f"[AuditIndex] Skipping malformed line in {segment}@{offset}")
+            return None
+        return (
+            segment,
+            offset,
+            len(raw),
+            event.get("timestamp"),
+            event.get("event_type"),
+            event.get("request_id"),
+            event.get("user_id_hash"),
+            event.get("input_hash"),
+        )
+
+    # ── Queries ──────────────────────────────────────────────────────────
+
+    def query(
+        self,
+        request_id: Optional[str] = None,
+        user_id_hash: Optional[str] = None,
+        input_hash: Optional[str] = None,
+        event_type: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return matching events in timestamp order.
+
+        ``since``/``until`` are ISO-8601 prefixes compared lexicographically
+        (e.g. "2026-07-01" or "2026-07-01T12:00:00"); ``until`` is exclusive.
+        """
+        clauses = []
+        params: List[Any] = []
+        for column, value in (
+            ("request_id", request_id),
+            ("user_id_hash", user_id_hash),
+            ("input_hash", input_hash),
+            ("event_type", event_type),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+
+        sql = "SELECT segment, offset, length FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp, id LIMIT ?"
+        params.append(int(limit))
+
+        with self._lock:
+            locations = self._conn.execute(sql, params).fetchall()
+        return [self._read_event(*loc) for loc in locations]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            events = self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+            segments = self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {"events": events, "segments": segments}
+
+    def _read_event(self, segment: str, offset: int, length: int) -> Dict[str, Any]:
+        path = self.log_dir / segment
+        if not path.exists():
+            # Sealed: decompress only the block(s) covering this line
+            return json.loads(self._sealed_reader(segment).read(offset, length))
+        with path.open("rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def _sealed_reader(self, segment: str) -> SealedSegment:
+        with self._readers_lock:
+            reader = self._readers.get(segment)
+            if reader is not None:
+                self._readers.move_to_end(segment)
+                return reader
+        reader = SealedSegment(str(self.log_dir), segment)
+        with self._readers_lock:
+            self._readers[segment] = reader
+            while len(self._readers) > SEALED_READER_CACHE_SIZE:
+                self._readers.popitem(last=False)
+        return reader
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_index_instances: Dict[str, AuditIndex] = {}
+_index_lock = threading.Lock()
+
+
+def get_audit_index(log_dir: str = "logs/audit") -> AuditIndex:
+    """Shared AuditIndex per log directory (one SQLite connection per process)."""
+    key = str(Path(log_dir).resolve())
+    with _index_lock:
+        if key not in _index_instances:
+            _index_instances[key] = AuditIndex(log_dir)
+        return _index_instances[key]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from backend.audit.audit_logger import hash_identifier
+
+    parser = argparse.ArgumentParser(description="Query the VoxRay audit log index.")
+    parser.add_argument("--log-dir", default="logs/audit")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    q = sub.add_parser("query", help="Look up audit events")
+    q.add_argument("--request-id")
+    q.add_argument("--user-id-hash")
+    q.add_argument("--user-id", help="Raw user id; hashed with AUDIT_SALT")
+    q.add_argument("--input-hash")
+    q.add_argument("--event-type")
+    q.add_argument("--since", help="ISO date/time, inclusive")
+    q.add_argument("--until", help="ISO date/time, exclusive")
+    q.add_argument("--limit", type=int, default=100)
+
+    sub.add_parser("reindex", help="Rebuild the index from all segments")
+    sub.add_parser("stats", help="Show index size")
+
+    args = parser.parse_args(argv)
+    index = AuditIndex(args.log_dir)
+
+    if args.command == "reindex":
+        print(f"✅ Indexed {index.reindex()} events")
+    elif args.command == "stats":
+        index.refresh()
+        print(json.dumps(index.stats()))
+    else:
+        user_hash = args.user_id_hash
+        if args.user_id:
+            user_hash = hash_identifier(args.user_id)
+        index.refresh()
+        for event in index.query(
+            request_id=args.request_id,
+            user_id_hash=user_hash,
+            input_hash=args.input_hash,
+            event_type=args.event_type,
+            since=args.since,
+            until=args.until,
+            limit=args.limit,
+        ):
+            print(json.dumps(event))
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
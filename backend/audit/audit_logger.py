@@ -4,22 +4,36 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+from backend.audit.audit_writer import AuditWriter
+
+
+def hash_identifier(value: str, salt: Optional[str] = None) -> str:
+    """Salted, truncated SHA-256 used for user ids in audit events."""
+    salt = salt if salt is not None else os.getenv("AUDIT_SALT", "voxray_audit_salt")
+    return hashlib.sha256(f"{salt}{value}".encode()).hexdigest()[:16]
+
 
 class AuditLogger:
-    def __init__(self, log_dir: str = "logs/audit"):
+    def __init__(self, log_dir: str = "logs/audit", writer: Optional[AuditWriter] = None):
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(parents=True, exist_ok=True)
         self.salt = os.getenv("AUDIT_SALT", "voxray_audit_salt")
+        # Events are queued and written in batches off the request path
+        self.writer = writer or AuditWriter(log_dir=str(self.log_dir))
 
     def _hash(self, value: str) -> str:
-        return hashlib.sha256(f"{self.salt}{value}".encode()).hexdigest()[:16]
-
-    def log_event(self, event: Dict[str, Any]) -> None:
-        ts = datetime.utcnow().isoformat() + "Z"
-        event["timestamp"] = ts
-        filename = self.log_dir / f"audit-{datetime.utcnow().date().isoformat()}.jsonl"
-        with filename.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(event) + "\n")
+        return hash_identifier(value, self.salt)
+
+    def log_event(self, event: Dict[str, Any]) -> bool:
+        now = datetime.utcnow()
+        event["timestamp"] = now.isoformat() + "Z"
+        return self.writer.submit(now.date().isoformat(), json.dumps(event))
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        return self.writer.flush(timeout)
+
+    def close(self) -> None:
+        self.writer.close()
 
     def log_prediction(
         self,
@@ -0,0 +1,435 @@
+"""
+Buffered audit log writer.
+
+Audit events are serialized on the caller's thread, pushed onto a bounded
+in-memory queue and written by a single background thread in batches
+(group commit). The active segment file stays open between batches, so the
+request path never touches the disk.
+
+Segments are named ``audit-YYYY-MM-DD.jsonl`` and roll over when the UTC date
+changes or the segment grows past ``max_bytes`` (``audit-YYYY-MM-DD-1.jsonl``,
+``audit-YYYY-MM-DD-2.jsonl``, ...). A segment that has been rotated out or
+sealed is never written again: a late event for its date opens the next
+index instead.
+"""
+
+from __future__ import annotations
+import os
+import re
+import time
+import queue
+import atexit
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+FSYNC_NONE = "none"
+FSYNC_INTERVAL = "interval"
+FSYNC_EVERY_BATCH = "every-batch"
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_INTERVAL, FSYNC_EVERY_BATCH)
+
+SEGMENT_RE = re.compile(r"^audit-(\d{4}-\d{2}-\d{2})(?:-(\d+))?\.jsonl$")
+
+# Files a sealed segment leaves behind (see audit_archive)
+DATA_SUFFIX = ".z"
+MANIFEST_SUFFIX = ".manifest.json"
+
+_STOP = object()
+
+# Every live writer, so shutdown and /metrics can reach them without
+# threading references through the routers that own the loggers.
+_writers: "List[AuditWriter]" = []
+_writers_lock = threading.Lock()
+
+
+def segment_name(date_str: str, index: int = 0) -> str:
+    """File name of the ``index``-th segment for a UTC date."""
+    if index == 0:
+        return f"audit-{date_str}.jsonl"
+    return f"audit-{date_str}-{index}.jsonl"
+
+
+def parse_segment_name(name: str) -> Optional[Tuple[str, int]]:
+    """Inverse of segment_name(). Returns (date_str, index) or None."""
+    match = SEGMENT_RE.match(name)
+    if not match:
+        return None
+    return match.group(1), int(match.group(2) or 0)
+
+
+class AuditWriter:
+    """
+    Background, batching JSONL writer for audit events.
+
+    Args:
+        log_dir: Directory that holds the audit segments.
+        flush_interval: Max seconds a batch is held open for more events.
+        fsync: One of "none", "interval" or "every-batch".
+        fsync_interval: Under the "interval" policy, min seconds between fsyncs
+            and max seconds written events stay unsynced.
+        max_bytes: Segment size that triggers rotation (0 disables).
+        max_queue: Queue capacity; events beyond it are dropped and counted.
+        max_batch: Max events written per batch.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = "logs/audit",
+        flush_interval: Optional[float] = None,
+        fsync: Optional[str] = None,
+        fsync_interval: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_batch: int = 512,
+    ):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.2"))
+        )
+        self.fsync = (fsync or os.getenv("AUDIT_FSYNC", FSYNC_INTERVAL)).lower()
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(
+                f"Unknown audit fsync policy '{self.fsync}'. Expected one of {FSYNC_POLICIES}"
+            )
+        self.fsync_interval = (
+            fsync_interval
+            if fsync_interval is not None
+            else float(os.getenv("AUDIT_FSYNC_INTERVAL", "1.0"))
+        )
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else int(os.getenv("AUDIT_MAX_BYTES", str(64 * 1024 * 1024)))
+        )
+        max_queue = (
+            max_queue
+            if max_queue is not None
+            else int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+        )
+        self.max_batch = max_batch
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Active segment state — only touched by the writer thread
+        self._fh = None
+        self._segment_path: Optional[Path] = None
+        self._segment_date: Optional[str] = None
+        self._segment_index = 0
+        self._segment_size = 0
+        self._last_fsync = 0.0
+        self._dirty = False  # written since the last fsync
+
+        self._segment_close_hooks: List[Callable[[Path], None]] = []
+        # Segments rotated out by this writer; they may still be awaiting their seal
+        self._retired: Set[str] = set()
+
+        self.events_written = 0
+        self.events_dropped = 0
+        self.batches_written = 0
+        self.rotations = 0
+
+        with _writers_lock:
+            _writers.append(self)
+
+    # ── Public API ───────────────────────────────────────────────────────
+
+    def submit(self, date_str: str, line: str) -> bool:
+        """
+        Enqueue one serialized event (without trailing newline) for ``date_str``.
+        Never blocks. Returns False when the event was dropped.
+        """
+        if self._closed:
+            with self._lock:
+                self.events_dropped += 1
+            return False
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((date_str, line))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.events_dropped += 1
+            return False
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Block until every event enqueued before this call is on disk."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Drain the queue, fsync and close the active segment. Idempotent."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        with _writers_lock:
+            if self in _writers:
+                _writers.remove(self)
+
+    def add_segment_close_hook(self, hook: Callable[[Path], None]) -> None:
+        """Register a callback invoked (on the writer thread) with each rotated-out segment."""
+        self._segment_close_hooks.append(hook)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def active_segment(self) -> Optional[Path]:
+        return self._segment_path
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "events_written": self.events_written,
+                "events_dropped": self.events_dropped,
+                "batches_written": self.batches_written,
+                "rotations": self.rotations,
+            }
+
+    # ── Writer thread ────────────────────────────────────────────────────
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self._fsync_due_in())
+            except queue.Empty:
+                # Traffic stopped with the last batch unsynced
+                try:
+                    self._sync(force=True)
+                except OSError as e:
+                    logger.error(f"[AuditWriter] fsync failed: {e}")
+                continue
+            batch: List[Tuple[str, str]] = []
+            barriers: List[threading.Event] = []
+
+            if item is _STOP:
+                stopping = True
+            elif isinstance(item, threading.Event):
+                barriers.append(item)
+            else:
+                batch.append(item)
+                # Group commit: hold the batch open briefly to absorb a burst
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = (
+                            self._queue.get(timeout=remaining)
+                            if remaining > 0
+                            else self._queue.get_nowait()
+                        )
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    if isinstance(item, threading.Event):
+                        barriers.append(item)
+                        break
+                    batch.append(item)
+
+            if stopping:
+                batch.extend(self._drain_nowait(barriers))
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+                if barriers and self._fh is not None:
+                    self._fh.flush()
+            except Exception as e:
+                logger.error(f"[AuditWriter] Batch write failed: {e}", exc_info=True)
+
+            for barrier in barriers:
+                barrier.set()
+
+        self._close_segment(notify=False)
+
+    def _fsync_due_in(self) -> Optional[float]:
+        """Seconds until unsynced data must be fsynced; None when nothing is pending."""
+        if self.fsync != FSYNC_INTERVAL or not self._dirty or self._fh is None:
+            return None
+        return max(self._last_fsync + self.fsync_interval - time.monotonic(), 0.0)
+
+    def _drain_nowait(self, barriers: List[threading.Event]) -> List[Tuple[str, str]]:
+        drained: List[Tuple[str, str]] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return drained
+            if isinstance(item, threading.Event):
+                barriers.append(item)
+            elif item is not _STOP:
+                drained.append(item)
+
+    def _write_batch(self, batch: List[Tuple[str, str]]) -> None:
+        # Consecutive events for the same date go out in a single write() call
+        chunk: List[str] = []
+        chunk_date: Optional[str] = None
+        for date_str, line in batch:
+            if chunk and date_str != chunk_date:
+                self._write_chunk(chunk_date, chunk)
+                chunk = []
+            chunk_date = date_str
+            chunk.append(line)
+        if chunk:
+            self._write_chunk(chunk_date, chunk)
+
+        with self._lock:
+            self.events_written += len(batch)
+            self.batches_written += 1
+
+        if self.fsync == FSYNC_EVERY_BATCH:
+            self._sync(force=True)
+        elif self.fsync == FSYNC_INTERVAL:
+            self._sync(force=False)
+        elif self._fh is not None:
+            self._fh.flush()
+
+    def _write_chunk(self, date_str: str, lines: List[str]) -> None:
+        if self._segment_date != date_str:
+            self._open_segment(date_str)
+
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        if (
+            self.max_bytes
+            and self._segment_size > 0
+            and self._segment_size + len(data) > self.max_bytes
+        ):
+            self._open_segment(date_str, index=self._segment_index + 1)
+
+        self._fh.write(data)
+        self._segment_size += len(data)
+        self._dirty = True
+
+    def _open_segment(self, date_str: str, index: Optional[int] = None) -> None:
+        had_segment = self._fh is not None
+        self._close_segment(notify=True)
+        if had_segment:
+            with self._lock:
+                self.rotations += 1
+
+        if index is None:
+            # Resume the newest existing segment for this date after a restart
+            index = 0
+            for path in self.log_dir.glob(f"audit-{date_str}*.jsonl*"):
+                parsed = parse_segment_name(path.name[: path.name.index(".jsonl") + 6])
+                if parsed and parsed[0] == date_str:
+                    index = max(index, parsed[1])
+
+        path = self.log_dir / segment_name(date_str, index)
+        size = path.stat().st_size if path.exists() else 0
+        while self._taken(path.name) or (self.max_bytes and size >= self.max_bytes):
+            index += 1
+            path = self.log_dir / segment_name(date_str, index)
+            size = path.stat().st_size if path.exists() else 0
+
+        self._fh = path.open("ab")
+        self._segment_path = path
+        self._segment_date = date_str
+        self._segment_index = index
+        self._segment_size = size
+
+    def _taken(self, name: str) -> bool:
+        """True for segments that must not be appended to: rotated out or sealed."""
+        return (
+            name in self._retired
+            or (self.log_dir / f"{name}{MANIFEST_SUFFIX}").exists()
+            or (self.log_dir / f"{name}{DATA_SUFFIX}").exists()
+        )
+
+    def _close_segment(self, notify: bool) -> None:
+        if self._fh is None:
+            return
+        closed_path = self._segment_path
+        try:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        except OSError as e:
+            logger.error(f"[AuditWriter] fsync on close failed: {e}")
+        self._fh.close()
+        self._fh = None
+        self._dirty = False
+        self._segment_path = None
+        self._segment_date = None
+
+        if notify:
+            self._retired.add(closed_path.name)
+            for hook in self._segment_close_hooks:
+                try:
+                    hook(closed_path)
+                except Exception as e:
+                    logger.error(f"[AuditWriter] Segment close hook failed: {e}")
+
+    def _sync(self, force: bool) -> None:
+        if self._fh is None:
+            return
+        self._fh.flush()
+        if self.fsync == FSYNC_NONE and not force:
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._fh.fileno())
+            self._last_fsync = now
+            self._dirty = False
+
+
+def get_audit_writers() -> List[AuditWriter]:
+    with _writers_lock:
+        return list(_writers)
+
+
+def audit_writer_stats() -> Dict[str, int]:
+    """Counters summed over every live writer (for /metrics)."""
+    totals = {
+        "queue_depth": 0,
+        "events_written": 0,
+        "events_dropped": 0,
+        "batches_written": 0,
+        "rotations": 0,
+    }
+    for writer in get_audit_writers():
+        for key, value in writer.stats().items():
+            totals[key] += value
+    return totals
+
+
+def shutdown_audit_writers() -> None:
+    """Flush and close every live writer. Called from the app lifespan and at exit."""
+    for writer in get_audit_writers():
+        writer.close()
+
+
+atexit.register(shutdown_audit_writers)
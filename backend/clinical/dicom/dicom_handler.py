@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Any, BinaryIO, Dict, Optional, Union
 import numpy as np
 
 
@@ -13,7 +13,8 @@ class DicomExtractResult:
 
 
 class DICOMHandler:
-    def read_and_extract(self, file_bytes: bytes) -> DicomExtractResult:
+    def read_and_extract(self, file_bytes: Union[bytes, BinaryIO]) -> DicomExtractResult:
+        """``file_bytes``: DICOM bytes or a binary stream (read in place, not copied)."""
         try:
             import pydicom
         except ImportError:
@@ -22,7 +23,8 @@ class DICOMHandler:
         try:
             from io import BytesIO
 
-            ds = pydicom.dcmread(BytesIO(file_bytes), force=True)
+            source = file_bytes if hasattr(file_bytes, "read") else BytesIO(file_bytes)
+            ds = pydicom.dcmread(source, force=True)
 
             metadata = {
                 "study_instance_uid": str(ds.get((0x0020, 0x000D), "")),
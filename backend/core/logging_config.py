@@ -0,0 +1,173 @@
+"""
+Structured, non-blocking logging.
+
+Request handlers used to ``print`` on every call (and the exception handler
+printed whole tracebacks), so stdout writes — and, under load, a blocked pipe
+to the log collector — sat on the request path. ``setup_logging`` routes
+the root logger through a ``QueueHandler``: a log call only copies the record
+onto an in-memory queue, and a ``QueueListener`` thread formats and writes
+it. Tracebacks are formatted on the listener thread as well.
+
+- records are one JSON object per line (``ts``, ``level``, ``logger``,
+  ``message``, ``exc`` and any ``extra={...}`` fields); LOG_FORMAT=text
+  gives plain lines for local development
+- LOG_LEVEL sets the root level and LOG_LEVELS overrides it per logger
+- DEBUG records are sampled (LOG_DEBUG_SAMPLE_RATE) and rate limited per
+  logger (LOG_DEBUG_RATE_PER_SECOND) before they reach the queue, so debug
+  logging on a hot path cannot flood the output
+- a full queue drops the record rather than block the caller; drops are
+  counted in ``log_stats`` and exported on /metrics
+
+Configuration (env):
+    LOG_LEVEL                  root level (default INFO)
+    LOG_LEVELS                 per-logger levels, e.g. backend.voice=DEBUG,httpx=WARNING
+    LOG_FORMAT                 json | text (default json)
+    LOG_DEBUG_SAMPLE_RATE      fraction of DEBUG records kept (default 1.0)
+    LOG_DEBUG_RATE_PER_SECOND  DEBUG records per second per logger; 0 disables the limit (default 20)
+    LOG_QUEUE_SIZE             records buffered for the writer thread (default 10000)
+"""
+
+from __future__ import annotations
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+log_stats: Dict[str, int] = {"sampled": 0, "rate_limited": 0, "queue_full": 0}
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Sample and rate-limit DEBUG (and lower) records, per logger."""
+
+    def __init__(self, sample_rate: float = 1.0, rate_per_second: float = 0.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate = rate_per_second
+        self._buckets: Dict[str, list] = {}  # logger -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            log_stats["sampled"] += 1
+            return False
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(record.name, [self.rate, now])
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                log_stats["rate_limited"] += 1
+                return False
+            bucket[0] -= 1
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueue a shallow copy of the record; formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Resolve %-args now: they may be mutated after the call returns
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_stats["queue_full"] += 1
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever ``sys.stdout`` is at emit time (test capture, reloaders)."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """Install the queue handler on the root logger and start the writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = _StdoutHandler()
+    if os.getenv("LOG_FORMAT", "json").strip().lower() == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        output.setFormatter(JSONFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    handler.addFilter(
+        DebugSampler(
+            float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0")),
+            float(os.getenv("LOG_DEBUG_RATE_PER_SECOND", "20")),
+        )
+    )
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").strip().upper())
+    for name, level in parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
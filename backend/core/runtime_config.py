@@ -0,0 +1,274 @@
+"""
+CPU thread budget shared by TensorFlow and torch.
+
+The classifier (and Grad-CAM) run on TensorFlow and Whisper runs on torch in
+the same process. Left alone, each runtime sizes its intra- and inter-op
+pools to every core the machine reports. That is the host's core count, not
+the pod's CPU limit, so two runtimes with a pool each thrash a 2-CPU pod
+whenever image and voice requests overlap. Here:
+
+- one budget is derived from the cgroup CPU quota (v2 ``cpu.max`` or v1
+  ``cpu.cfs_quota_us``), capped by the cores the process may run on
+- the budget is split between the TF and torch intra-op pools (half each by
+  default); inter-op pools get one thread, since each request runs a single
+  model graph at a time
+- with CPU_PINNING the two runtimes get disjoint core sets: TensorFlow's
+  pool threads are created on TF cores and the STT executor thread (and the
+  OpenMP workers it spawns) on torch cores. Linux only; best effort
+- a runtime profile (RUNTIME_PROFILE, written by
+  ``benchmarks/autotune_runtime.py``) supplies defaults for any of these
+  settings and for tuning knobs such as STT_MAX_BATCH. Values set in the
+  environment always win over the profile.
+
+``configure_runtime`` must run before TensorFlow or torch is imported (the
+OpenMP/MKL variables are read at import); ``apply_tensorflow`` and
+``apply_torch`` then size the pools before either runtime does any work.
+
+Configuration (env):
+    CPU_BUDGET             inference threads in total (default: cgroup CPU limit, else usable cores)
+    TF_INTRA_OP_THREADS    TensorFlow intra-op threads (default half the budget, at least 1)
+    TF_INTER_OP_THREADS    TensorFlow inter-op threads (default 1)
+    TORCH_THREADS          torch intra-op threads (default the rest of the budget, at least 1)
+    TORCH_INTEROP_THREADS  torch inter-op threads (default 1)
+    CPU_PINNING            pin TF and torch to disjoint cores (default false)
+    RUNTIME_PROFILE        JSON profile of setting defaults (default backend/runtime_profile.json)
+"""
+
+from __future__ import annotations
+import os
+import json
+import math
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_PATH = Path(__file__).resolve().parent.parent / "runtime_profile.json"
+
+# Thread-pool variables read by OpenMP, MKL and OpenBLAS when they load
+_NATIVE_POOL_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def _env_int(name: str) -> Optional[int]:
+    raw = os.getenv(name, "").strip()
+    return int(raw) if raw else None
+
+
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("true", "1", "yes", "on")
+
+
+# ── Discovery ────────────────────────────────────────────────────────────
+
+
+def cgroup_cpu_limit(root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """CPUs allowed by the cgroup quota, or None when unlimited/unknown."""
+    base = Path(root)
+    try:
+        quota, period = (base / "cpu.max").read_text().split()[:2]  # cgroup v2
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((base / "cpu" / "cpu.cfs_quota_us").read_text())  # cgroup v1
+        period = int((base / "cpu" / "cpu.cfs_period_us").read_text())
+    except (OSError, ValueError):
+        return None
+    if quota <= 0 or period <= 0:
+        return None
+    return quota / period
+
+
+def usable_cores() -> List[int]:
+    """Cores this process may be scheduled on."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:  # not Linux
+        return list(range(os.cpu_count() or 1))
+
+
+def detect_cpu_budget() -> int:
+    cores = len(usable_cores())
+    limit = cgroup_cpu_limit()
+    if limit is None:
+        return cores
+    # A 1.5-CPU quota still runs two threads usefully
+    return max(1, min(cores, math.ceil(limit)))
+
+
+# ── Profile ──────────────────────────────────────────────────────────────
+
+
+def profile_path() -> Path:
+    return Path(os.getenv("RUNTIME_PROFILE", str(DEFAULT_PROFILE_PATH)))
+
+
+def load_profile(path: Optional[Path] = None) -> Dict[str, str]:
+    """
+    Apply a runtime profile's settings as environment defaults and return
+    the ones that took effect. Settings already in the environment are kept.
+    """
+    path = path or profile_path()
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        logger.warning(f"[Runtime] Ignoring unreadable profile {path}: {e}")
+        return {}
+    if not text.strip():
+        return {}
+    try:
+        profile = json.loads(text)
+    except ValueError as e:
+        logger.warning(f"[Runtime] Ignoring malformed profile {path}: {e}")
+        return {}
+    applied = {}
+    for name, value in profile.get("settings", {}).items():
+        if name not in os.environ:
+            os.environ[name] = applied[name] = str(value)
+    if applied:
+        logger.info(f"[Runtime] Profile {path}: {applied}")
+    return applied
+
+
+# ── Budget ───────────────────────────────────────────────────────────────
+
+
+@dataclass
+class ThreadBudget:
+    total: int
+    tf_intra: int
+    tf_inter: int
+    torch_intra: int
+    torch_interop: int
+    pinning: bool = False
+    tf_cores: List[int] = field(default_factory=list)
+    torch_cores: List[int] = field(default_factory=list)
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        total = _env_int("CPU_BUDGET") or detect_cpu_budget()
+        tf_intra = _env_int("TF_INTRA_OP_THREADS") or max(1, total // 2)
+        torch_intra = _env_int("TORCH_THREADS") or max(1, total - tf_intra)
+        budget = cls(
+            total=total,
+            tf_intra=tf_intra,
+            tf_inter=_env_int("TF_INTER_OP_THREADS") or 1,
+            torch_intra=torch_intra,
+            torch_interop=_env_int("TORCH_INTEROP_THREADS") or 1,
+            pinning=_env_bool("CPU_PINNING"),
+        )
+        if budget.pinning:
+            budget.tf_cores, budget.torch_cores = split_cores(usable_cores(), tf_intra, torch_intra)
+        return budget
+
+    def apply_tensorflow(self, tf: Any) -> None:
+        """Size TF's pools; must run before TensorFlow executes any op."""
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(self.tf_intra)
+            tf.config.threading.set_inter_op_parallelism_threads(self.tf_inter)
+        except RuntimeError as e:  # context already initialized
+            logger.warning(f"[Runtime] TensorFlow thread pools already created: {e}")
+            return
+        if self.pinning and self.tf_cores:
+            # Pool threads inherit the affinity of the thread that creates them
+            with pinned(self.tf_cores):
+                tf.constant(0)
+
+    def apply_torch(self, torch: Any) -> None:
+        torch.set_num_threads(self.torch_intra)
+        try:
+            torch.set_num_interop_threads(self.torch_interop)
+        except RuntimeError as e:  # inter-op pool already started
+            logger.warning(f"[Runtime] torch inter-op pool already started: {e}")
+
+    def init_torch_worker(self) -> None:
+        """Executor initializer for threads that run torch (the STT executor)."""
+        if self.pinning and self.torch_cores:
+            pin_thread(self.torch_cores)
+        try:
+            import torch
+        except ImportError:
+            return
+        # OpenMP thread counts are per calling thread
+        torch.set_num_threads(self.torch_intra)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "tf_intra": self.tf_intra,
+            "tf_inter": self.tf_inter,
+            "torch_intra": self.torch_intra,
+            "torch_interop": self.torch_interop,
+            "pinning": self.pinning,
+            "tf_cores": list(self.tf_cores),
+            "torch_cores": list(self.torch_cores),
+        }
+
+
+def split_cores(cores: List[int], tf_threads: int, torch_threads: int) -> tuple:
+    """
+    Disjoint (tf, torch) core lists sized by thread share. With a single
+    core there is nothing to split and both runtimes share it.
+    """
+    if len(cores) < 2:
+        return list(cores), list(cores)
+    n_tf = round(len(cores) * tf_threads / (tf_threads + torch_threads))
+    n_tf = min(max(n_tf, 1), len(cores) - 1)
+    return cores[:n_tf], cores[n_tf:]
+
+
+def pin_thread(cores: List[int]) -> bool:
+    """Restrict the calling thread (and threads it starts) to ``cores``."""
+    try:
+        os.sched_setaffinity(threading.get_native_id(), cores)
+    except (AttributeError, OSError) as e:
+        logger.warning(f"[Runtime] Could not pin thread to cores {cores}: {e}")
+        return False
+    return True
+
+
+@contextmanager
+def pinned(cores: List[int]) -> Iterator[None]:
+    """Pin the calling thread for the duration of the block, then restore it."""
+    try:
+        previous = os.sched_getaffinity(0)
+    except AttributeError:
+        yield
+        return
+    pin_thread(cores)
+    try:
+        yield
+    finally:
+        pin_thread(sorted(previous))
+
+
+_thread_budget_instance: Optional[ThreadBudget] = None
+
+
+def get_thread_budget() -> ThreadBudget:
+    global _thread_budget_instance
+    if _thread_budget_instance is None:
+        _thread_budget_instance = ThreadBudget.from_env()
+    return _thread_budget_instance
+
+
+def configure_runtime() -> ThreadBudget:
+    """
+    Load the runtime profile, fix the thread budget and export it to the
+    native thread pools. Call before importing TensorFlow or torch.
+    """
+    global _thread_budget_instance
+    load_profile()
+    _thread_budget_instance = budget = ThreadBudget.from_env()
+    for name in _NATIVE_POOL_VARS:
+        os.environ.setdefault(name, str(budget.torch_intra))
+    logger.info(f"[Runtime] CPU thread budget: {budget.as_dict()}")
+    return budget
@@ -0,0 +1,236 @@
+"""
+Stack Auth access-token verification with a verified-token cache.
+
+- JWKSStore keeps the signing keys in memory. Keys are fetched in the
+  background at startup and on a schedule, or read from a local JWKS file
+  (STACK_JWKS_FILE) for offline/test environments. An unknown ``kid``
+  triggers at most one refresh at a time (single-flight), rate-limited so
+  forged kids cannot hammer the JWKS endpoint.
+- VerifiedTokenCache is an LRU of tokens whose signature has already been
+  checked, keyed by the token's SHA-256 and valid until the token's ``exp``.
+  A repeat request costs one hash and one dict lookup.
+"""
+
+from __future__ import annotations
+import json
+import time
+import hashlib
+import logging
+import threading
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSStore:
+    """
+    In-memory JWKS keyed by ``kid``.
+
+    Args:
+        url: Remote JWKS endpoint.
+        file_path: Local JWKS JSON file; takes precedence over ``url``.
+        refresh_interval: Seconds between scheduled background refreshes.
+        min_refresh_gap: Minimum seconds between refreshes caused by unknown kids.
+        fetch_timeout: HTTP timeout for the JWKS fetch.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        file_path: Optional[str] = None,
+        refresh_interval: float = 3600.0,
+        min_refresh_gap: float = 10.0,
+        fetch_timeout: float = 5.0,
+    ):
+        self.url = url
+        self.file_path = Path(file_path) if file_path else None
+        self.refresh_interval = refresh_interval
+        self.min_refresh_gap = min_refresh_gap
+        self.fetch_timeout = fetch_timeout
+
+        self._keys: Dict[str, Any] = {}
+        self._refresh_lock = threading.Lock()
+        self._generation = 0
+        self._last_refresh = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._on_keys_removed: List[Any] = []
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.url or self.file_path)
+
+    @property
+    def kids(self) -> List[str]:
+        return list(self._keys)
+
+    def on_keys_removed(self, callback) -> None:
+        """Register a callback run when a refresh drops previously known kids."""
+        self._on_keys_removed.append(callback)
+
+    def _load_document(self) -> Dict[str, Any]:
+        if self.file_path:
+            return json.loads(self.file_path.read_text(encoding="utf-8"))
+        req = urllib.request.Request(self.url, headers={"User-Agent": "voxray-backend"})
+        with urllib.request.urlopen(req, timeout=self.fetch_timeout) as resp:
+            return json.loads(resp.read())
+
+    def refresh(self) -> bool:
+        """Fetch the JWKS and swap it in atomically. Returns False on failure."""
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> bool:
+        self._last_refresh = time.monotonic()
+        try:
+            document = self._load_document()
+            jwk_set = jwt.PyJWKSet.from_dict(document)
+        except Exception as e:
+            logger.error(f"[JWKS] Refresh failed: {e}")
+            return False
+
+        keys = {k.key_id: k.key for k in jwk_set.keys if k.key_id}
+        removed = set(self._keys) - set(keys)
+        self._keys = keys  # single reference swap; readers never see a partial dict
+        self._generation += 1
+        logger.info(f"[JWKS] Loaded {len(keys)} signing key(s)")
+
+        if removed:
+            for callback in self._on_keys_removed:
+                callback(removed)
+        return True
+
+    def get_key(self, kid: Optional[str]) -> Optional[Any]:
+        """Return the key for ``kid``, refreshing once (single-flight) on a miss."""
+        keys = self._keys
+        if kid is None and len(keys) == 1:
+            return next(iter(keys.values()))
+        if kid in keys:
+            return keys[kid]
+
+        seen_generation = self._generation
+        with self._refresh_lock:
+            if self._generation == seen_generation:
+                # Nobody refreshed while we waited — do it ourselves, unless one just ran
+                if (
+                    self._generation > 0
+                    and time.monotonic() - self._last_refresh < self.min_refresh_gap
+                ):
+                    return None
+                self._refresh_locked()
+        return self._keys.get(kid)
+
+    def start(self) -> None:
+        """Load keys and keep them fresh on a daemon thread."""
+        if not self.configured or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="jwks-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self) -> None:
+        self.refresh()
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+
+class VerifiedTokenCache:
+    """LRU of verified token payloads keyed by SHA-256 of the raw token."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if time.time() >= expires_at:
+                del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return payload
+
+    def put(self, digest: bytes, payload: Dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_size <= 0:
+            return  # Tokens without exp are never cached
+        with self._lock:
+            self._entries[digest] = (float(exp), payload)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self, *_args: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TokenVerifier:
+    """Verifies ES256/RS256 access tokens, skipping the signature check on cache hits."""
+
+    def __init__(
+        self,
+        jwks: JWKSStore,
+        audience: Optional[str],
+        cache: Optional[VerifiedTokenCache] = None,
+        leeway: int = 60,
+    ):
+        self.jwks = jwks
+        self.audience = audience
+        self.cache = cache if cache is not None else VerifiedTokenCache()
+        self.leeway = leeway
+        # A rotated-out key invalidates everything it signed
+        jwks.on_keys_removed(self.cache.clear)
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the token payload or raise a jwt.PyJWTError subclass."""
+        digest = VerifiedTokenCache.digest(token)
+        payload = self.cache.get(digest)
+        if payload is not None:
+            return dict(payload)
+
+        header = jwt.get_unverified_header(token)
+        key = self.jwks.get_key(header.get("kid"))
+        if key is None:
+            raise jwt.InvalidTokenError("Signing key not found in JWKS")
+
+        payload = jwt.decode(
+            token,
+            key,
+            algorithms=["ES256", "RS256"],
+            audience=self.audience,
+            # Add leeway to handle clock skew between client and server
+            leeway=self.leeway,
+            options={"verify_aud": True},
+        )
+        self.cache.put(digest, payload)
+        return dict(payload)
@@ -0,0 +1,283 @@
+"""
+Model lifecycle: load on first use, evict when idle or under memory pressure.
+
+Pods used to hold the Keras classifier, Whisper and the v2 ensemble resident
+for their whole life, even on nodes that only ever see one kind of traffic.
+Here every model is registered with three callables — ``load`` (install the
+model, return it), ``current`` (the installed model or None) and
+``release`` (drop every reference) — and:
+
+- ``acquire``/``aacquire`` return the installed model, loading it first if
+  needed; concurrent callers share one load (single-flight per model)
+- a sweeper thread evicts models unused for MODEL_IDLE_TTL_SECONDS, and,
+  while process RSS is above MODEL_RSS_HIGH_WATERMARK_MB, evicts the least
+  recently used models until RSS falls under the low watermark
+- models listed in MODEL_STANDBY are warm standbys: loaded at startup and
+  never evicted for idleness (memory pressure can still evict them, last)
+
+An evicted model reloads transparently on its next use. Requests already
+holding a reference keep the object alive until they finish; the memory is
+returned when the last one does. The TensorFlow and torch runtimes
+themselves stay imported — only model weights and graphs are released.
+
+Configuration (env):
+    MODEL_IDLE_TTL_SECONDS       evict models idle this long; 0 disables (default 1800)
+    MODEL_RSS_HIGH_WATERMARK_MB  start pressure eviction above this RSS; 0 disables (default 0)
+    MODEL_RSS_LOW_WATERMARK_MB   stop pressure eviction below this RSS (default 85% of high)
+    MODEL_SWEEP_INTERVAL_SECONDS how often the sweeper runs (default 30)
+    MODEL_STANDBY                comma-separated warm-standby models (default classifier,stt)
+    MODEL_LOAD_RETRY_SECONDS     after a failed load, answer "unavailable" this long before retrying (default 60)
+"""
+
+from __future__ import annotations
+import gc
+import os
+import time
+import ctypes
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size, from /proc (Linux); None where unavailable."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _return_freed_memory() -> None:
+    gc.collect()
+    try:
+        # glibc keeps freed arenas mapped; trimming hands them back so RSS drops
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+@dataclass
+class ManagedModel:
+    name: str
+    load: Callable[[], Any]
+    current: Callable[[], Any]
+    release: Callable[[], None]
+    busy: Callable[[], bool] = lambda: False
+    standby: bool = False
+    last_used: float = 0.0
+    loads: int = 0
+    load_failures: int = 0
+    failed_at: Optional[float] = None
+    evictions: Dict[str, int] = field(default_factory=lambda: {"idle": 0, "memory": 0})
+    load_seconds: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def resident(self) -> bool:
+        return self.current() is not None
+
+
+class ModelLifecycle:
+    """Registry of lazily loaded, evictable models."""
+
+    def __init__(
+        self,
+        idle_ttl: Optional[float] = None,
+        high_watermark_mb: Optional[float] = None,
+        low_watermark_mb: Optional[float] = None,
+        sweep_interval: Optional[float] = None,
+        standby: Optional[List[str]] = None,
+        rss: Callable[[], Optional[int]] = process_rss_bytes,
+    ):
+        self.idle_ttl = (
+            idle_ttl if idle_ttl is not None else float(os.getenv("MODEL_IDLE_TTL_SECONDS", "1800"))
+        )
+        high = (
+            high_watermark_mb
+            if high_watermark_mb is not None
+            else float(os.getenv("MODEL_RSS_HIGH_WATERMARK_MB", "0"))
+        )
+        low = (
+            low_watermark_mb
+            if low_watermark_mb is not None
+            else float(os.getenv("MODEL_RSS_LOW_WATERMARK_MB", str(high * 0.85)))
+        )
+        self.high_watermark = int(high * 1024 * 1024)
+        self.low_watermark = int(min(low, high) * 1024 * 1024)
+        self.sweep_interval = sweep_interval or float(os.getenv("MODEL_SWEEP_INTERVAL_SECONDS", "30"))
+        if standby is None:
+            standby = [s.strip() for s in os.getenv("MODEL_STANDBY", "classifier,stt").split(",")]
+        self.standby = {s for s in standby if s}
+        self.retry_after = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "60"))
+        self.rss = rss
+
+        self._models: Dict[str, ManagedModel] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── Registration and use ─────────────────────────────────────────────
+
+    def register(
+        self,
+        name: str,
+        load: Callable[[], Any],
+        current: Callable[[], Any],
+        release: Callable[[], None],
+        busy: Optional[Callable[[], bool]] = None,
+    ) -> ManagedModel:
+        """
+        ``busy`` (optional) reports in-flight work that still needs the model;
+        busy models are not evicted.
+        """
+        model = ManagedModel(name, load, current, release, standby=name in self.standby)
+        if busy is not None:
+            model.busy = busy
+        if model.resident:
+            model.last_used = time.monotonic()
+        self._models[name] = model
+        return model
+
+    def acquire(self, name: str) -> Any:
+        """The model, loaded if needed (blocking). None if it cannot be loaded."""
+        model = self._models[name]
+        value = model.current()
+        if value is None:
+            with model.lock:
+                value = model.current()
+                if value is None:
+                    value = self._load(model)
+        model.last_used = time.monotonic()
+        return value
+
+    async def aacquire(self, name: str) -> Any:
+        """``acquire`` for async handlers; loads run off the event loop."""
+        model = self._models[name]
+        value = model.current()
+        if value is not None:
+            model.last_used = time.monotonic()
+            return value
+        return await asyncio.to_thread(self.acquire, name)
+
+    def _load(self, model: ManagedModel) -> Any:
+        # A model that just failed to load (missing file, failed download)
+        # is not retried on every request
+        if model.failed_at is not None and time.monotonic() - model.failed_at < self.retry_after:
+            return None
+        started = time.perf_counter()
+        try:
+            value = model.load()
+        except Exception as e:
+            logger.error(f"[ModelLifecycle] Loading {model.name} failed: {e}")
+            value = None
+        if value is None:
+            model.load_failures += 1
+            model.failed_at = time.monotonic()
+            return None
+        model.failed_at = None
+        model.load_seconds = time.perf_counter() - started
+        model.loads += 1
+        logger.info(f"[ModelLifecycle] Loaded {model.name} in {model.load_seconds:.1f}s")
+        return value
+
+    def preload_standby(self) -> None:
+        """Load every warm-standby model (startup)."""
+        for model in self._models.values():
+            if model.standby:
+                self.acquire(model.name)
+
+    # ── Eviction ─────────────────────────────────────────────────────────
+
+    def evict(self, name: str, reason: str = "idle") -> bool:
+        model = self._models[name]
+        with model.lock:
+            if not model.resident or model.busy():
+                return False
+            model.release()
+            model.evictions[reason] = model.evictions.get(reason, 0) + 1
+        _return_freed_memory()
+        logger.info(f"[ModelLifecycle] Evicted {name} ({reason})")
+        return True
+
+    def sweep(self) -> List[str]:
+        """Evict idle models, then LRU models while above the RSS watermark."""
+        now = time.monotonic()
+        evicted = []
+        if self.idle_ttl > 0:
+            for model in list(self._models.values()):
+                if (
+                    not model.standby
+                    and model.resident
+                    and now - model.last_used > self.idle_ttl
+                    and self.evict(model.name, "idle")
+                ):
+                    evicted.append(model.name)
+
+        if self.high_watermark > 0:
+            rss = self.rss()
+            if rss is not None and rss > self.high_watermark:
+                # Non-standby first, then least recently used
+                victims = sorted(
+                    (m for m in self._models.values() if m.resident),
+                    key=lambda m: (m.standby, m.last_used),
+                )
+                for model in victims:
+                    if self.evict(model.name, "memory"):
+                        evicted.append(model.name)
+                    rss = self.rss()
+                    if rss is None or rss <= self.low_watermark:
+                        break
+        return evicted
+
+    def start(self) -> None:
+        """Run ``sweep`` on a daemon thread every ``sweep_interval`` seconds."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-lifecycle", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"[ModelLifecycle] Sweep failed: {e}")
+
+    # ── Introspection ────────────────────────────────────────────────────
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            name: {
+                "resident": model.resident,
+                "standby": model.standby,
+                "idle_seconds": now - model.last_used if model.last_used else None,
+                "loads": model.loads,
+                "load_failures": model.load_failures,
+                "load_seconds": model.load_seconds,
+                "evictions": dict(model.evictions),
+            }
+            for name, model in self._models.items()
+        }
+
+
+_model_lifecycle_instance: Optional[ModelLifecycle] = None
+
+
+def get_model_lifecycle() -> ModelLifecycle:
+    global _model_lifecycle_instance
+    if _model_lifecycle_instance is None:
+        _model_lifecycle_instance = ModelLifecycle()
+    return _model_lifecycle_instance
@@ -1,7 +1,7 @@
 import os
 import io
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Any, BinaryIO, Dict, List, Optional, Union
 
 import numpy as np
 from PIL import Image
@@ -19,8 +19,10 @@ class ModelServer:
     """
     Central model server for VoxRay AI.
 
-    - Loads one or more Keras models into an ensemble.
+    - Loads one or more Keras models into an ensemble (on first ``load``).
     - Provides unified prediction and optional MC Dropout uncertainty.
+    - ``load``/``unload`` let the model lifecycle manager evict an idle
+      ensemble and bring it back on the next request.
     """
 
     _instance: Optional["ModelServer"] = None
@@ -47,9 +49,18 @@ class ModelServer:
         self.ensemble: Optional[Any] = (
             None  # Typed as Any to avoid import error in type hint
         )
-        self._initialize()
         self._initialized = True
 
+    def load(self) -> Optional[Any]:
+        """Build the ensemble if it is not loaded; return it (None on failure)."""
+        if self.ensemble is None:
+            self._initialize()
+        return self.ensemble
+
+    def unload(self) -> None:
+        """Drop the ensemble; the next ``load`` rebuilds it from disk."""
+        self.ensemble = None
+
     def _initialize(self):
         """Load models and prepare ensemble."""
         # Lazy load dependencies
@@ -104,7 +115,7 @@ class ModelServer:
             self.ensemble = None
 
     def preprocess_image(
-        self, image_bytes: bytes, target_size=(224, 224)
+        self, image_bytes: Union[bytes, BinaryIO], target_size=(224, 224)
     ) -> np.ndarray:
         """
         Convert raw bytes to tensor using the SAME preprocessing as v1.
@@ -117,7 +128,8 @@ class ModelServer:
           - expand dims
         """
         try:
-            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            source = image_bytes if hasattr(image_bytes, "read") else io.BytesIO(image_bytes)
+            image = Image.open(source).convert("RGB")
         except Exception as e:
             raise ValueError(f"Invalid image file: {e}")
 
@@ -135,13 +147,13 @@ class ModelServer:
         return img_batch
 
     def predict(
-        self, image_bytes: bytes, run_uncertainty: bool = False
+        self, image_bytes: Union[bytes, BinaryIO], run_uncertainty: bool = False
     ) -> Dict[str, Any]:
         """
         Predict class, confidence, and optionally uncertainty.
 
         Args:
-            image_bytes: Raw image bytes
+            image_bytes: Raw image bytes or a binary stream
             run_uncertainty: Whether to run MC Dropout (slower)
 
         Returns:
@@ -153,14 +165,16 @@ class ModelServer:
                 - uncertainty (if requested)
                 - benchmark_comparison (string)
         """
-        if self.ensemble is None:
+        # Local reference: an eviction mid-request must not pull the model away
+        ensemble = self.ensemble
+        if ensemble is None:
             return {"error": "ModelServer not initialized: no ensemble models loaded."}
 
         # 1. Preprocess
         tensor = self.preprocess_image(image_bytes)
 
         # 2. Ensemble prediction
-        ensemble_result = self.ensemble.predict(tensor)
+        ensemble_result = ensemble.predict(tensor)
         probs = np.array(ensemble_result["mean_probability"])
         if probs.shape[0] != len(self.CLASS_NAMES):
             logger.warning(
@@ -191,9 +205,9 @@ class ModelServer:
         }
 
         # 3. Optional MC Dropout uncertainty
-        if run_uncertainty and self.ensemble.models:
+        if run_uncertainty and ensemble.models:
             try:
-                mc = predict_with_uncertainty(self.ensemble.models[0], tensor)
+                mc = predict_with_uncertainty(ensemble.models[0], tensor)
                 mc_probs = np.array(mc["mean_probability"])[:n_classes]
                 response["uncertainty"] = {
                     "entropy": mc["entropy"],
@@ -1,8 +1,17 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 from backend.api.main import app
 from backend.api.deps import get_current_user
+from backend.api.chat_cache import get_chat_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_chat_cache():
+    cache = get_chat_cache()
+    if cache is not None:
+        cache.clear()
+    yield
 
 @pytest.fixture
 def mock_auth():
@@ -10,13 +19,12 @@ def mock_auth():
     yield
     app.dependency_overrides = {}
 
-@patch("backend.api.main.OpenAI")
-def test_chat_endpoint_success(mock_openai_class, mock_auth, client):
-    # Mock the client instance and its method chain
-    mock_instance = mock_openai_class.return_value
-    mock_completion = MagicMock()
-    mock_completion.choices[0].message.content = "This is a mocked response from Gemini."
-    mock_instance.chat.completions.create.return_value = mock_completion
+@patch("backend.api.main.get_llm_gateway")
+def test_chat_endpoint_success(mock_get_gateway, mock_auth, client, monkeypatch):
+    # Mock the shared gateway's async completion call
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    mock_gateway = mock_get_gateway.return_value
+    mock_gateway.complete = AsyncMock(return_value="This is a mocked response from Gemini.")
 
     payload = {
         "message": "What does this X-ray show?",
@@ -31,9 +39,10 @@ def test_chat_endpoint_success(mock_openai_class, mock_auth, client):
     assert "response" in data
     assert data["response"] == "This is a mocked response from Gemini."
     
-    # Verify OpenAI was initialized (checking if api_key was passed is good practice)
-    # But since api_key comes from env, we might need to mock env if not set.
-    # The endpoint checks expected env var. In test env it might differ.
+    # The full message chain (system prompt + user message) goes to the gateway
+    messages = mock_gateway.complete.call_args.args[0]
+    assert messages[0]["role"] == "system"
+    assert messages[-1] == {"role": "user", "content": payload["message"]}
     
 def test_chat_missing_api_key(client, monkeypatch):
     """Test 500 if API key is missing (simulated by empty env)"""
@@ -50,3 +59,81 @@ def test_chat_missing_api_key(client, monkeypatch):
     assert "OpenRouter API Key not found" in response.json()["detail"]
     
     app.dependency_overrides = {}
+
+
+def _mock_stream(*chunks):
+    async def stream(messages, **kwargs):
+        usage = kwargs.get("usage")
+        if usage is not None:
+            usage.update(ttft_s=0.01, tokens=len(chunks), tokens_per_sec=100.0)
+        for chunk in chunks:
+            yield chunk
+
+    return stream
+
+
+@patch("backend.api.main.get_llm_gateway")
+def test_chat_stream_endpoint_emits_sse(mock_get_gateway, mock_auth, client, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    mock_gateway = mock_get_gateway.return_value
+    mock_gateway.model = "stand-in"
+    mock_gateway.stream = _mock_stream("Pneumonia ", "is an ", "infection.")
+
+    response = client.post("/chat/stream", json={"message": "What is it?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    body = response.text
+    assert body.count("event: delta") == 3
+    assert '"text": "Pneumonia is an infection."' in body
+    assert body.rstrip().split("\n\n")[-1].startswith("event: end")
+
+
+def test_chat_stream_missing_api_key(mock_auth, client, monkeypatch):
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    response = client.post("/chat/stream", json={"message": "Hello"})
+    assert response.status_code == 500
+
+
+@patch("backend.api.main.get_llm_gateway")
+def test_chat_repeated_question_served_from_cache(mock_get_gateway, mock_auth, client, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    mock_gateway = mock_get_gateway.return_value
+    mock_gateway.complete = AsyncMock(return_value="Cough, fever and chest pain.")
+    payload = {"message": "What are the symptoms?", "context": "Diagnosis: PNEUMONIA, Confidence: 91.0%"}
+
+    first = client.post("/chat", json=payload)
+    second = client.post("/chat", json={**payload, "message": "what are the symptoms"})
+
+    assert first.json() == second.json() == {"response": "Cough, fever and chest pain."}
+    assert mock_gateway.complete.await_count == 1
+
+    # A real conversation bypasses the cache
+    client.post("/chat", json={**payload, "history": [{"role": "user", "text": "Is this pneumonia?"}]})
+    assert mock_gateway.complete.await_count == 2
+
+
+@patch("backend.api.main.get_llm_gateway")
+def test_concurrent_identical_chats_are_coalesced(mock_get_gateway, mock_auth, monkeypatch):
+    import asyncio
+    import httpx
+
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setenv("CHAT_CACHE_ENABLED", "false")
+
+    async def slow_complete(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return "Shared answer."
+
+    mock_gateway = mock_get_gateway.return_value
+    mock_gateway.complete = AsyncMock(side_effect=slow_complete)
+    payload = {"message": "What are the symptoms?", "context": "Diagnosis: PNEUMONIA, Confidence: 91.0%"}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/chat", json=payload) for _ in range(4)))
+
+    responses = asyncio.run(run())
+    assert [r.json() for r in responses] == [{"response": "Shared answer."}] * 4
+    assert mock_gateway.complete.await_count == 1
@@ -0,0 +1,231 @@
+"""
+Audio ingest: uploaded recordings to 16 kHz mono float32 for Whisper.
+
+The old path decoded with ``sf.read`` (float64), resampled every channel
+with ``librosa.resample`` and only then averaged to mono, so a 48 kHz stereo
+browser recording was resampled twice and carried in float64 throughout.
+Here:
+
+- libsndfile decodes straight to float32
+- channels are averaged before resampling, so only one channel is resampled
+- resampling uses soxr (the library behind librosa's default ``soxr_hq``)
+  or, without it, ``scipy.signal.resample_poly`` with the anti-aliasing
+  filter for each sample-rate pair designed once and cached
+- ``iter_decode`` reads compressed formats (FLAC, OGG/Opus, MP3) block by
+  block and resamples each block with a streaming soxr resampler, so memory
+  stays bounded by the block size rather than the recording
+- containers libsndfile cannot open (WebM, MP4) are piped through ffmpeg
+  when it is installed, which decodes, downmixes and resamples as it reads
+
+Configuration (env):
+    AUDIO_RESAMPLER          soxr | polyphase (default soxr when installed)
+    AUDIO_SOXR_QUALITY       soxr quality preset: QQ, LQ, MQ, HQ, VHQ (default HQ)
+    AUDIO_DECODE_BLOCK_FRAMES  frames per block for incremental decoding (default 65536)
+    AUDIO_FFMPEG             ffmpeg executable for WebM/MP4 input (default: ffmpeg on PATH)
+"""
+
+from __future__ import annotations
+import io
+import os
+import math
+import shutil
+import logging
+import threading
+import subprocess
+from functools import lru_cache
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import firwin, resample_poly
+
+try:
+    import soxr
+except ImportError:  # pragma: no cover - soxr ships with librosa
+    soxr = None
+
+logger = logging.getLogger(__name__)
+
+TARGET_RATE = 16000
+
+AudioSource = Union[bytes, bytearray, BinaryIO]
+
+
+class AudioDecodeError(ValueError):
+    """The upload is not audio this server can decode."""
+
+
+def _resampler() -> str:
+    default = "soxr" if soxr is not None else "polyphase"
+    choice = os.getenv("AUDIO_RESAMPLER", default).strip().lower()
+    if choice == "soxr" and soxr is None:
+        logger.warning("[AudioIngest] soxr not installed, using polyphase resampling")
+        return "polyphase"
+    return choice
+
+
+def _soxr_quality() -> str:
+    return os.getenv("AUDIO_SOXR_QUALITY", "HQ").upper()
+
+
+def _block_frames() -> int:
+    return int(os.getenv("AUDIO_DECODE_BLOCK_FRAMES", "65536"))
+
+
+# ── Resampling ───────────────────────────────────────────────────────────
+
+
+@lru_cache(maxsize=32)
+def polyphase_filter(orig_sr: int, target_sr: int) -> Tuple[int, int, np.ndarray]:
+    """(up, down, taps) for ``resample_poly``; the same design scipy would make."""
+    g = math.gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    max_rate = max(up, down)
+    taps = firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+    taps = taps.astype(np.float32)
+    taps.flags.writeable = False
+    return up, down, taps
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int = TARGET_RATE) -> np.ndarray:
+    """Resample mono float32 audio."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if orig_sr == target_sr or audio.size == 0:
+        return audio
+    if _resampler() == "soxr":
+        return soxr.resample(audio, orig_sr, target_sr, quality=_soxr_quality())
+    up, down, taps = polyphase_filter(orig_sr, target_sr)
+    return resample_poly(audio, up, down, window=taps).astype(np.float32, copy=False)
+
+
+def to_mono(audio: np.ndarray) -> np.ndarray:
+    """Average channels. Column adds beat ``mean(axis=1)`` on a few wide columns."""
+    if audio.ndim == 1:
+        return audio
+    channels = audio.shape[1]
+    mono = audio[:, 0].astype(np.float32)
+    for c in range(1, channels):
+        mono += audio[:, c]
+    if channels > 1:
+        mono *= np.float32(1.0 / channels)
+    return mono
+
+
+# ── Decoding ─────────────────────────────────────────────────────────────
+
+
+def _as_file(source: AudioSource) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _open(source: AudioSource) -> Tuple[Optional[sf.SoundFile], BinaryIO]:
+    f = _as_file(source)
+    try:
+        return sf.SoundFile(f), f
+    except (sf.LibsndfileError, RuntimeError):
+        f.seek(0)
+        return None, f
+
+
+def decode_audio(source: AudioSource, target_sr: int = TARGET_RATE) -> np.ndarray:
+    """Decode a whole recording to mono float32 at ``target_sr``."""
+    snd, f = _open(source)
+    if snd is None:
+        return _concat(_ffmpeg_blocks(f, target_sr))
+    with snd:
+        audio = snd.read(dtype="float32", always_2d=False)
+        return resample(to_mono(audio), snd.samplerate, target_sr)
+
+
+def iter_decode(
+    source: AudioSource, target_sr: int = TARGET_RATE, block_frames: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    """Decode a recording block by block, yielding mono float32 at ``target_sr``."""
+    block_frames = block_frames or _block_frames()
+    snd, f = _open(source)
+    if snd is None:
+        yield from _ffmpeg_blocks(f, target_sr, block_frames)
+        return
+    with snd:
+        orig_sr = snd.samplerate
+        if orig_sr == target_sr:
+            for block in snd.blocks(block_frames, dtype="float32", always_2d=True):
+                yield to_mono(block)
+            return
+        if _resampler() != "soxr":
+            # Polyphase filtering has no carry-over state between blocks
+            yield resample(to_mono(snd.read(dtype="float32", always_2d=False)), orig_sr, target_sr)
+            return
+        stream = soxr.ResampleStream(orig_sr, target_sr, 1, dtype="float32", quality=_soxr_quality())
+        for block in snd.blocks(block_frames, dtype="float32", always_2d=True):
+            out = stream.resample_chunk(to_mono(block))
+            if out.size:
+                yield out
+        tail = stream.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+        if tail.size:
+            yield tail
+
+
+def _concat(blocks: Iterator[np.ndarray]) -> np.ndarray:
+    parts = list(blocks)
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(parts)
+
+
+def _ffmpeg_blocks(
+    f: BinaryIO, target_sr: int, block_frames: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    ffmpeg = os.getenv("AUDIO_FFMPEG") or shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise AudioDecodeError("Unsupported audio format (install ffmpeg for WebM/MP4 input)")
+    block_bytes = (block_frames or _block_frames()) * 4
+    proc = subprocess.Popen(
+        [ffmpeg, "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "f32le", "-ac", "1", "-ar", str(target_sr), "pipe:1"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    def feed() -> None:
+        try:
+            while True:
+                chunk = f.read(block_bytes)
+                if not chunk:
+                    break
+                proc.stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    writer = threading.Thread(target=feed, name="ffmpeg-feed", daemon=True)
+    writer.start()
+    leftover = b""
+    try:
+        while True:
+            chunk = proc.stdout.read(block_bytes)
+            if not chunk:
+                break
+            chunk = leftover + chunk
+            usable = len(chunk) - len(chunk) % 4
+            leftover = chunk[usable:]
+            if usable:
+                yield np.frombuffer(chunk[:usable], dtype="<f4").copy()
+        if proc.wait() != 0:
+            message = proc.stderr.read().decode(errors="replace").strip()
+            raise AudioDecodeError(f"ffmpeg could not decode audio: {message[:200]}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        writer.join(timeout=1)
+        proc.stdout.close()
+        proc.stderr.close()
@@ -0,0 +1,96 @@
+"""
+Incremental transcription of a live PCM stream.
+
+``live_transcripts`` feeds incoming chunks through ``EnergyVAD`` and submits
+every segment to the STT service the moment the VAD closes it, while the
+client keeps talking. Perceived latency drops from "whole utterance + decode"
+to roughly one segment's decode. Open segments are also decoded as partial
+hypotheses every VAD_PARTIAL_MS; a new partial is skipped while the previous
+one is still decoding, so partials never queue up behind each other.
+
+Hypotheses are yielded in the order their audio was cut, each as soon as it
+(and everything before it) has decoded.
+"""
+
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import numpy as np
+
+from backend.voice.stt_service import STTService
+from backend.voice.vad import EnergyVAD, VADEvent
+
+PCM_ENCODINGS = {"s16le": np.int16, "f32le": np.float32}
+
+
+def pcm_to_float(data: bytes, encoding: str = "s16le") -> np.ndarray:
+    """Decode little-endian mono PCM bytes to float32 samples in [-1, 1]."""
+    dtype = PCM_ENCODINGS.get(encoding)
+    if dtype is None:
+        raise ValueError(f"Unsupported PCM encoding: {encoding}")
+    if len(data) % np.dtype(dtype).itemsize:
+        raise ValueError(f"{encoding} frame of {len(data)} bytes is not whole samples")
+    samples = np.frombuffer(data, dtype=np.dtype(dtype).newbyteorder("<"))
+    if dtype is np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32)
+
+
+@dataclass
+class LiveHypothesis:
+    kind: str  # "partial" | "final"
+    segment: int
+    text: str
+    start: float
+    end: float
+
+
+async def live_transcripts(
+    chunks: AsyncIterator[np.ndarray],
+    service: STTService,
+    whisper_language: Optional[str] = None,
+    vad: Optional[EnergyVAD] = None,
+) -> AsyncIterator[LiveHypothesis]:
+    """Transcribe ``chunks`` (16 kHz mono float) segment by segment as they arrive."""
+    vad = vad or EnergyVAD()
+    decoded: asyncio.Queue = asyncio.Queue()
+    partial_task: Optional[asyncio.Future] = None
+
+    def submit(event: VADEvent) -> None:
+        nonlocal partial_task
+        if event.kind == "partial" and partial_task is not None and not partial_task.done():
+            return
+        task = asyncio.ensure_future(service.transcribe(event.audio, whisper_language))
+        # A closed segment's pending partial must not hold back the next one's
+        partial_task = task if event.kind == "partial" else None
+        decoded.put_nowait((event, task))
+
+    async def read() -> None:
+        try:
+            async for chunk in chunks:
+                for event in vad.feed(chunk):
+                    submit(event)
+            for event in vad.flush():
+                submit(event)
+        finally:
+            decoded.put_nowait(None)
+
+    reader = asyncio.ensure_future(read())
+    try:
+        while True:
+            item = await decoded.get()
+            if item is None:
+                break
+            event, task = item
+            result = await task
+            yield LiveHypothesis(event.kind, event.segment, result.text, event.start, event.end)
+        await reader
+    finally:
+        if not reader.done():
+            reader.cancel()
+        while not decoded.empty():
+            item = decoded.get_nowait()
+            if item is not None:
+                item[1].cancel()
@@ -0,0 +1,184 @@
+"""
+Long-form transcription beyond Whisper's 30-second window.
+
+The Whisper processor pads or truncates every input to one 30 s window, so
+longer dictations used to lose everything after the first 30 seconds. Here
+the audio is cut into overlapping windows:
+
+- each window ends at the quietest 20 ms frame in the last few seconds
+  before the 30 s limit, so cuts fall between words where possible
+- the next window starts ``overlap`` seconds before that cut, so a word
+  clipped at the boundary is heard whole in one of the two windows
+
+All windows are submitted to the STT service together and decode as one
+batch (or a few, above STT_MAX_BATCH), so latency grows far slower than
+audio length. Texts are stitched in order, dropping the words the overlap
+made both windows hear. ``stream_long_form`` yields the stitched transcript
+as each window (and every window before it) has finished.
+
+Without a forced language, only the first window goes through language ID;
+the rest are submitted once it is back, forced to the language it detected,
+so one dictation is never transcribed in several languages.
+
+Configuration (env):
+    STT_WINDOW_SECONDS    window length (default 30)
+    STT_OVERLAP_SECONDS   overlap between windows (default 1.5)
+    STT_CUT_SEARCH_SECONDS  how far back from the limit to look for a quiet cut (default 4)
+"""
+
+from __future__ import annotations
+import os
+import re
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.voice.stt_service import SAMPLE_RATE, STTService
+
+FRAME_SECONDS = 0.02
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _env_seconds(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+def plan_windows(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    window_s: Optional[float] = None,
+    overlap_s: Optional[float] = None,
+    search_s: Optional[float] = None,
+) -> List[Tuple[int, int]]:
+    """(start, end) sample ranges covering ``audio``, cut at low-energy points."""
+    window = int((window_s or _env_seconds("STT_WINDOW_SECONDS", "30")) * sample_rate)
+    overlap = int(
+        (overlap_s if overlap_s is not None else _env_seconds("STT_OVERLAP_SECONDS", "1.5"))
+        * sample_rate
+    )
+    search = int((search_s or _env_seconds("STT_CUT_SEARCH_SECONDS", "4")) * sample_rate)
+    frame = max(int(FRAME_SECONDS * sample_rate), 1)
+    total = len(audio)
+    if total <= window:
+        return [(0, total)]
+
+    windows: List[Tuple[int, int]] = []
+    start = 0
+    while True:
+        limit = start + window
+        if limit >= total:
+            windows.append((start, total))
+            return windows
+        lo = max(limit - search, start + overlap + frame)
+        region = audio[lo:limit]
+        n_frames = len(region) // frame
+        if n_frames > 0:
+            frames = region[: n_frames * frame].reshape(n_frames, frame)
+            energy = np.mean(frames.astype(np.float32) ** 2, axis=1)
+            # Latest of the quietest frames keeps windows as long as possible
+            quietest = n_frames - 1 - int(np.argmin(energy[::-1]))
+            cut = lo + quietest * frame + frame // 2
+        else:
+            cut = limit
+        windows.append((start, cut))
+        start = cut - overlap
+
+
+def _norm(word: str) -> str:
+    return word.casefold()
+
+
+def stitch(previous: str, following: str, max_overlap_words: int = 12) -> str:
+    """
+    Join two window transcripts, removing the longest run of words that ends
+    ``previous`` and also starts ``following`` (case and punctuation ignored).
+
+    The boundary may clip a word: ``previous`` can end in a fragment of the
+    word ``following`` has whole ("... has pneu" / "has pneumonia ..."), and
+    ``following`` can open with the tail of a word ``previous`` already has.
+    """
+    if not previous:
+        return following
+    if not following:
+        return previous
+    prev_words = previous.split()
+    next_words = following.split()
+    prev_keys = [" ".join(_WORD_RE.findall(_norm(w))) for w in prev_words]
+    next_keys = [" ".join(_WORD_RE.findall(_norm(w))) for w in next_words]
+
+    limit = min(max_overlap_words, len(prev_words), len(next_words))
+    for size in range(limit, 0, -1):
+        tail = prev_keys[-size:]
+        if not any(tail):
+            continue
+        for skip in (0, 1):
+            if skip and size < 2:
+                continue  # a clipped lead-in plus one common word is too weak a match
+            head = next_keys[skip : skip + size]
+            if len(head) < size or tail[:-1] != head[:-1]:
+                continue
+            if tail[-1] == head[-1]:
+                return " ".join(prev_words + next_words[skip + size :])
+            if size >= 2 and tail[-1] and head[-1].startswith(tail[-1]):
+                return " ".join(prev_words[:-1] + next_words[skip + size - 1 :])
+    return " ".join(prev_words + next_words)
+
+
+@dataclass
+class LongFormUpdate:
+    """Progress of a long-form transcription after one more window finished."""
+
+    text: str
+    windows_done: int
+    windows_total: int
+    final: bool
+    language: Optional[str] = None  # Whisper name, forced or detected on the first window
+    language_probs: Optional[Dict[str, float]] = None
+
+
+async def stream_long_form(
+    service: STTService,
+    audio: np.ndarray,
+    whisper_language: Optional[str] = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> AsyncIterator[LongFormUpdate]:
+    """Transcribe ``audio`` window by window, yielding the stitched text in order."""
+    windows = plan_windows(audio, sample_rate)
+    tasks = [
+        asyncio.ensure_future(service.transcribe(audio[start:end], whisper_language))
+        for start, end in (windows if whisper_language else windows[:1])
+    ]
+    text = ""
+    language, language_probs = whisper_language, None
+    try:
+        for index in range(len(windows)):
+            result = await tasks[index]
+            if index == 0:
+                language, language_probs = result.language, result.language_probs
+                if len(tasks) < len(windows):
+                    tasks.extend(
+                        asyncio.ensure_future(service.transcribe(audio[start:end], language))
+                        for start, end in windows[1:]
+                    )
+            text = stitch(text, result.text)
+            yield LongFormUpdate(
+                text, index + 1, len(windows), index + 1 == len(windows), language, language_probs
+            )
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def transcribe_long_form(
+    service: STTService,
+    audio: np.ndarray,
+    whisper_language: Optional[str] = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> LongFormUpdate:
+    update = LongFormUpdate("", 0, 0, True)
+    async for update in stream_long_form(service, audio, whisper_language, sample_rate):
+        pass
+    return update
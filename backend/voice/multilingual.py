@@ -4,7 +4,7 @@ Handles language-specific settings for TTS voices and display names.
 """
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 
 @dataclass
@@ -13,33 +13,41 @@ class LanguageConfig:
     language: str  # ISO 639-1 code
     tts_voice: str  # Edge TTS voice identifier
     display_name: str  # Native language name for UI
+    local_voice: Optional[str] = None  # Piper voice for the local TTS backend
+    tts_backends: Optional[Tuple[str, ...]] = None  # Backend order; None = TTS_BACKENDS
 
 
 # Supported language configurations
 # Hindi disabled: whisper-base cannot distinguish spoken Hindi from Urdu (phonetically
-# identical). Re-enable by upgrading STT to faster-whisper medium and uncommenting
-# all lines marked '# hi-disabled' across multilingual.py, main.py, VoiceSection.jsx.
+# identical). Re-enable by running a larger checkpoint (e.g. STT_MODEL_ID=openai/whisper-medium
+# with STT_BACKEND=int8 to keep CPU latency) and uncommenting all lines marked
+# '# hi-disabled' across multilingual.py, main.py, VoiceSection.jsx.
 LANGS: Dict[str, LanguageConfig] = {
     # "hi": LanguageConfig(  # hi-disabled
     #     language="hi", tts_voice="hi-IN-SwaraNeural", display_name="हिन्दी"  # hi-disabled
     # ),  # hi-disabled
-    "ur": LanguageConfig(
+    "ur": LanguageConfig(  # no Piper Urdu voice — Edge TTS only
         language="ur", tts_voice="ur-PK-UzmaNeural", display_name="اردو"
     ),
     "en": LanguageConfig(
-        language="en", tts_voice="en-US-ChristopherNeural", display_name="English"
+        language="en", tts_voice="en-US-ChristopherNeural", display_name="English",
+        local_voice="en_US-lessac-medium",
     ),
     "es": LanguageConfig(
-        language="es", tts_voice="es-ES-AlvaroNeural", display_name="Español"
+        language="es", tts_voice="es-ES-AlvaroNeural", display_name="Español",
+        local_voice="es_ES-davefx-medium",
     ),
     "fr": LanguageConfig(
-        language="fr", tts_voice="fr-FR-HenriNeural", display_name="Français"
+        language="fr", tts_voice="fr-FR-HenriNeural", display_name="Français",
+        local_voice="fr_FR-siwis-medium",
     ),
     "de": LanguageConfig(
-        language="de", tts_voice="de-DE-ConradNeural", display_name="Deutsch"
+        language="de", tts_voice="de-DE-ConradNeural", display_name="Deutsch",
+        local_voice="de_DE-thorsten-medium",
     ),
     "zh": LanguageConfig(
-        language="zh", tts_voice="zh-CN-XiaoxiaoNeural", display_name="中文"
+        language="zh", tts_voice="zh-CN-XiaoxiaoNeural", display_name="中文",
+        local_voice="zh_CN-huayan-medium",
     ),
 }
 
@@ -101,4 +109,14 @@ TTS_INCOMPATIBLE_SCRIPTS: Dict[str, set] = {
     'zh': {'arabic', 'devanagari'},
     'ja': {'arabic', 'devanagari'},
     'ko': {'arabic', 'devanagari'},
-}
\ No newline at end of file
+}
+# Sentence-final punctuation per script (keys as in LANG_SCRIPT_MAP), used to
+# split long TTS text. These end a sentence where they stand — Urdu "۔" and
+# CJK "。" take no trailing space. ASCII ".!?" additionally end a sentence in
+# every script, but only when followed by whitespace (so "2.5" stays whole).
+SENTENCE_TERMINATORS: Dict["str | None", str] = {
+    'latin': '',
+    'arabic': '۔؟',
+    'devanagari': '।॥',
+    None: '。！？；',
+}
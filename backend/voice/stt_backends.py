@@ -0,0 +1,165 @@
+"""
+Pluggable speech-to-text backends.
+
+Every backend loads a Whisper checkpoint into a (processor, model) pair that
+``STTService`` drives unchanged: the processor extracts features and decodes
+tokens, the model exposes ``generate``. Backends differ in how the model is
+held in memory and executed:
+
+- ``transformers``: the Hugging Face checkpoint in fp32, as before
+- ``int8``: the same checkpoint with every ``torch.nn.Linear`` replaced by a
+  dynamically quantized int8 Linear (weights stored in int8, activations
+  quantized on the fly). Whisper's encoder and decoder are dominated by
+  Linear layers, so CPU inference gets ~2x faster and the model ~3x smaller,
+  which is what makes whisper-small/medium affordable on a CPU pod. Dynamic
+  quantization runs on CPU only.
+
+``benchmarks/stt_backends.py`` compares WER and latency of backends and
+checkpoints on fixture clips.
+
+Configuration (env):
+    STT_BACKEND    transformers | int8 (default transformers)
+    STT_MODEL_ID   Whisper checkpoint to load (default openai/whisper-base)
+"""
+
+from __future__ import annotations
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_ID = "openai/whisper-base"
+
+
+class STTBackendError(RuntimeError):
+    """The requested STT backend cannot be used in this environment."""
+
+
+@dataclass
+class LoadedSTT:
+    backend: str
+    model_id: str
+    processor: Any
+    model: Any
+    device: str
+    load_seconds: float = 0.0
+
+    @property
+    def parameter_bytes(self) -> int:
+        """Bytes held by weights, counting packed int8 weights of quantized layers."""
+        state = self.model.state_dict()
+        total = 0
+        for value in state.values():
+            if hasattr(value, "element_size"):
+                total += value.element_size() * value.nelement()
+            elif isinstance(value, tuple):  # packed (weight, bias) of quantized Linear
+                total += sum(v.element_size() * v.nelement() for v in value if hasattr(v, "nelement"))
+        return total
+
+
+class STTBackend:
+    """A way of loading and executing a Whisper checkpoint."""
+
+    name = "base"
+
+    def available(self) -> bool:
+        raise NotImplementedError
+
+    def load(self, model_id: str, device: str) -> LoadedSTT:
+        raise NotImplementedError
+
+
+class TransformersSTTBackend(STTBackend):
+    """Hugging Face transformers checkpoint in full precision."""
+
+    name = "transformers"
+
+    def available(self) -> bool:
+        try:
+            import torch  # noqa: F401
+            import transformers  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _load_fp32(self, model_id: str, device: str):
+        from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
+
+        processor = AutoProcessor.from_pretrained(model_id)
+        model = AutoModelForSpeechSeq2Seq.from_pretrained(model_id).to(device)
+        model.eval()
+        return processor, model
+
+    def load(self, model_id: str, device: str) -> LoadedSTT:
+        started = time.perf_counter()
+        processor, model = self._load_fp32(model_id, device)
+        return LoadedSTT(self.name, model_id, processor, model, device, time.perf_counter() - started)
+
+
+class QuantizedSTTBackend(TransformersSTTBackend):
+    """transformers checkpoint with int8 dynamic quantization of Linear layers."""
+
+    name = "int8"
+
+    def available(self) -> bool:
+        if not super().available():
+            return False
+        import torch
+
+        return bool(torch.backends.quantized.supported_engines)
+
+    def load(self, model_id: str, device: str) -> LoadedSTT:
+        import torch
+
+        if device != "cpu":
+            logger.warning(f"[STT] int8 dynamic quantization is CPU-only; ignoring device {device}")
+            device = "cpu"
+        engines = torch.backends.quantized.supported_engines
+        for engine in ("fbgemm", "x86", "qnnpack"):
+            if engine in engines:
+                torch.backends.quantized.engine = engine
+                break
+
+        started = time.perf_counter()
+        processor, model = self._load_fp32(model_id, device)
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.eval()
+        return LoadedSTT(self.name, model_id, processor, model, device, time.perf_counter() - started)
+
+
+STT_BACKENDS: Dict[str, Type[STTBackend]] = {
+    TransformersSTTBackend.name: TransformersSTTBackend,
+    QuantizedSTTBackend.name: QuantizedSTTBackend,
+}
+
+
+def get_stt_backend(name: Optional[str] = None) -> STTBackend:
+    name = (name or os.getenv("STT_BACKEND", TransformersSTTBackend.name)).strip().lower()
+    if name not in STT_BACKENDS:
+        raise STTBackendError(
+            f"Unknown STT backend '{name}' (choose from {', '.join(STT_BACKENDS)})"
+        )
+    return STT_BACKENDS[name]()
+
+
+def load_stt(
+    backend: Optional[str] = None, model_id: Optional[str] = None, device: str = "cpu"
+) -> LoadedSTT:
+    """
+    Load the configured checkpoint with the configured backend. A backend
+    that cannot run here falls back to plain transformers.
+    """
+    selected = get_stt_backend(backend)
+    model_id = model_id or os.getenv("STT_MODEL_ID", DEFAULT_MODEL_ID)
+    if not selected.available():
+        logger.warning(f"[STT] Backend '{selected.name}' unavailable, using transformers")
+        selected = TransformersSTTBackend()
+    loaded = selected.load(model_id, device)
+    logger.info(
+        f"[STT] {loaded.model_id} loaded with {loaded.backend} on {loaded.device} "
+        f"in {loaded.load_seconds:.1f}s"
+    )
+    return loaded
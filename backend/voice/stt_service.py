@@ -0,0 +1,426 @@
+"""
+Batched Whisper transcription on a dedicated executor.
+
+``transcribe_audio`` used to run the processor and ``model.generate`` inline
+in the async handler, one clip at a time, blocking the event loop while
+concurrent speakers queued behind each other. Here clips are submitted to a
+queue; a batcher task drains it into micro-batches (up to STT_MAX_BATCH
+clips, waiting at most STT_BATCH_WAIT_MS for company), groups each batch by
+forced language so every row shares the same ``forced_decoder_ids``, and runs
+feature extraction, one padded ``generate`` call (with attention masks) and
+decoding on a single-thread executor. While a batch decodes, new clips pile
+up and form the next batch, so batch size grows with load on its own.
+
+Clips without a forced language go through a language-ID stage first: the
+Whisper encoder runs once, a single decoder step from ``<|startoftranscript|>``
+over the encoder frames of the first STT_LID_SECONDS of audio scores the
+language tokens, restricted to ``LANG_WHISPER_NAME``, and the clip is then
+decoded with ``forced_decoder_ids`` for the winner. ``generate`` is handed
+the cached encoder output, so the encoder is not run twice. Auto-detection
+can no longer wander into a language the app does not support.
+
+Every result carries per-stage timings (queue, features, language_id,
+generate, decode) and the size of the batch it rode in. Service stats sum
+the queue wait per clip and the other stages per batch.
+
+Configuration (env):
+    STT_MAX_BATCH        clips per generate call (default 8)
+    STT_BATCH_WAIT_MS    max wait for more clips once one arrives (default 15)
+    STT_MAX_NEW_LENGTH   generate max_length (default 448)
+    STT_LANGUAGE_ID      run the language-ID stage for auto-detect clips (default true)
+    STT_LID_SECONDS      audio the language-ID decoder step attends to (default 10)
+"""
+
+from __future__ import annotations
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.voice.multilingual import LANG_WHISPER_NAME
+from backend.core.runtime_config import get_thread_budget
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+ENCODER_FRAMES_PER_SECOND = 50  # Whisper: 1500 encoder positions per 30 s window
+
+STAGES = ("queue", "features", "language_id", "generate", "decode")
+
+
+@dataclass
+class TranscriptionResult:
+    text: str
+    language: Optional[str]
+    batch_size: int
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    language_probs: Optional[Dict[str, float]] = None  # set when the language was detected
+
+
+@dataclass
+class _Job:
+    audio: np.ndarray
+    whisper_language: Optional[str]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class STTService:
+    """
+    Micro-batching front end for a Whisper processor/model pair.
+
+    Args:
+        processor: transformers WhisperProcessor (or compatible).
+        model: Whisper seq2seq model with ``generate``.
+        device: Torch device the model lives on.
+        max_batch: Max clips per generate call.
+        max_wait_ms: How long the first clip of a batch waits for others.
+        max_length: generate ``max_length``.
+        lid_languages: ISO code -> Whisper name of languages auto-detection may pick.
+    """
+
+    def __init__(
+        self,
+        processor: Any,
+        model: Any,
+        device: str = "cpu",
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        max_length: Optional[int] = None,
+        lid_languages: Optional[Dict[str, str]] = None,
+    ):
+        self.processor = processor
+        self.model = model
+        self.device = device
+        self.max_batch = max_batch or int(os.getenv("STT_MAX_BATCH", "8"))
+        self.max_wait = (
+            max_wait_ms if max_wait_ms is not None else float(os.getenv("STT_BATCH_WAIT_MS", "15"))
+        ) / 1000
+        self.max_length = max_length or int(os.getenv("STT_MAX_NEW_LENGTH", "448"))
+        self.lid_enabled = os.getenv("STT_LANGUAGE_ID", "true").strip().lower() in (
+            "true", "1", "yes", "on"
+        )
+        self.lid_seconds = float(os.getenv("STT_LID_SECONDS", "10"))
+        self.lid_languages = lid_languages or LANG_WHISPER_NAME
+        self._lid_tokens: Optional[Tuple[List[str], List[int], int]] = None
+
+        # One thread: torch already parallelizes inside an op, and a single
+        # decode stream is what lets the queue build up into batches. The
+        # thread takes torch's share of the CPU budget (and cores, if pinned)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="stt",
+            initializer=get_thread_budget().init_torch_worker,
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._prompt_ids: Dict[str, Any] = {}
+        self.pending = 0  # clips submitted and not yet answered
+
+        self.stats: Dict[str, float] = {
+            "clips": 0,
+            "batches": 0,
+            "errors": 0,
+            "queue_depth": 0,
+            **{f"{stage}_ms_sum": 0.0 for stage in STAGES},
+        }
+
+    # ── Submission ───────────────────────────────────────────────────────
+
+    def _ensure_batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._batcher is None or self._batcher.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._batcher = loop.create_task(self._run())
+
+    async def transcribe(
+        self, audio: np.ndarray, whisper_language: Optional[str] = None
+    ) -> TranscriptionResult:
+        """
+        Transcribe mono float audio at 16 kHz. ``whisper_language`` is a full
+        Whisper language name ("english", "urdu") or None to auto-detect.
+        """
+        self._ensure_batcher()
+        future = self._loop.create_future()
+        self._queue.put_nowait(
+            _Job(np.asarray(audio, dtype=np.float32), whisper_language, future, time.perf_counter())
+        )
+        self.stats["queue_depth"] = self._queue.qsize()
+        self.pending += 1
+        try:
+            return await future
+        finally:
+            self.pending -= 1
+
+    async def transcribe_many(
+        self, audios: List[np.ndarray], whisper_language: Optional[str] = None
+    ) -> List[TranscriptionResult]:
+        """Submit several clips at once so they share generate calls."""
+        return list(
+            await asyncio.gather(*(self.transcribe(a, whisper_language) for a in audios))
+        )
+
+    # ── Batching ─────────────────────────────────────────────────────────
+
+    async def _next_batch(self) -> List[_Job]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self.stats["queue_depth"] = self._queue.qsize()
+            groups: Dict[Optional[str], List[_Job]] = {}
+            for job in batch:
+                groups.setdefault(job.whisper_language, []).append(job)
+            for language, jobs in groups.items():
+                jobs = [j for j in jobs if not j.future.cancelled()]
+                if not jobs:
+                    continue
+                started = time.perf_counter()
+                try:
+                    decoded, timings = await loop.run_in_executor(
+                        self._executor, self._run_batch, [j.audio for j in jobs], language
+                    )
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"[STT] Batch of {len(jobs)} failed: {e}")
+                    for job in jobs:
+                        if not job.future.done():
+                            job.future.set_exception(e)
+                    continue
+                self._record(jobs, decoded, timings, started)
+
+    def _record(self, jobs, decoded, timings, started) -> None:
+        self.stats["batches"] += 1
+        self.stats["clips"] += len(jobs)
+        for stage in STAGES[1:]:
+            self.stats[f"{stage}_ms_sum"] += timings[stage]
+        for job, (text, language, probs) in zip(jobs, decoded):
+            queue_ms = (started - job.enqueued_at) * 1000
+            self.stats["queue_ms_sum"] += queue_ms
+            if job.future.done():
+                continue
+            job.future.set_result(
+                TranscriptionResult(
+                    text=text,
+                    language=language,
+                    batch_size=len(jobs),
+                    timings_ms={
+                        "queue": round(queue_ms, 1),
+                        **{k: round(v, 1) for k, v in timings.items()},
+                    },
+                    language_probs=probs,
+                )
+            )
+
+    # ── Inference (executor thread) ──────────────────────────────────────
+
+    def _decoder_prompt(self, language: Optional[str]):
+        if language is None:
+            return None
+        if language not in self._prompt_ids:
+            self._prompt_ids[language] = self.processor.get_decoder_prompt_ids(
+                language=language, task="transcribe"
+            )
+        return self._prompt_ids[language]
+
+    def _can_identify(self) -> bool:
+        return (
+            self.lid_enabled
+            and hasattr(self.model, "get_encoder")
+            and hasattr(self.processor, "tokenizer")
+        )
+
+    def _language_tokens(self) -> Tuple[List[str], List[int], int]:
+        """(whisper names, their <|xx|> token ids, <|startoftranscript|> id)."""
+        if self._lid_tokens is None:
+            tokenizer = self.processor.tokenizer
+            names, ids = [], []
+            for code, name in sorted(self.lid_languages.items()):
+                token_id = tokenizer.convert_tokens_to_ids(f"<|{code}|>")
+                if token_id is None or token_id == tokenizer.unk_token_id:
+                    logger.warning(f"[STT] No Whisper language token for '{code}'")
+                    continue
+                names.append(name)
+                ids.append(token_id)
+            sot = tokenizer.convert_tokens_to_ids("<|startoftranscript|>")
+            self._lid_tokens = (names, ids, sot)
+        return self._lid_tokens
+
+    def _identify_languages(self, input_features, audios: List[np.ndarray]):
+        """
+        Run the encoder once for the batch, then one decoder step per clip
+        over its first ``lid_seconds`` of encoder frames. Returns the encoder
+        output (for ``generate`` to reuse) and a language distribution per clip.
+        """
+        import torch
+
+        names, token_ids, sot = self._language_tokens()
+        with torch.inference_mode():
+            encoder_outputs = self.model.get_encoder()(input_features)
+            hidden = encoder_outputs.last_hidden_state
+            start = torch.full((1, 1), sot, dtype=torch.long, device=hidden.device)
+            distributions = []
+            for row, audio in enumerate(audios):
+                seconds = min(len(audio) / SAMPLE_RATE, self.lid_seconds)
+                frames = max(math.ceil(seconds * ENCODER_FRAMES_PER_SECOND), 1)
+                logits = self.model(
+                    encoder_outputs=(hidden[row : row + 1, :frames],),
+                    decoder_input_ids=start,
+                ).logits[0, -1, token_ids]
+                probs = torch.softmax(logits.float(), dim=-1).tolist()
+                distributions.append(dict(zip(names, probs)))
+        return encoder_outputs, distributions
+
+    def _run_batch(self, audios: List[np.ndarray], language: Optional[str]):
+        t0 = time.perf_counter()
+        # Whisper pads every clip to its 30 s window; the attention mask marks
+        # the real frames so short clips in a batch decode as if alone
+        features = self.processor(
+            audios,
+            sampling_rate=SAMPLE_RATE,
+            return_tensors="pt",
+            return_attention_mask=True,
+        )
+        input_features = features.input_features.to(self.device)
+        attention_mask = features.attention_mask.to(self.device)
+        t1 = time.perf_counter()
+
+        if language is not None or not self._can_identify():
+            t2 = time.perf_counter()
+            predicted_ids = self.model.generate(
+                input_features,
+                attention_mask=attention_mask,
+                forced_decoder_ids=self._decoder_prompt(language),
+                max_length=self.max_length,
+            )
+            t3 = time.perf_counter()
+            texts = [t.strip() for t in self.processor.batch_decode(predicted_ids, skip_special_tokens=True)]
+            t4 = time.perf_counter()
+            return [(text, language, None) for text in texts], {
+                "features": (t1 - t0) * 1000,
+                "language_id": (t2 - t1) * 1000,
+                "generate": (t3 - t2) * 1000,
+                "decode": (t4 - t3) * 1000,
+            }
+
+        encoder_outputs, distributions = self._identify_languages(input_features, audios)
+        winners = [max(d, key=d.get) for d in distributions]
+        t2 = time.perf_counter()
+        decoded: List[Any] = [None] * len(audios)
+        generate_s = decode_s = 0.0
+        for winner in dict.fromkeys(winners):
+            rows = [i for i, w in enumerate(winners) if w == winner]
+            g0 = time.perf_counter()
+            predicted_ids = self.model.generate(
+                encoder_outputs=type(encoder_outputs)(
+                    last_hidden_state=encoder_outputs.last_hidden_state[rows]
+                ),
+                attention_mask=attention_mask[rows],
+                forced_decoder_ids=self._decoder_prompt(winner),
+                max_length=self.max_length,
+            )
+            g1 = time.perf_counter()
+            texts = self.processor.batch_decode(predicted_ids, skip_special_tokens=True)
+            decode_s += time.perf_counter() - g1
+            generate_s += g1 - g0
+            for row, text in zip(rows, texts):
+                decoded[row] = (text.strip(), winner, distributions[row])
+        return decoded, {
+            "features": (t1 - t0) * 1000,
+            "language_id": (t2 - t1) * 1000,
+            "generate": generate_s * 1000,
+            "decode": decode_s * 1000,
+        }
+
+    def close(self) -> None:
+        """Stop the batcher (safe from any thread) and release the executor."""
+        batcher, loop = self._batcher, self._loop
+        if batcher is not None and not batcher.done():
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(batcher.cancel)
+            else:
+                batcher.cancel()
+        self._executor.shutdown(wait=False)
+
+
+_stt_service_instance: Optional[STTService] = None
+
+
+def get_stt_service(processor: Any, model: Any, device: str = "cpu") -> STTService:
+    """Shared service for the loaded processor/model; rebuilt if they change."""
+    global _stt_service_instance
+    service = _stt_service_instance
+    if service is None or service.processor is not processor or service.model is not model:
+        if service is not None:
+            service.close()
+        _stt_service_instance = STTService(processor, model, device)
+    return _stt_service_instance
+
+
+def stt_service_stats() -> Optional[Dict[str, float]]:
+    if _stt_service_instance is None:
+        return None
+    return dict(_stt_service_instance.stats)
+
+
+_open_sessions = 0
+_sessions_lock = threading.Lock()
+
+
+@contextmanager
+def stt_session() -> Iterator[None]:
+    """
+    Marks a request or stream that uses the STT model, from before it is
+    acquired until its last clip is decoded. Opening one before acquiring
+    keeps eviction from releasing the model (and closing the shared
+    service's executor) while a handler is still reading its upload or a
+    socket is between segments.
+    """
+    global _open_sessions
+    with _sessions_lock:
+        _open_sessions += 1
+    try:
+        yield
+    finally:
+        with _sessions_lock:
+            _open_sessions -= 1
+
+
+def stt_service_busy() -> bool:
+    """True while an STT session is open or the shared service has clips in flight."""
+    if _open_sessions > 0:
+        return True
+    return _stt_service_instance is not None and _stt_service_instance.pending > 0
+
+
+def reset_stt_service() -> None:
+    """Close and drop the shared service, releasing its model references."""
+    global _stt_service_instance
+    service, _stt_service_instance = _stt_service_instance, None
+    if service is not None:
+        service.close()
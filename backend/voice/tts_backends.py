@@ -0,0 +1,384 @@
+"""
+Pluggable text-to-speech backends with failover and latency-aware routing.
+
+Backends:
+
+- ``edge``:  Microsoft Edge TTS (remote, neural voices; ``LanguageConfig.tts_voice``)
+- ``local``: Piper ONNX voices synthesized on the CPU and encoded to MP3 with
+             soundfile (``LanguageConfig.local_voice``; needs the optional
+             ``piper-tts`` package and ``<voice>.onnx`` in TTS_LOCAL_VOICES_DIR)
+
+The router builds an ordered candidate list per language — the language's
+``tts_backends`` from LANGS, else TTS_BACKENDS — keeping only backends that
+are installed and have a voice for it. The first synthesis call of a request
+tries the candidates in turn until one produces its first chunk within
+TTS_FIRST_CHUNK_TIMEOUT; that backend is then pinned for the rest of the
+request, so a sentence-by-sentence stream never mixes Edge and Piper MP3
+encodings. Once audio has started there is no switching.
+
+Routing follows the configured order, except that a backend whose
+time-to-first-chunk EWMA exceeds TTS_LATENCY_BUDGET_MS, or which failed
+TTS_FAILURE_THRESHOLD times in a row (and is cooling down), is moved behind
+the healthy ones. Every TTS_PROBE_EVERY-th selection tries a demoted backend
+first so it can recover.
+
+Configuration (env):
+    TTS_BACKENDS              default backend order (default "edge,local")
+    TTS_LOCAL_VOICES_DIR      Piper voice models (default models/piper)
+    TTS_FIRST_CHUNK_TIMEOUT   seconds before failing over (default 5)
+    TTS_LATENCY_BUDGET_MS     first-chunk latency above which a backend is demoted (default 1500)
+    TTS_FAILURE_THRESHOLD     consecutive failures before cooldown (default 3)
+    TTS_FAILURE_COOLDOWN      seconds a failing backend stays demoted (default 30)
+    TTS_PROBE_EVERY           selections between probes of a demoted backend (default 20)
+"""
+
+from __future__ import annotations
+import io
+import os
+import time
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from backend.voice.multilingual import LanguageConfig
+from backend.voice.tts_cache import TTS_FORMAT
+
+logger = logging.getLogger(__name__)
+
+
+class TTSBackendError(RuntimeError):
+    """No backend could synthesize the text."""
+
+
+class TTSBackend:
+    """A speech synthesizer producing MP3 chunks for a voice."""
+
+    name = "base"
+    format = ""
+
+    def available(self) -> bool:
+        return True
+
+    def voice_for(self, lang_config: LanguageConfig) -> Optional[str]:
+        raise NotImplementedError
+
+    def synthesize(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+
+class EdgeTTSBackend(TTSBackend):
+    """Microsoft Edge TTS over its websocket service."""
+
+    name = "edge"
+    format = TTS_FORMAT
+
+    def __init__(self):
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            import edge_tts
+
+            self._module = edge_tts
+        return self._module
+
+    def available(self) -> bool:
+        try:
+            self._load()
+        except ImportError:
+            return False
+        return True
+
+    def voice_for(self, lang_config: LanguageConfig) -> Optional[str]:
+        return lang_config.tts_voice
+
+    async def synthesize(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        communicate = self._load().Communicate(text=text, voice=voice)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+
+class PiperTTSBackend(TTSBackend):
+    """
+    Local Piper voices. Synthesis runs in a worker thread; each call renders
+    its (sentence-sized) text and yields it as one MP3 clip.
+
+    Args:
+        voices_dir: Directory with ``<voice>.onnx`` and ``<voice>.onnx.json``.
+    """
+
+    name = "local"
+    format = "piper-mp3"
+
+    def __init__(self, voices_dir: Optional[str] = None):
+        self.voices_dir = Path(voices_dir or os.getenv("TTS_LOCAL_VOICES_DIR", "models/piper"))
+        self._voices: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        try:
+            import piper  # noqa: F401  (optional dependency: piper-tts)
+
+            self._installed = True
+        except ImportError:
+            self._installed = False
+
+    def available(self) -> bool:
+        return self._installed
+
+    def _model_path(self, voice: str) -> Path:
+        return self.voices_dir / f"{voice}.onnx"
+
+    def voice_for(self, lang_config: LanguageConfig) -> Optional[str]:
+        voice = lang_config.local_voice
+        if voice and self._model_path(voice).exists():
+            return voice
+        return None
+
+    def _load_voice(self, voice: str):
+        with self._lock:
+            if voice not in self._voices:
+                from piper import PiperVoice
+
+                self._voices[voice] = PiperVoice.load(str(self._model_path(voice)))
+                logger.info(f"[TTS] Loaded local voice {voice}")
+            return self._voices[voice]
+
+    def _render(self, text: str, voice: str) -> bytes:
+        import numpy as np
+        import soundfile as sf
+
+        piper_voice = self._load_voice(voice)
+        if hasattr(piper_voice, "synthesize_stream_raw"):  # piper-tts 1.2
+            pcm = b"".join(piper_voice.synthesize_stream_raw(text))
+        else:  # piper-tts >= 1.3 yields AudioChunk objects
+            pcm = b"".join(chunk.audio_int16_bytes for chunk in piper_voice.synthesize(text))
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, piper_voice.config.sample_rate, format="MP3")
+        return buffer.getvalue()
+
+    async def synthesize(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        data = await asyncio.to_thread(self._render, text, voice)
+        if data:
+            yield data
+
+
+@dataclass
+class BackendHealth:
+    """Routing state and counters for one backend."""
+
+    ttfb_ewma: Optional[float] = None
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    failovers: int = 0
+
+
+@dataclass
+class Candidate:
+    backend: TTSBackend
+    voice: str
+
+
+@dataclass
+class TTSRoute:
+    """
+    Backends chosen for one request. The first candidate's voice and format
+    identify the audio for caching; ``failed_over`` tells whether the audio
+    came from another backend. ``pinned`` is the backend that produced the
+    request's first audio; later synthesis calls use only it.
+    """
+
+    router: "TTSRouter"
+    candidates: List[Candidate]
+    failed_over: bool = False
+    used: List[str] = field(default_factory=list)
+    pinned: Optional[Candidate] = None
+    _choosing: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    @property
+    def backend(self) -> str:
+        return self.candidates[0].backend.name
+
+    @property
+    def voice(self) -> str:
+        return self.candidates[0].voice
+
+    @property
+    def format(self) -> str:
+        return self.candidates[0].backend.format
+
+    async def synthesize(self, text: str, voice: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Synthesize with failover. ``voice`` is ignored — each candidate uses
+        its own voice — so this fits the pipeline's (text, voice) signature.
+        """
+        async for chunk in self.router.stream(self, text):
+            yield chunk
+
+
+class TTSRouter:
+    """
+    Orders backends per language and runs synthesis with failover.
+
+    Args:
+        backends: Backends by name.
+        order: Default backend order.
+        first_chunk_timeout: Seconds to wait for a backend's first chunk.
+        latency_budget: First-chunk EWMA (seconds) above which a backend is demoted.
+        failure_threshold: Consecutive failures that start a cooldown.
+        cooldown: Seconds a failing backend stays demoted.
+        probe_every: Selections between probes of a demoted backend.
+    """
+
+    EWMA_ALPHA = 0.3
+
+    def __init__(
+        self,
+        backends: Dict[str, TTSBackend],
+        order: Optional[List[str]] = None,
+        first_chunk_timeout: Optional[float] = None,
+        latency_budget: Optional[float] = None,
+        failure_threshold: Optional[int] = None,
+        cooldown: Optional[float] = None,
+        probe_every: Optional[int] = None,
+    ):
+        self.backends = backends
+        self.order = order or [
+            name.strip()
+            for name in os.getenv("TTS_BACKENDS", "edge,local").split(",")
+            if name.strip()
+        ]
+        self.first_chunk_timeout = first_chunk_timeout or float(
+            os.getenv("TTS_FIRST_CHUNK_TIMEOUT", "5")
+        )
+        self.latency_budget = latency_budget or float(
+            os.getenv("TTS_LATENCY_BUDGET_MS", "1500")
+        ) / 1000
+        self.failure_threshold = failure_threshold or int(os.getenv("TTS_FAILURE_THRESHOLD", "3"))
+        self.cooldown = cooldown if cooldown is not None else float(
+            os.getenv("TTS_FAILURE_COOLDOWN", "30")
+        )
+        self.probe_every = probe_every or int(os.getenv("TTS_PROBE_EVERY", "20"))
+        self.health: Dict[str, BackendHealth] = {name: BackendHealth() for name in backends}
+        self._selections = 0
+
+    def _demoted(self, name: str, now: float) -> bool:
+        health = self.health[name]
+        if health.cooldown_until > now:
+            return True
+        return health.ttfb_ewma is not None and health.ttfb_ewma > self.latency_budget
+
+    def route(self, lang_config: LanguageConfig) -> TTSRoute:
+        """Candidates for ``lang_config`` in routing order; raises TTSBackendError if none."""
+        candidates = []
+        for name in lang_config.tts_backends or self.order:
+            backend = self.backends.get(name)
+            if backend is None or not backend.available():
+                continue
+            voice = backend.voice_for(lang_config)
+            if voice:
+                candidates.append(Candidate(backend, voice))
+        if not candidates:
+            raise TTSBackendError(f"No TTS backend available for '{lang_config.language}'")
+
+        now = time.monotonic()
+        healthy = [c for c in candidates if not self._demoted(c.backend.name, now)]
+        demoted = [c for c in candidates if self._demoted(c.backend.name, now)]
+        self._selections += 1
+        if healthy and demoted and self._selections % self.probe_every == 0:
+            return TTSRoute(self, demoted[:1] + healthy + demoted[1:])
+        return TTSRoute(self, healthy + demoted)
+
+    def _record_success(self, name: str, ttfb: float) -> None:
+        health = self.health[name]
+        health.consecutive_failures = 0
+        health.cooldown_until = 0.0
+        health.ttfb_ewma = (
+            ttfb
+            if health.ttfb_ewma is None
+            else self.EWMA_ALPHA * ttfb + (1 - self.EWMA_ALPHA) * health.ttfb_ewma
+        )
+
+    def _record_failure(self, name: str) -> None:
+        health = self.health[name]
+        health.failures += 1
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= self.failure_threshold:
+            health.cooldown_until = time.monotonic() + self.cooldown
+
+    async def _first_chunk(self, route: TTSRoute, candidates: List[Candidate], text: str):
+        """(candidate, source, first chunk) of the first candidate to start in time."""
+        last_error: Optional[BaseException] = None
+        for candidate in candidates:
+            name = candidate.backend.name
+            health = self.health[name]
+            health.requests += 1
+            if candidate is not route.candidates[0]:
+                health.failovers += 1
+                route.failed_over = True
+            started = time.monotonic()
+            source = candidate.backend.synthesize(text, candidate.voice)
+            try:
+                first = await asyncio.wait_for(source.__anext__(), self.first_chunk_timeout)
+            except StopAsyncIteration:
+                last_error = TTSBackendError(f"{name} returned no audio")
+            except Exception as e:  # includes asyncio.TimeoutError
+                last_error = e
+            else:
+                self._record_success(name, time.monotonic() - started)
+                if name not in route.used:
+                    route.used.append(name)
+                return candidate, source, first
+            await source.aclose()
+            self._record_failure(name)
+            logger.warning(f"[TTS] {name} failed for voice={candidate.voice}: {last_error!r}")
+        raise TTSBackendError(f"All TTS backends failed: {last_error!r}") from last_error
+
+    async def stream(self, route: TTSRoute, text: str) -> AsyncIterator[bytes]:
+        picked = None
+        if route.pinned is None:
+            # The first call picks the backend; concurrent sentences wait for it
+            async with route._choosing:
+                if route.pinned is None:
+                    picked = await self._first_chunk(route, route.candidates, text)
+                    route.pinned = picked[0]
+        if picked is None:
+            picked = await self._first_chunk(route, [route.pinned], text)
+        candidate, source, first = picked
+        yield first
+        try:
+            async for chunk in source:
+                yield chunk
+        except Exception:
+            self._record_failure(candidate.backend.name)
+            raise
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        return {
+            name: {
+                "requests": h.requests,
+                "failures": h.failures,
+                "failovers": h.failovers,
+                "ttfb_ewma": h.ttfb_ewma or 0.0,
+                "demoted": int(self._demoted(name, now)),
+            }
+            for name, h in self.health.items()
+        }
+
+
+_tts_router_instance: Optional[TTSRouter] = None
+
+
+def get_tts_router() -> TTSRouter:
+    global _tts_router_instance
+    if _tts_router_instance is None:
+        _tts_router_instance = TTSRouter(
+            {"edge": EdgeTTSBackend(), "local": PiperTTSBackend()}
+        )
+    return _tts_router_instance
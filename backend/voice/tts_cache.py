@@ -0,0 +1,347 @@
+"""
+Content-addressed cache for synthesized speech.
+
+The same diagnosis explanations and UI phrases are spoken over and over, so
+TTS audio is cached under sha256(normalized text, voice, output format) in
+two tiers:
+
+- memory: LRU of MP3 bytes, bounded by total size
+- disk:   one ``<key>.mp3`` per entry under TTS_CACHE_DIR, bounded by total
+          size and evicted least-recently-used (file mtime)
+
+On a miss the synthesis stream is tee'd: chunks go to the client as they
+arrive and are stored once the stream completes without error, so a failed
+or disconnected synthesis never leaves truncated audio behind. Disk writes
+are atomic (temp file + rename), so concurrent workers can share a directory.
+
+An optional warm-up list (TTS_WARMUP_FILE, JSON ``{"en": ["phrase", ...]}``)
+is synthesized in the background at startup.
+
+Configuration (env):
+    TTS_CACHE_ENABLED        default true
+    TTS_CACHE_DIR            disk tier directory (default cache/tts)
+    TTS_CACHE_MEMORY_BYTES   memory tier size (default 33554432)
+    TTS_CACHE_DISK_BYTES     disk tier size, 0 disables the tier (default 536870912)
+    TTS_CACHE_MAX_ENTRY_BYTES  larger clips are streamed but not cached (default 4194304)
+    TTS_WARMUP_FILE          phrase list synthesized at startup (default none)
+"""
+
+from __future__ import annotations
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Edge TTS default output; part of the key so a format change never serves stale audio
+TTS_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+
+
+def tts_cache_key(text: str, voice: str, fmt: str = TTS_FORMAT) -> str:
+    h = hashlib.sha256()
+    for part in (text, voice, fmt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+class TTSCache:
+    """
+    Two-tier (memory LRU + size-bounded disk) cache of synthesized audio.
+
+    Args:
+        cache_dir: Disk tier directory.
+        memory_bytes: Max total bytes held in memory.
+        disk_bytes: Max total bytes on disk; 0 disables the disk tier.
+        max_entry_bytes: Clips larger than this are not cached.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        memory_bytes: Optional[int] = None,
+        disk_bytes: Optional[int] = None,
+        max_entry_bytes: Optional[int] = None,
+    ):
+        self.cache_dir = Path(cache_dir or os.getenv("TTS_CACHE_DIR", "cache/tts"))
+        self.memory_bytes = (
+            memory_bytes
+            if memory_bytes is not None
+            else int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+        )
+        self.disk_bytes = (
+            disk_bytes
+            if disk_bytes is not None
+            else int(os.getenv("TTS_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+        )
+        self.max_entry_bytes = max_entry_bytes or int(
+            os.getenv("TTS_CACHE_MAX_ENTRY_BYTES", str(4 * 1024 * 1024))
+        )
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        # key -> file size, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "hits_memory": 0,
+            "hits_disk": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+        if self.disk_bytes > 0:
+            self._scan_disk()
+
+    # ── Disk tier ────────────────────────────────────────────────────────
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mp3"
+
+    def _scan_disk(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries: List[Tuple[float, str, int]] = []
+        for path in self.cache_dir.glob("*.mp3"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.stats["evictions"] += 1
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    # ── Memory tier ──────────────────────────────────────────────────────
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    # ── Public API ───────────────────────────────────────────────────────
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        """Memory-tier lookup only; cheap enough to call on the event loop."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits_memory"] += 1
+            return data
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Memory, then disk (promoting to memory). Disk reads block — run off-loop."""
+        return self.get_first([key])
+
+    def get_first(self, keys: List[str]) -> Optional[bytes]:
+        """
+        The first of ``keys`` held in memory, else on disk; one miss is
+        counted when none is. Disk reads block — run off-loop.
+        """
+        for key in keys:
+            data = self.get_memory(key)
+            if data is not None:
+                return data
+        for key in keys:
+            data = self._get_disk(key)
+            if data is not None:
+                return data
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _get_disk(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            on_disk = key in self._disk
+        if not on_disk:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            data = None
+        with self._lock:
+            if data:
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self._remember(key, data)
+                self.stats["hits_disk"] += 1
+                return data
+            size = self._disk.pop(key, None)  # Removed underneath us
+            if size is not None:
+                self._disk_size -= size
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store a complete clip in both tiers. Disk writes block — run off-loop."""
+        if not data or len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._remember(key, data)
+            self.stats["stores"] += 1
+        if self.disk_bytes <= 0:
+            return
+        try:
+            self._write_disk(key, data)
+        except OSError as e:
+            logger.warning(f"[TTSCache] Disk write failed for {key[:12]}: {e}")
+            return
+        with self._lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_size -= old
+            self._disk[key] = len(data)
+            self._disk_size += len(data)
+            self._evict_disk()
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    async def tee(
+        self,
+        key: str,
+        source: AsyncIterator[bytes],
+        cacheable: Optional[Callable[[], bool]] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Forward ``source`` chunk by chunk and store the concatenation once it
+        completes (and ``cacheable()`` still holds). Errors from ``source``
+        propagate and nothing is stored.
+        """
+        parts: List[bytes] = []
+        size = 0
+        async for chunk in source:
+            if size <= self.max_entry_bytes:
+                parts.append(chunk)
+                size += len(chunk)
+            yield chunk
+        if 0 < size <= self.max_entry_bytes and (cacheable is None or cacheable()):
+            await asyncio.to_thread(self.put, key, b"".join(parts))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            for key in list(self._disk):
+                try:
+                    self._path(key).unlink()
+                except FileNotFoundError:
+                    pass
+            self._disk.clear()
+            self._disk_size = 0
+
+    def usage(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_size,
+            }
+
+
+_tts_cache_instance: Optional[TTSCache] = None
+
+
+def get_tts_cache() -> Optional[TTSCache]:
+    """Shared cache, or None when TTS_CACHE_ENABLED is false."""
+    global _tts_cache_instance
+    if os.getenv("TTS_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _tts_cache_instance is None:
+        _tts_cache_instance = TTSCache()
+    return _tts_cache_instance
+
+
+# ── Warm-up ─────────────────────────────────────────────────────────────────
+
+
+def load_warmup_phrases(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """Read ``{"<lang>": ["phrase", ...]}`` from TTS_WARMUP_FILE; empty if unset."""
+    path = path or os.getenv("TTS_WARMUP_FILE")
+    if not path:
+        return {}
+    try:
+        document = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"[TTSCache] Could not read warm-up phrases from {path}: {e}")
+        return {}
+    return {
+        lang: [p for p in phrases if isinstance(p, str) and p.strip()]
+        for lang, phrases in document.items()
+        if isinstance(phrases, list)
+    }
+
+
+async def warm_up(
+    cache: TTSCache,
+    jobs: List[Tuple[str, Callable[[], AsyncIterator[bytes]]]],
+    concurrency: int = 2,
+) -> int:
+    """
+    Run every ``(key, synthesize)`` job whose key is not cached yet and store
+    its audio. Returns the number of clips stored.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    stored = 0
+
+    async def one(key: str, synthesize: Callable[[], AsyncIterator[bytes]]) -> None:
+        nonlocal stored
+        if cache.contains(key):
+            return
+        async with semaphore:
+            try:
+                async for _ in cache.tee(key, synthesize()):
+                    pass
+            except Exception as e:
+                logger.warning(f"[TTSCache] Warm-up failed for {key[:12]}: {e}")
+                return
+        if cache.contains(key):
+            stored += 1
+
+    await asyncio.gather(*(one(key, synthesize) for key, synthesize in jobs))
+    logger.info(f"[TTSCache] Warm-up stored {stored}/{len(jobs)} clips")
+    return stored
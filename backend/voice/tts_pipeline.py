@@ -0,0 +1,194 @@
+"""
+Sentence-pipelined TTS synthesis.
+
+One Edge TTS session synthesizes a 2000-character answer sequentially, so
+the client hears nothing until the service has worked through the opening
+of the text and the whole clip takes as long as its slowest stretch. Here
+the normalized text is split at sentence boundaries (script-aware, see
+SENTENCE_TERMINATORS in multilingual.py), the first sentence is synthesized
+immediately and later sentences are fetched concurrently with bounded
+parallelism. MP3 segments are streamed strictly in order: the first one
+chunk-by-chunk as it arrives, later ones from their buffers as soon as
+everything before them has been sent. MP3 frames concatenate cleanly, so
+the client sees one continuous stream.
+
+Configuration (env):
+    TTS_PIPELINE_ENABLED      default true
+    TTS_PIPELINE_CONCURRENCY  sentences synthesized at once (default 3)
+    TTS_PIPELINE_MIN_CHARS    shorter sentences are merged with the next (default 40)
+    TTS_PIPELINE_MAX_CHARS    longer sentences are split at commas/spaces (default 400)
+"""
+
+from __future__ import annotations
+import os
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, List, Optional
+
+from backend.voice.multilingual import LANG_SCRIPT_MAP, SENTENCE_TERMINATORS
+
+logger = logging.getLogger(__name__)
+
+# A period after these does not end a sentence
+_ABBREVIATIONS = frozenset(
+    "dr mr mrs ms prof st vs etc approx fig vol e.g i.e cf".split()
+)
+_SOFT_TERMINATORS = ".!?"
+_CLOSERS = "\"')]”’»」』"
+_BREAKS = ",;:،、，"
+
+Synthesizer = Callable[[str, str], AsyncIterator[bytes]]
+
+
+def pipeline_enabled() -> bool:
+    return os.getenv("TTS_PIPELINE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def _ends_with_abbreviation(text: str) -> bool:
+    words = text[:-1].rsplit(None, 1)
+    word = words[-1].lower() if words else ""
+    return word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+def split_sentences(text: str, language: Optional[str] = "en") -> List[str]:
+    """Split ``text`` after sentence-final punctuation for ``language``'s script."""
+    hard = SENTENCE_TERMINATORS.get(LANG_SCRIPT_MAP.get(language or "en", "latin"), "")
+    sentences: List[str] = []
+    start = 0
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        end = None
+        if ch in hard:
+            end = i + 1
+        elif ch in _SOFT_TERMINATORS:
+            j = i + 1
+            while j < n and text[j] in _SOFT_TERMINATORS:
+                j += 1
+            while j < n and text[j] in _CLOSERS:
+                j += 1
+            if (j == n or text[j].isspace()) and not (
+                ch == "." and _ends_with_abbreviation(text[start : i + 1])
+            ):
+                end = j
+        if end is not None:
+            while end < n and text[end] in _CLOSERS:
+                end += 1
+            sentence = text[start:end].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = i = end
+            continue
+        i += 1
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    parts: List[str] = []
+    while len(sentence) > max_chars:
+        window = sentence[:max_chars]
+        cut = max(window.rfind(c) for c in _BREAKS)
+        if cut < max_chars // 3:
+            cut = window.rfind(" ")
+        if cut < max_chars // 3:
+            cut = max_chars - 1
+        parts.append(sentence[: cut + 1].strip())
+        sentence = sentence[cut + 1 :].strip()
+    if sentence:
+        parts.append(sentence)
+    return parts
+
+
+def plan_segments(
+    text: str,
+    language: Optional[str] = "en",
+    min_chars: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> List[str]:
+    """
+    Sentences grouped into synthesis segments: fragments shorter than
+    ``min_chars`` are merged forward, runs longer than ``max_chars`` split.
+    """
+    min_chars = min_chars if min_chars is not None else int(os.getenv("TTS_PIPELINE_MIN_CHARS", "40"))
+    max_chars = max_chars or int(os.getenv("TTS_PIPELINE_MAX_CHARS", "400"))
+    joiner = "" if LANG_SCRIPT_MAP.get(language or "en", "latin") is None else " "
+
+    segments: List[str] = []
+    pending = ""
+    for sentence in split_sentences(text, language):
+        for part in _split_long(sentence, max_chars):
+            pending = f"{pending}{joiner}{part}" if pending else part
+            if len(pending) >= min_chars:
+                segments.append(pending)
+                pending = ""
+    if pending:
+        if segments and len(segments[-1]) + len(pending) <= max_chars:
+            segments[-1] = f"{segments[-1]}{joiner}{pending}"
+        else:
+            segments.append(pending)
+    return segments
+
+
+_DONE = object()
+
+
+async def pipelined_synthesis(
+    segments: List[str],
+    voice: str,
+    synthesize: Synthesizer,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Synthesize ``segments`` with up to ``concurrency`` sessions in flight and
+    yield their audio in order. The first error from any segment is raised
+    once the stream reaches it; closing the generator cancels pending work.
+    """
+    concurrency = concurrency or int(os.getenv("TTS_PIPELINE_CONCURRENCY", "3"))
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    queues: List[asyncio.Queue] = [asyncio.Queue() for _ in segments]
+
+    async def produce(index: int) -> None:
+        queue = queues[index]
+        try:
+            async with semaphore:
+                async for chunk in synthesize(segments[index], voice):
+                    queue.put_nowait(chunk)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(_DONE)
+
+    # Tasks start in order, so the semaphore admits the first sentence first
+    tasks = [asyncio.ensure_future(produce(i)) for i in range(len(segments))]
+    try:
+        for queue in queues:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def speech_stream(
+    text: str,
+    voice: str,
+    language: Optional[str],
+    synthesize: Synthesizer,
+) -> AsyncIterator[bytes]:
+    """Pipelined synthesis when the text has several segments, else one session."""
+    if pipeline_enabled():
+        segments = plan_segments(text, language)
+        if len(segments) > 1:
+            logger.info(f"[TTSPipeline] {len(segments)} segments for voice={voice}")
+            return pipelined_synthesis(segments, voice, synthesize)
+    return synthesize(text, voice)
@@ -0,0 +1,382 @@
+"""
+Energy-based voice activity detection for streamed PCM.
+
+``EnergyVAD`` consumes 16 kHz mono float frames as they arrive and cuts them
+into speech segments, so each segment can be decoded as soon as the speaker
+pauses instead of after the whole utterance is uploaded:
+
+- every frame's RMS (``NoiseEstimator.estimate_rms``) is compared with
+  ``NoiseEstimator.adaptive_threshold`` of a running noise floor, never
+  below VAD_MIN_RMS
+- the noise floor tracks non-speech frames only; it falls quickly and rises
+  slowly, so a burst of speech does not raise it
+- a segment opens after VAD_ONSET_MS of consecutive voiced frames and keeps
+  VAD_PREROLL_MS of audio from before the onset so soft word starts survive
+- it closes after VAD_HANGOVER_MS of non-speech, or is cut at
+  VAD_MAX_SEGMENT_SECONDS so one long monologue still streams
+- while a segment is open, a ``partial`` event carries the audio so far
+  every VAD_PARTIAL_MS
+
+``trim_silence`` is the offline counterpart for whole uploads: one
+vectorized pass computes every frame's RMS, the noise floor is taken from
+the quietest frames, and leading/trailing non-speech is cut while internal
+pauses longer than VAD_TRIM_MAX_GAP_MS are collapsed to VAD_TRIM_KEEP_GAP_MS.
+Whisper then spends encoder and decoder time on speech only, and clips that
+never rise above VAD_MIN_RMS never reach the model.
+
+Configuration (env):
+    VAD_FRAME_MS              analysis frame length (default 30)
+    VAD_THRESHOLD_MULTIPLIER  speech threshold as a multiple of the noise floor (default 2.5)
+    VAD_MIN_RMS               absolute speech threshold floor, float PCM (default 0.01)
+    VAD_ONSET_MS              voiced audio needed to open a segment (default 90)
+    VAD_PREROLL_MS            audio kept from before the onset (default 200)
+    VAD_HANGOVER_MS           non-speech that closes a segment (default 500)
+    VAD_PARTIAL_MS            interval between partial events (default 1000)
+    VAD_MAX_SEGMENT_SECONDS   longest segment before a forced cut (default 15)
+    STT_VAD_TRIM              trim uploads before transcription (default true)
+    VAD_TRIM_PAD_MS           audio kept around detected speech (default 200)
+    VAD_TRIM_MAX_GAP_MS       internal pauses longer than this are collapsed (default 800)
+    VAD_TRIM_KEEP_GAP_MS      what a collapsed pause is shortened to (default 300)
+    VAD_TRIM_NOISE_PERCENTILE  frame-RMS percentile taken as the noise floor (default 10)
+"""
+
+from __future__ import annotations
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from backend.voice.noise_handler import NoiseEstimator
+
+SAMPLE_RATE = 16000
+
+# Noise floor EWMA weights: follow quieter rooms fast, louder ones slowly
+_FLOOR_FALL = 0.5
+_FLOOR_RISE = 0.05
+
+
+def _env_float(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+@dataclass
+class VADEvent:
+    """
+    A snapshot of a speech segment. ``kind`` is ``partial`` while the
+    segment is still open and ``final`` once it has closed; ``start`` and
+    ``end`` are seconds from the beginning of the stream.
+    """
+
+    kind: str
+    segment: int
+    audio: np.ndarray
+    start: float
+    end: float
+
+
+class EnergyVAD:
+    """
+    Streaming speech segmenter. Call ``feed`` with each chunk of samples and
+    ``flush`` at end of stream; both return the events the audio completed.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: Optional[float] = None,
+        threshold_multiplier: Optional[float] = None,
+        min_rms: Optional[float] = None,
+        onset_ms: Optional[float] = None,
+        preroll_ms: Optional[float] = None,
+        hangover_ms: Optional[float] = None,
+        partial_ms: Optional[float] = None,
+        max_segment_s: Optional[float] = None,
+        estimator: Optional[NoiseEstimator] = None,
+    ):
+        self.sample_rate = sample_rate
+        frame_ms = frame_ms or _env_float("VAD_FRAME_MS", "30")
+        self.frame = max(int(sample_rate * frame_ms / 1000), 1)
+        self.multiplier = threshold_multiplier or _env_float("VAD_THRESHOLD_MULTIPLIER", "2.5")
+        self.min_rms = min_rms if min_rms is not None else _env_float("VAD_MIN_RMS", "0.01")
+
+        def frames(ms: Optional[float], env: str, default: str) -> int:
+            value = ms if ms is not None else _env_float(env, default)
+            return max(int(round(value / frame_ms)), 0)
+
+        self.onset_frames = max(frames(onset_ms, "VAD_ONSET_MS", "90"), 1)
+        self.preroll_frames = frames(preroll_ms, "VAD_PREROLL_MS", "200")
+        self.hangover_frames = max(frames(hangover_ms, "VAD_HANGOVER_MS", "500"), 1)
+        self.partial_frames = frames(partial_ms, "VAD_PARTIAL_MS", "1000")
+        self.max_frames = max(
+            int((max_segment_s or _env_float("VAD_MAX_SEGMENT_SECONDS", "15")) * 1000 / frame_ms),
+            self.onset_frames,
+        )
+        self.estimator = estimator or NoiseEstimator()
+
+        self.noise_floor = self.min_rms / self.multiplier
+        self.segments = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._frames_seen = 0
+        self._preroll: Deque[np.ndarray] = deque(maxlen=self.preroll_frames)
+        self._onset: List[np.ndarray] = []
+        self._speech: List[np.ndarray] = []
+        self._active = False
+        self._speech_start = 0
+        self._silent_run = 0
+        self._since_partial = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return self._active
+
+    def threshold(self) -> float:
+        return max(self.estimator.adaptive_threshold(self.noise_floor, self.multiplier), self.min_rms)
+
+    # ── Streaming ────────────────────────────────────────────────────────
+
+    def feed(self, samples: np.ndarray) -> List[VADEvent]:
+        """Consume mono float samples; return the events they completed."""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if self._pending.size:
+            samples = np.concatenate([self._pending, samples])
+        usable = len(samples) - len(samples) % self.frame
+        self._pending = samples[usable:].copy()
+        events: List[VADEvent] = []
+        for offset in range(0, usable, self.frame):
+            event = self._step(samples[offset : offset + self.frame])
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[VADEvent]:
+        """End of stream: close the open segment, if any."""
+        if self._pending.size and self._active:
+            self._speech.append(self._pending)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._onset = []
+        if not self._speech:
+            self._active = False
+            return []
+        return [self._close()]
+
+    # ── Per frame ────────────────────────────────────────────────────────
+
+    def _step(self, frame: np.ndarray) -> Optional[VADEvent]:
+        index = self._frames_seen
+        self._frames_seen += 1
+        voiced = self.estimator.estimate_rms(frame) > self.threshold()
+
+        if not self._active:
+            if voiced:
+                self._onset.append(frame)
+                if len(self._onset) >= self.onset_frames:
+                    self._open(index + 1 - len(self._onset))
+                return None
+            for held in self._onset:
+                self._preroll.append(held)
+            self._onset = []
+            self._track_floor(frame)
+            self._preroll.append(frame)
+            return None
+
+        self._speech.append(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if not voiced:
+            self._track_floor(frame)
+        if self._silent_run >= self.hangover_frames:
+            return self._close()
+        if len(self._speech) >= self.max_frames:
+            event = self._close()
+            # Still talking: the next segment starts right at the cut
+            if voiced:
+                self._active = True
+                self._speech_start = self._frames_seen * self.frame
+            return event
+        self._since_partial += 1
+        if self.partial_frames and self._since_partial >= self.partial_frames:
+            self._since_partial = 0
+            return self._event("partial")
+        return None
+
+    def _track_floor(self, frame: np.ndarray) -> None:
+        rms = self.estimator.estimate_rms(frame)
+        alpha = _FLOOR_FALL if rms < self.noise_floor else _FLOOR_RISE
+        self.noise_floor += alpha * (rms - self.noise_floor)
+
+    def _open(self, onset_index: int) -> None:
+        preroll = list(self._preroll)
+        self._preroll.clear()
+        self._speech = preroll + self._onset
+        self._active = True
+        self._onset = []
+        self._speech_start = (onset_index - len(preroll)) * self.frame
+        self._silent_run = 0
+        self._since_partial = 0
+
+    def _event(self, kind: str) -> VADEvent:
+        audio = np.concatenate(self._speech)
+        return VADEvent(
+            kind=kind,
+            segment=self.segments,
+            audio=audio,
+            start=self._speech_start / self.sample_rate,
+            end=(self._speech_start + len(audio)) / self.sample_rate,
+        )
+
+    def _close(self) -> VADEvent:
+        event = self._event("final")
+        self.segments += 1
+        self._speech = []
+        self._active = False
+        self._silent_run = 0
+        self._since_partial = 0
+        return event
+
+
+# ── Offline trimming ─────────────────────────────────────────────────────
+
+WHISPER_WINDOW_SECONDS = 30
+
+trim_stats: Dict[str, float] = {
+    "clips": 0,
+    "silent_clips": 0,
+    "input_seconds": 0.0,
+    "kept_seconds": 0.0,
+    "windows_saved": 0,
+}
+
+
+def trim_enabled() -> bool:
+    return os.getenv("STT_VAD_TRIM", "true").strip().lower() in ("true", "1", "yes", "on")
+
+
+@dataclass
+class TrimResult:
+    audio: np.ndarray
+    input_seconds: float
+    kept_seconds: float
+
+    @property
+    def has_speech(self) -> bool:
+        return self.audio.size > 0
+
+
+def _frame_rms(audio: np.ndarray, frame: int) -> np.ndarray:
+    """RMS of each ``frame``-sample frame; the last one is zero-padded."""
+    n_frames = -(-len(audio) // frame)
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[: len(audio)] = audio
+    frames = padded.reshape(n_frames, frame)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame)
+
+
+def speech_mask(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    frame_ms: Optional[float] = None,
+    threshold_multiplier: Optional[float] = None,
+    min_rms: Optional[float] = None,
+    noise_percentile: Optional[float] = None,
+    estimator: Optional[NoiseEstimator] = None,
+) -> np.ndarray:
+    """Per-frame voiced flags for a whole clip, from one vectorized RMS pass."""
+    frame_ms = frame_ms or _env_float("VAD_FRAME_MS", "30")
+    frame = max(int(sample_rate * frame_ms / 1000), 1)
+    multiplier = threshold_multiplier or _env_float("VAD_THRESHOLD_MULTIPLIER", "2.5")
+    min_rms = min_rms if min_rms is not None else _env_float("VAD_MIN_RMS", "0.01")
+    percentile = (
+        noise_percentile
+        if noise_percentile is not None
+        else _env_float("VAD_TRIM_NOISE_PERCENTILE", "10")
+    )
+    estimator = estimator or NoiseEstimator()
+
+    rms = _frame_rms(audio, frame)
+    if rms.size == 0:
+        return np.zeros(0, dtype=bool)
+    noise_floor = float(np.percentile(rms, percentile))
+    threshold = max(estimator.adaptive_threshold(noise_floor, multiplier), min_rms)
+    return rms > threshold
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """(start, end) frame indices of every run of True in ``mask``."""
+    edges = np.diff(np.concatenate([[False], mask, [False]]).astype(np.int8))
+    return np.stack([np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)], axis=1)
+
+
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    frame_ms: Optional[float] = None,
+    pad_ms: Optional[float] = None,
+    max_gap_ms: Optional[float] = None,
+    keep_gap_ms: Optional[float] = None,
+    onset_ms: Optional[float] = None,
+    **mask_kwargs,
+) -> TrimResult:
+    """
+    Cut leading and trailing non-speech and shorten long internal pauses.
+    A clip comes back empty only when it is quiet in absolute terms (fewer
+    than ``onset_ms`` of frames above VAD_MIN_RMS). A loud clip with no
+    frames standing out from its own noise floor (continuous speech over
+    steady noise) comes back untrimmed.
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    frame_ms = frame_ms or _env_float("VAD_FRAME_MS", "30")
+    frame = max(int(sample_rate * frame_ms / 1000), 1)
+
+    def frames(ms: Optional[float], env: str, default: str) -> int:
+        value = ms if ms is not None else _env_float(env, default)
+        return max(int(round(value / frame_ms)), 0)
+
+    pad = frames(pad_ms, "VAD_TRIM_PAD_MS", "200")
+    max_gap = frames(max_gap_ms, "VAD_TRIM_MAX_GAP_MS", "800")
+    keep_gap = min(frames(keep_gap_ms, "VAD_TRIM_KEEP_GAP_MS", "300"), max_gap)
+    onset = max(frames(onset_ms, "VAD_ONSET_MS", "90"), 1)
+
+    input_seconds = len(audio) / sample_rate
+    voiced = speech_mask(audio, sample_rate, frame_ms, **mask_kwargs)
+    if int(voiced.sum()) < onset:
+        min_rms = mask_kwargs.get("min_rms")
+        if min_rms is None:
+            min_rms = _env_float("VAD_MIN_RMS", "0.01")
+        if int((_frame_rms(audio, frame) > min_rms).sum()) < onset:
+            return TrimResult(np.zeros(0, dtype=np.float32), input_seconds, 0.0)
+        # Speech cannot be told from the noise floor; let Whisper decide
+        return TrimResult(audio, input_seconds, input_seconds)
+
+    # Grow each voiced run by ``pad`` frames on both sides
+    keep = np.zeros(len(voiced), dtype=bool)
+    for start, end in _runs(voiced):
+        keep[max(start - pad, 0) : end + pad] = True
+
+    # Long pauses between kept runs shrink to ``keep_gap`` frames, split
+    # evenly so each neighbouring word keeps some of its tail/lead-in
+    kept = _runs(keep)
+    for (_, prev_end), (next_start, _) in zip(kept, kept[1:]):
+        gap = next_start - prev_end
+        if gap > max_gap:
+            head = keep_gap // 2
+            keep[prev_end : prev_end + head] = True
+            keep[next_start - (keep_gap - head) : next_start] = True
+        else:
+            keep[prev_end:next_start] = True
+
+    sample_keep = np.repeat(keep, frame)[: len(audio)]
+    trimmed = audio[sample_keep]
+    return TrimResult(trimmed, input_seconds, len(trimmed) / sample_rate)
+
+
+def record_trim(result: TrimResult) -> None:
+    """Add one trimmed clip to ``trim_stats``."""
+    trim_stats["clips"] += 1
+    trim_stats["input_seconds"] += result.input_seconds
+    trim_stats["kept_seconds"] += result.kept_seconds
+    if not result.has_speech:
+        trim_stats["silent_clips"] += 1
+    before = -(-result.input_seconds // WHISPER_WINDOW_SECONDS) or 1
+    after = -(-result.kept_seconds // WHISPER_WINDOW_SECONDS) if result.has_speech else 0
+    trim_stats["windows_saved"] += int(max(before - after, 0))
@@ -0,0 +1,150 @@
+"""
+Benchmark audio ingest on common browser recordings: the legacy decode
+(sf.read float64, librosa.resample on every channel, then average) against
+backend.voice.audio_ingest with soxr and polyphase resampling, and
+incremental decoding. Reports mean decode time, real-time factor and peak
+Python-tracked memory per clip.
+
+Usage:
+    python benchmarks/audio_ingest.py --seconds 20 --repeats 5
+    python benchmarks/audio_ingest.py --output bench_ingest.json
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.voice.audio_ingest import decode_audio, iter_decode  # noqa: E402
+
+
+def speechlike(sr: int, seconds: float, channels: int, seed: int = 3) -> np.ndarray:
+    """Amplitude-modulated harmonics plus room noise, roughly speech-shaped."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * seconds)) / sr
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 2.5 * t), 0, None)
+    mono = 0.2 * voice * envelope + rng.normal(0, 0.005, len(t))
+    return np.stack([mono * (1 - 0.2 * c) for c in range(channels)], axis=1)
+
+
+def recordings(seconds: float) -> dict:
+    clips = {}
+    for name, sr, channels, fmt, subtype in [
+        ("wav_48k_stereo", 48000, 2, "WAV", "PCM_16"),
+        ("wav_48k_mono", 48000, 1, "WAV", "PCM_16"),
+        ("wav_44k_stereo", 44100, 2, "WAV", "PCM_16"),
+        ("opus_48k_stereo", 48000, 2, "OGG", "OPUS"),
+    ]:
+        buf = io.BytesIO()
+        sf.write(buf, speechlike(sr, seconds, channels), sr, format=fmt, subtype=subtype)
+        clips[name] = buf.getvalue()
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        webm = subprocess.run(
+            [ffmpeg, "-loglevel", "error", "-f", "ogg", "-i", "pipe:0",
+             "-c:a", "copy", "-f", "webm", "pipe:1"],
+            input=clips["opus_48k_stereo"], capture_output=True, check=True,
+        ).stdout
+        clips["webm_opus_48k_stereo"] = webm
+    return clips
+
+
+def legacy_decode(raw: bytes) -> np.ndarray:
+    import librosa
+
+    audio, sr = sf.read(io.BytesIO(raw))
+    if sr != 16000:
+        audio = librosa.resample(y=audio.T, orig_sr=sr, target_sr=16000).T
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    return audio
+
+
+def incremental_decode(raw: bytes) -> np.ndarray:
+    return np.concatenate(list(iter_decode(raw)))
+
+
+def measure(fn, raw: bytes, repeats: int, env: dict) -> dict:
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        fn(raw)  # warm-up: imports, filter design
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            out = fn(raw)
+            times.append(time.perf_counter() - t0)
+        tracemalloc.start()
+        fn(raw)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return {"ms": float(np.mean(times)) * 1000, "peak_mb": peak / 1e6, "dtype": str(out.dtype)}
+
+
+def run(seconds: float, repeats: int) -> dict:
+    variants = {
+        "legacy": (legacy_decode, {}),
+        "ingest_soxr": (decode_audio, {"AUDIO_RESAMPLER": "soxr"}),
+        "ingest_polyphase": (decode_audio, {"AUDIO_RESAMPLER": "polyphase"}),
+        "ingest_incremental": (incremental_decode, {"AUDIO_RESAMPLER": "soxr"}),
+    }
+    report = {"seconds": seconds, "repeats": repeats, "clips": {}}
+    for name, raw in recordings(seconds).items():
+        rows = {}
+        for variant, (fn, env) in variants.items():
+            try:
+                r = measure(fn, raw, repeats, env)
+            except Exception as e:  # legacy path cannot read WebM
+                rows[variant] = {"error": str(e)[:120]}
+                continue
+            rows[variant] = {
+                "decode_ms": round(r["ms"], 2),
+                "realtime_factor": round(seconds * 1000 / r["ms"], 1),
+                "peak_mb": round(r["peak_mb"], 2),
+                "dtype": r["dtype"],
+            }
+        legacy = rows.get("legacy", {}).get("decode_ms")
+        if legacy:
+            for variant, row in rows.items():
+                if "decode_ms" in row and variant != "legacy":
+                    row["speedup_vs_legacy"] = round(legacy / row["decode_ms"], 2)
+        report["clips"][name] = {"bytes": len(raw), **rows}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args.seconds, args.repeats)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark sealed audit segments: compression ratio, sealing throughput,
+verification throughput (sequential vs parallel) and random-access latency.
+
+Usage:
+    python benchmarks/audit_segments.py --events 1000000 --segments 8 --workers 4
+    python benchmarks/audit_segments.py --events 100000 --output bench_audit.json
+"""
+
+import argparse
+import os
+import json
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.audit.audit_archive import (  # noqa: E402
+    DEFAULT_BLOCK_SIZE,
+    SealedSegment,
+    seal_closed_segments,
+    verify_log,
+)
+from backend.audit.audit_logger import hash_identifier  # noqa: E402
+from backend.audit.audit_writer import segment_name  # noqa: E402
+
+CLASSES = [
+    "01_NORMAL_LUNG",
+    "02_NORMAL_BONE",
+    "03_NORMAL_PNEUMONIA",
+    "04_LUNG_CANCER",
+    "05_FRACTURED",
+    "06_PNEUMONIA",
+]
+
+
+def generate(log_dir: Path, events: int, segments: int, seed: int = 7) -> int:
+    """Write prediction events shaped like AuditLogger.log_prediction output."""
+    rng = random.Random(seed)
+    users = [hash_identifier(f"user-{i}") for i in range(500)]
+    per_segment = events // segments
+    raw_bytes = 0
+    for s in range(segments):
+        date_str = f"2026-01-{s + 1:02d}"
+        path = log_dir / segment_name(date_str)
+        with path.open("w", encoding="utf-8") as f:
+            for i in range(per_segment):
+                event = {
+                    "event_type": "prediction",
+                    "user_id_hash": rng.choice(users),
+                    "request_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "model_version": "v1_resnet50v2",
+                    "input_hash": "%064x" % rng.getrandbits(256),
+                    "prediction": {
+                        "diagnosis": rng.choice(CLASSES),
+                        "confidence": round(rng.random(), 6),
+                    },
+                    "extra": {"modality": "CR", "anonymized": True},
+                    "timestamp": f"{date_str}T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                }
+                line = json.dumps(event) + "\n"
+                raw_bytes += len(line)
+                f.write(line)
+    return raw_bytes
+
+
+def run(events: int, segments: int, workers: int, block_size: int, reads: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        raw_bytes = generate(log_dir, events, segments)
+
+        t0 = time.perf_counter()
+        sealed = seal_closed_segments(str(log_dir), block_size=block_size)
+        seal_s = time.perf_counter() - t0
+        compressed = sum(p.stat().st_size for p in log_dir.glob("audit-*.jsonl.z"))
+
+        t0 = time.perf_counter()
+        seq = verify_log(str(log_dir), workers=1, full=True)
+        seq_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        par = verify_log(str(log_dir), workers=workers, full=True)
+        par_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        incremental = verify_log(str(log_dir), workers=workers)
+        inc_s = time.perf_counter() - t0
+
+        rng = random.Random(1)
+        readers = [SealedSegment(str(log_dir), name) for name in sealed]
+        t0 = time.perf_counter()
+        for _ in range(reads):
+            reader = rng.choice(readers)
+            reader.read(rng.randrange(max(reader.raw_size - 512, 1)), 512)
+        read_s = time.perf_counter() - t0
+
+        total_events = sum(r.events for r in seq)
+        assert all(r.ok for r in seq) and all(r.ok for r in par)
+        return {
+            "events": total_events,
+            "segments": len(sealed),
+            "block_size": block_size,
+            "raw_bytes": raw_bytes,
+            "compressed_bytes": compressed,
+            "compression_ratio": round(raw_bytes / compressed, 2),
+            "seal_mb_per_s": round(raw_bytes / seal_s / 1e6, 1),
+            "verify_sequential_events_per_s": round(total_events / seq_s),
+            "verify_parallel_events_per_s": round(total_events / par_s),
+            "verify_parallel_workers": workers,
+            "verify_incremental_noop_ms": round(inc_s * 1000, 2),
+            "verify_incremental_segments": len(incremental),
+            "random_read_512b_us": round(read_s / reads * 1e6, 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--segments", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args.events, args.segments, args.workers, args.block_size, args.reads)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
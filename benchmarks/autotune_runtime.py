@@ -0,0 +1,226 @@
+"""
+Auto-tune the CPU thread budget: sweep the TensorFlow/torch thread split and
+the STT batch size against a mixed image + voice workload, and write the
+best settings to the runtime profile the backend loads at startup
+(RUNTIME_PROFILE, default backend/runtime_profile.json).
+
+Each candidate runs in a fresh subprocess, since TensorFlow's pools cannot be
+resized once created. Within a trial, classifier requests (fixture X-ray)
+and STT requests (fixture clips, as in benchmarks/stt_backends.py) run
+concurrently for ``--seconds``. Candidates are ranked by the geometric mean
+of their image and clip throughput, each normalized to the best seen, so
+neither workload is starved to win the other.
+
+Usage:
+    python benchmarks/autotune_runtime.py
+    python benchmarks/autotune_runtime.py --budget 2 --batch-sizes 1,4,8 --seconds 20 --output bench_tune.json
+    python benchmarks/autotune_runtime.py --dry-run   # report only, keep the current profile
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.core.runtime_config import detect_cpu_budget, profile_path  # noqa: E402
+
+IMAGE = ROOT / "tests" / "fixtures" / "sample_xray.png"
+MODEL = ROOT / "backend" / "models" / "medical_model_final.keras"
+
+
+def percentile_ms(samples: list, q: float):
+    return round(float(np.percentile(samples, q)) * 1000, 1) if samples else None
+
+
+# ── One trial (subprocess) ───────────────────────────────────────────────
+
+
+def image_worker(model, batch, deadline: float, latencies: list) -> None:
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        model.predict(batch, verbose=0)
+        latencies.append(time.perf_counter() - t0)
+
+
+async def voice_worker(service, clips: list, deadline: float, latencies: list, offset: int) -> None:
+    i = offset
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        await service.transcribe(clips[i % len(clips)], "english")
+        latencies.append(time.perf_counter() - t0)
+        i += 1
+
+
+def run_trial(args) -> dict:
+    """Measure the mixed workload under the settings already in the environment."""
+    from backend.core.runtime_config import configure_runtime
+
+    budget = configure_runtime()
+    image_model = image_batch = None
+    try:
+        import tensorflow as tf
+        from backend.serving.model_server import ModelServer
+
+        budget.apply_tensorflow(tf)
+        if MODEL.exists() and IMAGE.exists():
+            image_model = tf.keras.models.load_model(str(MODEL))
+            image_batch = ModelServer().preprocess_image(IMAGE.read_bytes())
+    except ImportError:
+        pass
+
+    service = clips = None
+    try:
+        import torch
+        from backend.voice.stt_backends import load_stt
+        from backend.voice.stt_service import STTService
+        from stt_backends import load_clips
+
+        budget.apply_torch(torch)
+        clips_dir = Path(args.clips)
+        clips = [audio for _, audio, _ in load_clips(clips_dir)] if clips_dir.exists() else []
+        if clips:
+            loaded = load_stt(device="cpu")
+            service = STTService(loaded.processor, loaded.model, loaded.device)
+    except ImportError:
+        pass
+
+    image_lat, clip_lat = [], []
+
+    async def mixed():
+        if service is not None:
+            await service.transcribe(clips[0], "english")  # warm-up
+        if image_model is not None:
+            image_model.predict(image_batch, verbose=0)
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=image_worker, args=(image_model, image_batch, deadline, image_lat))
+            for _ in range(args.image_concurrency if image_model is not None else 0)
+        ]
+        for t in threads:
+            t.start()
+        if service is not None:
+            await asyncio.gather(
+                *(
+                    voice_worker(service, clips, deadline, clip_lat, i)
+                    for i in range(args.voice_concurrency)
+                )
+            )
+        await asyncio.to_thread(lambda: [t.join() for t in threads])
+
+    asyncio.run(mixed())
+    if service is not None:
+        service.close()
+    return {
+        "budget": budget.as_dict(),
+        "images_per_s": round(len(image_lat) / args.seconds, 2) if image_model is not None else None,
+        "image_p95_ms": percentile_ms(image_lat, 95),
+        "clips_per_s": round(len(clip_lat) / args.seconds, 2) if service is not None else None,
+        "clip_p95_ms": percentile_ms(clip_lat, 95),
+    }
+
+
+# ── Sweep ────────────────────────────────────────────────────────────────
+
+
+def candidates(budget: int, batch_sizes: list) -> list:
+    splits = [(t, budget - t) for t in range(1, budget)] or [(1, 1)]
+    return [
+        {
+            "CPU_BUDGET": budget,
+            "TF_INTRA_OP_THREADS": tf_threads,
+            "TORCH_THREADS": torch_threads,
+            "STT_MAX_BATCH": batch,
+        }
+        for tf_threads, torch_threads in splits
+        for batch in batch_sizes
+    ]
+
+
+def launch(settings: dict, args) -> dict:
+    env = dict(os.environ)
+    env.update({k: str(v) for k, v in settings.items()})
+    env["RUNTIME_PROFILE"] = os.devnull  # measure the candidate, not the current profile
+    cmd = [
+        sys.executable, __file__, "--trial",
+        "--seconds", str(args.seconds),
+        "--clips", args.clips,
+        "--image-concurrency", str(args.image_concurrency),
+        "--voice-concurrency", str(args.voice_concurrency),
+    ]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"settings": settings, "error": proc.stderr.strip()[-500:]}
+    return {"settings": settings, **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def score(results: list) -> None:
+    """Geometric mean of throughputs normalized to the best trial."""
+    for key in ("images_per_s", "clips_per_s"):
+        best = max((r.get(key) or 0 for r in results), default=0)
+        for r in results:
+            if best > 0:
+                r.setdefault("_norm", []).append((r.get(key) or 0) / best)
+    for r in results:
+        norm = r.pop("_norm", [])
+        r["score"] = round(math.prod(norm) ** (1 / len(norm)), 4) if norm else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget", type=int, help="CPU budget to tune for (default: detected)")
+    parser.add_argument("--batch-sizes", default="1,2,4,8", help="STT_MAX_BATCH values to try")
+    parser.add_argument("--seconds", type=float, default=15, help="Measured seconds per trial")
+    parser.add_argument("--clips", default="benchmarks/fixtures/stt")
+    parser.add_argument("--image-concurrency", type=int, default=2)
+    parser.add_argument("--voice-concurrency", type=int, default=4)
+    parser.add_argument("--profile", help="Profile to write (default: RUNTIME_PROFILE)")
+    parser.add_argument("--dry-run", action="store_true", help="Do not write the profile")
+    parser.add_argument("--output", help="Also write the JSON report here")
+    parser.add_argument("--trial", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trial:
+        print(json.dumps(run_trial(args)))
+        return
+
+    budget = args.budget or detect_cpu_budget()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    results = [launch(settings, args) for settings in candidates(budget, batch_sizes)]
+    measured = [r for r in results if "error" not in r]
+    if not measured or not any(r["images_per_s"] or r["clips_per_s"] for r in measured):
+        print(json.dumps({"budget": budget, "results": results}, indent=2))
+        parser.error("No workload could run (needs TensorFlow + the classifier and/or torch + fixture clips)")
+    score(measured)
+    best = max(measured, key=lambda r: r["score"])
+
+    report = {"budget": budget, "best": best, "results": results}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    if not args.dry_run:
+        profile = {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "generated_by": "benchmarks/autotune_runtime.py",
+            "settings": best["settings"],
+            "measured": {k: v for k, v in best.items() if k not in ("settings", "budget")},
+        }
+        path = Path(args.profile) if args.profile else profile_path()
+        path.write_text(json.dumps(profile, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Offline load test: run the backend against local stand-ins for Stack Auth,
+OpenRouter, Edge TTS and (if needed) the classifier, drive a mixed workload
+at a fixed concurrency, and report per-endpoint latency percentiles and
+throughput as JSON for comparison between commits.
+
+Stand-ins (benchmarks/standins):
+- JWKS server with a generated ES256 key. Every request carries a token it
+  signed, so ``get_current_user`` verifies for real
+- OpenAI-compatible chat completions (--llm-latency, --llm-token-delay)
+- ``edge_tts`` module (--tts-latency, --tts-chunk-delay) behind the app's
+  real Edge backend
+- a tiny generated Keras classifier when backend/models/medical_model_final.keras
+  is missing or an LFS pointer (--tiny-model forces it)
+
+Whisper loads from the local Hugging Face cache only (HF_HUB_OFFLINE). Any
+workload whose model cannot load answers 503 during warm-up; it is left out
+of the run and listed under "unavailable". Image uploads are distinct per
+request and the chat and TTS caches are off (--caches keeps them on), so
+repeated inputs are neither coalesced nor served from cache.
+
+The app runs in this process on a uvicorn thread, so the load generator
+shares its GIL. Compare reports taken on one machine with one set of
+options; the absolute numbers are not production capacity.
+
+Usage:
+    python benchmarks/loadtest.py
+    python benchmarks/loadtest.py --concurrency 16 --seconds 60 --mix image=4,explain=1,stt=2,tts=2,chat=3
+    python benchmarks/loadtest.py --output bench_load.json --baseline bench_load_main.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.standins import jwks as jwks_standin  # noqa: E402
+from benchmarks.standins import openai_mock  # noqa: E402
+from benchmarks.standins.server import serve  # noqa: E402
+from benchmarks.standins.tts import StandInTTS, edge_tts_module  # noqa: E402
+
+IMAGE = ROOT / "tests" / "fixtures" / "sample_xray.png"
+REAL_MODEL = ROOT / "backend" / "models" / "medical_model_final.keras"
+AUDIO_SUFFIXES = (".wav", ".flac", ".ogg", ".mp3")
+
+DEFAULT_MIX = "image=3,explain=1,stt=2,tts=2,chat=2,chat_stream=1"
+
+CHAT_MESSAGES = [
+    "What does this result mean?",
+    "Should I see a specialist?",
+    "What are the usual next steps?",
+    "Can you explain the confidence score?",
+]
+TTS_TEXTS = [
+    "The scan suggests pneumonia with 87% confidence. Please consult your physician.",
+    "No acute fracture is identified. Follow up if the pain persists for more than two weeks.",
+    "Findings are consistent with normal lung fields. No further imaging is required at this time.",
+]
+
+
+# ── Inputs ───────────────────────────────────────────────────────────────
+
+
+def image_variants(n: int) -> list:
+    """``n`` PNGs with identical pixels and distinct bytes (distinct upload digests)."""
+    if IMAGE.exists():
+        png = IMAGE.read_bytes()
+    else:
+        from PIL import Image
+
+        buf = io.BytesIO()
+        pixels = (np.random.default_rng(0).random((224, 224, 3)) * 255).astype(np.uint8)
+        Image.fromarray(pixels).save(buf, format="PNG")
+        png = buf.getvalue()
+    # Splice a tEXt chunk in before IEND rather than re-encoding the image n times
+    head, iend = png[:-12], png[-12:]
+    variants = []
+    for i in range(n):
+        data = b"loadtest\x00" + str(i).encode()
+        chunk = struct.pack(">I", len(data)) + b"tEXt" + data
+        chunk += struct.pack(">I", zlib.crc32(b"tEXt" + data))
+        variants.append(head + chunk + iend)
+    return variants
+
+
+def audio_clips(clips_dir: Path) -> list:
+    """Fixture clips as (filename, bytes); a synthetic 4 s clip when there are none."""
+    clips = sorted(p for p in clips_dir.glob("*") if p.suffix.lower() in AUDIO_SUFFIXES)
+    if clips:
+        return [(p.name, p.read_bytes()) for p in clips]
+    import soundfile as sf
+
+    rate = 16000
+    t = np.arange(4 * rate) / rate
+    voiced = (np.sin(2 * np.pi * 3 * t) > 0).astype(np.float32)  # 3 Hz on/off bursts
+    audio = 0.3 * voiced * np.sin(2 * np.pi * 220 * t) + 0.01 * np.random.default_rng(0).standard_normal(t.size)
+    buf = io.BytesIO()
+    sf.write(buf, audio.astype(np.float32), rate, format="WAV")
+    return [("synthetic.wav", buf.getvalue())]
+
+
+# ── Workloads ────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Sample:
+    workload: str
+    status: int
+    latency: float
+    ttfb: float
+
+
+class Workloads:
+    """Builds one request per call for each workload name."""
+
+    def __init__(self, tokens: list, images: list, clips: list):
+        self.tokens = tokens
+        self.images = images
+        self.clips = clips
+        self.n = 0
+
+    def auth(self) -> dict:
+        return {"x-stack-access-token": self.tokens[self.n % len(self.tokens)]}
+
+    def request(self, name: str) -> tuple:
+        """(method, path, httpx keyword arguments)."""
+        self.n += 1
+        n = self.n
+        if name in ("image", "explain"):
+            path = "/predict/image" if name == "image" else "/predict/explain"
+            image = self.images[n % len(self.images)]
+            return "POST", path, {"files": {"image_file": ("xray.png", image, "image/png")}, "headers": self.auth()}
+        if name == "stt":
+            filename, data = self.clips[n % len(self.clips)]
+            return "POST", "/transcribe/audio", {
+                "files": {"audio_file": (filename, data, "application/octet-stream")},
+                "params": {"language": "en"},
+            }
+        if name == "tts":
+            # Numbered so a TTS cache, if enabled, still sees distinct text
+            text = f"{TTS_TEXTS[n % len(TTS_TEXTS)]} Reference {n}."
+            return "POST", "/generate/speech", {"json": {"text": text, "language": "en"}}
+        if name in ("chat", "chat_stream"):
+            body = {
+                "message": f"{CHAT_MESSAGES[n % len(CHAT_MESSAGES)]} (#{n})",
+                "context": "Diagnosis: Pneumonia Detected (87% confidence)",
+                "language": "en",
+            }
+            path = "/chat" if name == "chat" else "/chat/stream"
+            return "POST", path, {"json": body, "headers": self.auth()}
+        raise ValueError(f"Unknown workload {name!r}")
+
+
+async def send(client, workloads: Workloads, name: str) -> Sample:
+    method, path, kwargs = workloads.request(name)
+    t0 = time.perf_counter()
+    ttfb = None
+    try:
+        async with client.stream(method, path, **kwargs) as response:
+            async for _ in response.aiter_raw():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - t0
+            status = response.status_code
+    except Exception:
+        status = 0  # connection error / timeout
+    latency = time.perf_counter() - t0
+    return Sample(name, status, latency, ttfb if ttfb is not None else latency)
+
+
+async def drive(base_url: str, workloads: Workloads, mix: dict, args) -> tuple:
+    """Warm up each workload, then run the mix for ``args.seconds``."""
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        unavailable = {}
+        for name in list(mix):
+            for _ in range(args.warmup):
+                sample = await send(client, workloads, name)
+                if not 200 <= sample.status < 300:
+                    unavailable[name] = sample.status
+                    del mix[name]
+                    break
+        if not mix:
+            return [], unavailable, 0.0
+
+        names, weights = list(mix), list(mix.values())
+        rng = random.Random(args.seed)
+        samples = []
+        started = time.perf_counter()
+        deadline = started + args.seconds
+
+        async def user():
+            while time.perf_counter() < deadline:
+                samples.append(await send(client, workloads, rng.choices(names, weights)[0]))
+
+        await asyncio.gather(*(user() for _ in range(args.concurrency)))
+        return samples, unavailable, time.perf_counter() - started
+
+
+# ── Report ───────────────────────────────────────────────────────────────
+
+
+def percentiles_ms(values: list) -> dict:
+    if not values:
+        return {}
+    arr = np.asarray(values) * 1000
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 1),
+        "p95": round(float(np.percentile(arr, 95)), 1),
+        "p99": round(float(np.percentile(arr, 99)), 1),
+        "mean": round(float(arr.mean()), 1),
+        "max": round(float(arr.max()), 1),
+    }
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    ok = [s for s in samples if 200 <= s.status < 300]
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "status": dict(Counter(str(s.status) for s in samples)),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": percentiles_ms([s.latency for s in ok]),
+        "ttfb_ms": percentiles_ms([s.ttfb for s in ok]),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> dict:
+    """Per-endpoint p95 and throughput against a baseline report."""
+    result = {}
+    for name, current in report["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base or not base.get("latency_ms") or not current.get("latency_ms"):
+            continue
+        p95_ratio = current["latency_ms"]["p95"] / max(base["latency_ms"]["p95"], 1e-9)
+        rps_ratio = current["throughput_rps"] / max(base["throughput_rps"], 1e-9)
+        result[name] = {
+            "p95_ratio": round(p95_ratio, 3),
+            "throughput_ratio": round(rps_ratio, 3),
+            "regressed": p95_ratio > 1 + tolerance or rps_ratio < 1 - tolerance,
+        }
+    return result
+
+
+# ── Setup ────────────────────────────────────────────────────────────────
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip():
+            mix[name.strip()] = float(weight or 1)
+    return {name: w for name, w in mix.items() if w > 0}
+
+
+def prepare_classifier(args, workdir: Path) -> str:
+    """'real', 'tiny' or 'missing'; sets CLASSIFIER_MODEL_PATH for the tiny model."""
+    real = REAL_MODEL.exists() and REAL_MODEL.stat().st_size > 1_000_000
+    if "CLASSIFIER_MODEL_PATH" in os.environ:
+        return "custom"
+    if real and not args.tiny_model:
+        return "real"
+    try:
+        from benchmarks.standins.tiny_model import build_tiny_classifier
+
+        path = build_tiny_classifier(workdir / "tiny_classifier.keras")
+    except ImportError:
+        return "missing"
+    os.environ["CLASSIFIER_MODEL_PATH"] = str(path)
+    return "tiny"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent virtual users")
+    parser.add_argument("--seconds", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Workload weights (default {DEFAULT_MIX})")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests per workload first")
+    parser.add_argument("--users", type=int, help="Distinct auth tokens (default: concurrency)")
+    parser.add_argument("--clips", default="benchmarks/fixtures/stt", help="Audio clips for stt")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Chat stand-in latency (s)")
+    parser.add_argument("--llm-token-delay", type=float, default=0.01, help="Chat stand-in delay per streamed word (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.15, help="TTS stand-in first-chunk latency (s)")
+    parser.add_argument("--tts-chunk-delay", type=float, default=0.01, help="TTS stand-in delay per chunk (s)")
+    parser.add_argument("--tiny-model", action="store_true", help="Use the tiny classifier even if the real one exists")
+    parser.add_argument("--caches", action="store_true", help="Keep the chat and TTS caches enabled")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier report to compare against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed p95/throughput drift vs baseline")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    workdir = Path(tempfile.mkdtemp(prefix="voxray-load-"))
+    keys = jwks_standin.TestKeys()
+    tts = StandInTTS(first_chunk_latency=args.tts_latency, per_chunk_delay=args.tts_chunk_delay)
+    llm_app = openai_mock.create_app(latency=args.llm_latency, token_delay=args.llm_token_delay)
+
+    # The app logs to stdout; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        with serve(jwks_standin.create_app(keys)) as jwks_url, serve(llm_app) as llm_url:
+            # Must be in place before the backend is imported (deps reads auth settings at import)
+            os.environ.update(
+                {
+                    "STACK_JWKS_URL": f"{jwks_url}/.well-known/jwks.json",
+                    "STACK_PROJECT_ID": keys.audience,
+                    "LLM_BASE_URL": f"{llm_url}/v1",
+                    "OPENROUTER_API_KEY": "loadtest",
+                    "TTS_BACKENDS": "edge",
+                    "HF_HUB_OFFLINE": "1",
+                    "TRANSFORMERS_OFFLINE": "1",
+                }
+            )
+            os.environ.setdefault("LOG_LEVEL", "WARNING")
+            os.environ.setdefault("TTS_CACHE_DIR", str(workdir / "tts"))
+            if not args.caches:
+                os.environ.update({"CHAT_CACHE_ENABLED": "false", "TTS_CACHE_ENABLED": "false"})
+            sys.modules["edge_tts"] = edge_tts_module(tts)
+            classifier = prepare_classifier(args, workdir)
+
+            from backend.api.main import app
+            from backend.core.runtime_config import get_thread_budget
+
+            tokens = [keys.token(f"loadtest-user-{i}") for i in range(args.users or args.concurrency)]
+            images = image_variants(256) if {"image", "explain"} & set(mix) else []
+            clips = audio_clips(Path(args.clips)) if "stt" in mix else []
+            workloads = Workloads(tokens, images, clips)
+            with serve(app, startup_timeout=600, lifespan="on") as base_url:
+                samples, unavailable, elapsed = asyncio.run(drive(base_url, workloads, mix, args))
+
+        from backend.core.logging_config import shutdown_logging
+
+        shutdown_logging()  # flush queued app logs while stdout still points at stderr
+
+    if not samples:
+        print(json.dumps({"unavailable": unavailable}, indent=2))
+        parser.error("No workload could run")
+
+    endpoints = {
+        name: summarize([s for s in samples if s.workload == name], elapsed)
+        for name in sorted({s.workload for s in samples})
+    }
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "concurrency": args.concurrency,
+            "seconds": round(elapsed, 2),
+            "mix": mix,
+            "classifier": classifier,
+            "caches": args.caches,
+            "llm_latency": args.llm_latency,
+            "tts_latency": args.tts_latency,
+            "cpu_budget": get_thread_budget().as_dict(),
+        },
+        "overall": summarize(samples, elapsed),
+        "endpoints": endpoints,
+        "unavailable": unavailable,
+        "standins": {
+            "jwks_fetches": keys.fetches,
+            "llm_calls": llm_app.state.mock.calls,
+            "llm_peak_in_flight": llm_app.state.mock.peak_in_flight,
+            "tts_calls": len(tts.calls),
+            "tts_peak_in_flight": tts.peak_in_flight,
+        },
+    }
+    regressed = False
+    if args.baseline:
+        report["baseline"] = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        regressed = any(r["regressed"] for r in report["baseline"].values())
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
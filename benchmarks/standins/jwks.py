@@ -0,0 +1,56 @@
+"""
+Stack Auth JWKS stand-in.
+
+Generates an ES256 test key, serves its public half at
+``/.well-known/jwks.json`` and signs access tokens with it, so
+``get_current_user`` runs its real verification path (JWKS fetch, signature
+check, verified-token cache) without reaching Stack Auth. Point the backend
+at it with STACK_JWKS_URL and use ``keys.audience`` as STACK_PROJECT_ID:
+
+    keys = TestKeys()
+    with serve(create_app(keys)) as base_url:
+        os.environ["STACK_JWKS_URL"] = f"{base_url}/.well-known/jwks.json"
+        headers = {"x-stack-access-token": keys.token("user-1")}
+"""
+
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import FastAPI
+
+
+@dataclass
+class TestKeys:
+    __test__ = False  # not a pytest class
+
+    audience: str = "voxray-bench"
+    kid: str = field(default_factory=lambda: f"bench-{uuid.uuid4().hex[:8]}")
+    private_key: Any = field(default_factory=lambda: ec.generate_private_key(ec.SECP256R1()))
+    fetches: int = 0
+
+    def jwks(self) -> dict:
+        jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk.update({"kid": self.kid, "alg": "ES256", "use": "sig"})
+        return {"keys": [jwk]}
+
+    def token(self, sub: str = "bench-user", ttl: float = 3600, **claims: Any) -> str:
+        now = int(time.time())
+        payload = {"sub": sub, "aud": self.audience, "iat": now, "exp": now + int(ttl), **claims}
+        return jwt.encode(payload, self.private_key, algorithm="ES256", headers={"kid": self.kid})
+
+
+def create_app(keys: TestKeys) -> FastAPI:
+    app = FastAPI(title="JWKS stand-in")
+    app.state.keys = keys
+
+    @app.get("/.well-known/jwks.json")
+    async def jwks():
+        keys.fetches += 1
+        return keys.jwks()
+
+    return app
@@ -0,0 +1,154 @@
+"""
+OpenAI-compatible chat completions stand-in.
+
+Answers POST /v1/chat/completions after a configurable latency, with a
+canned reply, and can fail the first N calls with a given status to
+exercise client retries. Requests with ``"stream": true`` get the reply as
+SSE chunks (one per word, ``token_delay`` apart), a usage chunk when
+``stream_options.include_usage`` is set, then ``data: [DONE]``.
+Run standalone with:
+
+    python -m benchmarks.standins.openai_mock --port 9100 --latency 0.3
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class MockState:
+    latency: float = 0.0
+    reply: str = "This is a stand-in response."
+    fail_first: int = 0
+    fail_status: int = 503
+    token_delay: float = 0.0
+    calls: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    requests: List[dict] = field(default_factory=list)
+
+
+def create_app(
+    latency: float = 0.0,
+    reply: str = "This is a stand-in response.",
+    fail_first: int = 0,
+    fail_status: int = 503,
+    token_delay: float = 0.0,
+) -> FastAPI:
+    app = FastAPI(title="OpenAI stand-in")
+    state = MockState(
+        latency=latency,
+        reply=reply,
+        fail_first=fail_first,
+        fail_status=fail_status,
+        token_delay=token_delay,
+    )
+    app.state.mock = state
+
+    def _stream_chunks(body: dict, completion_id: str):
+        words = state.reply.split(" ")
+        base = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stand-in"),
+        }
+
+        async def gen():
+            state.in_flight += 1
+            state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+            try:
+                await asyncio.sleep(state.latency)
+                for i, word in enumerate(words):
+                    text = word if i == 0 else " " + word
+                    chunk = {
+                        **base,
+                        "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if state.token_delay:
+                        await asyncio.sleep(state.token_delay)
+                final = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                yield f"data: {json.dumps(final)}\n\n"
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    usage = {
+                        **base,
+                        "choices": [],
+                        "usage": {
+                            "prompt_tokens": 0,
+                            "completion_tokens": len(words),
+                            "total_tokens": len(words),
+                        },
+                    }
+                    yield f"data: {json.dumps(usage)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                state.in_flight -= 1
+
+        return StreamingResponse(gen(), media_type="text/event-stream")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        state.calls += 1
+        state.requests.append(body)
+        if state.calls <= state.fail_first:
+            return JSONResponse(
+                status_code=state.fail_status,
+                content={"error": {"message": "stand-in failure", "type": "server_error"}},
+            )
+        if body.get("stream"):
+            return _stream_chunks(body, f"chatcmpl-{uuid.uuid4().hex[:12]}")
+
+        state.in_flight += 1
+        state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+        try:
+            await asyncio.sleep(state.latency)
+        finally:
+            state.in_flight -= 1
+
+        completion_tokens = len(state.reply.split())
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stand-in"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": state.reply},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in body.get("messages", [])),
+                "completion_tokens": completion_tokens,
+                "total_tokens": completion_tokens,
+            },
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible chat stand-in")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--reply", default="This is a stand-in response.")
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(latency=args.latency, reply=args.reply, token_delay=args.token_delay),
+        host="127.0.0.1",
+        port=args.port,
+    )
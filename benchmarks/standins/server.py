@@ -0,0 +1,49 @@
+"""
+Run an ASGI stand-in app on a background uvicorn server.
+
+    with serve(create_app()) as base_url:
+        ...  # talk to f"{base_url}/v1/chat/completions"
+"""
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import uvicorn
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(
+    app,
+    port: int = 0,
+    host: str = "127.0.0.1",
+    startup_timeout: float = 10.0,
+    lifespan: str = "off",
+):
+    """
+    Start ``app`` on a daemon thread, yield its base URL, stop it on exit.
+    Pass ``lifespan="on"`` for apps whose startup work must run (the backend).
+    """
+    port = port or free_port()
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan=lifespan)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.time() + startup_timeout
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError(f"Stand-in server on port {port} failed to start")
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
@@ -0,0 +1,38 @@
+"""
+A tiny stand-in for the Keras classifier.
+
+Same interface as ``medical_model_final.keras`` — 224x224x3 input, six
+softmax classes, a Sequential of [base model, pooling, head] whose base has
+a ``conv5_block3_out`` layer for Grad-CAM — but a few thousand random
+weights instead of ResNet50V2. Load it through CLASSIFIER_MODEL_PATH when
+the real model is not on disk. Predictions are meaningless; the point is to
+exercise the request path (upload, preprocessing, inference, Grad-CAM,
+overlay) offline.
+
+    path = build_tiny_classifier(Path(tmp) / "tiny.keras")
+"""
+
+from pathlib import Path
+
+
+def build_tiny_classifier(path: Path, num_classes: int = 6, seed: int = 0) -> Path:
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(shape=(224, 224, 3))
+    x = tf.keras.layers.Conv2D(8, 3, strides=4, activation="relu")(inputs)
+    x = tf.keras.layers.Conv2D(16, 3, strides=4, activation="relu", name="conv5_block3_out")(x)
+    base = tf.keras.Model(inputs, x, name="tiny_base")
+
+    model = tf.keras.Sequential(
+        [
+            base,
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(num_classes, activation="softmax"),
+        ]
+    )
+    model.build((None, 224, 224, 3))
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    model.save(str(path))
+    return path
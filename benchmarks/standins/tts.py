@@ -0,0 +1,74 @@
+"""
+Local text-to-speech stand-in.
+
+A synthesizer with the same call shape as ``edge_tts_stream(text, voice)``:
+an async iterator of MP3-like chunks. Each session waits ``first_chunk_latency``
+(the service round-trip), then emits one chunk per ``chars_per_chunk``
+characters, ``per_chunk_delay`` apart, so synthesis time grows with text
+length the way a real engine's does. Chunks embed the text they came from,
+which lets tests check ordering. Calls and peak concurrency are recorded.
+
+    tts = StandInTTS(first_chunk_latency=0.2)
+    async for chunk in tts("Hello there.", "en-US-ChristopherNeural"):
+        ...
+
+``edge_tts_module(tts)`` wraps one in the ``edge_tts`` package's interface
+(``Communicate(text, voice).stream()``), for installing in ``sys.modules``
+so the app's real Edge backend runs against it.
+"""
+
+import asyncio
+import time
+import types
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional, Tuple
+
+
+@dataclass
+class StandInTTS:
+    first_chunk_latency: float = 0.0
+    per_chunk_delay: float = 0.0
+    chars_per_chunk: int = 20
+    fail_on: Optional[str] = None
+    calls: List[Tuple[str, str]] = field(default_factory=list)
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    first_chunk_at: List[float] = field(default_factory=list)
+
+    async def __call__(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        self.calls.append((text, voice))
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.first_chunk_latency)
+            if self.fail_on is not None and self.fail_on in text:
+                raise ConnectionError(f"stand-in TTS failure for {text!r}")
+            self.first_chunk_at.append(time.perf_counter())
+            for start in range(0, max(len(text), 1), self.chars_per_chunk):
+                if start:
+                    await asyncio.sleep(self.per_chunk_delay)
+                yield frame(text[start : start + self.chars_per_chunk])
+        finally:
+            self.in_flight -= 1
+
+
+def frame(text: str) -> bytes:
+    """The bytes StandInTTS emits for a piece of text."""
+    return b"\xff\xf3" + text.encode("utf-8") + b"|"
+
+
+def edge_tts_module(tts: StandInTTS) -> types.ModuleType:
+    """A stand-in ``edge_tts`` module whose ``Communicate`` streams from ``tts``."""
+
+    class Communicate:
+        def __init__(self, text: str, voice: str, **_):
+            self.text = text
+            self.voice = voice
+
+        async def stream(self):
+            async for chunk in tts(self.text, self.voice):
+                yield {"type": "audio", "data": chunk}
+
+    module = types.ModuleType("edge_tts")
+    module.Communicate = Communicate
+    return module
@@ -0,0 +1,154 @@
+"""
+Compare STT backends and Whisper checkpoints on fixture clips: word error
+rate, per-clip latency (sequential), batched throughput, load time and
+weight memory. Run on the target CPU to pick a backend/checkpoint pair that
+is more accurate at today's latency.
+
+Fixture clips are ``<name>.wav`` (or .flac/.ogg/.mp3) next to a ``<name>.txt``
+reference transcript. ``--synthesize`` fills an empty directory with spoken
+medical sentences from Edge TTS (needs network once).
+
+Usage:
+    python benchmarks/stt_backends.py --backends transformers,int8 --models openai/whisper-base
+    python benchmarks/stt_backends.py --models openai/whisper-base,openai/whisper-small \\
+        --clips benchmarks/fixtures/stt --synthesize --output bench_stt.json
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.voice.audio_ingest import decode_audio  # noqa: E402
+from backend.voice.stt_backends import load_stt  # noqa: E402
+from backend.voice.stt_service import SAMPLE_RATE, STTService  # noqa: E402
+
+AUDIO_SUFFIXES = (".wav", ".flac", ".ogg", ".mp3")
+
+SENTENCES = [
+    "The chest radiograph shows a consolidation in the right lower lobe.",
+    "No acute fracture or dislocation is identified.",
+    "There is mild cardiomegaly without pulmonary edema.",
+    "Findings are consistent with community acquired pneumonia.",
+    "A small left pleural effusion is noted at the costophrenic angle.",
+    "The patient reports shortness of breath and a productive cough for three days.",
+    "Recommend follow up imaging in six weeks to confirm resolution.",
+    "Oxygen saturation was ninety four percent on room air.",
+]
+
+
+def normalize(text: str) -> list:
+    return re.findall(r"\w+", text.casefold())
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple:
+    """(edit distance in words, reference length)."""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1], len(ref)
+
+
+async def synthesize(clips_dir: Path) -> None:
+    from backend.voice.multilingual import LANGS
+    from backend.voice.tts_backends import EdgeTTSBackend
+
+    backend = EdgeTTSBackend()
+    clips_dir.mkdir(parents=True, exist_ok=True)
+    for i, sentence in enumerate(SENTENCES):
+        audio = b"".join([c async for c in backend.synthesize(sentence, LANGS["en"].tts_voice)])
+        (clips_dir / f"clip_{i:02d}.mp3").write_bytes(audio)
+        (clips_dir / f"clip_{i:02d}.txt").write_text(sentence + "\n", encoding="utf-8")
+
+
+def load_clips(clips_dir: Path) -> list:
+    clips = []
+    for path in sorted(clips_dir.iterdir()):
+        reference = path.with_suffix(".txt")
+        if path.suffix.lower() in AUDIO_SUFFIXES and reference.exists():
+            audio = decode_audio(path.read_bytes())
+            clips.append((path.name, audio, reference.read_text(encoding="utf-8").strip()))
+    return clips
+
+
+async def evaluate(loaded, clips: list) -> dict:
+    service = STTService(loaded.processor, loaded.model, loaded.device, max_wait_ms=0)
+    try:
+        await service.transcribe(clips[0][1], "english")  # warm-up
+
+        latencies, errors, words = [], 0, 0
+        for _, audio, reference in clips:
+            t0 = time.perf_counter()
+            result = await service.transcribe(audio, "english")
+            latencies.append(time.perf_counter() - t0)
+            e, n = word_errors(reference, result.text)
+            errors, words = errors + e, words + n
+
+        t0 = time.perf_counter()
+        await service.transcribe_many([audio for _, audio, _ in clips], "english")
+        batch_s = time.perf_counter() - t0
+    finally:
+        service.close()
+
+    audio_s = sum(len(audio) for _, audio, _ in clips) / SAMPLE_RATE
+    return {
+        "backend": loaded.backend,
+        "model": loaded.model_id,
+        "load_s": round(loaded.load_seconds, 2),
+        "weights_mb": round(loaded.parameter_bytes / 1024 / 1024, 1),
+        "wer": round(errors / max(words, 1), 4),
+        "latency_ms_mean": round(float(np.mean(latencies)) * 1000, 1),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)) * 1000, 1),
+        "realtime_factor": round(audio_s / sum(latencies), 2),
+        "batch_clips_per_s": round(len(clips) / batch_s, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backends", default="transformers,int8")
+    parser.add_argument("--models", default="openai/whisper-base")
+    parser.add_argument("--clips", default="benchmarks/fixtures/stt")
+    parser.add_argument("--synthesize", action="store_true", help="Generate fixture clips if none exist")
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    clips_dir = Path(args.clips)
+    if args.synthesize and not (clips_dir.exists() and any(clips_dir.glob("*.txt"))):
+        asyncio.run(synthesize(clips_dir))
+    if not clips_dir.exists():
+        parser.error(f"No fixture clips in {clips_dir} (pass --synthesize to generate them)")
+    clips = load_clips(clips_dir)
+    if not clips:
+        parser.error(f"No <name>.wav + <name>.txt pairs in {clips_dir}")
+
+    results = []
+    for model_id in args.models.split(","):
+        for backend in args.backends.split(","):
+            loaded = load_stt(backend.strip(), model_id.strip(), "cpu")
+            results.append(asyncio.run(evaluate(loaded, clips)))
+            del loaded
+
+    report = {
+        "clips": len(clips),
+        "audio_seconds": round(sum(len(a) for _, a, _ in clips) / SAMPLE_RATE, 1),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
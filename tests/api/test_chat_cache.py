@@ -0,0 +1,89 @@
+import time
+
+from backend.api.chat_cache import (
+    ChatAnswerCache,
+    history_is_trivial,
+    normalize_question,
+)
+
+
+def _cache(**kwargs):
+    kwargs.setdefault("max_entries", 16)
+    kwargs.setdefault("ttl", 60)
+    kwargs.setdefault("similarity_threshold", 0.8)
+    kwargs.setdefault("confidence_bucket", 10)
+    return ChatAnswerCache(**kwargs)
+
+
+def test_normalize_question_folds_case_and_punctuation():
+    assert normalize_question("  What are the SYMPTOMS?? ") == "what are the symptoms"
+    assert normalize_question("肺炎的症状是什么？") == "肺 炎 的 症 状 是 什 么"
+    # Vowel signs and viramas stay inside their words
+    assert normalize_question("क्या यह गंभीर है?") == "क्या यह गंभीर है"
+    assert normalize_question("کیا یہ سنگین ہے؟") == "کیا یہ سنگین ہے"
+    assert normalize_question("क्या यह गंभीर है") != normalize_question("क्या यह गंभीर हैं")
+
+
+def test_exact_hit_within_scope_only():
+    cache = _cache()
+    scope = cache.scope("v1", "PNEUMONIA", 91.2, "en")
+    cache.put(scope, "What are the symptoms?", "Cough and fever.")
+
+    assert cache.get(scope, "what are the symptoms") == "Cough and fever."
+    assert cache.get(cache.scope("v1", "PNEUMONIA", 95.0, "en"), "What are the symptoms?") == "Cough and fever."
+    # Different diagnosis, confidence bucket, language or route never share answers
+    assert cache.get(cache.scope("v1", "NORMAL_LUNG", 91.2, "en"), "What are the symptoms?") is None
+    assert cache.get(cache.scope("v1", "PNEUMONIA", 55.0, "en"), "What are the symptoms?") is None
+    assert cache.get(cache.scope("v1", "PNEUMONIA", 91.2, "es"), "What are the symptoms?") is None
+    assert cache.get(cache.scope("v2", "PNEUMONIA", 91.2, "en"), "What are the symptoms?") is None
+    assert cache.stats["hits_exact"] == 2
+
+
+def test_similar_questions_hit_and_different_ones_miss():
+    cache = _cache()
+    scope = cache.scope("v1", "PNEUMONIA", 90, "en")
+    cache.put(scope, "What are the symptoms?", "Cough and fever.")
+    cache.put(scope, "What are the next steps?", "See a physician.")
+
+    assert cache.get(scope, "Which symptoms are typical") == "Cough and fever."
+    assert cache.get(scope, "next steps please") == "See a physician."
+    assert cache.get(scope, "What is the treatment for children?") is None
+    assert cache.stats["hits_similar"] == 2
+    assert cache.stats["misses"] == 1
+
+
+def test_similarity_tier_can_be_disabled():
+    cache = _cache(similarity_threshold=0)
+    scope = cache.scope("v1", "PNEUMONIA", 90, "en")
+    cache.put(scope, "What are the symptoms?", "Cough and fever.")
+    assert cache.get(scope, "Which symptoms are typical") is None
+
+
+def test_ttl_expiry(monkeypatch):
+    cache = _cache(ttl=10)
+    scope = cache.scope("v1", "PNEUMONIA", 90, "en")
+    cache.put(scope, "What are the symptoms?", "Cough and fever.")
+
+    now = time.time()
+    monkeypatch.setattr("backend.api.chat_cache.time.time", lambda: now + 11)
+    assert cache.get(scope, "What are the symptoms?") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    cache = _cache(max_entries=2)
+    scope = cache.scope("v1", "PNEUMONIA", 90, "en")
+    cache.put(scope, "symptoms", "a")
+    cache.put(scope, "treatment", "b")
+    assert cache.get(scope, "symptoms") == "a"  # refresh
+    cache.put(scope, "location", "c")
+
+    assert cache.get(scope, "treatment") is None
+    assert cache.get(scope, "symptoms") == "a"
+    assert len(cache) == 2
+
+
+def test_history_is_trivial():
+    assert history_is_trivial([])
+    assert history_is_trivial([{"role": "assistant", "text": "Hello, how can I help?"}])
+    assert not history_is_trivial([{"role": "user", "text": "Is this pneumonia?"}])
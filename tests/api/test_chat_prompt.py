@@ -0,0 +1,92 @@
+from backend.api.chat_prompt import (
+    SYSTEM_PROMPT_HEADER,
+    assemble_chat_prompt,
+    count_tokens,
+    system_prefix,
+)
+
+EN = "CRITICAL: Respond ONLY in English."
+ES = "CRITICAL: Respond ONLY in Spanish (Español)."
+
+
+def _history(n, chars=200):
+    turns = []
+    for i in range(n):
+        role = "user" if i % 2 == 0 else "assistant"
+        turns.append({"role": role, "text": f"turn {i} " + "x" * chars})
+    return turns
+
+
+def test_count_tokens_is_positive_and_monotonic():
+    assert count_tokens("") == 0
+    short = count_tokens("What are the symptoms?")
+    assert 0 < short < count_tokens("What are the symptoms of pneumonia in children?")
+
+
+def test_stable_prefix_is_shared_across_scans():
+    a = assemble_chat_prompt("Hi", [], EN, diagnosis_label="PNEUMONIA", confidence=91.0)
+    b = assemble_chat_prompt("Hi", [], EN, diagnosis_label="PNEUMONIA", confidence=64.5)
+    prefix = system_prefix("PNEUMONIA", None, EN)
+
+    assert a.messages[0]["content"].startswith(SYSTEM_PROMPT_HEADER)
+    assert a.messages[0]["content"].startswith(prefix)
+    assert b.messages[0]["content"].startswith(prefix)
+    assert "AI CONFIDENCE FOR THIS SCAN: 91.0%" in a.messages[0]["content"]
+    assert system_prefix("PNEUMONIA", None, EN) is prefix  # memoized
+
+
+def test_history_fits_budget_newest_first():
+    roomy = assemble_chat_prompt("Next?", _history(6), EN, budget=100_000)
+    assert roomy.history_kept == 6
+    assert roomy.history_dropped == 0
+
+    base = assemble_chat_prompt("Next?", [], EN).prompt_tokens
+    tight = assemble_chat_prompt("Next?", _history(6), EN, budget=base + 150)
+    assert tight.prompt_tokens <= base + 150
+    assert 0 < tight.history_kept < 6
+    # The newest turn survives, the oldest does not
+    contents = [m["content"] for m in tight.messages]
+    assert any(c.startswith("turn 5") for c in contents)
+    assert not any(c.startswith("turn 0") for c in contents)
+    assert tight.messages[-1] == {"role": "user", "content": "Next?"}
+
+
+def test_dropped_turns_are_recapped_when_room():
+    prompt = assemble_chat_prompt("Next?", _history(6, chars=10), EN, max_turns=2)
+    assert prompt.summarized
+    assert prompt.history_kept == 2
+    assert "turn 0" in prompt.messages[1]["content"]
+    assert "Earlier in this conversation" in prompt.messages[1]["content"]
+    roles = [m["role"] for m in prompt.messages[1:]]
+    assert all(a != b for a, b in zip(roles, roles[1:]))  # strictly alternating
+
+
+def test_non_english_reminder_replaces_synthetic_turns():
+    first = assemble_chat_prompt("¿Síntomas?", [], ES, lang_code="es")
+    assert len(first.messages) == 2
+    assert first.messages[-1]["content"] == "¿Síntomas?"
+
+    later = assemble_chat_prompt("¿Y el tratamiento?", _history(2, chars=20), ES, lang_code="es")
+    assert len(later.messages) == 4
+    assert later.messages[-1]["content"].endswith(f"({ES})")
+    assert not any("Understood" in m["content"] for m in later.messages)
+
+
+def test_unparsed_context_is_passed_through():
+    prompt = assemble_chat_prompt("Hi", [], EN, raw_context="something odd")
+    assert prompt.messages[0]["content"].endswith("Diagnosis context provided: something odd")
+
+
+def test_only_question_relevant_passages_are_injected(monkeypatch):
+    monkeypatch.setenv("CHAT_KB_PASSAGES", "1")
+    prompt = assemble_chat_prompt("What are the symptoms?", [], EN, diagnosis_label="PNEUMONIA")
+    system = prompt.messages[0]["content"]
+    assert "TYPICAL SYMPTOMS (General Knowledge): High fever" in system
+    assert "Antibiotics (for bacterial causes)" not in system
+
+    generic = assemble_chat_prompt("What should I do now?", [], EN, diagnosis_label="PNEUMONIA")
+    assert "Antibiotics (for bacterial causes)" in generic.messages[0]["content"]
+
+    monkeypatch.setenv("CHAT_KB_PASSAGES", "0")
+    full = assemble_chat_prompt("What are the symptoms?", [], EN, diagnosis_label="PNEUMONIA")
+    assert "Antibiotics (for bacterial causes)" in full.messages[0]["content"]
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from backend.api.knowledge_index import KnowledgeBase, tokenize
+from backend.api.medical_context import (
+    CONDITION_DETAILS,
+    get_condition_info,
+    get_knowledge_base_info,
+    get_relevant_passages,
+)
+
+
+@pytest.fixture(scope="module")
+def kb():
+    return KnowledgeBase()
+
+
+def test_shipped_data_loads(kb):
+    assert set(kb.conditions) == set(CONDITION_DETAILS)
+    assert "PNEUMONIA" in kb.conditions
+    info = get_knowledge_base_info()
+    assert info["version"] == kb.version
+    assert info["conditions_count"] == len(kb.conditions)
+    assert info["files"] == ["conditions.json"]
+
+
+@pytest.mark.parametrize(
+    "label, expected",
+    [
+        ("06_PNEUMONIA", "PNEUMONIA"),
+        ("pneumonia", "PNEUMONIA"),
+        ("04_LUNG_CANCER", "LUNG_CANCER"),
+        ("lung", "NORMAL_LUNG"),
+        ("Suspected tumor", "LUNG_CANCER"),
+        ("broken-wrist", "FRACTURED"),
+        ("xyz", None),
+    ],
+)
+def test_resolve_labels(kb, label, expected):
+    assert kb.resolve(label) == expected
+
+
+def test_resolve_is_memoized(kb):
+    kb.resolve("06_PNEUMONIA")
+    before = kb.resolve.cache_info().hits
+    kb.resolve("06_PNEUMONIA")
+    assert kb.resolve.cache_info().hits == before + 1
+
+
+def test_unknown_label_falls_back():
+    info = get_condition_info("Something Rare")
+    assert "Something Rare" in info["description"]
+
+
+@pytest.mark.parametrize(
+    "question, field",
+    [
+        ("What are the symptoms?", "common_symptoms"),
+        ("How is it treated?", "standard_treatment"),
+        ("Where is it located?", "typical_location"),
+        ("What should we do next?", "next_steps"),
+        ("Could it be something else?", "differential"),
+        ("What does the x-ray show?", "radiological_features"),
+    ],
+)
+def test_search_ranks_relevant_field_first(kb, question, field):
+    hits = kb.search(question, condition="PNEUMONIA", k=3)
+    assert hits and hits[0].passage.field == field
+    assert all(h.passage.condition == "PNEUMONIA" for h in hits)
+
+
+def test_relevant_passages_respect_k_and_unknown_conditions():
+    assert len(get_relevant_passages("06_PNEUMONIA", "symptoms and treatment", k=2)) == 2
+    assert get_relevant_passages("xyz", "symptoms") == []
+
+
+@pytest.mark.parametrize(
+    "question",
+    ["hello", "What should I do now?", "¿Cuáles son los síntomas?", "क्या यह गंभीर है?"],
+)
+def test_questions_without_hits_get_the_default_passages(question):
+    hits = get_relevant_passages("06_PNEUMONIA", question)
+    assert [h.passage.field for h in hits] == [
+        "common_symptoms",
+        "standard_treatment",
+        "next_steps",
+    ]
+
+
+def test_tokenize_keeps_non_latin_words_whole():
+    assert tokenize("¿SÍNTOMAS?") == ["síntoma"]
+    assert tokenize("क्या यह गंभीर है?") == ["क्या", "यह", "गंभीर", "है"]
+    assert tokenize("肺炎") == ["肺", "炎"]
+
+
+def test_extra_files_extend_the_knowledge_base(tmp_path, kb):
+    base = json.loads((kb.kb_dir / "conditions.json").read_text(encoding="utf-8"))
+    (tmp_path / "conditions.json").write_text(json.dumps(base), encoding="utf-8")
+    (tmp_path / "zz_extra.json").write_text(
+        json.dumps(
+            {
+                "aliases": {"EFFUSION": "PLEURAL_EFFUSION"},
+                "conditions": {
+                    "PLEURAL_EFFUSION": {
+                        "description": "Fluid in the pleural space.",
+                        "common_symptoms": ["Dyspnea", "Pleuritic chest pain"],
+                    }
+                },
+            }
+        ),
+        encoding="utf-8",
+    )
+    extended = KnowledgeBase(str(tmp_path))
+    assert extended.version == kb.version
+    assert extended.resolve("07_PLEURAL_EFFUSION") == "PLEURAL_EFFUSION"
+    hits = extended.search("symptoms", condition="PLEURAL_EFFUSION", k=1)
+    assert "Dyspnea" in hits[0].passage.text
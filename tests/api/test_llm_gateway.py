@@ -0,0 +1,215 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+from backend.api.llm_gateway import LLMGateway
+from benchmarks.standins.openai_mock import create_app
+from benchmarks.standins.server import serve
+
+MESSAGES = [{"role": "user", "content": "What are the symptoms?"}]
+
+
+def _gateway(base_url, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return LLMGateway(base_url=f"{base_url}/v1", api_key="test-key", **kwargs)
+
+
+def test_complete_against_stand_in():
+    app = create_app(reply="Pneumonia typically presents with cough.")
+    with serve(app) as base_url:
+        gateway = _gateway(base_url)
+
+        async def run():
+            try:
+                return await gateway.complete(MESSAGES, max_tokens=50)
+            finally:
+                await gateway.aclose()
+
+        assert asyncio.run(run()) == "Pneumonia typically presents with cough."
+    body = app.state.mock.requests[0]
+    assert body["max_tokens"] == 50
+    assert body["messages"] == MESSAGES
+
+
+def test_concurrent_calls_overlap_but_respect_limit():
+    app = create_app(latency=0.2)
+    with serve(app) as base_url:
+        gateway = _gateway(base_url, max_concurrency=3)
+
+        async def run():
+            try:
+                start = time.perf_counter()
+                await asyncio.gather(*(gateway.complete(MESSAGES) for _ in range(6)))
+                return time.perf_counter() - start
+            finally:
+                await gateway.aclose()
+
+        elapsed = asyncio.run(run())
+    # 6 calls, 3 at a time, 0.2s each -> ~0.4s; serialized would be 1.2s
+    assert elapsed < 1.0
+    assert app.state.mock.peak_in_flight == 3
+
+
+def test_transient_errors_are_retried():
+    app = create_app(fail_first=2, fail_status=503)
+    with serve(app) as base_url:
+        gateway = _gateway(base_url, max_retries=2)
+
+        async def run():
+            try:
+                return await gateway.complete(MESSAGES)
+            finally:
+                await gateway.aclose()
+
+        assert asyncio.run(run()) == "This is a stand-in response."
+    assert app.state.mock.calls == 3
+    assert gateway.stats["retries"] == 2
+    assert gateway.stats["errors"] == 0
+
+
+def test_client_errors_are_not_retried():
+    app = create_app(fail_first=5, fail_status=400)
+    with serve(app) as base_url:
+        gateway = _gateway(base_url, max_retries=3)
+
+        async def run():
+            try:
+                await gateway.complete(MESSAGES)
+            finally:
+                await gateway.aclose()
+
+        with pytest.raises(openai.BadRequestError):
+            asyncio.run(run())
+    assert app.state.mock.calls == 1
+    assert gateway.stats["errors"] == 1
+
+
+def test_backoff_is_jittered_and_capped():
+    gateway = LLMGateway(api_key="k", backoff_base=1.0, backoff_max=4.0)
+    delays = [gateway._backoff(5, RuntimeError()) for _ in range(50)]
+    assert all(0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_stream_yields_deltas_and_records_ttft():
+    app = create_app(reply="Pneumonia typically presents with cough.", latency=0.05)
+    with serve(app) as base_url:
+        gateway = _gateway(base_url)
+        usage = {}
+
+        async def run():
+            try:
+                return [t async for t in gateway.stream(MESSAGES, usage=usage)]
+            finally:
+                await gateway.aclose()
+
+        deltas = asyncio.run(run())
+    assert len(deltas) == 5
+    assert "".join(deltas) == "Pneumonia typically presents with cough."
+    assert app.state.mock.requests[0]["stream"] is True
+    assert usage["tokens"] == 5
+    assert usage["ttft_s"] >= 0.05
+    assert gateway.stats["streams"] == 1
+    assert gateway.stats["ttft_count"] == 1
+    assert gateway.stats["stream_tokens"] == 5
+    assert gateway.stats["in_flight"] == 0
+
+
+def test_abandoned_stream_closes_the_upstream_response(monkeypatch):
+    closed = []
+    real_close = openai.AsyncStream.close
+
+    async def close(self):
+        closed.append(self)
+        await real_close(self)
+
+    monkeypatch.setattr(openai.AsyncStream, "close", close)
+    app = create_app(reply="one two three four five six", token_delay=0.05)
+    with serve(app) as base_url:
+        gateway = _gateway(base_url)
+
+        async def run():
+            try:
+                deltas = gateway.stream(MESSAGES)
+                first = await deltas.__anext__()
+                await deltas.aclose()  # what Starlette does when the client disconnects
+                return first
+            finally:
+                await gateway.aclose()
+
+        assert asyncio.run(run()).strip() == "one"
+    assert len(closed) == 1
+    assert gateway.stats["in_flight"] == 0
+
+
+def test_stream_retries_before_first_token():
+    app = create_app(fail_first=1, fail_status=503)
+    with serve(app) as base_url:
+        gateway = _gateway(base_url, max_retries=1)
+
+        async def run():
+            try:
+                return "".join([t async for t in gateway.stream(MESSAGES)])
+            finally:
+                await gateway.aclose()
+
+        assert asyncio.run(run()) == "This is a stand-in response."
+    assert gateway.stats["retries"] == 1
+
+
+def test_chat_sse_stream_event_sequence():
+    from backend.api.llm_gateway import chat_sse_stream
+
+    app = create_app(reply="Hello there")
+    with serve(app) as base_url:
+        gateway = _gateway(base_url)
+
+        async def run():
+            try:
+                return [e async for e in chat_sse_stream(gateway, MESSAGES, meta={"language": "en"})]
+            finally:
+                await gateway.aclose()
+
+        events = asyncio.run(run())
+    names = [e.split(b"\n", 1)[0] for e in events]
+    assert names == [b"event: start", b"event: delta", b"event: delta", b"event: end"]
+    assert b'"text": "Hello there"' in events[-1]
+
+
+def test_chat_sse_stream_reports_errors_as_events():
+    from backend.api.llm_gateway import chat_sse_stream
+
+    app = create_app(fail_first=5, fail_status=400)
+    with serve(app) as base_url:
+        gateway = _gateway(base_url, max_retries=0)
+
+        async def run():
+            try:
+                return [e async for e in chat_sse_stream(gateway, MESSAGES)]
+            finally:
+                await gateway.aclose()
+
+        events = asyncio.run(run())
+    assert events[-1].startswith(b"event: error")
+    assert gateway.stats["errors"] == 1
+
+
+def test_replaced_client_is_closed(monkeypatch):
+    gateway = LLMGateway(base_url="http://127.0.0.1:9/v1")
+
+    async def run():
+        monkeypatch.setenv("OPENROUTER_API_KEY", "key-1")
+        first = gateway._get_client()
+        monkeypatch.setenv("OPENROUTER_API_KEY", "key-2")
+        second = gateway._get_client()
+        for _ in range(10):
+            if first.is_closed():
+                break
+            await asyncio.sleep(0)
+        closed = first.is_closed()
+        await gateway.aclose()
+        return first is not second and closed
+
+    assert asyncio.run(run())
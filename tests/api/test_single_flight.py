@@ -0,0 +1,158 @@
+import asyncio
+
+from starlette.responses import JSONResponse, StreamingResponse
+
+from backend.api.single_flight import SharedStream, SingleFlight, digest, single_flight
+
+
+def test_digest_is_stable_and_order_insensitive_for_dicts():
+    assert digest({"a": 1, "b": 2}) == digest({"b": 2, "a": 1})
+    assert digest(b"img") != digest(b"img2")
+    assert digest("x", "y") != digest("xy")
+
+
+def test_concurrent_duplicates_share_one_run():
+    flight = SingleFlight("t")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert results == [{"ok": True}] * 5
+    assert len(calls) == 1
+    assert flight.stats == {"leaders": 1, "coalesced": 4, "cancelled": 0}
+    assert flight.in_flight() == 0
+
+
+def test_exceptions_reach_every_waiter_and_key_is_released():
+    flight = SingleFlight("t")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad image")
+
+    async def run():
+        results = await asyncio.gather(
+            *(flight.do("k", boom) for _ in range(3)), return_exceptions=True
+        )
+        again = await flight.do("k", lambda: asyncio.sleep(0, result="fresh"))
+        return results, again
+
+    results, again = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert again == "fresh"
+
+
+def test_work_is_cancelled_only_when_all_waiters_leave():
+    flight = SingleFlight("t")
+    state = {"finished": False, "cancelled": False}
+
+    async def slow():
+        try:
+            await asyncio.sleep(0.2)
+            state["finished"] = True
+            return "done"
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        a = asyncio.ensure_future(flight.do("k", slow))
+        b = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.02)
+        a.cancel()
+        assert await b == "done"  # one client leaving does not stop the other
+
+        c = asyncio.ensure_future(flight.do("k2", slow))
+        d = asyncio.ensure_future(flight.do("k2", slow))
+        await asyncio.sleep(0.02)
+        c.cancel()
+        d.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert state["finished"] and state["cancelled"]
+    assert flight.stats["cancelled"] == 1
+
+
+def test_shared_stream_replays_to_late_subscribers():
+    produced = []
+
+    async def source():
+        for i in range(3):
+            produced.append(i)
+            await asyncio.sleep(0.01)
+            yield f"c{i}".encode()
+
+    async def collect(stream):
+        return b"".join([c async for c in stream.subscribe()])
+
+    async def run():
+        shared = SharedStream(source(), expected=2)
+        first = asyncio.ensure_future(collect(shared))
+        await asyncio.sleep(0.015)
+        second = await collect(shared)
+        return await first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == b"c0c1c2"
+    assert produced == [0, 1, 2]
+
+
+def test_decorator_coalesces_json_and_streaming_handlers():
+    runs = {"json": 0, "stream": 0}
+
+    @single_flight("test_json", key=lambda text, **_: digest(text))
+    async def json_handler(text: str):
+        runs["json"] += 1
+        await asyncio.sleep(0.02)
+        return JSONResponse({"echo": text})
+
+    @single_flight("test_stream", key=lambda text, **_: digest(text))
+    async def stream_handler(text: str):
+        runs["stream"] += 1
+
+        async def body():
+            for word in text.split():
+                await asyncio.sleep(0.01)
+                yield word.encode()
+
+        return StreamingResponse(body(), media_type="audio/mpeg", headers={"X-Test": "1"})
+
+    async def drain(response):
+        return b"".join([c async for c in response.body_iterator])
+
+    async def run():
+        json_results = await asyncio.gather(*(json_handler(text="hi") for _ in range(3)))
+        responses = await asyncio.gather(*(stream_handler(text="a b c") for _ in range(3)))
+        bodies = await asyncio.gather(*(drain(r) for r in responses))
+        return json_results, responses, bodies
+
+    json_results, responses, bodies = asyncio.run(run())
+    assert runs == {"json": 1, "stream": 1}
+    assert all(r.body == b'{"echo":"hi"}' for r in json_results)
+    assert bodies == [b"abc"] * 3
+    assert len({id(r) for r in responses}) == 3
+    assert all(r.media_type == "audio/mpeg" and r.headers["x-test"] == "1" for r in responses)
+
+
+def test_none_key_skips_coalescing():
+    runs = []
+
+    @single_flight("test_none", key=lambda **_: None)
+    async def handler():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def run():
+        await asyncio.gather(handler(), handler())
+
+    asyncio.run(run())
+    assert len(runs) == 2
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+
+from backend.api.single_flight import upload_digest
+from backend.api.uploads import UploadLimitMiddleware, ingest_upload, route_kind
+from backend.voice.audio_ingest import decode_audio
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(MultiPartParser, "spool_max_size", 64 * 1024)
+    monkeypatch.setenv("UPLOAD_MAX_AUDIO_MB", "1")
+
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware)
+
+    @app.post("/transcribe/audio")
+    async def audio(audio_file: UploadFile = File(...)):
+        key = await upload_digest(audio_file)
+        upload = await ingest_upload(audio_file, "audio")
+        samples = decode_audio(upload.open())
+        return {
+            "key": key,
+            "sha256": upload.sha256,
+            "size": upload.size,
+            "spooled": upload.spooled,
+            "samples": len(samples),
+            "same": bytes(upload.data[:4]).decode("latin-1"),
+        }
+
+    return TestClient(app)
+
+
+def wav_bytes(seconds: float) -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, np.zeros(int(16000 * seconds), dtype=np.float32), 16000, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("seconds, spooled", [(0.5, False), (10, True)])
+def test_upload_is_hashed_once_and_decoded_in_place(client, seconds, spooled):
+    data = wav_bytes(seconds)  # 16 KB in memory, 320 KB spooled to disk and mapped
+    r = client.post("/transcribe/audio", files={"audio_file": ("a.wav", data, "audio/wav")})
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["sha256"] == body["key"] == hashlib.sha256(data).hexdigest()
+    assert body["size"] == len(data)
+    assert body["spooled"] is spooled
+    assert body["samples"] == int(16000 * seconds)
+    assert body["same"] == "RIFF"
+
+
+def test_oversized_upload_rejected_from_content_length(client):
+    data = wav_bytes(40)  # ~1.3 MB > 1 MB cap
+    r = client.post("/transcribe/audio", files={"audio_file": ("a.wav", data, "audio/wav")})
+    assert r.status_code == 413
+    assert "1 MB" in r.json()["detail"]
+
+
+def test_oversized_upload_rejected_while_streaming(client):
+    head = (
+        b"--x\r\nContent-Disposition: form-data; name=\"audio_file\"; filename=\"a.wav\"\r\n"
+        b"Content-Type: audio/wav\r\n\r\n"
+    )
+    received = []
+
+    async def receive():
+        received.append(1)
+        body = (head if len(received) == 1 else b"") + b"\0" * 256 * 1024
+        return {"type": "http.request", "body": body, "more_body": True}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/transcribe/audio",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=x")],  # no Content-Length
+    }
+    asyncio.run(client.app(scope, receive, send))
+
+    assert messages[0]["status"] == 413
+    assert len(received) == 4  # the headers plus four 256 KB chunks cross the 1 MB cap
+
+
+def test_routes_map_to_upload_kinds():
+    assert route_kind("/v1/predict/image") == route_kind("/predict/image") == "image"
+    assert route_kind("/v2/predict/dicom") == "dicom"
+    assert route_kind("/chat") is None
@@ -0,0 +1,162 @@
+import json
+
+import pytest
+
+from backend.audit.audit_archive import (
+    GENESIS,
+    AuditArchiver,
+    SealedSegment,
+    list_sealed_segments,
+    load_manifest,
+    seal_closed_segments,
+    seal_segment,
+    sealed_paths,
+    verify_block,
+    verify_log,
+    verify_segment,
+)
+from backend.audit.audit_index import AuditIndex
+from backend.audit.audit_writer import AuditWriter, segment_name
+
+
+def _write_segment(log_dir, date_str, n, index=0):
+    path = log_dir / segment_name(date_str, index)
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(n):
+            event = {
+                "event_type": "prediction",
+                "request_id": f"{date_str}-{index}-{i}",
+                "timestamp": f"{date_str}T00:00:00Z",
+                "prediction": {"diagnosis": "06_PNEUMONIA", "confidence": i / n},
+            }
+            f.write(json.dumps(event) + "\n")
+    return path
+
+
+def test_seal_round_trips_and_compresses(tmp_path):
+    path = _write_segment(tmp_path, "2026-01-01", 2000)
+    original = path.read_bytes()
+
+    manifest = seal_segment(path, block_size=4096)
+    assert not path.exists()
+    assert manifest["event_count"] == 2000
+    assert len(manifest["blocks"]) > 1
+    assert manifest["compressed_size"] < manifest["raw_size"] / 3
+    assert manifest["prev_head"] == GENESIS
+
+    reader = SealedSegment(str(tmp_path), path.name)
+    assert b"".join(line for _, line in reader.iter_lines()) == original
+    # Range spanning a block boundary
+    boundary = manifest["blocks"][1]["raw_offset"]
+    assert reader.read(boundary - 50, 100) == original[boundary - 50 : boundary + 50]
+
+
+def test_verify_detects_tampered_block(tmp_path):
+    path = _write_segment(tmp_path, "2026-01-01", 500)
+    manifest = seal_segment(path, block_size=4096)
+    assert verify_segment(str(tmp_path), path.name).ok
+
+    # Re-compress block 2 with one altered event, keeping the manifest as-is
+    import zlib
+
+    reader = SealedSegment(str(tmp_path), path.name)
+    raw = reader.read_block(2).replace(b"06_PNEUMONIA", b"01_NORMAL_LUNG", 1)
+    data_path, manifest_path = sealed_paths(tmp_path, path.name)
+    blob = bytearray(data_path.read_bytes())
+    block = manifest["blocks"][2]
+    replacement = zlib.compress(raw)
+    blob[block["offset"] : block["offset"] + block["length"]] = replacement
+    data_path.write_bytes(bytes(blob))
+    delta = len(replacement) - block["length"]
+    block["length"] = len(replacement)
+    for later in manifest["blocks"][3:]:
+        later["offset"] += delta
+    manifest_path.write_text(json.dumps(manifest))
+
+    result = verify_segment(str(tmp_path), path.name)
+    assert not result.ok
+    assert result.failed_blocks == [2]
+    assert verify_block(str(tmp_path), path.name, 1)
+    assert not verify_block(str(tmp_path), path.name, 2)
+
+
+def test_chain_links_segments_and_detects_removal(tmp_path):
+    for day in ("2026-01-01", "2026-01-02", "2026-01-03"):
+        _write_segment(tmp_path, day, 50)
+    assert len(seal_closed_segments(str(tmp_path))) == 3
+
+    names = list_sealed_segments(tmp_path)
+    first, second = load_manifest(tmp_path, names[0]), load_manifest(tmp_path, names[1])
+    assert second["prev_head"] == first["head"]
+
+    assert all(r.ok for r in verify_log(str(tmp_path), workers=2))
+
+    for p in sealed_paths(tmp_path, names[1]):
+        p.unlink()
+    results = verify_log(str(tmp_path), workers=1, full=True)
+    assert [r.ok for r in results] == [True, False]
+    assert "Chain link broken" in results[1].message
+
+
+def test_incremental_verification_skips_verified_segments(tmp_path):
+    _write_segment(tmp_path, "2026-01-01", 20)
+    seal_closed_segments(str(tmp_path))
+    assert len(verify_log(str(tmp_path), workers=1)) == 1
+
+    _write_segment(tmp_path, "2026-01-02", 20)
+    seal_closed_segments(str(tmp_path))
+    results = verify_log(str(tmp_path), workers=1)
+    assert [r.segment for r in results] == [segment_name("2026-01-02")]
+
+
+def test_index_reads_sealed_segments(tmp_path):
+    path = _write_segment(tmp_path, "2026-01-01", 300)
+    seal_segment(path, block_size=2048)
+
+    index = AuditIndex(str(tmp_path))
+    assert index.refresh() == 300
+    hit = index.query(request_id="2026-01-01-0-123")
+    assert hit[0]["prediction"]["confidence"] == 123 / 300
+    index.close()
+
+
+def test_seal_refuses_to_overwrite(tmp_path):
+    path = _write_segment(tmp_path, "2026-01-01", 5)
+    seal_segment(path)
+    _write_segment(tmp_path, "2026-01-01", 1)
+    with pytest.raises(FileExistsError):
+        seal_segment(path)
+    assert load_manifest(tmp_path, path.name)["event_count"] == 5
+
+
+def test_late_event_for_sealed_date_gets_a_new_segment(tmp_path):
+    writer = AuditWriter(log_dir=str(tmp_path), fsync="every-batch")
+    index = AuditIndex(str(tmp_path))
+    index.attach(writer)
+    archiver = AuditArchiver()
+    archiver.attach(writer)
+
+    def write(date_str, ids):
+        for request_id in ids:
+            writer.submit(date_str, json.dumps({"request_id": request_id, "timestamp": f"{date_str}T00:00:00Z"}))
+        writer.flush()
+
+    write("2026-01-01", [f"a{i}" for i in range(5)])
+    write("2026-01-02", ["b0", "b1"])
+    archiver.flush()
+    assert list_sealed_segments(tmp_path) == [segment_name("2026-01-01")]
+
+    write("2026-01-01", ["late"])
+    write("2026-01-02", ["b2"])
+    writer.close()
+    archiver.flush()
+    seal_closed_segments(str(tmp_path))
+
+    assert load_manifest(tmp_path, segment_name("2026-01-01"))["event_count"] == 5
+    assert load_manifest(tmp_path, segment_name("2026-01-01", 1))["event_count"] == 1
+    index.refresh()
+    for request_id in ("a3", "late", "b0", "b2"):
+        assert index.query(request_id=request_id)[0]["request_id"] == request_id
+    # Chain follows sealing order, so the late segment links after 2026-01-02
+    assert all(r.ok for r in verify_log(str(tmp_path), workers=1, full=True))
+    index.close()
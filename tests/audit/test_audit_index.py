@@ -0,0 +1,176 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.audit.audit_index import AuditIndex, main as audit_cli
+from backend.audit.audit_writer import segment_name
+
+
+def _write_segment(log_dir, date_str, events, index=0):
+    path = log_dir / segment_name(date_str, index)
+    with path.open("a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+    return path
+
+
+def _event(i, date_str, user="u1", event_type="prediction"):
+    return {
+        "event_type": event_type,
+        "request_id": f"req-{date_str}-{i}",
+        "user_id_hash": user,
+        "input_hash": f"in-{i % 3}",
+        "timestamp": f"{date_str}T00:00:{i:02d}Z",
+    }
+
+
+@pytest.fixture
+def populated(tmp_path):
+    _write_segment(tmp_path, "2026-01-01", [_event(i, "2026-01-01") for i in range(10)])
+    _write_segment(
+        tmp_path, "2026-02-01", [_event(i, "2026-02-01", user="u2") for i in range(10)]
+    )
+    _write_segment(
+        tmp_path, "2026-03-01", [_event(0, "2026-03-01", user="u3", event_type="export")]
+    )
+    index = AuditIndex(str(tmp_path))
+    index.refresh()
+    yield index
+    index.close()
+
+
+def test_lookup_by_keys(populated):
+    hits = populated.query(request_id="req-2026-02-01-4")
+    assert len(hits) == 1 and hits[0]["user_id_hash"] == "u2"
+
+    assert len(populated.query(user_id_hash="u1")) == 10
+    assert len(populated.query(input_hash="in-0")) == 9
+    assert [e["event_type"] for e in populated.query(event_type="export")] == ["export"]
+
+
+def test_time_range_is_half_open(populated):
+    hits = populated.query(since="2026-01-15", until="2026-03-01")
+    assert len(hits) == 10
+    assert all(e["timestamp"].startswith("2026-02-01") for e in hits)
+    assert len(populated.query(user_id_hash="u1", since="2026-02-01")) == 0
+
+
+def test_refresh_is_incremental_and_skips_partial_tail(tmp_path):
+    path = _write_segment(tmp_path, "2026-01-01", [_event(0, "2026-01-01")])
+    index = AuditIndex(str(tmp_path))
+    assert index.refresh() == 1
+    assert index.refresh() == 0
+
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(_event(1, "2026-01-01")) + "\n")
+        f.write('{"request_id": "half-writ')
+    assert index.refresh() == 1
+    assert index.stats() == {"events": 2, "segments": 1}
+
+    with path.open("a", encoding="utf-8") as f:
+        f.write('ten"}\n')
+    assert index.refresh() == 1
+    assert index.query(request_id="half-written")[0]["request_id"] == "half-written"
+    index.close()
+
+
+def test_reindex_rebuilds_from_disk(populated):
+    assert populated.reindex() == 21
+
+
+def test_cli_query(populated, tmp_path, capsys):
+    audit_cli(["--log-dir", str(tmp_path), "query", "--request-id", "req-2026-01-01-3"])
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["request_id"] == "req-2026-01-01-3"
+
+
+def test_admin_route(populated, tmp_path):
+    from backend.api.main import app
+    from backend.api.deps import get_current_user
+    from backend.core.feature_flags import FeatureFlag
+
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "admin", "roles": ["admin"]}
+    try:
+        with (
+            patch(
+                "backend.core.feature_flags.check_flag",
+                side_effect=lambda f: f == FeatureFlag.AUDIT_LOGGING,
+            ),
+            patch("backend.api.routes.v2_admin.get_audit_index", return_value=populated),
+        ):
+            client = TestClient(app)
+            resp = client.get("/v2/admin/audit/events", params={"user_id_hash": "u2"})
+            assert resp.status_code == 200
+            assert resp.json()["count"] == 10
+
+            resp = client.get("/v2/admin/audit/events")
+            assert resp.status_code == 400
+    finally:
+        app.dependency_overrides = {}
+
+
+def test_admin_route_rejects_non_admin(populated, monkeypatch):
+    from backend.api.main import app
+    from backend.api.deps import get_current_user
+    from backend.core.feature_flags import FeatureFlag
+
+    monkeypatch.setenv("ADMIN_USER_IDS", "user_admin")
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "user_1", "roles": ["clinician"]}
+    try:
+        with (
+            patch(
+                "backend.core.feature_flags.check_flag",
+                side_effect=lambda f: f == FeatureFlag.AUDIT_LOGGING,
+            ),
+            patch("backend.api.routes.v2_admin.get_audit_index", return_value=populated),
+        ):
+            client = TestClient(app)
+            resp = client.get("/v2/admin/audit/events", params={"user_id_hash": "u2"})
+            assert resp.status_code == 403
+
+            # Allowlisted subjects are admins without a roles claim
+            app.dependency_overrides[get_current_user] = lambda: {"sub": "user_admin"}
+            resp = client.get("/v2/admin/audit/events", params={"user_id_hash": "u2"})
+            assert resp.status_code == 200
+    finally:
+        app.dependency_overrides = {}
+
+
+def test_clinical_router_opens_the_index_on_first_rotation(tmp_path, monkeypatch):
+    from backend.api.routes import v2_clinical
+    from backend.audit import audit_index
+    from backend.audit.audit_logger import AuditLogger
+    from backend.audit.audit_writer import AuditWriter
+
+    monkeypatch.setattr(audit_index, "_index_instances", {})
+    logger = AuditLogger(
+        log_dir=str(tmp_path), writer=AuditWriter(log_dir=str(tmp_path), max_bytes=400)
+    )
+    monkeypatch.setattr(v2_clinical, "audit_logger", logger)
+    logger.writer.add_segment_close_hook(v2_clinical._index_closed_segment)
+
+    logger.log_prediction(
+        user_id="user_1",
+        request_id="req-0",
+        model_version="v1",
+        prediction={"diagnosis": "06_PNEUMONIA", "confidence": 0.9},
+        input_hash="abc",
+    )
+    logger.flush()
+    assert not (tmp_path / audit_index.INDEX_FILENAME).exists()
+
+    for i in range(1, 6):  # enough to rotate the first segment out
+        logger.log_prediction(
+            user_id="user_1",
+            request_id=f"req-{i}",
+            model_version="v1",
+            prediction={"diagnosis": "06_PNEUMONIA", "confidence": 0.9},
+            input_hash="abc",
+        )
+    logger.flush()
+    logger.close()
+    assert (tmp_path / audit_index.INDEX_FILENAME).exists()
+    assert audit_index.get_audit_index(str(tmp_path)).query(request_id="req-0")
@@ -0,0 +1,107 @@
+import json
+import time
+
+from backend.audit.audit_logger import AuditLogger
+from backend.audit.audit_writer import AuditWriter, segment_name, parse_segment_name
+
+
+def _read_lines(path):
+    return [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_events_are_written_after_flush(tmp_path):
+    logger = AuditLogger(log_dir=str(tmp_path))
+    for i in range(50):
+        logger.log_prediction(
+            user_id="user_1",
+            request_id=f"req-{i}",
+            model_version="v1",
+            prediction={"diagnosis": "06_PNEUMONIA", "confidence": 0.9},
+            input_hash="abc",
+        )
+    assert logger.flush()
+
+    files = list(tmp_path.glob("audit-*.jsonl"))
+    assert len(files) == 1
+    events = _read_lines(files[0])
+    assert [e["request_id"] for e in events] == [f"req-{i}" for i in range(50)]
+    assert events[0]["user_id_hash"] != "user_1"
+    assert logger.writer.stats()["events_written"] == 50
+    logger.close()
+
+
+def test_batches_share_one_write(tmp_path):
+    writer = AuditWriter(log_dir=str(tmp_path), flush_interval=0.2, fsync="none")
+    for i in range(100):
+        writer.submit("2026-01-01", json.dumps({"i": i}))
+    writer.flush()
+    # 100 events submitted in a burst must not need 100 batches
+    assert writer.stats()["batches_written"] < 10
+    writer.close()
+
+
+def test_last_batch_is_fsynced_within_the_interval(tmp_path, monkeypatch):
+    from backend.audit import audit_writer
+
+    synced = []
+    real_fsync = audit_writer.os.fsync
+    monkeypatch.setattr(
+        audit_writer.os, "fsync", lambda fd: (synced.append(time.monotonic()), real_fsync(fd))
+    )
+    writer = AuditWriter(
+        log_dir=str(tmp_path), flush_interval=0.01, fsync="interval", fsync_interval=0.2
+    )
+    writer.submit("2026-01-01", json.dumps({"i": 0}))
+    writer.flush()  # first batch is fsynced right away
+    writer.submit("2026-01-01", json.dumps({"i": 1}))
+    writer.flush()  # inside the interval: written, not yet fsynced
+    assert len(synced) == 1
+
+    written_at = time.monotonic()
+    time.sleep(0.5)  # no further events
+    assert len(synced) == 2
+    assert synced[1] - written_at < 0.3
+    writer.close()
+
+
+def test_rotation_by_size_and_date(tmp_path):
+    closed = []
+    writer = AuditWriter(log_dir=str(tmp_path), max_bytes=200, fsync="every-batch")
+    writer.add_segment_close_hook(closed.append)
+
+    for i in range(20):
+        writer.submit("2026-01-01", json.dumps({"i": i, "pad": "x" * 20}))
+        writer.flush()
+    writer.submit("2026-01-02", json.dumps({"i": "next-day"}))
+    writer.close()
+
+    day1 = sorted(p.name for p in tmp_path.glob("audit-2026-01-01*.jsonl"))
+    assert len(day1) > 1
+    assert segment_name("2026-01-01") in day1
+    assert (tmp_path / segment_name("2026-01-02")).exists()
+    assert writer.stats()["rotations"] >= len(day1)
+    assert all(parse_segment_name(p.name)[0] == "2026-01-01" for p in closed)
+
+    total = sum(len(_read_lines(tmp_path / n)) for n in day1)
+    assert total == 20
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    writer = AuditWriter(log_dir=str(tmp_path), max_queue=1)
+    # Keep the writer thread from starting so the queue cannot drain
+    writer._ensure_started = lambda: None
+    assert writer.submit("2026-01-01", "{}")
+    assert not writer.submit("2026-01-01", "{}")
+    assert writer.stats()["events_dropped"] == 1
+    assert writer.queue_depth == 1
+
+
+def test_close_drains_queue_and_rejects_new_events(tmp_path):
+    writer = AuditWriter(log_dir=str(tmp_path), flush_interval=1.0)
+    for i in range(10):
+        writer.submit("2026-01-01", json.dumps({"i": i}))
+    writer.close()
+
+    assert len(_read_lines(tmp_path / segment_name("2026-01-01"))) == 10
+    assert writer.submit("2026-01-01", "{}") is False
+    assert writer.stats()["events_dropped"] == 1
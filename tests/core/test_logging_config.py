@@ -0,0 +1,75 @@
+import json
+import logging
+import queue
+import sys
+
+from backend.core import logging_config
+from backend.core.logging_config import (
+    DebugSampler,
+    JSONFormatter,
+    NonBlockingQueueHandler,
+    parse_levels,
+)
+
+
+def record(level=logging.INFO, msg="hello %s", args=("world",), name="backend.test", **extra):
+    r = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    r.__dict__.update(extra)
+    return r
+
+
+def test_json_records_carry_extras_and_traceback():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        r = record(level=logging.ERROR, diagnosis="06_PNEUMONIA")
+        r.exc_info = sys.exc_info()
+
+    entry = json.loads(JSONFormatter().format(r))
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "ERROR" and entry["logger"] == "backend.test"
+    assert entry["diagnosis"] == "06_PNEUMONIA"
+    assert "ValueError: boom" in entry["exc"]
+
+
+def test_debug_is_rate_limited_per_logger(monkeypatch):
+    monkeypatch.setitem(logging_config.log_stats, "rate_limited", 0)
+    sampler = DebugSampler(rate_per_second=5)
+
+    kept = sum(sampler.filter(record(logging.DEBUG)) for _ in range(50))
+    assert kept == 5
+    assert sampler.filter(record(logging.DEBUG, name="backend.other"))
+    assert all(sampler.filter(record(logging.WARNING)) for _ in range(50))
+    assert logging_config.log_stats["rate_limited"] == 45
+
+
+def test_debug_sampling(monkeypatch):
+    monkeypatch.setattr(logging_config.random, "random", iter([0.1, 0.9] * 10).__next__)
+    sampler = DebugSampler(sample_rate=0.5)
+    assert sum(sampler.filter(record(logging.DEBUG)) for _ in range(20)) == 10
+
+
+def test_queue_handler_defers_formatting_and_never_blocks(monkeypatch):
+    monkeypatch.setitem(logging_config.log_stats, "queue_full", 0)
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    args = ["mutable"]
+    try:
+        raise RuntimeError("late")
+    except RuntimeError:
+        r = record(msg="value %s", args=(args,))
+        r.exc_info = sys.exc_info()
+    handler.handle(r)
+    args.append("changed after the call")
+    handler.handle(record())  # queue full: dropped, not blocked
+
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "value ['mutable']"
+    assert queued.exc_info is not None and queued.exc_text is None  # formatted by the listener
+    assert logging_config.log_stats["queue_full"] == 1
+
+
+def test_parse_levels():
+    assert parse_levels("backend.voice=debug, httpx=WARNING,bad") == {
+        "backend.voice": "DEBUG",
+        "httpx": "WARNING",
+    }
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from backend.core import runtime_config
+from backend.core.runtime_config import ThreadBudget, cgroup_cpu_limit, load_profile, split_cores
+
+BUDGET_VARS = (
+    "CPU_BUDGET",
+    "TF_INTRA_OP_THREADS",
+    "TF_INTER_OP_THREADS",
+    "TORCH_THREADS",
+    "TORCH_INTEROP_THREADS",
+    "CPU_PINNING",
+    "STT_MAX_BATCH",
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    # setenv first so teardown also removes values load_profile writes
+    for name in BUDGET_VARS:
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+
+
+def test_cgroup_v2_and_v1_quotas(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == 1.5
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+    v1 = tmp_path / "v1"
+    (v1 / "cpu").mkdir(parents=True)
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    (v1 / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(str(v1)) == 2.0
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    assert cgroup_cpu_limit(str(v1)) is None
+
+
+def test_budget_is_split_between_runtimes(monkeypatch):
+    monkeypatch.setattr(runtime_config, "detect_cpu_budget", lambda: 2)
+    budget = ThreadBudget.from_env()
+    assert (budget.total, budget.tf_intra, budget.torch_intra) == (2, 1, 1)
+    assert (budget.tf_inter, budget.torch_interop) == (1, 1)
+
+    monkeypatch.setenv("CPU_BUDGET", "1")
+    budget = ThreadBudget.from_env()
+    assert (budget.tf_intra, budget.torch_intra) == (1, 1)
+
+    monkeypatch.setenv("CPU_BUDGET", "8")
+    monkeypatch.setenv("TF_INTRA_OP_THREADS", "2")
+    assert ThreadBudget.from_env().torch_intra == 6
+
+
+def test_pinning_splits_cores_by_share():
+    assert split_cores([0, 1, 2, 3], 1, 3) == ([0], [1, 2, 3])
+    assert split_cores([0, 1], 4, 4) == ([0], [1])
+    assert split_cores([5], 1, 1) == ([5], [5])
+
+
+def test_profile_supplies_defaults_but_env_wins(tmp_path, monkeypatch):
+    profile = tmp_path / "runtime_profile.json"
+    profile.write_text(
+        json.dumps({"settings": {"TF_INTRA_OP_THREADS": 1, "TORCH_THREADS": 3, "STT_MAX_BATCH": 4}})
+    )
+    monkeypatch.setenv("TORCH_THREADS", "2")
+
+    applied = load_profile(profile)
+
+    assert applied == {"TF_INTRA_OP_THREADS": "1", "STT_MAX_BATCH": "4"}
+    budget = ThreadBudget.from_env()
+    assert (budget.tf_intra, budget.torch_intra) == (1, 2)
+    assert load_profile(tmp_path / "missing.json") == {}
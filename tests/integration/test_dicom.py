@@ -1,4 +1,5 @@
 import os
+import importlib.util
 import pytest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -21,6 +22,17 @@ FIXTURES_DIR = Path(__file__).parent.parent / "fixtures"
 
 
 # --- Mocks ---
+@pytest.fixture(autouse=True)
+def tmp_audit_log(tmp_path, monkeypatch):
+    """Audit events from these requests go to tmp_path, not ./logs/audit"""
+    from backend.audit.audit_logger import AuditLogger
+
+    audit_logger = AuditLogger(log_dir=str(tmp_path / "audit"))
+    monkeypatch.setattr("backend.api.routes.v2_clinical.audit_logger", audit_logger)
+    yield audit_logger
+    audit_logger.close()
+
+
 @pytest.fixture
 def mock_auth():
     """Mock authentication for successful tests"""
@@ -96,6 +108,10 @@ def test_dicom_endpoint_disabled_by_default(mock_auth):
         assert r.json()["detail"]["error"] == "FEATURE_NOT_ENABLED"
 
 
+@pytest.mark.skipif(
+    importlib.util.find_spec("tensorflow") is None,
+    reason="preprocessing uses Keras' preprocess_input",
+)
 def test_dicom_endpoint_success_flow(mock_auth, mock_model, mock_dicom_handler):
     """Should return 200 with diagnosis if enabled"""
     with patch.dict(
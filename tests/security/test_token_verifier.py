@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from jwt.algorithms import ECAlgorithm
+
+from backend.security.token_verifier import JWKSStore, TokenVerifier, VerifiedTokenCache
+from benchmarks.standins.jwks import TestKeys, create_app
+from benchmarks.standins.server import serve
+
+AUDIENCE = "test_project"
+
+
+def _jwks(path, keys):
+    document = {"keys": []}
+    for kid, private_key in keys.items():
+        jwk = json.loads(ECAlgorithm.to_jwk(private_key.public_key()))
+        jwk.update({"kid": kid, "alg": "ES256", "use": "sig"})
+        document["keys"].append(jwk)
+    path.write_text(json.dumps(document))
+
+
+def _token(private_key, kid, exp_in=300, **claims):
+    payload = {"sub": "user_1", "aud": AUDIENCE, "exp": int(time.time()) + exp_in, **claims}
+    return jwt.encode(payload, private_key, algorithm="ES256", headers={"kid": kid})
+
+
+@pytest.fixture
+def key():
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+@pytest.fixture
+def jwks_file(tmp_path, key):
+    path = tmp_path / "jwks.json"
+    _jwks(path, {"k1": key})
+    return path
+
+
+def test_verify_then_serve_from_cache(jwks_file, key):
+    verifier = TokenVerifier(JWKSStore(file_path=str(jwks_file)), audience=AUDIENCE)
+    token = _token(key, "k1")
+
+    assert verifier.verify(token)["sub"] == "user_1"
+    with patch("backend.security.token_verifier.jwt.decode") as decode:
+        payload = verifier.verify(token)
+        decode.assert_not_called()
+    assert payload["sub"] == "user_1"
+    assert verifier.cache.hits == 1
+
+    # Callers get a copy, so mutating it cannot poison the cache
+    payload["sub"] = "someone_else"
+    assert verifier.verify(token)["sub"] == "user_1"
+
+
+def test_expired_entry_is_not_served(jwks_file, key):
+    verifier = TokenVerifier(JWKSStore(file_path=str(jwks_file)), audience=AUDIENCE, leeway=0)
+    token = _token(key, "k1", exp_in=1)
+    verifier.verify(token)
+    time.sleep(1.1)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(token)
+
+
+def test_invalid_signature_and_audience_rejected(jwks_file, key):
+    verifier = TokenVerifier(JWKSStore(file_path=str(jwks_file)), audience=AUDIENCE)
+    forged = _token(ec.generate_private_key(ec.SECP256R1()), "k1")
+    with pytest.raises(jwt.InvalidSignatureError):
+        verifier.verify(forged)
+    with pytest.raises(jwt.InvalidAudienceError):
+        verifier.verify(_token(key, "k1", aud="other_project"))
+    assert len(verifier.cache) == 0
+
+
+def test_unknown_kid_refreshes_once_under_concurrency(tmp_path, key):
+    path = tmp_path / "jwks.json"
+    _jwks(path, {"k1": key})
+    store = JWKSStore(file_path=str(path), min_refresh_gap=60)
+    assert store.refresh()
+    store._last_refresh -= 120  # Previous refresh is outside the rate-limit window
+
+    new_key = ec.generate_private_key(ec.SECP256R1())
+    _jwks(path, {"k1": key, "k2": new_key})
+
+    calls = []
+    original = store._load_document
+
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.05)
+        return original()
+
+    store._load_document = slow_load
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(store.get_key("k2")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is not None for r in results)
+
+    # A bogus kid right after a refresh is rate-limited, not re-fetched
+    assert store.get_key("forged") is None
+    assert len(calls) == 1
+
+
+def test_rotated_out_key_clears_cache(tmp_path, key):
+    path = tmp_path / "jwks.json"
+    _jwks(path, {"k1": key})
+    store = JWKSStore(file_path=str(path))
+    verifier = TokenVerifier(store, audience=AUDIENCE)
+    verifier.verify(_token(key, "k1"))
+    assert len(verifier.cache) == 1
+
+    _jwks(path, {"k2": ec.generate_private_key(ec.SECP256R1())})
+    store.refresh()
+    assert len(verifier.cache) == 0
+
+
+def test_lru_eviction_and_no_exp_not_cached():
+    cache = VerifiedTokenCache(max_size=2)
+    for name in ("a", "b", "c"):
+        cache.put(cache.digest(name), {"exp": time.time() + 60})
+    assert cache.get(cache.digest("a")) is None
+    assert cache.get(cache.digest("c")) is not None
+
+    cache.put(cache.digest("forever"), {"sub": "x"})
+    assert cache.get(cache.digest("forever")) is None
+
+
+def test_background_refresh_loads_keys(jwks_file):
+    store = JWKSStore(file_path=str(jwks_file), refresh_interval=60)
+    store.start()
+    try:
+        deadline = time.time() + 2
+        while not store.kids and time.time() < deadline:
+            time.sleep(0.01)
+        assert store.kids == ["k1"]
+    finally:
+        store.stop()
+
+
+def test_verifies_tokens_from_jwks_stand_in():
+    keys = TestKeys(audience=AUDIENCE)
+    with serve(create_app(keys)) as base_url:
+        verifier = TokenVerifier(JWKSStore(url=f"{base_url}/.well-known/jwks.json"), audience=AUDIENCE)
+        assert verifier.verify(keys.token("user_9"))["sub"] == "user_9"
+    assert keys.fetches == 1
@@ -0,0 +1,130 @@
+import threading
+import time
+
+from backend.serving.model_lifecycle import ModelLifecycle
+
+
+class Slot:
+    """A model slot the way main.py holds one: a global set by load, cleared by release."""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.value = None
+        self.delay = delay
+        self.fail = fail
+        self.loads = 0
+        self.busy = False
+
+    def load(self):
+        self.loads += 1
+        time.sleep(self.delay)
+        if self.fail:
+            return None
+        self.value = object()
+        return self.value
+
+    def release(self):
+        self.value = None
+
+    def register(self, lifecycle):
+        lifecycle.register(
+            self.name, self.load, lambda: self.value, self.release, busy=lambda: self.busy
+        )
+        return self
+
+
+def make(**kwargs):
+    kwargs.setdefault("idle_ttl", 60)
+    kwargs.setdefault("high_watermark_mb", 0)
+    kwargs.setdefault("standby", [])
+    return ModelLifecycle(**kwargs)
+
+
+def test_concurrent_first_use_loads_once():
+    lifecycle = make()
+    slot = Slot("stt", delay=0.05).register(lifecycle)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(lifecycle.acquire("stt"))) for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert slot.loads == 1
+    assert len({id(r) for r in results}) == 1 and results[0] is slot.value
+
+
+def test_idle_models_are_evicted_and_reload_on_next_use():
+    lifecycle = make(idle_ttl=0.01)
+    slot = Slot("classifier").register(lifecycle)
+    first = lifecycle.acquire("classifier")
+
+    time.sleep(0.02)
+    assert lifecycle.sweep() == ["classifier"]
+    assert slot.value is None
+    assert lifecycle.stats()["classifier"]["evictions"]["idle"] == 1
+
+    second = lifecycle.acquire("classifier")
+    assert second is not None and second is not first
+    assert lifecycle.stats()["classifier"]["loads"] == 2
+
+
+def test_standby_and_busy_models_survive_idle_sweep():
+    lifecycle = make(idle_ttl=0.01, standby=["classifier"])
+    standby = Slot("classifier").register(lifecycle)
+    busy = Slot("stt").register(lifecycle)
+    lifecycle.preload_standby()
+    lifecycle.acquire("stt")
+    busy.busy = True
+
+    time.sleep(0.02)
+    assert lifecycle.sweep() == []
+    assert standby.value is not None and busy.value is not None
+    assert busy.loads == 1
+
+
+def test_memory_pressure_evicts_lru_with_standby_last():
+    rss = {"mb": 900}
+    lifecycle = make(
+        idle_ttl=0,
+        high_watermark_mb=800,
+        low_watermark_mb=500,
+        standby=["classifier"],
+        rss=lambda: rss["mb"] * 1024 * 1024,
+    )
+    slots = {n: Slot(n).register(lifecycle) for n in ("classifier", "stt", "ensemble")}
+    for name in ("classifier", "ensemble", "stt"):  # stt most recently used
+        lifecycle.acquire(name)
+        time.sleep(0.001)
+
+    def release(slot, freed):
+        def _release():
+            slot.value = None
+            rss["mb"] -= freed
+
+        return _release
+
+    lifecycle._models["ensemble"].release = release(slots["ensemble"], 200)
+    lifecycle._models["stt"].release = release(slots["stt"], 300)
+
+    assert lifecycle.sweep() == ["ensemble", "stt"]
+    assert slots["classifier"].value is not None
+    assert lifecycle.stats()["stt"]["evictions"]["memory"] == 1
+
+
+def test_failed_load_is_not_retried_until_backoff_expires(monkeypatch):
+    monkeypatch.setenv("MODEL_LOAD_RETRY_SECONDS", "60")
+    lifecycle = make()
+    slot = Slot("ensemble", fail=True).register(lifecycle)
+
+    assert lifecycle.acquire("ensemble") is None
+    assert lifecycle.acquire("ensemble") is None
+    assert slot.loads == 1
+
+    lifecycle.retry_after = 0
+    slot.fail = False
+    assert lifecycle.acquire("ensemble") is slot.value
+    assert lifecycle.stats()["ensemble"]["load_failures"] == 1
@@ -0,0 +1,79 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from backend.voice import audio_ingest
+from backend.voice.audio_ingest import (
+    AudioDecodeError,
+    decode_audio,
+    iter_decode,
+    polyphase_filter,
+    resample,
+)
+
+
+def _recording(fmt="WAV", sr=48000, seconds=2.0, channels=2, subtype=None):
+    t = np.arange(int(sr * seconds)) / sr
+    left = 0.4 * np.sin(2 * np.pi * 440 * t)
+    right = 0.2 * np.sin(2 * np.pi * 440 * t)
+    data = np.stack([left, right], axis=1)[:, :channels]
+    buf = io.BytesIO()
+    sf.write(buf, data, sr, format=fmt, subtype=subtype)
+    return buf.getvalue()
+
+
+def _peak_hz(audio, sr=16000):
+    spectrum = np.abs(np.fft.rfft(audio))
+    return np.fft.rfftfreq(len(audio), 1 / sr)[int(np.argmax(spectrum))]
+
+
+@pytest.mark.parametrize("resampler", ["soxr", "polyphase"])
+def test_stereo_wav_to_16k_mono_float32(monkeypatch, resampler):
+    monkeypatch.setenv("AUDIO_RESAMPLER", resampler)
+    audio = decode_audio(_recording())
+
+    assert audio.dtype == np.float32 and audio.ndim == 1
+    assert abs(len(audio) - 32000) <= 1
+    assert abs(_peak_hz(audio) - 440) < 2
+    # Channels averaged: (0.4 + 0.2) / 2
+    assert abs(np.max(np.abs(audio[1000:-1000])) - 0.3) < 0.01
+
+
+def test_polyphase_filter_is_designed_once_per_rate_pair(monkeypatch):
+    monkeypatch.setenv("AUDIO_RESAMPLER", "polyphase")
+    x = np.random.default_rng(0).normal(size=4410).astype(np.float32)
+    polyphase_filter.cache_clear()
+
+    ours = resample(x, 44100, 16000)
+    resample(x, 44100, 16000)
+
+    assert polyphase_filter.cache_info().misses == 1 and polyphase_filter.cache_info().hits == 1
+    np.testing.assert_allclose(ours, resample_poly(x, 160, 441), atol=1e-5)
+
+
+def test_incremental_decode_matches_whole_file():
+    ogg = _recording("OGG", subtype="VORBIS", seconds=3.0)
+    whole = decode_audio(ogg)
+    blocks = list(iter_decode(ogg, block_frames=8192))
+
+    assert len(blocks) > 3
+    joined = np.concatenate(blocks)
+    assert abs(len(joined) - len(whole)) <= 16
+    n = min(len(joined), len(whole))
+    assert np.max(np.abs(joined[:n] - whole[:n])) < 0.01
+
+
+def test_file_objects_are_read_from_the_start():
+    f = io.BytesIO(_recording(sr=16000, channels=1))
+    f.seek(100)
+    assert len(decode_audio(f)) == 32000
+
+
+def test_unsupported_container_without_ffmpeg(monkeypatch):
+    monkeypatch.delenv("AUDIO_FFMPEG", raising=False)
+    monkeypatch.setattr(audio_ingest.shutil, "which", lambda name: None)
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"\x1aE\xdf\xa3 not really webm")
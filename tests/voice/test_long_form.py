@@ -0,0 +1,103 @@
+import asyncio
+
+import numpy as np
+
+from backend.voice.long_form import plan_windows, stitch, stream_long_form, transcribe_long_form
+from backend.voice.stt_service import TranscriptionResult
+
+SR = 1000  # low sample rate keeps the synthetic audio small
+
+
+def _dictation(n_words, word_s=0.6, gap_s=0.3):
+    """Word k is a run of samples valued k+1, words separated by silence."""
+    parts = []
+    for k in range(n_words):
+        parts.append(np.full(int(word_s * SR), float(k + 1), dtype=np.float32))
+        parts.append(np.zeros(int(gap_s * SR), dtype=np.float32))
+    return np.concatenate(parts)
+
+
+class WordService:
+    """STT stand-in that 'hears' every word with samples in the clip."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+
+    async def transcribe(self, audio, whisper_language=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        values = sorted({int(v) for v in audio if v > 0})
+        return TranscriptionResult(" ".join(f"w{v}" for v in values), whisper_language, 1)
+
+
+def test_short_audio_is_one_window():
+    assert plan_windows(np.zeros(5 * SR), SR, window_s=30) == [(0, 5 * SR)]
+
+
+def test_windows_cover_audio_with_overlap_and_cut_in_silence():
+    audio = _dictation(100)
+    windows = plan_windows(audio, SR, window_s=10, overlap_s=1, search_s=3)
+
+    assert windows[0][0] == 0 and windows[-1][1] == len(audio)
+    for (s0, e0), (s1, _) in zip(windows, windows[1:]):
+        assert e0 - s0 <= 10 * SR
+        assert s1 == e0 - SR
+        assert audio[e0 - 1] == 0  # cut lands in a gap between words
+
+
+def test_stitch_drops_overlapping_words():
+    assert stitch("the scan shows mild", "shows mild opacity in the lobe") == (
+        "the scan shows mild opacity in the lobe"
+    )
+    assert stitch("No acute findings.", "Findings are stable") == "No acute findings. are stable"
+    assert stitch("patient has pneu", "has pneumonia today") == "patient has pneumonia today"
+    assert stitch("left lower lobe", "obe lower lobe opacity") == "left lower lobe opacity"
+    assert stitch("alpha beta", "gamma delta") == "alpha beta gamma delta"
+
+
+def test_long_dictation_keeps_every_word_once():
+    audio = _dictation(150)  # 135 s
+    service = WordService()
+
+    result = asyncio.run(transcribe_long_form(service, audio, "english", SR))
+
+    assert result.text == " ".join(f"w{k}" for k in range(1, 151))
+    assert result.windows_total == 5
+    assert service.peak == 5  # all windows were submitted together
+
+
+def test_stream_reports_partials_in_order():
+    audio = _dictation(80)
+    service = WordService(delay=0.01)
+
+    async def run():
+        return [u async for u in stream_long_form(service, audio, None, SR)]
+
+    updates = asyncio.run(run())
+    assert [u.windows_done for u in updates] == list(range(1, len(updates) + 1))
+    assert [u.final for u in updates] == [False] * (len(updates) - 1) + [True]
+    assert all(b.text.startswith(a.text) for a, b in zip(updates, updates[1:]))
+
+
+def test_auto_detect_runs_language_id_once_and_forces_the_winner():
+    audio = _dictation(80)
+    requested = []
+
+    class DetectingService(WordService):
+        async def transcribe(self, audio, whisper_language=None):
+            requested.append(whisper_language)
+            result = await super().transcribe(audio, whisper_language)
+            if whisper_language is None:
+                result.language, result.language_probs = "urdu", {"ur": 0.9, "hi": 0.1}
+            return result
+
+    result = asyncio.run(transcribe_long_form(DetectingService(), audio, None, SR))
+
+    assert result.windows_total > 1
+    assert requested == [None] + ["urdu"] * (result.windows_total - 1)
+    assert result.language == "urdu" and result.language_probs == {"ur": 0.9, "hi": 0.1}
+    assert result.text == " ".join(f"w{k}" for k in range(1, 81))
@@ -0,0 +1,57 @@
+import pytest
+
+from backend.voice import stt_backends
+from backend.voice.stt_backends import (
+    LoadedSTT,
+    QuantizedSTTBackend,
+    STTBackendError,
+    TransformersSTTBackend,
+    get_stt_backend,
+    load_stt,
+)
+
+
+def test_backend_is_selected_by_config(monkeypatch):
+    monkeypatch.setenv("STT_BACKEND", "int8")
+    assert isinstance(get_stt_backend(), QuantizedSTTBackend)
+    assert isinstance(get_stt_backend("transformers"), TransformersSTTBackend)
+    with pytest.raises(STTBackendError):
+        get_stt_backend("whisper.cpp")
+
+
+def test_unavailable_backend_falls_back_to_transformers(monkeypatch):
+    loads = []
+
+    def fake_load(self, model_id, device):
+        loads.append((self.name, model_id, device))
+        return LoadedSTT(self.name, model_id, object(), object(), device)
+
+    monkeypatch.setenv("STT_MODEL_ID", "openai/whisper-small")
+    monkeypatch.setattr(QuantizedSTTBackend, "available", lambda self: False)
+    monkeypatch.setattr(TransformersSTTBackend, "available", lambda self: True)
+    monkeypatch.setattr(TransformersSTTBackend, "load", fake_load)
+
+    loaded = load_stt("int8")
+    assert loaded.backend == "transformers"
+    assert loads == [("transformers", "openai/whisper-small", "cpu")]
+
+
+def test_int8_quantizes_linear_layers(monkeypatch):
+    torch = pytest.importorskip("torch")
+    if not torch.backends.quantized.supported_engines:
+        pytest.skip("no quantized engine")
+
+    class Tiny(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.proj = torch.nn.Linear(64, 64)
+
+    monkeypatch.setattr(
+        stt_backends.TransformersSTTBackend, "_load_fp32", lambda self, m, d: (object(), Tiny())
+    )
+    fp32 = TransformersSTTBackend().load("tiny", "cpu")
+    int8 = QuantizedSTTBackend().load("tiny", "cuda:0")
+
+    assert int8.device == "cpu"
+    assert "Quantized" in type(int8.model.proj).__module__ + type(int8.model.proj).__name__
+    assert int8.parameter_bytes < fp32.parameter_bytes / 2
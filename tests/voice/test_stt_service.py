@@ -0,0 +1,214 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.voice.stt_service import STTService
+
+
+class _Tensor:
+    def __init__(self, array):
+        self.array = array
+
+    def to(self, device):
+        return self
+
+
+class FakeProcessor:
+    """Whisper processor stand-in: 'decodes' each clip to its first sample."""
+
+    def __call__(self, audios, sampling_rate, return_tensors, return_attention_mask):
+        features = np.stack([np.full(4, a[0]) for a in audios])
+        return SimpleNamespace(input_features=_Tensor(features), attention_mask=_Tensor(features))
+
+    def get_decoder_prompt_ids(self, language, task):
+        return [(1, language), (2, task)]
+
+    def batch_decode(self, ids, skip_special_tokens):
+        return [f" clip {int(row[0])} " for row in ids]
+
+
+class FakeModel:
+    """Cost is per call, not per row — like a batched matmul on CPU."""
+
+    def __init__(self, delay=0.05, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def generate(self, input_features, attention_mask, forced_decoder_ids, max_length):
+        self.calls.append((len(input_features.array), forced_decoder_ids))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("out of memory")
+        return input_features.array
+
+
+def _clip(i):
+    return np.full(1600, float(i), dtype=np.float32)
+
+
+def test_concurrent_clips_share_generate_calls():
+    model = FakeModel()
+    service = STTService(FakeProcessor(), model, max_batch=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(service.transcribe(_clip(i)) for i in range(8)))
+
+    results = asyncio.run(run())
+    assert [r.text for r in results] == [f"clip {i}" for i in range(8)]
+    assert len(model.calls) == 1 and model.calls[0][0] == 8
+    assert results[0].batch_size == 8
+    assert set(results[0].timings_ms) == {"queue", "features", "language_id", "generate", "decode"}
+    assert service.stats["clips"] == 8 and service.stats["batches"] == 1
+
+
+def test_batches_are_grouped_by_forced_language():
+    model = FakeModel(delay=0)
+    service = STTService(FakeProcessor(), model, max_batch=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(
+            service.transcribe(_clip(0), "english"),
+            service.transcribe(_clip(1), "urdu"),
+            service.transcribe(_clip(2), "english"),
+        )
+
+    results = asyncio.run(run())
+    assert [r.language for r in results] == ["english", "urdu", "english"]
+    assert sorted((n, ids[0][1]) for n, ids in model.calls) == [(1, "urdu"), (2, "english")]
+
+
+def test_throughput_beats_sequential_decoding():
+    model = FakeModel(delay=0.05)
+    service = STTService(FakeProcessor(), model, max_batch=8, max_wait_ms=10)
+
+    async def run():
+        started = time.perf_counter()
+        await asyncio.gather(*(service.transcribe(_clip(i)) for i in range(8)))
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 8 * 0.05 / 2
+
+
+def test_event_loop_stays_responsive_during_decode():
+    service = STTService(FakeProcessor(), FakeModel(delay=0.2), max_wait_ms=0)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        await service.transcribe(_clip(1))
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 10
+
+
+def test_batch_failure_reaches_every_caller():
+    service = STTService(FakeProcessor(), FakeModel(delay=0, fail=True), max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(
+            service.transcribe(_clip(0)), service.transcribe(_clip(1)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert service.stats["errors"] == 1
+
+
+def test_language_id_forces_winner_and_reuses_encoder():
+    torch = pytest.importorskip("torch")
+
+    class Tokenizer:
+        unk_token_id = 0
+        vocab = {"<|startoftranscript|>": 1, "<|en|>": 10, "<|ur|>": 11, "<|de|>": 12}
+
+        def convert_tokens_to_ids(self, token):
+            return self.vocab.get(token, 0)
+
+    class LIDProcessor(FakeProcessor):
+        tokenizer = Tokenizer()
+
+        def __call__(self, audios, sampling_rate, return_tensors, return_attention_mask):
+            features = torch.tensor(np.stack([np.full(4, a[0]) for a in audios]))
+            return SimpleNamespace(input_features=features, attention_mask=torch.ones(len(audios), 4))
+
+    class LIDModel:
+        """Even clips 'sound' English, odd clips Urdu."""
+
+        def __init__(self):
+            self.encoder_calls = 0
+            self.calls = []
+
+        def get_encoder(self):
+            def encode(features):
+                self.encoder_calls += 1
+                return SimpleNamespace(last_hidden_state=features[:, None, :].repeat(1, 1500, 1))
+
+            return encode
+
+        def __call__(self, encoder_outputs, decoder_input_ids):
+            value = int(encoder_outputs[0][0, 0, 0].item())
+            logits = torch.zeros(1, 1, 20)
+            logits[0, -1, 10 if value % 2 == 0 else 11] = 6.0
+            return SimpleNamespace(logits=logits)
+
+        def generate(self, encoder_outputs, attention_mask, forced_decoder_ids, max_length):
+            self.calls.append((len(encoder_outputs.last_hidden_state), forced_decoder_ids[0][1]))
+            return encoder_outputs.last_hidden_state[:, 0, :].numpy()
+
+    model = LIDModel()
+    service = STTService(
+        LIDProcessor(),
+        model,
+        max_wait_ms=20,
+        lid_languages={"en": "english", "ur": "urdu", "de": "german"},
+    )
+
+    async def run():
+        return await service.transcribe_many([_clip(i) for i in range(4)])
+
+    results = asyncio.run(run())
+    assert [r.text for r in results] == [f"clip {i}" for i in range(4)]
+    assert [r.language for r in results] == ["english", "urdu", "english", "urdu"]
+    assert results[0].language_probs["english"] > 0.9 and set(results[0].language_probs) == {
+        "english", "urdu", "german"
+    }
+    assert model.encoder_calls == 1
+    assert sorted(model.calls) == [(2, "english"), (2, "urdu")]
+
+
+def test_open_session_blocks_eviction_until_it_closes():
+    from backend.serving.model_lifecycle import ModelLifecycle
+    from backend.voice.stt_service import stt_service_busy, stt_session
+
+    class Slot:
+        model = None
+
+        def load(self):
+            self.model = object()
+            return self.model
+
+        def release(self):
+            self.model = None
+
+    slot = Slot()
+    lifecycle = ModelLifecycle(idle_ttl=60, high_watermark_mb=0, standby=[])
+    lifecycle.register("stt", slot.load, lambda: slot.model, slot.release, busy=stt_service_busy)
+
+    with stt_session():
+        assert lifecycle.acquire("stt") is not None
+        # e.g. still reading the upload, or a socket between segments
+        assert not lifecycle.evict("stt", "memory")
+    assert lifecycle.evict("stt", "memory")
+    assert slot.model is None
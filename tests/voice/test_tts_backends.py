@@ -0,0 +1,169 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.voice.multilingual import LANGS
+from backend.voice.tts_backends import (
+    EdgeTTSBackend,
+    PiperTTSBackend,
+    TTSBackend,
+    TTSBackendError,
+    TTSRouter,
+)
+from benchmarks.standins.tts import StandInTTS, edge_tts_module, frame
+
+
+class StandInBackend(TTSBackend):
+    def __init__(self, name, tts, voice_attr="tts_voice"):
+        self.name = name
+        self.format = f"{name}-mp3"
+        self.tts = tts
+        self.voice_attr = voice_attr
+
+    def voice_for(self, lang_config):
+        return getattr(lang_config, self.voice_attr)
+
+    def synthesize(self, text, voice):
+        return self.tts(text, voice)
+
+
+def _router(edge, local, **kwargs):
+    backends = {
+        "edge": StandInBackend("edge", edge),
+        "local": StandInBackend("local", local, voice_attr="local_voice"),
+    }
+    return TTSRouter(backends, order=["edge", "local"], **kwargs)
+
+
+def _speak(router, lang, text="Hello there."):
+    route = router.route(LANGS[lang])
+
+    async def run():
+        return [chunk async for chunk in route.synthesize(text)], route
+
+    return asyncio.run(run())
+
+
+def test_candidates_follow_language_voices():
+    router = _router(StandInTTS(), StandInTTS())
+    assert [c.backend.name for c in router.route(LANGS["en"]).candidates] == ["edge", "local"]
+    # No local Urdu voice is configured
+    assert [c.backend.name for c in router.route(LANGS["ur"]).candidates] == ["edge"]
+
+
+def test_language_order_overrides_default(monkeypatch):
+    router = _router(StandInTTS(), StandInTTS())
+    monkeypatch.setattr(LANGS["en"], "tts_backends", ("local", "edge"))
+    route = router.route(LANGS["en"])
+    assert route.backend == "local"
+    assert route.voice == "en_US-lessac-medium"
+
+
+def test_error_fails_over_to_next_backend():
+    edge, local = StandInTTS(fail_on="Hello"), StandInTTS()
+    router = _router(edge, local)
+
+    chunks, route = _speak(router, "en")
+
+    assert chunks == [frame("Hello there.")]
+    assert route.failed_over and route.used == ["local"]
+    assert local.calls == [("Hello there.", "en_US-lessac-medium")]
+    assert router.health["edge"].failures == 1
+    assert router.health["local"].failovers == 1
+
+
+def test_slow_first_chunk_fails_over():
+    router = _router(StandInTTS(first_chunk_latency=1.0), StandInTTS(), first_chunk_timeout=0.05)
+    chunks, route = _speak(router, "en")
+    assert route.used == ["local"]
+    assert chunks == [frame("Hello there.")]
+
+
+def test_all_backends_failing_raises():
+    router = _router(StandInTTS(fail_on="Hello"), StandInTTS(fail_on="Hello"))
+    with pytest.raises(TTSBackendError):
+        _speak(router, "en")
+
+
+def test_a_request_stays_on_the_backend_that_started_it():
+    from backend.voice.tts_pipeline import pipelined_synthesis
+
+    sentences = ["First one.", "Second one.", "Third one."]
+
+    def run(router):
+        route = router.route(LANGS["en"])
+
+        async def collect():
+            return [c async for c in pipelined_synthesis(sentences, route.voice, route.synthesize)]
+
+        return route, collect
+
+    # Edge fails mid-request: the request errors rather than mixing encodings
+    edge, local = StandInTTS(fail_on="Second"), StandInTTS()
+    route, collect = run(_router(edge, local))
+    with pytest.raises(TTSBackendError):
+        asyncio.run(collect())
+    assert local.calls == [] and route.used == ["edge"]
+
+    # Edge fails on the first sentence: the whole request moves to local
+    edge, local = StandInTTS(fail_on="First"), StandInTTS()
+    route, collect = run(_router(edge, local))
+    assert asyncio.run(collect()) == [frame(s) for s in sentences]
+    assert [text for text, _ in edge.calls] == ["First one."]
+    assert route.used == ["local"] and route.failed_over
+
+
+def test_repeated_failures_demote_until_cooldown_ends():
+    edge = StandInTTS(fail_on="Hello")
+    router = _router(edge, StandInTTS(), failure_threshold=2, cooldown=60)
+    for _ in range(2):
+        _speak(router, "en")
+    assert router.route(LANGS["en"]).backend == "local"
+
+    router.health["edge"].cooldown_until = 0.0
+    assert router.route(LANGS["en"]).backend == "edge"
+
+
+def test_slow_backend_is_routed_around_and_probed():
+    router = _router(StandInTTS(first_chunk_latency=0.06), StandInTTS(), latency_budget=0.03, probe_every=4)
+    _speak(router, "en")  # edge measured above budget
+    assert router.health["edge"].ttfb_ewma > 0.03
+
+    picks = [router.route(LANGS["en"]).backend for _ in range(7)]
+    assert picks == ["local", "local", "edge", "local", "local", "local", "edge"]
+
+
+def test_local_backend_encodes_mp3(tmp_path, monkeypatch):
+    backend = PiperTTSBackend(voices_dir=str(tmp_path))
+    (tmp_path / "en_US-lessac-medium.onnx").write_bytes(b"")
+    assert backend.voice_for(LANGS["en"]) == "en_US-lessac-medium"
+    assert backend.voice_for(LANGS["ur"]) is None
+
+    pcm = (np.sin(np.linspace(0, 440, 22050)) * 8000).astype(np.int16).tobytes()
+    fake_voice = SimpleNamespace(
+        config=SimpleNamespace(sample_rate=22050),
+        synthesize_stream_raw=lambda text: iter([pcm]),
+    )
+    monkeypatch.setattr(backend, "_load_voice", lambda voice: fake_voice)
+
+    async def run():
+        return [c async for c in backend.synthesize("Hello.", "en_US-lessac-medium")]
+
+    (clip,) = asyncio.run(run())
+    assert clip[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2", b"ID")
+
+
+def test_edge_backend_streams_from_stand_in_module(monkeypatch):
+    tts = StandInTTS(chars_per_chunk=5)
+    monkeypatch.setitem(sys.modules, "edge_tts", edge_tts_module(tts))
+    backend = EdgeTTSBackend()
+    assert backend.available()
+
+    async def run():
+        return [c async for c in backend.synthesize("Hello there.", "en-US-ChristopherNeural")]
+
+    assert asyncio.run(run()) == [frame("Hello"), frame(" ther"), frame("e.")]
+    assert tts.calls == [("Hello there.", "en-US-ChristopherNeural")]
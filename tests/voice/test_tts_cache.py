@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.voice.tts_cache import TTSCache, tts_cache_key, warm_up
+
+
+def _collect(agen):
+    async def run():
+        return [chunk async for chunk in agen]
+
+    return asyncio.run(run())
+
+
+async def _chunks(*parts, fail=False):
+    for part in parts:
+        await asyncio.sleep(0)
+        yield part
+    if fail:
+        raise ConnectionError("upstream closed")
+
+
+def test_key_covers_text_voice_and_format():
+    base = tts_cache_key("hello", "en-US-ChristopherNeural")
+    assert base == tts_cache_key("hello", "en-US-ChristopherNeural")
+    assert base != tts_cache_key("hello", "hi-IN-SwaraNeural")
+    assert base != tts_cache_key("hello.", "en-US-ChristopherNeural")
+    assert base != tts_cache_key("hello", "en-US-ChristopherNeural", "riff-24khz-16bit-mono-pcm")
+
+
+def test_tee_forwards_chunks_and_stores_completed_stream(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    key = tts_cache_key("hi", "v")
+
+    assert _collect(cache.tee(key, _chunks(b"ab", b"cd"))) == [b"ab", b"cd"]
+    assert cache.get(key) == b"abcd"
+    assert (tmp_path / f"{key}.mp3").read_bytes() == b"abcd"
+    assert cache.stats["hits_memory"] == 1
+
+
+def test_failed_stream_is_not_cached(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    key = tts_cache_key("hi", "v")
+
+    with pytest.raises(ConnectionError):
+        _collect(cache.tee(key, _chunks(b"ab", fail=True)))
+    assert cache.get(key) is None
+    assert list(tmp_path.glob("*.mp3")) == []
+
+
+def test_disk_tier_survives_restart_and_promotes_to_memory(tmp_path):
+    key = tts_cache_key("hi", "v")
+    TTSCache(cache_dir=str(tmp_path)).put(key, b"mp3-bytes")
+
+    fresh = TTSCache(cache_dir=str(tmp_path))
+    assert fresh.get(key) == b"mp3-bytes"
+    assert fresh.stats["hits_disk"] == 1
+    assert fresh.get(key) == b"mp3-bytes"
+    assert fresh.stats["hits_memory"] == 1
+
+
+def test_disk_tier_is_size_bounded_lru(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path), memory_bytes=0, disk_bytes=25)
+    keys = [tts_cache_key(str(i), "v") for i in range(3)]
+    cache.put(keys[0], b"0" * 10)
+    cache.put(keys[1], b"1" * 10)
+    assert cache.get(keys[0]) is not None  # keys[1] is now least recently used
+    cache.put(keys[2], b"2" * 10)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.usage()["disk_bytes"] == 20
+    assert cache.stats["evictions"] == 1
+    assert len(list(tmp_path.glob("*.mp3"))) == 2
+
+
+def test_oversized_clips_stream_but_are_not_stored(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path), max_entry_bytes=3)
+    key = tts_cache_key("long", "v")
+    assert _collect(cache.tee(key, _chunks(b"ab", b"cd"))) == [b"ab", b"cd"]
+    assert not cache.contains(key)
+
+
+def test_warm_up_synthesizes_only_missing_phrases(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    cache.put(tts_cache_key("cached", "v"), b"old")
+    calls = []
+
+    def job(text):
+        def synthesize():
+            calls.append(text)
+            return _chunks(text.encode())
+
+        return tts_cache_key(text, "v"), synthesize
+
+    stored = asyncio.run(warm_up(cache, [job("cached"), job("new")]))
+    assert stored == 1
+    assert calls == ["new"]
+    assert cache.get(tts_cache_key("new", "v")) == b"new"
+
+
+def test_get_first_counts_one_miss_for_all_keys(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    keys = [tts_cache_key("hi", "edge-voice"), tts_cache_key("hi", "local-voice", "piper-mp3")]
+    assert cache.get_first(keys) is None
+    assert cache.stats["misses"] == 1
+
+    cache.put(keys[1], b"local")
+    assert cache.get_first(keys) == b"local"
+    assert cache.stats["misses"] == 1
+
+
+def test_cacheable_predicate_can_veto_the_store(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    key = tts_cache_key("hi", "v")
+    _collect(cache.tee(key, _chunks(b"ab"), cacheable=lambda: False))
+    assert not cache.contains(key)
+
+
+def test_generate_speech_serves_repeat_from_cache(tmp_path, monkeypatch):
+    from backend.api import main
+    from backend.voice import tts_backends
+    from backend.voice import tts_cache as tts_cache_module
+    from benchmarks.standins.tts import StandInTTS
+
+    monkeypatch.setattr(tts_cache_module, "_tts_cache_instance", TTSCache(cache_dir=str(tmp_path)))
+    standin = StandInTTS()
+
+    class StandInBackend(tts_backends.TTSBackend):
+        name = "edge"
+        format = "standin-mp3"
+
+        def voice_for(self, lang_config):
+            return lang_config.tts_voice
+
+        def synthesize(self, text, voice):
+            return standin(text, voice)
+
+    router = tts_backends.TTSRouter({"edge": StandInBackend()}, order=["edge"])
+    monkeypatch.setattr(tts_backends, "_tts_router_instance", router)
+    client = TestClient(main.app)
+    body = {"text": "Take 5 mg daily", "language": "en"}
+
+    first = client.post("/generate/speech", json=body)
+    second = client.post("/generate/speech", json=body)
+
+    assert first.content == second.content
+    assert first.headers["x-tts-cache"] == "miss"
+    assert second.headers["x-tts-cache"] == "hit"
+    assert standin.calls == [(main.normalize_medical_text("Take 5 mg daily"), "en-US-ChristopherNeural")]
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.voice.tts_pipeline import (
+    pipelined_synthesis,
+    plan_segments,
+    speech_stream,
+    split_sentences,
+)
+from benchmarks.standins.tts import StandInTTS, frame
+
+
+def _collect(agen):
+    async def run():
+        return [chunk async for chunk in agen]
+
+    return asyncio.run(run())
+
+
+def test_split_latin_keeps_decimals_and_abbreviations():
+    text = "Dr. Smith reviewed it. The opacity is 2.5 cm wide! Follow up, e.g. a CT scan?"
+    assert split_sentences(text, "en") == [
+        "Dr. Smith reviewed it.",
+        "The opacity is 2.5 cm wide!",
+        "Follow up, e.g. a CT scan?",
+    ]
+
+
+def test_split_urdu_on_full_stop_without_trailing_space():
+    text = "یہ نمونیا ہے۔ڈاکٹر سے رجوع کریں۔کیا آپ کو بخار ہے؟"
+    assert split_sentences(text, "ur") == [
+        "یہ نمونیا ہے۔",
+        "ڈاکٹر سے رجوع کریں۔",
+        "کیا آپ کو بخار ہے؟",
+    ]
+
+
+def test_split_chinese_on_ideographic_punctuation():
+    text = "这是肺炎。请咨询医生！您发烧吗？"
+    assert split_sentences(text, "zh") == ["这是肺炎。", "请咨询医生！", "您发烧吗？"]
+
+
+def test_plan_merges_short_fragments_and_splits_long_runs():
+    text = "Yes. " + "The finding is consistent with pneumonia. " + "word " * 60
+    segments = plan_segments(text.strip(), "en", min_chars=20, max_chars=120)
+    assert segments[0] == "Yes. The finding is consistent with pneumonia."
+    assert all(len(s) <= 120 for s in segments)
+    assert " ".join(segments).split() == text.split()
+
+
+def test_chinese_segments_are_joined_without_spaces():
+    assert plan_segments("好。这是肺炎。", "zh", min_chars=5) == ["好。这是肺炎。"]
+
+
+def test_segments_stream_in_order_with_bounded_parallelism():
+    tts = StandInTTS(first_chunk_latency=0.05, chars_per_chunk=8)
+    segments = [f"Sentence number {i} is here." for i in range(6)]
+
+    chunks = _collect(pipelined_synthesis(segments, "v", tts, concurrency=3))
+
+    assert b"".join(chunks) == b"".join(
+        frame(s[i : i + 8]) for s in segments for i in range(0, len(s), 8)
+    )
+    assert tts.peak_in_flight == 3
+    assert [text for text, _ in tts.calls] == segments
+
+
+def test_first_audio_arrives_before_the_whole_text_is_synthesized():
+    tts = StandInTTS(first_chunk_latency=0.05, per_chunk_delay=0.02, chars_per_chunk=10)
+    text = " ".join(f"This is sentence number {i} of the answer." for i in range(8))
+
+    async def time_to_first_chunk(stream):
+        started = time.perf_counter()
+        async for _ in stream:
+            first = time.perf_counter() - started
+            async for _ in stream:
+                pass
+            return first, time.perf_counter() - started
+
+    ttfa_piped, total_piped = asyncio.run(time_to_first_chunk(speech_stream(text, "v", "en", tts)))
+    ttfa_single, total_single = asyncio.run(time_to_first_chunk(tts(text, "v")))
+
+    assert ttfa_piped < 0.1
+    assert total_piped < total_single / 2
+
+
+def test_segment_failure_surfaces_after_earlier_audio():
+    tts = StandInTTS(fail_on="second")
+    stream = pipelined_synthesis(["first one", "second one", "third one"], "v", tts)
+
+    async def run():
+        received = []
+        with pytest.raises(ConnectionError):
+            async for chunk in stream:
+                received.append(chunk)
+        return received
+
+    assert asyncio.run(run()) == [frame("first one")]
+
+
+def test_closing_the_stream_cancels_pending_segments():
+    tts = StandInTTS(first_chunk_latency=0.05)
+
+    async def run():
+        stream = pipelined_synthesis([f"segment {i}" for i in range(5)], "v", tts, concurrency=2)
+        assert await stream.__anext__() == frame("segment 0")
+        await stream.aclose()
+        await asyncio.sleep(0.1)
+        return tts.in_flight
+
+    assert asyncio.run(run()) == 0
+
+
+def test_short_text_uses_a_single_session():
+    tts = StandInTTS()
+    assert _collect(speech_stream("Short answer.", "v", "en", tts)) == [frame("Short answer.")]
+    assert len(tts.calls) == 1
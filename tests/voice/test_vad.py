@@ -0,0 +1,215 @@
+import asyncio
+import os
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.voice.live_transcription import live_transcripts, pcm_to_float
+from backend.voice.stt_service import TranscriptionResult
+from backend.voice.vad import EnergyVAD
+
+SR = 16000
+
+
+def _tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _noise(seconds, level=0.002, seed=0):
+    return np.random.default_rng(seed).normal(0, level, int(seconds * SR)).astype(np.float32)
+
+
+def _vad(**kwargs):
+    params = dict(partial_ms=0, hangover_ms=300, preroll_ms=90, max_segment_s=15)
+    params.update(kwargs)
+    return EnergyVAD(**params)
+
+
+def _run(vad, audio, chunk=480 * 3 + 7):
+    events = []
+    for i in range(0, len(audio), chunk):
+        events.extend(vad.feed(audio[i : i + chunk]))
+    return events + vad.flush()
+
+
+def test_two_utterances_become_two_segments():
+    audio = np.concatenate([_noise(0.5), _tone(1.0), _noise(1.0, seed=1), _tone(0.8), _noise(0.5, seed=2)])
+    events = _run(_vad(), audio)
+
+    assert [(e.kind, e.segment) for e in events] == [("final", 0), ("final", 1)]
+    first, second = events
+    assert 0.35 <= first.start < 0.5  # pre-roll keeps audio from before the onset
+    assert 1.5 < first.end < 2.0
+    assert second.start < 2.5 < second.end
+    assert len(first.audio) == round((first.end - first.start) * SR)
+
+
+def test_noise_alone_never_opens_a_segment():
+    vad = _vad()
+    assert _run(vad, _noise(3.0, level=0.004)) == []
+    assert vad.noise_floor < vad.min_rms
+
+
+def test_partials_while_speaking_and_forced_cut():
+    vad = _vad(partial_ms=500, max_segment_s=2)
+    events = _run(vad, np.concatenate([_tone(4.5), _noise(0.5)]))
+
+    finals = [e for e in events if e.kind == "final"]
+    assert [round(e.end - e.start) for e in finals] == [2, 2, 1]
+    assert any(e.kind == "partial" for e in events)
+    for e in events:
+        if e.kind == "partial":
+            final = finals[e.segment]
+            assert e.start == final.start and e.end < final.end
+
+
+def test_pcm_decoding():
+    pcm = np.array([0, 16384, -32768], dtype="<i2").tobytes()
+    assert pcm_to_float(pcm).tolist() == [0.0, 0.5, -1.0]
+    assert pcm_to_float(np.array([0.25], dtype="<f4").tobytes(), "f32le").tolist() == [0.25]
+
+
+class LengthService:
+    """STT stand-in that reports how many seconds of audio it heard."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def transcribe(self, audio, whisper_language=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return TranscriptionResult(f"{len(audio) / SR:.1f}s", whisper_language, 1)
+
+
+def test_segments_decode_while_audio_still_arrives():
+    audio = np.concatenate([_tone(1.0), _noise(0.6), _tone(1.0), _noise(0.6, seed=1)])
+    service = LengthService(delay=0.01)
+    received_at = []
+    yielded_at = {}
+
+    async def chunks():
+        for i in range(0, len(audio), 1600):
+            received_at.append(i)
+            yield audio[i : i + 1600]
+            await asyncio.sleep(0.005)
+
+    async def run():
+        out = []
+        async for h in live_transcripts(chunks(), service, "english", _vad()):
+            yielded_at[h.segment] = len(received_at)
+            out.append(h)
+        return out
+
+    hypotheses = asyncio.run(run())
+    assert [(h.kind, h.segment) for h in hypotheses] == [("final", 0), ("final", 1)]
+    # The first segment was back before the client finished sending
+    assert yielded_at[0] < len(received_at)
+
+
+def test_next_segment_partial_is_not_held_back_by_a_closed_one():
+    from backend.voice.vad import VADEvent
+
+    class ScriptedVAD:
+        def feed(self, chunk):
+            return [
+                VADEvent(kind, segment, _tone(0.5), segment, segment + 0.5)
+                for segment in (0, 1)
+                for kind in ("partial", "final")
+            ]
+
+        def flush(self):
+            return []
+
+    async def chunks():
+        yield _tone(0.1)
+
+    async def run():
+        return [
+            (h.kind, h.segment)
+            async for h in live_transcripts(chunks(), LengthService(delay=0.01), None, ScriptedVAD())
+        ]
+
+    assert asyncio.run(run()) == [("partial", 0), ("final", 0), ("partial", 1), ("final", 1)]
+
+
+def test_websocket_streams_hypotheses():
+    from backend.api.main import app
+    from backend.core.feature_flags import get_feature_flags
+
+    pcm = (np.concatenate([_tone(1.0), _noise(0.8)]) * 32767).astype("<i2").tobytes()
+    with patch.dict(os.environ, {"FF_NOISE_HANDLING": "true"}):
+        get_feature_flags().reload()
+        with patch("backend.api.main.stt_model", MagicMock()), patch(
+            "backend.api.main.stt_processor", MagicMock()
+        ), patch("backend.api.routes.v2_voice.get_stt_service", return_value=LengthService()):
+            with TestClient(app).websocket_connect("/v2/voice/stream?language=en") as ws:
+                for i in range(0, len(pcm), 3200):
+                    ws.send_bytes(pcm[i : i + 3200])
+                ws.send_json({"type": "end"})
+                messages = []
+                while not messages or messages[-1]["type"] != "done":
+                    messages.append(ws.receive_json())
+    get_feature_flags().reload()
+
+    finals = [m for m in messages if m["type"] == "final"]
+    assert len(finals) == 1 and finals[0]["segment"] == 0
+    assert finals[0]["text"].endswith("s") and finals[0]["start"] < 0.05
+
+
+def test_trim_cuts_edges_and_collapses_long_pauses():
+    from backend.voice.vad import trim_silence
+
+    audio = np.concatenate(
+        [_noise(2.0), _tone(1.0), _noise(3.0, seed=1), _tone(1.0), _noise(0.4, seed=2), _tone(0.5), _noise(2.0, seed=3)]
+    )
+    result = trim_silence(audio, pad_ms=150, max_gap_ms=600, keep_gap_ms=300)
+
+    assert result.input_seconds == len(audio) / SR
+    # 2.5 s of tone, the 0.4 s pause kept whole, the 3 s pause cut to ~0.3 s, plus padding
+    assert 3.2 < result.kept_seconds < 4.0
+    assert result.audio.dtype == np.float32
+
+
+def test_continuous_speech_over_steady_noise_is_passed_through():
+    from backend.voice.vad import trim_silence
+
+    t = np.arange(3 * SR) / SR
+    speech = (0.1 * np.sin(2 * np.pi * 220 * t) * (1 + 0.3 * np.sin(2 * np.pi * 3 * t))).astype(np.float32)
+    audio = speech + _noise(3.0, level=0.05)  # about 6 dB SNR, no quiet frames
+
+    result = trim_silence(audio)
+
+    assert result.has_speech
+    assert result.kept_seconds == result.input_seconds
+    np.testing.assert_array_equal(result.audio, audio)
+
+
+def test_silent_clip_is_skipped_without_the_model():
+    import io
+
+    import soundfile as sf
+
+    from backend.api.main import app
+    from backend.voice.vad import trim_silence, trim_stats
+
+    assert not trim_silence(_noise(5.0, level=0.003)).has_speech
+
+    class NoService:
+        async def transcribe(self, audio, whisper_language=None):
+            raise AssertionError("Whisper should not run on silence")
+
+    wav = io.BytesIO()
+    sf.write(wav, _noise(3.0, level=0.003), SR, format="WAV")
+    silent_before = trim_stats["silent_clips"]
+    with patch("backend.api.main.stt_model", MagicMock()), patch(
+        "backend.api.main.stt_processor", MagicMock()
+    ), patch("backend.api.main.get_stt_service", return_value=NoService()):
+        r = TestClient(app).post(
+            "/transcribe/audio", files={"audio_file": ("a.wav", wav.getvalue(), "audio/wav")}
+        )
+
+    assert r.status_code == 200 and r.json()["transcription"] == ""
+    assert trim_stats["silent_clips"] == silent_before + 1